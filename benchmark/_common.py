@@ -0,0 +1,67 @@
+"""Common helpers for the benchmark scripts.
+
+The benchmark scripts are run from the repository root, e.g.
+    python benchmark/bench_tuning.py
+and import the notebook and feature repository modules the same way the
+notebooks do, by adding their directories to sys.path.
+"""
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Dict,
+    Tuple,
+)
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+NOTEBOOK_DIR = REPO_ROOT / "notebook"
+FEATURE_REPOSITORY_DIR = REPO_ROOT / "deployment" / "feast" / "feature_repository"
+RAW_DATA_PATH = REPO_ROOT / "data" / "raw" / "german_credit_data.csv"
+PROCESSED_DATA_PATH = REPO_ROOT / "data" / "processed" / "customer_credit_risk_features.csv"
+# Arguments of the pipelines in the 01 notebook.
+NUMERIC_COLUMNS = ["Age", "Credit amount", "Duration"]
+CATEGORICAL_COLUMNS = ["Sex", "Job", "Housing", "Saving accounts", "Checking account", "Purpose"]
+COLUMN_RENAME_MAP = {
+    "Risk": "risk",
+    "purpose_domestic appliances": "purpose_domestic_appliances",
+    "purpose_furniture/equipment": "purpose_furniture_equipment",
+    "purpose_radio/TV": "purpose_radio_tv",
+    "purpose_vacation/others": "purpose_vacation_others",
+    "saving_accounts_quite rich": "saving_accounts_quite_rich",
+    "generation_Student": "generation_student",
+    "generation_Young": "generation_young",
+    "generation_Adult": "generation_adult",
+    "generation_Senior": "generation_senior",
+    "amount_<5K": "amount_0",
+    "amount_5-10K": "amount_1",
+    "amount_10-15K": "amount_2",
+    "amount_15-20K": "amount_3",
+    "amount_20K+": "amount_4",
+    "sex_male": "gender_male",
+    "sex_female": "gender_female",
+}
+
+for path in (NOTEBOOK_DIR, FEATURE_REPOSITORY_DIR):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+
+def load_processed_features(label_column: str = "risk") -> Tuple[pd.DataFrame, pd.Series]:
+    """Load the engineered features written by the 01 notebook.
+    Returns: Tuple(X, y)
+    """
+    df = pd.read_csv(PROCESSED_DATA_PATH)
+    return df.drop(columns=[label_column]), df[label_column]
+
+
+@contextmanager
+def timer(name: str, results: Dict[str, float]):
+    """Record the wall time of the with-block into results[name] in seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[name] = time.perf_counter() - start
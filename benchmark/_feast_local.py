@@ -0,0 +1,237 @@
+"""Local FEAST feature store for the benchmarks.
+
+Builds a throw-away feature repository in a working directory with the same
+project, entity, feature view and feature service names as features.py, but a
+FileSource (Parquet) offline store and a file registry, so that the benchmarks
+need neither PostgreSQL nor `feast apply` on the real repository. The online
+store is SQLite as in feature_store.yaml.template.
+
+A feature_store.yaml is written into the working directory, hence the directory
+can also be used as the repo path of `feast serve` or the scoring service.
+"""
+import io
+import os
+from datetime import (
+    datetime,
+    timedelta,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import yaml
+from feast import (
+    Entity,
+    FeatureService,
+    FeatureStore,
+    FeatureView,
+    Field,
+    FileSource,
+)
+from feast.data_format import ParquetFormat
+from feast.feature_logging import LoggingConfig
+from feast.infra.offline_stores.contrib.postgres_offline_store.postgres_source import (
+    PostgreSQLSource,
+)
+from feast.infra.offline_stores.file_source import FileLoggingDestination
+from feast.on_demand_feature_view import on_demand_feature_view
+from feast.types import (
+    Float32,
+    Int64,
+)
+from sqlalchemy import create_engine
+
+from _common import PROCESSED_DATA_PATH
+from offline_export import write_monthly_parquet
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    pack_one_hot,
+    unpack_categories,
+)
+
+PROJECT = "customer_credit_risk"
+FEATURE_VIEW_NAME = "customer_credit_risk_feature_view"
+FEATURE_SERVICE_NAME = "customer_credit_risk_feature_service"
+PACKED_FEATURE_VIEW_NAME = "customer_credit_risk_packed_feature_view"
+PACKED_FEATURE_SERVICE_NAME = "customer_credit_risk_packed_feature_service"
+
+
+def customer_credit_risk_unpacked_feature_view(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Same transformation as the on demand feature view in features.py"""
+    return unpack_categories(inputs)
+
+
+def make_feature_rows(
+        n_entities: int,
+        event_timestamp: datetime,
+        seed: int = 0,
+        history: Optional[timedelta] = None,
+) -> pd.DataFrame:
+    """Resample the processed features to n_entities rows with entity ids 1..n_entities.
+    With history, the event timestamps are spread uniformly over the history before
+    event_timestamp instead of all being event_timestamp.
+    """
+    df = pd.read_csv(PROCESSED_DATA_PATH)
+    df = df.sample(n=n_entities, replace=True, random_state=seed).reset_index(drop=True)
+    df = df.astype(np.float32)
+    df["entity_id"] = np.arange(1, n_entities + 1, dtype=np.int64)
+    df["event_timestamp"] = pd.Timestamp(event_timestamp)
+    if history is not None:
+        offsets = np.random.default_rng(seed).uniform(0, history.total_seconds(), n_entities)
+        df["event_timestamp"] -= pd.to_timedelta(offsets, unit="s")
+    df["created"] = df["event_timestamp"]
+    return df
+
+
+def postgres_offline_store_from_env() -> Optional[Dict[str, Any]]:
+    """postgres offline_store section from the variables of deploy.sh, None without POSTGRES_PASSWORD"""
+    if not os.environ.get("POSTGRES_PASSWORD"):
+        return None
+    return {
+        "type": "postgres",
+        "host": os.environ.get("PG_OFFLINE_HOST", "localhost"),
+        "port": int(os.environ.get("PG_OFFLINE_PORT", "5432")),
+        "database": os.environ.get("PG_OFFLINE_DB", "offline_features"),
+        "db_schema": os.environ.get("PG_OFFLINE_SCHEMA", "credit"),
+        "user": os.environ.get("PG_OFFLINE_USER", "dbadm"),
+        "password": os.environ["POSTGRES_PASSWORD"],
+    }
+
+
+def load_postgres(df: pd.DataFrame, offline_store: Dict[str, Any]) -> str:
+    """Replace the offline table in the postgres offline store database with df, returns its name"""
+    schema = offline_store.get("db_schema", "public")
+    table = "customer_credit_risk_offline_features"
+    engine = create_engine(
+        f"postgresql+psycopg2://{quote(offline_store['user'])}:{quote(offline_store['password'])}"
+        f"@{offline_store['host']}:{offline_store.get('port', 5432)}/{offline_store['database']}"
+    )
+    try:
+        df.head(0).to_sql(table, engine, schema=schema, if_exists="replace", index=False)
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {schema}.{table} FROM STDIN WITH CSV", buffer)
+                cursor.execute(f"CREATE INDEX ON {schema}.{table} (entity_id, event_timestamp)")
+                cursor.execute(f"ANALYZE {schema}.{table}")
+            connection.commit()
+        finally:
+            connection.close()
+    finally:
+        engine.dispose()
+    return f"{schema}.{table}"
+
+
+def create_local_feature_store(
+        workdir: str,
+        n_entities: int = 10_000,
+        online_store: Optional[Dict[str, Any]] = None,
+        materialize: bool = True,
+        history: Optional[timedelta] = None,
+        packed: bool = False,
+        registry: Optional[Dict[str, Any]] = None,
+        offline_store: Optional[Dict[str, Any]] = None,
+) -> Tuple[FeatureStore, FeatureView, FeatureService]:
+    """Create, apply and (optionally) materialise the local feature repository.
+
+    Args:
+        workdir: directory for the registry, Parquet source and online store
+        n_entities: number of entities
+        online_store: online_store section of feature_store.yaml, SQLite in workdir by default
+        materialize: materialise the rows of the last hour into the online store
+        history: spread the event timestamps over this period, see make_feature_rows
+        packed: Use the packed layout of features.py instead, i.e. the packed feature
+            view, the unpacking on demand feature view and the packed feature service.
+        registry: registry section of feature_store.yaml, a file registry in workdir by default
+        offline_store: offline_store section of feature_store.yaml, the dask file offline
+            store on one Parquet file by default. With duckdb, the source is the monthly
+            Parquet export of offline_export.py in workdir. With postgres, the rows are
+            loaded into the customer_credit_risk_offline_features table of the database.
+
+    Returns: Tuple(FeatureStore, FeatureView, FeatureService)
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    df = make_feature_rows(n_entities, now - timedelta(minutes=5), history=history)
+    if packed:
+        df[PACKED_FEATURE] = pack_one_hot(df)
+        df = df.drop(columns=ONE_HOT_FEATURES)
+    source_path = workdir / "customer_credit_risk_offline_features.parquet"
+    df.to_parquet(source_path, index=False)
+    offline_store = offline_store or {"type": "file"}
+    source_options = {
+        "name": "customer_credit_risk_feature_source",
+        "timestamp_field": "event_timestamp",
+        "created_timestamp_column": "created",
+    }
+    if offline_store["type"] == "duckdb":
+        export_dir = workdir / "offline" / "customer_credit_risk_offline_features"
+        df["event_timestamp"] = df["event_timestamp"].dt.tz_localize("UTC").dt.floor("us")
+        df["created"] = df["event_timestamp"]
+        write_monthly_parquet([df.sort_values("event_timestamp")], str(export_dir))
+        source = FileSource(path=str(export_dir / "*.parquet"), file_format=ParquetFormat(),
+                            **source_options)
+    elif offline_store["type"] == "postgres":
+        table = load_postgres(df, offline_store)
+        source = PostgreSQLSource(query=f"SELECT * FROM {table}", **source_options)
+    else:
+        source = FileSource(path=str(source_path), **source_options)
+
+    config = {
+        "project": PROJECT,
+        "provider": "local",
+        "registry": registry or {"path": str(workdir / "registry.db"), "cache_ttl_seconds": 60},
+        "online_store": online_store or {
+            "type": "sqlite", "path": str(workdir / "online_store.db")
+        },
+        "offline_store": offline_store,
+        "entity_key_serialization_version": 3,
+    }
+    with open(workdir / "feature_store.yaml", "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file)
+    store = FeatureStore(repo_path=str(workdir))
+
+    customer = Entity(name="customer", join_keys=["entity_id"])
+    feature_names = [c for c in df.columns if c not in ("entity_id", "event_timestamp", "created")]
+    feature_view = FeatureView(
+        name=PACKED_FEATURE_VIEW_NAME if packed else FEATURE_VIEW_NAME,
+        source=source,
+        entities=[customer],
+        ttl=timedelta(hours=1),
+        schema=[Field(name="entity_id", dtype=Int64)] + [
+            Field(name=name, dtype=Int64 if name == PACKED_FEATURE else Float32)
+            for name in feature_names
+        ],
+        online=True,
+    )
+    if packed:
+        unpacked_view = on_demand_feature_view(
+            sources=[feature_view],
+            schema=[Field(name=name, dtype=Float32) for name in ONE_HOT_FEATURES],
+            mode="python",
+        )(customer_credit_risk_unpacked_feature_view)
+        feature_service = FeatureService(
+            name=PACKED_FEATURE_SERVICE_NAME, features=[unpacked_view]
+        )
+        store.apply([customer, feature_view, unpacked_view, feature_service])
+    else:
+        feature_service = FeatureService(
+            name=FEATURE_SERVICE_NAME, features=[feature_view],
+            logging_config=LoggingConfig(destination=FileLoggingDestination(path="logs")),
+        )
+        store.apply([customer, feature_view, feature_service])
+    if materialize:
+        store.materialize(now - timedelta(hours=1), now)
+    return store, feature_view, feature_service
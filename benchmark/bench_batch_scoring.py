@@ -0,0 +1,85 @@
+"""Benchmark the batch scoring job.
+
+Without PostgreSQL, scores n_entities rows of resampled processed features in
+chunks with score_chunks and serialises the COPY input with predictions_csv,
+i.e. the job without the database reads and writes. With POSTGRES_PASSWORD and
+the PG_OFFLINE_* variables of deploy.sh, the rows are loaded into the offline
+table and the whole BatchScoringJob runs against it.
+
+Usage:
+    python benchmark/bench_batch_scoring.py [n_entities] [chunk_rows] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+
+from sklearn.linear_model import LogisticRegression
+from sqlalchemy import create_engine
+
+from _common import load_processed_features
+from _feast_local import (
+    load_postgres,
+    make_feature_rows,
+    postgres_offline_store_from_env,
+)
+from batch_scoring import (
+    BatchScoringJob,
+    predictions_csv,
+    score_chunks,
+)
+from scorer import (
+    export_scorer,
+    save_scorer,
+)
+
+
+def main(n_entities: int = 1_000_000, chunk_rows: int = 100_000, workers: int = os.cpu_count()):
+    """Print the end to end rows/s"""
+    X, y = load_processed_features()
+    scorer = export_scorer(LogisticRegression(max_iter=1000).fit(X, y))
+    df = make_feature_rows(n_entities, datetime.now())
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = str(Path(workdir) / "scorer.npz")
+        save_scorer(scorer, model_path)
+
+        offline_store = postgres_offline_store_from_env()
+        if offline_store is None:
+            entity_ids = df["entity_id"].to_numpy()
+            features = df[scorer.feature_names].to_numpy(dtype="float64")
+            chunks = ((entity_ids[i:i + chunk_rows], features[i:i + chunk_rows])
+                      for i in range(0, n_entities, chunk_rows))
+            scored_at = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            rows = 0
+            for chunk_ids, scores in score_chunks(chunks, model_path, workers):
+                predictions_csv(chunk_ids, scores, "bench", scored_at)
+                rows += len(chunk_ids)
+            seconds = time.perf_counter() - start
+            print(f"score + COPY input, no database: {rows} rows in {seconds:.2f} sec, "
+                  f"{rows / seconds:,.0f} rows/s ({workers} workers)")
+            return
+
+        table = load_postgres(df, offline_store)
+        engine = create_engine(
+            f"postgresql+psycopg2://{offline_store['user']}:{offline_store['password']}"
+            f"@{offline_store['host']}:{offline_store['port']}/{offline_store['database']}"
+        )
+        try:
+            report = BatchScoringJob(
+                engine, model_path, "bench", f"bench@{time.time_ns()}", table=table,
+                chunk_rows=chunk_rows, workers=workers,
+            ).run()
+        finally:
+            engine.dispose()
+        print(f"batch scoring job: {report['rows']} rows in {report['seconds']:.2f} sec, "
+              f"{report['rows_per_second']:,.0f} rows/s ({workers} workers)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
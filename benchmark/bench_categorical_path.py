@@ -0,0 +1,81 @@
+"""Benchmark the Categorical data path of eda.py / feature_engineering.py against object strings.
+
+    object             categorical=False: object string columns throughout
+    categorical        categorical=True on object string input, i.e. including the
+                       conversion to Categoricals
+    categorical input  categorical=True on Categorical input, as data_loader.py loads it
+
+Each path runs in a fresh process on n_rows synthetic rows (synthetic_data.py)
+and reports the time of run_eda_enrich_pipeline, of the risk_heatmap groupbys
+(mean Risk per category), of run_feature_engineering_pipeline, the memory of the
+enriched DataFrame and the peak resident memory.
+
+Usage:
+    python benchmark/bench_categorical_path.py [n_rows]
+"""
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Dict
+
+import numpy as np
+
+from _common import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_RENAME_MAP,
+    NUMERIC_COLUMNS,
+    RAW_DATA_PATH,
+)
+from eda import run_eda_enrich_pipeline
+from feature_engineering import (
+    run_feature_engineering_pipeline,
+    to_categorical,
+)
+from synthetic_data import SyntheticCreditDataGenerator
+
+
+def _run(path: str, n_rows: int) -> Dict[str, float]:
+    """Runs in a fresh process: seconds per stage and memory in MB"""
+    df = SyntheticCreditDataGenerator.from_csv(str(RAW_DATA_PATH)).sample(n_rows, np.random.default_rng(0))
+    df["Risk"] = (df["Risk"] == "bad").astype(np.float64)
+    if path == "categorical input":
+        df = to_categorical(df)
+    categorical = path != "object"
+    results = {}
+
+    start = time.perf_counter()
+    df, categorical_cols, numeric_cols = run_eda_enrich_pipeline(
+        df, list(CATEGORICAL_COLUMNS), list(NUMERIC_COLUMNS), categorical=categorical
+    )
+    results["eda_enrich"] = time.perf_counter() - start
+    results["enriched_mb"] = df.memory_usage(deep=True).sum() / 2 ** 20
+
+    start = time.perf_counter()
+    for col in categorical_cols:
+        df.groupby(col, observed=False)["Risk"].mean()
+    results["groupby"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_feature_engineering_pipeline(
+        df, categorical_cols, numeric_cols, "Risk", COLUMN_RENAME_MAP, categorical=categorical
+    )
+    results["feature_engineering"] = time.perf_counter() - start
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def main(n_rows: int = 1_000_000):
+    """Print the times and memory per path"""
+    context = multiprocessing.get_context("spawn")
+    print(f"{n_rows} rows")
+    for path in ("object", "categorical", "categorical input"):
+        with context.Pool(1) as pool:
+            results = pool.apply(_run, (path, n_rows))
+        print(f"    {path:17s}: eda_enrich {results['eda_enrich']:6.2f} sec, groupby {results['groupby']:6.2f} sec, "
+              f"feature_engineering {results['feature_engineering']:6.2f} sec, "
+              f"enriched {results['enriched_mb']:6.0f} MB, peak rss {results['peak_rss_mb']:6.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
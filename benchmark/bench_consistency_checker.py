@@ -0,0 +1,96 @@
+"""Benchmark the online / offline consistency checker.
+
+Materialises n_entities rows into a local SQLite online store and compares
+them with the offline rows in two ways:
+
+    values          get_online_features of every entity and a value by value
+                    comparison with the offline rows
+    fingerprints    consistency_checker: the online table decoded with NumPy,
+                    row fingerprints and the diff of the fingerprints
+
+With POSTGRES_PASSWORD and the PG_OFFLINE_* variables of deploy.sh, the offline
+rows are loaded into PostgreSQL and the whole ConsistencyChecker runs against
+it, with the fingerprints computed server side. Without, the offline
+fingerprints are computed with NumPy from the Parquet source.
+
+Usage:
+    python benchmark/bench_consistency_checker.py [n_entities] [workers]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from _feast_local import (
+    FEATURE_VIEW_NAME,
+    PROJECT,
+    create_local_feature_store,
+    postgres_offline_store_from_env,
+)
+from consistency_checker import (
+    ConsistencyChecker,
+    diff_fingerprints,
+    fingerprint,
+    read_online_rows,
+)
+
+
+def main(n_entities: int = 100_000, workers: int = 4):
+    """Print the entities/s of each comparison"""
+    with tempfile.TemporaryDirectory() as workdir:
+        offline_store = postgres_offline_store_from_env()
+        store, feature_view, _ = create_local_feature_store(workdir, n_entities, offline_store=offline_store)
+        feature_names = [feature.name for feature in feature_view.features]
+        online_path = str(Path(workdir) / "online_store.db")
+        online_table = f"{PROJECT}_{FEATURE_VIEW_NAME}"
+        offline = pd.read_parquet(Path(workdir) / "customer_credit_risk_offline_features.parquet")
+        offline = offline.sort_values("entity_id")
+
+        start = time.perf_counter()
+        online = store.get_online_features(
+            features=[f"{FEATURE_VIEW_NAME}:{name}" for name in feature_names],
+            entity_rows=[{"entity_id": int(i)} for i in offline["entity_id"]],
+        ).to_df()
+        equal = np.array_equal(online[feature_names].to_numpy(dtype=np.float32),
+                               offline[feature_names].to_numpy(dtype=np.float32))
+        seconds = time.perf_counter() - start
+        print(f"values      : {n_entities} entities in {seconds:6.2f} sec, "
+              f"{n_entities / seconds:10,.0f} entities/s, consistent {equal}")
+
+        if offline_store is None:
+            start = time.perf_counter()
+            online_ids, online_values = read_online_rows(online_path, online_table, feature_names)
+            online_fingerprints = fingerprint(online_values)
+            online_seconds = time.perf_counter() - start
+            offline_fingerprints = fingerprint(offline[feature_names].to_numpy())
+            diff = diff_fingerprints(offline["entity_id"].to_numpy(), offline_fingerprints,
+                                     online_ids, online_fingerprints)
+            seconds = time.perf_counter() - start
+            print(f"fingerprints: {n_entities} entities in {seconds:6.2f} sec, "
+                  f"{n_entities / seconds:10,.0f} entities/s (online read {online_seconds:.2f} sec), "
+                  f"mismatched {len(diff['mismatched'])}, missing online {len(diff['missing_online'])}")
+            return
+
+        engine = create_engine(
+            f"postgresql+psycopg2://{offline_store['user']}:{offline_store['password']}"
+            f"@{offline_store['host']}:{offline_store['port']}/{offline_store['database']}"
+        )
+        try:
+            report = ConsistencyChecker(
+                engine, online_path, online_table, feature_names,
+                table=f"{offline_store['db_schema']}.customer_credit_risk_offline_features", workers=workers,
+            ).run()
+        finally:
+            engine.dispose()
+        print(f"fingerprints: {n_entities} entities in {report['seconds']:6.2f} sec, "
+              f"{report['entities_per_second']:10,.0f} entities/s (online read {report['online_seconds']:.2f} sec, "
+              f"offline {report['offline_seconds']:.2f} sec with {workers} workers), "
+              f"mismatched {report['mismatched']}, missing online {report['missing_online']}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""Benchmark load_raw_data against the notebooks' pd.read_csv with a Risk converter.
+
+A synthetic CSV of n_rows rows is generated with synthetic_data.py. Every load
+runs in a fresh process, which reports the load time, its peak resident memory
+and the memory of the loaded DataFrame.
+
+    read_csv      pd.read_csv(index_col=0, converters={'Risk': ...}), object strings
+    arrow         load_raw_data without the cache: pyarrow CSV reader, categoricals
+    arrow cached  load_raw_data from the Parquet sidecar
+
+Usage:
+    python benchmark/bench_data_loader.py [n_rows]
+"""
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import pandas as pd
+
+from _common import RAW_DATA_PATH
+from data_loader import (
+    load_raw_data,
+    sidecar_path,
+)
+from synthetic_data import SyntheticCreditDataGenerator
+
+
+def _load(method: str, path: str) -> Tuple[float, float, float]:
+    """Runs in a fresh process: (seconds, peak rss MB, DataFrame MB)"""
+    start = time.perf_counter()
+    if method == "read_csv":
+        df = pd.read_csv(path, index_col=0, converters={"Risk": lambda x: {"good": 0., "bad": 1.}[x]})
+    else:
+        df = load_raw_data(path, use_cache=method == "arrow cached")
+    seconds = time.perf_counter() - start
+    return (seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            df.memory_usage(deep=True).sum() / 2 ** 20)
+
+
+def main(n_rows: int = 10_000_000):
+    """Print the load time and memory per method"""
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / "german_credit_data.csv"
+        SyntheticCreditDataGenerator.from_csv(str(RAW_DATA_PATH)).write(str(path), n_rows)
+        print(f"load {n_rows} rows, {path.stat().st_size / 2 ** 20:.0f} MB CSV")
+        # Write the sidecar for the cached load.
+        load_raw_data(str(path))
+        print(f"    sidecar {sidecar_path(str(path)).stat().st_size / 2 ** 20:.0f} MB")
+        for method in ("read_csv", "arrow", "arrow cached"):
+            with context.Pool(1) as pool:
+                seconds, rss_peak, df_mb = pool.apply(_load, (method, str(path)))
+            print(f"    {method:12s}: {seconds:7.2f} sec, peak rss {rss_peak:7.0f} MB, DataFrame {df_mb:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,89 @@
+"""Benchmark the dense array online store against the SQLite online store.
+
+Usage:
+    python benchmark/bench_dense_online_store.py [n_entities]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _feast_local import (
+    FEATURE_VIEW_NAME,
+    create_local_feature_store,
+)
+from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+
+ONLINE_STORES = {
+    "sqlite": lambda workdir: {"type": "sqlite", "path": str(Path(workdir) / "online_store.db")},
+    "dense": lambda workdir: {
+        "type": "dense_online_store.DenseArrayOnlineStore",
+        "path": str(Path(workdir) / "dense_online_store"),
+    },
+}
+
+
+def _per_call_us(function, calls) -> float:
+    start = time.perf_counter()
+    for args in calls:
+        function(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main(n_entities: int = 100_000, n_calls: int = 500, batch_size: int = 256):
+    """Single entity and batched reads, through get_online_features and online_read"""
+    rng = np.random.default_rng(0)
+    singles = rng.integers(1, n_entities + 1, size=n_calls).tolist()
+    batches = [rng.integers(1, n_entities + 1, size=batch_size).tolist() for _ in range(50)]
+
+    for name, online_store in ONLINE_STORES.items():
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            store, feature_view, feature_service = create_local_feature_store(
+                workdir, n_entities, online_store=online_store(workdir)
+            )
+            setup_seconds = time.perf_counter() - start
+            provider_store = store._get_provider().online_store  # pylint: disable=protected-access
+            feature_view = store.get_feature_view(FEATURE_VIEW_NAME)
+
+            def get_online_features(ids):
+                store.get_online_features(
+                    features=feature_service, entity_rows=[{"entity_id": i} for i in ids]
+                ).to_dict()
+
+            def online_read(ids):
+                provider_store.online_read(
+                    store.config, feature_view,
+                    [EntityKeyProto(join_keys=["entity_id"],
+                                    entity_values=[ValueProto(int64_val=i)]) for i in ids],
+                )
+
+            results = {
+                "get_online_features, 1 entity (us)": _per_call_us(
+                    get_online_features, [([i],) for i in singles]),
+                f"get_online_features, {batch_size} entities (us)": _per_call_us(
+                    get_online_features, [(ids,) for ids in batches]),
+                "online_read, 1 entity (us)": _per_call_us(
+                    online_read, [([i],) for i in singles]),
+                f"online_read, {batch_size} entities (us)": _per_call_us(
+                    online_read, [(ids,) for ids in batches]),
+            }
+            if hasattr(provider_store, "read_arrays"):
+                results["read_arrays, 1 entity (us)"] = _per_call_us(
+                    lambda ids: provider_store.read_arrays(store.config, feature_view, ids),
+                    [([i],) for i in singles])
+                results[f"read_arrays, {batch_size} entities (us)"] = _per_call_us(
+                    lambda ids: provider_store.read_arrays(store.config, feature_view, ids),
+                    [(ids,) for ids in batches])
+
+            print(f"{name} online store, {n_entities} entities, "
+                  f"apply + materialize {setup_seconds:.1f} sec")
+            for label, value in results.items():
+                print(f"    {label:40s}: {value:10.1f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,108 @@
+"""Benchmark the incremental drift monitor on a day of feature logs.
+
+Writes n_rows logged rows of the processed features, resampled, over n_files
+feature_log-*.parquet files in the layout of feature_logger.py, then:
+
+    update          DriftMonitor.update() folding all the files
+    next update     DriftMonitor.update() after one more file, which reads
+                    that file only
+    full scan       pd.read_parquet of all the files and the histograms of
+                    every feature and of the score, as a job without state
+                    would compute them on every run
+
+The peak resident memory is printed after each step; the full scan holds the
+day in memory, update() a record batch.
+
+Usage:
+    python benchmark/bench_drift_monitor.py [n_rows] [n_files]
+"""
+import datetime
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.linear_model import LogisticRegression
+
+from _common import load_processed_features
+from _feast_local import FEATURE_VIEW_NAME
+from drift_monitor import (
+    DriftMonitor,
+    bin_counts,
+    psi_ks,
+)
+from scorer import export_scorer
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_log_file(path: Path, X: pd.DataFrame, day: datetime.date):
+    """One feature log file of the rows of X"""
+    n = len(X)
+    columns = {"entity_id": pa.array(np.arange(n, dtype=np.int64))}
+    for name in X.columns:
+        columns[f"{FEATURE_VIEW_NAME}__{name}"] = pa.array(X[name].to_numpy(dtype=np.float32))
+        columns[f"{FEATURE_VIEW_NAME}__{name}__timestamp"] = pa.nulls(n, pa.timestamp("us", tz="UTC"))
+        columns[f"{FEATURE_VIEW_NAME}__{name}__status"] = pa.array(np.ones(n, dtype=np.int32))
+    columns["__log_timestamp"] = pa.nulls(n, pa.timestamp("us", tz="UTC"))
+    columns["__log_date"] = pa.array([day] * n, pa.date32())
+    columns["__request_id"] = pa.array(np.arange(n).astype(str))
+    pq.write_table(pa.table(columns), path)
+
+
+def full_scan(log_dir: Path, monitor: DriftMonitor):
+    """Histograms of a full reread of the logs"""
+    logs = pd.concat([pd.read_parquet(path) for path in sorted(log_dir.glob("feature_log-*.parquet"))])
+    X = logs[[f"{FEATURE_VIEW_NAME}__{name}" for name in monitor.feature_names]].to_numpy(dtype=np.float64)
+    columns = dict(zip(monitor.feature_names, X.T))
+    columns["score"] = monitor.scorer.predict_proba(X)[:, 1]
+    names = list(monitor.state["cuts"])
+    counts = [bin_counts(columns[name], np.array(monitor.state["cuts"][name])) for name in names]
+    return psi_ks([monitor.state["baseline"][name] for name in names], counts)
+
+
+def main(n_rows: int = 1_000_000, n_files: int = 24):
+    """Print the rows/s and peak memory of each step"""
+    X, y = load_processed_features()
+    scorer = export_scorer(LogisticRegression(
+        C=0.1, class_weight='balanced', solver='liblinear', max_iter=1000, random_state=42
+    ).fit(X, y))
+    day = datetime.date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as workdir:
+        log_dir = Path(workdir)
+        rows_per_file = n_rows // n_files
+        for i in range(n_files + 1):
+            sample = X.sample(n=rows_per_file, replace=True, random_state=i)
+            write_log_file(log_dir / f"feature_log-{i:04d}.parquet", sample, day)
+        last = log_dir / f"feature_log-{n_files:04d}.parquet"
+        last.rename(log_dir / "next.parquet")
+
+        monitor = DriftMonitor.create(str(log_dir / "drift" / "state.json"), X, list(X.columns), scorer)
+        before = _peak_mb()
+        report = monitor.update(str(log_dir))
+        print(f"update      : {report['rows']} rows in {report['seconds']:6.2f} sec, "
+              f"{report['rows_per_second']:12,.0f} rows/s, peak {_peak_mb():7.0f} MB (from {before:.0f} MB)")
+        monitor.report()
+
+        (log_dir / "next.parquet").rename(last)
+        report = monitor.update(str(log_dir))
+        print(f"next update : {report['rows']} rows in {report['seconds']:6.2f} sec, "
+              f"{report['rows_per_second']:12,.0f} rows/s, {report['files']} file read")
+
+        start = time.perf_counter()
+        full_scan(log_dir, monitor)
+        seconds = time.perf_counter() - start
+        n_scanned = rows_per_file * (n_files + 1)
+        print(f"full scan   : {n_scanned} rows in {seconds:6.2f} sec, "
+              f"{n_scanned / seconds:12,.0f} rows/s, peak {_peak_mb():7.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""Benchmark the batch explanations against a per row explainer.
+
+Explains n_rows synthetic applicants, each category group resampled
+independently from the processed features, with the top k category group
+reasons:
+
+    per row     a model agnostic occlusion explainer, one applicant at a
+                time: the log odds change of setting each category group to
+                "no category", with predict_proba of the model
+    batch       explanation.explain(): coef * x for the LogisticRegression,
+                XGBoost pred_contribs for the XGBClassifier, in one call
+
+The per row explainer runs on n_per_row applicants only.
+
+Usage:
+    python benchmark/bench_explanation.py [n_rows] [n_per_row] [k]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from _common import load_processed_features
+from explanation import explain
+from packed_encoding import CATEGORY_GROUPS
+
+
+def explain_per_row(model, X, k: int):
+    """Top k groups of each row by occlusion"""
+    group_columns = {group: [X.columns.get_loc(c) for c in columns] for group, columns in CATEGORY_GROUPS.items()}
+    reasons = []
+    for i in range(len(X)):
+        row = X.iloc[[i]]
+        base = model.predict_proba(row)[0, 1]
+        base_logit = np.log(base / (1 - base))
+        deltas = {}
+        for group, columns in group_columns.items():
+            occluded = row.copy()
+            occluded.iloc[0, columns] = 0.
+            p = model.predict_proba(occluded)[0, 1]
+            deltas[group] = base_logit - np.log(p / (1 - p))
+        reasons.append(sorted(deltas, key=deltas.get, reverse=True)[:k])
+    return reasons
+
+
+def main(n_rows: int = 100_000, n_per_row: int = 200, k: int = 4):
+    """Print the applicants/s of each explainer"""
+    X, y = load_processed_features()
+    scale = float((y == 0).sum() / (y == 1).sum())
+    models = {
+        "LogisticRegression": LogisticRegression(
+            C=0.1, class_weight='balanced', solver='liblinear', max_iter=1000, random_state=42
+        ).fit(X, y),
+        "XGBClassifier": XGBClassifier(
+            max_depth=4, min_child_weight=8, n_estimators=300, gamma=0.1,
+            learning_rate=0.015, scale_pos_weight=scale, random_state=2
+        ).fit(X, y),
+    }
+    # Independent groups, so that the batch has many more distinct rows than the 1000 applicants.
+    X_batch = pd.concat([
+        X[columns].sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+        for seed, columns in enumerate(CATEGORY_GROUPS.values())
+    ], axis=1)[X.columns]
+    n_unique = len(np.unique(X_batch.to_numpy(), axis=0))
+    print(f"{n_rows} applicants, {n_unique} distinct")
+
+    print(f"{'model':<20}{'explainer':<12}{'rows':>10}{'sec':>10}{'rows/s':>14}")
+    for name, model in models.items():
+        start = time.perf_counter()
+        explain_per_row(model, X_batch.iloc[:n_per_row], k)
+        seconds = time.perf_counter() - start
+        print(f"{name:<20}{'per row':<12}{n_per_row:>10}{seconds:>10.2f}{n_per_row / seconds:>14,.0f}")
+
+        start = time.perf_counter()
+        explain(model, X_batch, k)
+        seconds = time.perf_counter() - start
+        print(f"{name:<20}{'batch':<12}{n_rows:>10}{seconds:>10.2f}{n_rows / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,78 @@
+"""Benchmark FeatureLogWriter against FeatureStore.write_logged_features per request.
+
+Each request reads the features of one entity and logs them, either
+synchronously with write_logged_features (one Parquet file per request) or
+through the buffer of FeatureLogWriter.
+
+Usage:
+    python benchmark/bench_feature_logger.py [n_requests]
+"""
+import sys
+import tempfile
+import time
+import uuid
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+
+import numpy as np
+
+from _feast_local import (
+    FEATURE_SERVICE_NAME,
+    create_local_feature_store,
+)
+from feature_logger import FeatureLogWriter
+
+
+def main(n_requests: int = 2_000, n_entities: int = 10_000):
+    """Per request logging latency, files written and the time to drain the buffer"""
+    entity_ids = np.random.default_rng(0).integers(1, n_entities + 1, size=n_requests).tolist()
+    with tempfile.TemporaryDirectory() as workdir:
+        store, _, feature_service = create_local_feature_store(workdir, n_entities)
+        log_dir = Path(workdir) / "logs"
+        responses = [
+            store.get_online_features(
+                features=feature_service, entity_rows=[{"entity_id": entity_id}]
+            ).to_dict()
+            for entity_id in entity_ids
+        ]
+
+        # Synchronous: the log table of each request converted and written on the request path.
+        converter = FeatureLogWriter(store, FEATURE_SERVICE_NAME)
+        latencies = []
+        for response in responses:
+            start = time.perf_counter()
+            table = converter._to_table(  # pylint: disable=protected-access
+                [(1, datetime.now(timezone.utc), uuid.uuid4().hex, response)]
+            )
+            store.write_logged_features(logs=table, source=feature_service)
+            latencies.append(time.perf_counter() - start)
+        converter.close()
+        sync_files = len(list(log_dir.glob("*.parquet")))
+        for path in log_dir.glob("*.parquet"):
+            path.unlink()
+
+        buffered = []
+        feature_logger = FeatureLogWriter(store, FEATURE_SERVICE_NAME, row_group_rows=1_000)
+        for response in responses:
+            start = time.perf_counter()
+            feature_logger.log(response)
+            buffered.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        feature_logger.close()
+        drain_seconds = time.perf_counter() - start
+        stats = feature_logger.stats()
+
+        print(f"feature logging, {n_requests} requests of 1 entity")
+        for name, values, files in (("write_logged_features", latencies, sync_files),
+                                    ("FeatureLogWriter.log", buffered, stats["files"])):
+            values = np.array(values) * 1e6
+            print(f"    {name:22s}: mean {values.mean():8.1f} us p99 {np.percentile(values, 99):8.1f} us"
+                  f" {files:6d} files")
+        print(f"    close() drain {drain_seconds * 1e3:.1f} ms, {stats}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
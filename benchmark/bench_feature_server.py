@@ -0,0 +1,71 @@
+"""Load test `feast serve` on a local feature store with the SQLite online store.
+
+Usage:
+    python benchmark/bench_feature_server.py [report.json]
+"""
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _feast_local import (
+    FEATURE_VIEW_NAME,
+    create_local_feature_store,
+)
+from load_test import (
+    run_feature_server_sweep,
+    write_report,
+)
+
+
+def _wait_for_port(port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.5)
+    raise TimeoutError("feature server did not start")
+
+
+def main(output: str = "feature_server_load_test.json", n_entities: int = 10_000, port: int = 6566):
+    """Start the feature server, run the sweep and write the report"""
+    with tempfile.TemporaryDirectory() as workdir:
+        _, feature_view, _ = create_local_feature_store(workdir, n_entities)
+        feature_refs = [f"{FEATURE_VIEW_NAME}:{feature.name}" for feature in feature_view.features]
+
+        process = subprocess.Popen(
+            ["feast", "-c", workdir, "serve", "-h", "127.0.0.1", "-p", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_port(port)
+            parameters = {
+                "entities": n_entities,
+                "feature_counts": [1, 35],
+                "batch_sizes": [1, 100],
+                "concurrencies": [1, 16],
+                "distribution": "zipf",
+                "requests": 200,
+            }
+            results = run_feature_server_sweep(
+                url=f"http://127.0.0.1:{port}/get-online-features",
+                feature_refs=feature_refs,
+                n_entities=n_entities,
+                feature_counts=parameters["feature_counts"],
+                batch_sizes=parameters["batch_sizes"],
+                concurrencies=parameters["concurrencies"],
+                distribution=parameters["distribution"],
+                n_requests=parameters["requests"],
+            )
+            write_report(output, results, parameters)
+            print(f"Report written to {output}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
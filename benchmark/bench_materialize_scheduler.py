@@ -0,0 +1,70 @@
+"""Benchmark MaterializationScheduler against a single FeatureStore.materialize call.
+
+Usage:
+    python benchmark/bench_materialize_scheduler.py [n_entities] [workers] [days] [window_days]
+
+The local FileSource offline store reads the whole Parquet file for every window,
+unlike the PostgreSQL source which filters on the event timestamp, so small
+windows carry a fixed cost here. The windowed run is only faster with enough
+CPUs for the workers; on one CPU it is about three times slower than the
+monolithic materialize (149 s vs 52 s for 100,000 entities over 30 days in 1 day
+windows). The scheduler is for restartability, the rerun line is what it buys.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from pathlib import Path
+
+from _feast_local import create_local_feature_store
+from materialize_scheduler import MaterializationScheduler
+
+
+def main(n_entities: int = 100_000, workers: int = 4, days: int = 30, window_days: int = 1):
+    """Backfill `days` of history monolithically and in windows of `window_days`"""
+    history = timedelta(days=days)
+    with tempfile.TemporaryDirectory() as workdir:
+        monolithic_dir = Path(workdir) / "monolithic"
+        store, _, _ = create_local_feature_store(
+            str(monolithic_dir), n_entities, materialize=False, history=history
+        )
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - history - timedelta(hours=1)
+        start = time.perf_counter()
+        store.materialize(start_date, end_date)
+        monolithic_seconds = time.perf_counter() - start
+
+        windowed_dir = Path(workdir) / "windowed"
+        create_local_feature_store(
+            str(windowed_dir), n_entities, materialize=False, history=history
+        )
+        scheduler = MaterializationScheduler(
+            repo_path=str(windowed_dir),
+            window=timedelta(days=window_days),
+            max_workers=workers,
+            state_path=str(windowed_dir / "materialization_state.json"),
+        )
+        report = scheduler.run(end_date=end_date, start_date=start_date)
+        rerun = scheduler.run(end_date=end_date)
+
+        print(f"CPUs                                  : {os.cpu_count():8d}")
+        print(f"monolithic materialize                : {monolithic_seconds:8.2f} sec "
+              f"({n_entities / monolithic_seconds:10.0f} rows/s)")
+        print(f"{report['windows']:3d} windows, {workers:2d} workers               : "
+              f"{report['seconds']:8.2f} sec ({report['rows_per_second']:10.0f} rows/s)")
+        print(f"rerun from high-water mark            : {rerun['seconds']:8.2f} sec "
+              f"({rerun['windows']} windows)")
+        slowest = max(report["window_reports"], key=lambda window: window["seconds"])
+        print(f"slowest window                        : {slowest['seconds']:8.2f} sec "
+              f"({slowest['rows']} rows)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,54 @@
+"""Benchmark OnlineFeatureCache against FeatureStore.get_online_features.
+
+Usage:
+    python benchmark/bench_online_cache.py
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from _feast_local import create_local_feature_store
+from online_cache import OnlineFeatureCache
+
+
+def main(n_entities: int = 10_000, n_requests: int = 2_000, hot_entities: int = 500):
+    """Replay single-entity requests drawn from a hot set and print latencies"""
+    with tempfile.TemporaryDirectory() as workdir:
+        store, _, feature_service = create_local_feature_store(workdir, n_entities)
+        rng = np.random.default_rng(0)
+        requests = rng.integers(1, hot_entities + 1, size=n_requests).tolist()
+
+        start = time.perf_counter()
+        for entity_id in requests[:200]:
+            store.get_online_features(
+                features=feature_service, entity_rows=[{"entity_id": entity_id}]
+            ).to_dict()
+        direct_us = (time.perf_counter() - start) / 200 * 1e6
+
+        cache = OnlineFeatureCache(store=store, features=feature_service)
+        start = time.perf_counter()
+        for entity_id in requests:
+            cache.get_online_features([entity_id])
+        cached_us = (time.perf_counter() - start) / n_requests * 1e6
+
+        start = time.perf_counter()
+        for entity_id in requests:
+            cache.get_online_features([entity_id])
+        warm_us = (time.perf_counter() - start) / n_requests * 1e6
+
+        batch = rng.integers(1, n_entities + 1, size=256).tolist()
+        cache.invalidate()
+        start = time.perf_counter()
+        cache.get_online_features(batch)
+        batch_miss_ms = (time.perf_counter() - start) * 1000
+
+        print(f"get_online_features per request       : {direct_us:10.1f} us")
+        print(f"cache, cold start ({hot_entities} hot entities) : {cached_us:10.1f} us")
+        print(f"cache, warm                           : {warm_us:10.1f} us")
+        print(f"cache, 256 entity batch of misses     : {batch_miss_ms:10.1f} ms")
+        print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark the packed categorical layout against the one-hot feature view layout.
+
+Three ways to get the model features of a batch of entities:
+    dense         customer_credit_risk_feature_service, 36 Float32 online values per entity
+    packed + odfv customer_credit_risk_packed_feature_service, on demand feature view
+                  expands packed_categories on read
+    packed raw    risk and packed_categories, expanded by the client with unpack_one_hot
+
+Usage:
+    python benchmark/bench_packed_features.py [n_entities]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _feast_local import (
+    PACKED_FEATURE_VIEW_NAME,
+    create_local_feature_store,
+)
+from packed_encoding import (
+    PACKED_FEATURE,
+    unpack_one_hot,
+)
+
+
+def _online_store_size(workdir: str):
+    """(rows, bytes) of the SQLite online store"""
+    path = Path(workdir) / "online_store.db"
+    with sqlite3.connect(path) as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        rows = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables)
+    return rows, os.path.getsize(path)
+
+
+def _measure(get_features, batches):
+    """Mean latency in us and mean response size in bytes per call"""
+    sizes = []
+    start = time.perf_counter()
+    for entity_ids in batches:
+        sizes.append(get_features(entity_ids))
+    return (time.perf_counter() - start) / len(batches) * 1e6, float(np.mean(sizes))
+
+
+def main(n_entities: int = 10_000, n_calls: int = 200):
+    """Print online store size, response size and latency per layout"""
+    rng = np.random.default_rng(0)
+    singles = [[i] for i in rng.integers(1, n_entities + 1, size=n_calls).tolist()]
+    batches = [rng.integers(1, n_entities + 1, size=256).tolist() for _ in range(20)]
+
+    with tempfile.TemporaryDirectory() as dense_dir, tempfile.TemporaryDirectory() as packed_dir:
+        dense_store, _, dense_service = create_local_feature_store(dense_dir, n_entities)
+        packed_store, _, packed_service = create_local_feature_store(
+            packed_dir, n_entities, packed=True
+        )
+        packed_refs = [f"{PACKED_FEATURE_VIEW_NAME}:risk", f"{PACKED_FEATURE_VIEW_NAME}:{PACKED_FEATURE}"]
+
+        def dense(entity_ids):
+            response = dense_store.get_online_features(
+                features=dense_service, entity_rows=[{"entity_id": i} for i in entity_ids]
+            )
+            response.to_dict()
+            return response.proto.ByteSize()
+
+        def packed_odfv(entity_ids):
+            response = packed_store.get_online_features(
+                features=packed_service, entity_rows=[{"entity_id": i} for i in entity_ids]
+            )
+            response.to_dict()
+            return response.proto.ByteSize()
+
+        def packed_raw(entity_ids):
+            response = packed_store.get_online_features(
+                features=packed_refs, entity_rows=[{"entity_id": i} for i in entity_ids]
+            )
+            packed = response.to_dict()[PACKED_FEATURE]
+            unpack_one_hot([0 if value is None else value for value in packed])
+            return response.proto.ByteSize()
+
+        dense_rows, dense_bytes = _online_store_size(dense_dir)
+        packed_rows, packed_bytes = _online_store_size(packed_dir)
+        print(f"online store, {n_entities} entities")
+        print(f"    dense : {dense_rows:9d} rows {dense_bytes / 1e6:8.1f} MB")
+        print(f"    packed: {packed_rows:9d} rows {packed_bytes / 1e6:8.1f} MB "
+              f"({dense_bytes / packed_bytes:.1f}x smaller)")
+
+        for label, calls in (("1 entity", singles), ("256 entities", batches)):
+            print(f"get_online_features, {label}")
+            for name, function in (("dense", dense), ("packed + odfv", packed_odfv),
+                                   ("packed raw", packed_raw)):
+                latency_us, size = _measure(function, calls)
+                print(f"    {name:14s}: {latency_us:10.1f} us {size:10.0f} response bytes")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
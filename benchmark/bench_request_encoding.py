@@ -0,0 +1,85 @@
+"""Benchmark the request time encoding of new applicants.
+
+Encodes batches of raw applicant records (resampled from the raw CSV) into the
+35 one-hot features in two ways:
+
+    pandas          DataFrame of the records, run_eda_enrich_pipeline and
+                    run_feature_engineering_pipeline of the notebooks, reindexed
+                    to the ONE_HOT_FEATURES columns
+    request         encode_records of request_encoding.py
+
+and reports the microseconds per request and per row for each batch size.
+
+Usage:
+    python benchmark/bench_request_encoding.py [repeats] [max_batch_rows]
+"""
+import sys
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+)
+
+import numpy as np
+import pandas as pd
+
+from _common import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_RENAME_MAP,
+    NUMERIC_COLUMNS,
+    RAW_DATA_PATH,
+)
+from eda import run_eda_enrich_pipeline
+from feature_engineering import run_feature_engineering_pipeline
+from packed_encoding import ONE_HOT_FEATURES
+from request_encoding import (
+    RAW_COLUMN_NAMES,
+    encode_records,
+)
+
+
+def encode_pandas(records: List[Dict[str, Any]]) -> np.ndarray:
+    """The notebook pipelines on the records"""
+    df = pd.DataFrame.from_records(records)
+    df["Duration"], df["Risk"] = 0, 0.
+    df, categorical_cols, numeric_cols = run_eda_enrich_pipeline(
+        df, list(CATEGORICAL_COLUMNS), list(NUMERIC_COLUMNS), categorical=False
+    )
+    df = run_feature_engineering_pipeline(
+        df, categorical_cols, numeric_cols, "Risk", COLUMN_RENAME_MAP, categorical=False
+    )
+    return df.reindex(columns=ONE_HOT_FEATURES, fill_value=0).to_numpy(dtype=np.float32)
+
+
+def _seconds_per_call(func: Callable[[], Any], repeats: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats: int = 200, max_batch_rows: int = 10_000):
+    """Print the microseconds per request and per row of each encoding"""
+    raw = pd.read_csv(RAW_DATA_PATH, index_col=0)[list(RAW_COLUMN_NAMES)]
+    raw = raw.sample(max_batch_rows, replace=True, random_state=0)
+    records = raw.astype(object).where(raw.notna(), None).to_dict("records")
+    assert np.array_equal(encode_pandas(records[:1000]), encode_records(records[:1000]))
+
+    batch_rows = 1
+    while batch_rows <= max_batch_rows:
+        batch = records[:batch_rows]
+        # Fewer repeats of the larger batches.
+        batch_repeats = max(1, repeats // batch_rows)
+        line = f"{batch_rows:6d} rows:"
+        for name, encode in (("pandas", encode_pandas), ("request", encode_records)):
+            seconds = _seconds_per_call(lambda: encode(batch), batch_repeats)  # pylint: disable=cell-var-from-loop
+            line += f"  {name} {seconds * 1e6:10.1f} us/request {seconds * 1e6 / batch_rows:8.2f} us/row"
+        print(line)
+        batch_rows *= 10
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
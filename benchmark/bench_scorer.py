@@ -0,0 +1,76 @@
+"""Benchmark the NumPy scorers against sklearn/XGBoost predict_proba.
+
+The booster row times XGBoost's native predictor without the predict_proba
+input checks, the baseline of the flattened trees for large batches.
+
+Usage:
+    python benchmark/bench_scorer.py
+"""
+import timeit
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from _common import load_processed_features
+from scorer import export_scorer
+
+
+def _latency_us(func, number: int) -> float:
+    """Median latency of func() in microseconds over 5 repeats"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    """Run the benchmark and print latencies"""
+    X, y = load_processed_features()
+    scale = float((y == 0).sum() / (y == 1).sum())
+    models = {
+        "LogisticRegression": LogisticRegression(
+            C=0.1, class_weight='balanced', solver='liblinear', max_iter=1000, random_state=42
+        ).fit(X, y),
+        "XGBClassifier": XGBClassifier(
+            max_depth=4, min_child_weight=8, n_estimators=300, gamma=0.1,
+            learning_rate=0.015, scale_pos_weight=scale, random_state=2
+        ).fit(X, y),
+    }
+
+    X_one = X.iloc[[0]]
+    x_one = X_one.to_numpy(dtype=np.float64)[0]
+    X_batch = X.sample(n=10_000, replace=True, random_state=0)
+    X_batch_array = X_batch.to_numpy(dtype=np.float64)
+
+    print(f"{'model':<20}{'path':<36}{'1 row (us)':>14}{'10k rows (ms)':>16}")
+    for name, model in models.items():
+        scorer = export_scorer(model)
+        max_error = np.abs(scorer.predict_proba(X_batch) - model.predict_proba(X_batch)).max()
+
+        rows = [
+            ("predict_proba(DataFrame)",
+             _latency_us(lambda: model.predict_proba(X_one), 200),
+             _latency_us(lambda: model.predict_proba(X_batch), 5) / 1000),
+            ("scorer.predict_proba(DataFrame)",
+             _latency_us(lambda: scorer.predict_proba(X_one), 200),
+             _latency_us(lambda: scorer.predict_proba(X_batch), 5) / 1000),
+            ("scorer.predict_proba(ndarray)",
+             _latency_us(lambda: scorer.predict_proba(x_one), 2000),
+             _latency_us(lambda: scorer.predict_proba(X_batch_array), 5) / 1000),
+            ("scorer.score_one(ndarray row)",
+             _latency_us(lambda: scorer.score_one(x_one), 2000),
+             float("nan")),
+        ]
+        if hasattr(model, "get_booster"):
+            booster = model.get_booster()
+            x_one_32, X_batch_32 = x_one.astype(np.float32)[None, :], X_batch_array.astype(np.float32)
+            rows.append(
+                ("booster.inplace_predict(ndarray)",
+                 _latency_us(lambda: booster.inplace_predict(x_one_32), 2000),
+                 _latency_us(lambda: booster.inplace_predict(X_batch_32), 5) / 1000)
+            )
+        for path, one_us, batch_ms in rows:
+            print(f"{name:<20}{path:<36}{one_us:>14.1f}{batch_ms:>16.2f}")
+        print(f"{name:<20}max |p_scorer - p_model| = {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
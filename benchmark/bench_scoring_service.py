@@ -0,0 +1,99 @@
+"""Load test the scoring service with and without micro-batching.
+
+Starts scoring_service.py as a subprocess on a local feature store (SQLite online
+store) and replays single-entity requests at a fixed concurrency.
+
+Usage:
+    python benchmark/bench_scoring_service.py
+"""
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from _common import (
+    FEATURE_REPOSITORY_DIR,
+    load_processed_features,
+)
+from _feast_local import create_local_feature_store
+from load_test import run_load
+from scorer import (
+    export_scorer,
+    save_scorer,
+)
+
+
+def _wait_until_healthy(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError("scoring service did not start")
+
+
+def _run_service(workdir: Path, model_path: Path, port: int, extra_args, n_entities: int,
+                 n_requests: int, concurrency: int):
+    process = subprocess.Popen(
+        [sys.executable, "scoring_service.py", "--model", str(model_path), "--model-version", "bench",
+         "--repo-path", str(workdir), "--port", str(port), *extra_args],
+        cwd=FEATURE_REPOSITORY_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_until_healthy(port)
+        rng = np.random.default_rng(0)
+        summary = asyncio.run(run_load(
+            f"http://127.0.0.1:{port}/score",
+            lambda _: {"entity_ids": [int(rng.integers(1, n_entities + 1))]},
+            n_requests=n_requests,
+            concurrency=concurrency,
+        ))
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+            summary["service"] = json.load(response)
+        return summary
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(n_entities: int = 10_000, n_requests: int = 3_000, concurrency: int = 64):
+    """Run the load test for each configuration and print the summaries"""
+    X, y = load_processed_features()
+    model = LogisticRegression(class_weight='balanced', solver='liblinear').fit(X, y)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        create_local_feature_store(str(workdir), n_entities)
+        model_path = workdir / "model.npz"
+        save_scorer(export_scorer(model), str(model_path))
+
+        configurations = {
+            "unbatched": ["--max-batch-size", "1", "--max-wait-ms", "0"],
+            "micro_batched(2ms)": ["--max-batch-size", "256", "--max-wait-ms", "2"],
+        }
+        for port, (name, extra_args) in enumerate(configurations.items(), start=6571):
+            summary = _run_service(
+                workdir, model_path, port, extra_args, n_entities, n_requests, concurrency
+            )
+            latency = summary["latency_ms"]
+            print(
+                f"{name:<20} throughput {summary['throughput_rps']:8.1f} req/s  "
+                f"p50 {latency['p50']:7.2f} ms  p99 {latency['p99']:7.2f} ms  "
+                f"errors {summary['error_rate']:.2%}  "
+                f"entities/batch {summary['service']['batching']['mean_entities_per_batch']:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark worker start-up with and without the registry snapshot of store_provider.
+
+Every run is a fresh Python process, as a new scoring worker would be, timing the
+FeatureStore construction and the first get_online_features call:
+    registry   FeatureStore(repo_path), loads the configured registry
+    snapshot   store_provider.get_feature_store(repo_path) with the snapshot of a
+               previous run, i.e. a warm start
+
+The local repository uses a SQL registry on SQLite. The PostgreSQL registry of
+feature_store.yaml.template adds a network round-trip per registry table on top.
+
+Usage:
+    python benchmark/bench_store_startup.py [n_feature_views] [runs]
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from feast import (
+    FeatureView,
+    Field,
+)
+from feast.types import Float32
+
+from _common import FEATURE_REPOSITORY_DIR
+from _feast_local import (
+    FEATURE_SERVICE_NAME,
+    create_local_feature_store,
+)
+
+WORKER = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.append(sys.argv[3])
+from feast import FeatureStore
+from store_provider import get_feature_store
+imported = time.perf_counter()
+store = get_feature_store(sys.argv[1]) if sys.argv[2] == "snapshot" else FeatureStore(repo_path=sys.argv[1])
+created = time.perf_counter()
+store.get_online_features(
+    features=store.get_feature_service("%s"), entity_rows=[{"entity_id": 1}]
+).to_dict()
+first = time.perf_counter()
+print(json.dumps({"import": imported - start, "store": created - imported, "first_read": first - created}))
+""" % FEATURE_SERVICE_NAME
+
+
+def _start_worker(repo_path: str, mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER, repo_path, mode, str(FEATURE_REPOSITORY_DIR)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(n_feature_views: int = 50, runs: int = 5):
+    """Start-up times in ms, median of `runs` processes"""
+    with tempfile.TemporaryDirectory() as workdir:
+        registry = {
+            "registry_type": "sql",
+            "path": f"sqlite:///{Path(workdir) / 'registry.db'}",
+            "cache_ttl_seconds": 60,
+            # Autocommit, the SQL registry nests write transactions which SQLite would lock.
+            "sqlalchemy_config_kwargs": {"connect_args": {"isolation_level": None}},
+        }
+        store, feature_view, _ = create_local_feature_store(workdir, 1_000, registry=registry)
+        # Extra feature views, so that the registry is closer to a shared production one.
+        store.apply([
+            FeatureView(
+                name=f"feature_view_{i}", source=feature_view.batch_source,
+                entities=[store.get_entity("customer")],
+                ttl=timedelta(hours=1),
+                schema=[Field(name=feature.name, dtype=Float32) for feature in feature_view.features],
+            )
+            for i in range(n_feature_views)
+        ])
+        # Cold start, writes the snapshot.
+        _start_worker(workdir, "snapshot")
+
+        print(f"worker start-up, {n_feature_views + 1} feature views, median of {runs} runs")
+        for mode in ("registry", "snapshot"):
+            results = [_start_worker(workdir, mode) for _ in range(runs)]
+            medians = {key: np.median([r[key] for r in results]) * 1e3 for key in results[0]}
+            print(f"    {mode:8s}: " + " ".join(f"{k} {v:8.1f} ms" for k, v in medians.items())
+                  + f" | store + first read {medians['store'] + medians['first_read']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,353 @@
+"""End-to-end benchmark suite with regression tracking.
+
+Runs the pipeline stages at each size (rows or entities):
+
+    raw_load             pd.read_csv of the raw CSV as in the 01 notebook
+    eda_enrich           run_eda_enrich_pipeline
+    feature_engineering  run_feature_engineering_pipeline
+    evaluate_model       evaluate_model of a logistic regression
+    postgres_load        COPY of the engineered features into the offline table,
+                         only with POSTGRES_PASSWORD and the PG_OFFLINE_* variables of deploy.sh
+    offline_retrieval    get_historical_features, on the PostgreSQL offline store
+                         when configured, the DuckDB offline store otherwise
+    online_read          get_online_features from the SQLite online store
+
+The raw CSV is generated by notebook/synthetic_data.py. Every stage runs in a
+fresh process, which prepares its input and then reports the wall time of the
+stage, its throughput, the peak resident memory during the stage and its growth
+over the resident memory of the prepared input. On Linux the high-water mark of
+the process is reset before the stage (/proc/self/clear_refs), as ru_maxrss also
+holds the peak of the preparation and of the parent process, inherited through
+fork and exec. Elsewhere the growth is that of ru_maxrss, 0 for a stage that stays
+below the earlier peak.
+
+The results are written to benchmark/results/<timestamp>-<commit>.json with the
+commit, machine and the format version. With a baseline (a previous results
+file), a stage whose time or peak memory growth exceeds the baseline by more than
+the threshold is a regression and the suite exits with status 1.
+
+Usage:
+    python benchmark/bench_suite.py [--sizes 10000 1000000 10000000] [--stages ...]
+                                    [--baseline benchmark/baseline.json] [--threshold 0.2]
+                                    [--update-baseline]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from _common import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_RENAME_MAP,
+    NUMERIC_COLUMNS,
+    RAW_DATA_PATH,
+    REPO_ROOT,
+)
+from _feast_local import (
+    FEATURE_SERVICE_NAME,
+    create_local_feature_store,
+    load_postgres,
+    postgres_offline_store_from_env,
+)
+from eda import run_eda_enrich_pipeline
+from evaluation import evaluate_model
+from feature_engineering import run_feature_engineering_pipeline
+from synthetic_data import SyntheticCreditDataGenerator
+
+FORMAT_VERSION = 2
+RESULTS_DIR = REPO_ROOT / "benchmark" / "results"
+DEFAULT_BASELINE = REPO_ROOT / "benchmark" / "baseline.json"
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+# Entities read from the online store per size, in batches of ONLINE_BATCH_SIZE.
+ONLINE_READ_ENTITIES = 10_000
+ONLINE_BATCH_SIZE = 100
+# Rows the evaluate_model model is fitted on.
+EVALUATE_TRAIN_ROWS = 100_000
+# Peak memory growth below which a stage is not compared, ru_maxrss noise.
+MIN_STAGE_RSS_MB = 16
+
+
+def _read_raw(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, index_col=0, converters={"Risk": lambda x: {"good": 0., "bad": 1.}[x]})
+
+
+def _enrich(df: pd.DataFrame) -> pd.DataFrame:
+    df, _, _ = run_eda_enrich_pipeline(df, list(CATEGORICAL_COLUMNS), list(NUMERIC_COLUMNS))
+    return df
+
+
+def _engineer(df: pd.DataFrame) -> pd.DataFrame:
+    return run_feature_engineering_pipeline(
+        df, CATEGORICAL_COLUMNS + ["Generation", "Amount"], ["Duration"], "Risk", COLUMN_RENAME_MAP
+    )
+
+
+def _prepare_raw_load(raw_path: str, _workdir: str, _size: int) -> Callable[[], int]:
+    return lambda: len(_read_raw(raw_path))
+
+
+def _prepare_eda_enrich(raw_path: str, _workdir: str, _size: int) -> Callable[[], int]:
+    df = _read_raw(raw_path)
+    return lambda: len(_enrich(df))
+
+
+def _prepare_feature_engineering(raw_path: str, _workdir: str, _size: int) -> Callable[[], int]:
+    df = _enrich(_read_raw(raw_path))
+    return lambda: len(_engineer(df))
+
+
+def _prepare_evaluate_model(raw_path: str, _workdir: str, _size: int) -> Callable[[], int]:
+    df = _engineer(_enrich(_read_raw(raw_path)))
+    X, y = df.drop(columns=["risk"]), df["risk"]
+    model = LogisticRegression(max_iter=1000).fit(X.iloc[:EVALUATE_TRAIN_ROWS], y.iloc[:EVALUATE_TRAIN_ROWS])
+
+    def run() -> int:
+        # evaluate_model prints its report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            evaluate_model(model, X, y, "LogisticRegression")
+        return len(X)
+    return run
+
+
+def _prepare_postgres_load(raw_path: str, _workdir: str, _size: int) -> Callable[[], int]:
+    df = _engineer(_enrich(_read_raw(raw_path)))
+    offline_store = postgres_offline_store_from_env()
+
+    def run() -> int:
+        load_postgres(df, offline_store)
+        return len(df)
+    return run
+
+
+def _prepare_offline_retrieval(_raw_path: str, workdir: str, size: int) -> Callable[[], int]:
+    offline_store = postgres_offline_store_from_env() or {"type": "duckdb"}
+    repo_path = Path(workdir) / "offline_retrieval"
+    store, _, _ = create_local_feature_store(
+        str(repo_path), size, materialize=False, history=timedelta(days=30), offline_store=offline_store,
+    )
+    # Labels observed 30 minutes after the features, within the 1 hour ttl.
+    entity_df = pd.read_parquet(
+        repo_path / "customer_credit_risk_offline_features.parquet", columns=["entity_id", "event_timestamp"]
+    )
+    entity_df["event_timestamp"] = (
+        entity_df["event_timestamp"] + pd.Timedelta(minutes=30)
+    ).dt.tz_localize("UTC").dt.floor("s")
+    feature_service = store.get_feature_service(FEATURE_SERVICE_NAME)
+    return lambda: len(store.get_historical_features(entity_df=entity_df, features=feature_service).to_df())
+
+
+def _prepare_online_read(_raw_path: str, workdir: str, size: int) -> Callable[[], int]:
+    store, _, _ = create_local_feature_store(str(Path(workdir) / "online_read"), size)
+    feature_service = store.get_feature_service(FEATURE_SERVICE_NAME)
+    entity_ids = list(range(1, min(size, ONLINE_READ_ENTITIES) + 1))
+
+    def run() -> int:
+        for i in range(0, len(entity_ids), ONLINE_BATCH_SIZE):
+            store.get_online_features(
+                features=feature_service,
+                entity_rows=[{"entity_id": entity_id} for entity_id in entity_ids[i:i + ONLINE_BATCH_SIZE]],
+            ).to_dict()
+        return len(entity_ids)
+    return run
+
+
+STAGES: Dict[str, Callable[[str, str, int], Callable[[], int]]] = {
+    "raw_load": _prepare_raw_load,
+    "eda_enrich": _prepare_eda_enrich,
+    "feature_engineering": _prepare_feature_engineering,
+    "evaluate_model": _prepare_evaluate_model,
+    "postgres_load": _prepare_postgres_load,
+    "offline_retrieval": _prepare_offline_retrieval,
+    "online_read": _prepare_online_read,
+}
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """VmRSS or VmHWM of /proc/self/status in MB, None without /proc"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current resident memory, False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")
+    except OSError:
+        return False
+    return _proc_status_mb("VmHWM") is not None
+
+
+def _run_stage(stage: str, raw_path: str, workdir: str, size: int) -> Tuple[float, int, float, float]:
+    """Runs in a fresh process: (seconds, rows, rss MB before run(), peak rss MB during run())"""
+    os.environ["MPLBACKEND"] = "Agg"
+    run = STAGES[stage](raw_path, workdir, size)
+    high_water_mark = _reset_peak_rss()
+    rss_before = _proc_status_mb("VmRSS") if high_water_mark else _max_rss_mb()
+    start = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - start
+    return seconds, rows, rss_before, _proc_status_mb("VmHWM") if high_water_mark else _max_rss_mb()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes: List[int], stages: List[str]) -> Dict[str, Any]:
+    """Run the stages at the sizes.
+
+    Returns: results document, see compare()
+    """
+    generator = SyntheticCreditDataGenerator.from_csv(str(RAW_DATA_PATH))
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            raw_path = str(Path(workdir) / "german_credit_data.csv")
+            generator.write(raw_path, size)
+            for stage in stages:
+                if stage == "postgres_load" and postgres_offline_store_from_env() is None:
+                    print(f"{stage:20s} {size:>10d}: skipped, POSTGRES_PASSWORD is not set")
+                    continue
+                with context.Pool(1) as pool:
+                    seconds, rows, rss_before_mb, peak_rss_mb = pool.apply(
+                        _run_stage, (stage, raw_path, workdir, size)
+                    )
+                result = {
+                    "stage": stage,
+                    "size": size,
+                    "rows": rows,
+                    "seconds": seconds,
+                    "rows_per_second": rows / seconds if seconds > 0 else None,
+                    "peak_rss_mb": peak_rss_mb,
+                    "stage_rss_mb": peak_rss_mb - rss_before_mb,
+                }
+                results.append(result)
+                print(f"{stage:20s} {size:>10d}: {seconds:9.3f} sec {result['rows_per_second'] or 0:>14,.0f} rows/sec "
+                      f"peak rss {peak_rss_mb:7.0f} MB (+{result['stage_rss_mb']:.0f} MB)")
+    return {
+        "format_version": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of current against baseline.
+
+    Args:
+        current: results document of run_suite
+        baseline: results document of a previous run
+        threshold: allowed relative increase of seconds and stage_rss_mb, e.g. 0.2 for 20%
+
+    Returns: description per regression, empty without regressions
+    """
+    if baseline.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"baseline format version [{baseline.get('format_version')}] is not [{FORMAT_VERSION}]."
+        )
+    baseline_results = {(result["stage"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get((result["stage"], result["size"]))
+        if previous is None:
+            continue
+        for metric in ("seconds", "stage_rss_mb"):
+            if metric == "stage_rss_mb" and result[metric] < MIN_STAGE_RSS_MB:
+                continue
+            if result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['stage']} at {result['size']}: {metric} {result[metric]:.3f} > "
+                    f"baseline {previous[metric]:.3f} (commit {baseline.get('commit')}) + {threshold:.0%}"
+                )
+    return regressions
+
+
+def _write_json(document: Dict[str, Any], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite, write the results and compare them with the baseline.
+
+    Returns: exit status, 1 on a regression
+    """
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative increase of time and peak memory growth against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the baseline")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, args.stages)
+    output = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{current['commit']}.json"
+    _write_json(current, output)
+    print(f"results written to [{output}]")
+
+    if args.update_baseline:
+        _write_json(current, args.baseline)
+        print(f"baseline written to [{args.baseline}]")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline [{args.baseline}], run with --update-baseline to create it")
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        regressions = compare(current, json.load(file), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
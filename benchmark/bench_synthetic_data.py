@@ -0,0 +1,73 @@
+"""Benchmark the synthetic data generator: throughput and fidelity to the raw data.
+
+Fidelity is reported as the largest absolute difference between the raw and the
+generated data of
+    - the category frequencies of each categorical column,
+    - the bad Risk rate per category,
+    - the deciles of the numerical columns, relative to the raw decile,
+    - the Pearson correlations between the numerical columns.
+
+Usage:
+    python benchmark/bench_synthetic_data.py [n_rows] [chunk_size]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from _common import RAW_DATA_PATH
+from synthetic_data import (
+    CATEGORICAL_COLUMNS,
+    NUMERICAL_COLUMNS,
+    TARGET_COLUMN,
+    SyntheticCreditDataGenerator,
+)
+
+
+def _fidelity(raw: pd.DataFrame, synthetic: pd.DataFrame):
+    for column in CATEGORICAL_COLUMNS:
+        raw_frequency = raw[column].value_counts(normalize=True, dropna=False)
+        frequency = synthetic[column].value_counts(normalize=True, dropna=False)
+        raw_bad = raw.groupby(column, dropna=False)[TARGET_COLUMN].apply(lambda risk: (risk == "bad").mean())
+        bad = synthetic.groupby(column, dropna=False)[TARGET_COLUMN].apply(lambda risk: (risk == "bad").mean())
+        print(f"    {column:16s}: frequency {(frequency - raw_frequency).abs().max():.4f}, "
+              f"bad rate {(bad - raw_bad).abs().max():.4f}")
+    quantiles = np.linspace(0.1, 0.9, 9)
+    for column in NUMERICAL_COLUMNS:
+        raw_deciles = raw[column].quantile(quantiles).to_numpy()
+        deciles = synthetic[column].quantile(quantiles).to_numpy()
+        print(f"    {column:16s}: deciles {np.abs(deciles / raw_deciles - 1).max():.1%}")
+    correlation = synthetic[NUMERICAL_COLUMNS].corr() - raw[NUMERICAL_COLUMNS].corr()
+    print(f"    {'correlation':16s}: {correlation.abs().to_numpy().max():.4f}")
+    print(f"    {'bad rate':16s}: raw {(raw[TARGET_COLUMN] == 'bad').mean():.4f}, "
+          f"synthetic {(synthetic[TARGET_COLUMN] == 'bad').mean():.4f}")
+
+
+def main(n_rows: int = 10_000_000, chunk_size: int = 1_000_000):
+    """Print the generation and write throughput, and the fidelity of the first chunk"""
+    raw = pd.read_csv(RAW_DATA_PATH, index_col=0)
+    generator = SyntheticCreditDataGenerator().fit(raw)
+
+    start = time.perf_counter()
+    rows = sum(len(df) for df in generator.generate(n_rows, chunk_size=chunk_size))
+    seconds = time.perf_counter() - start
+    print(f"generate {rows} rows: {seconds:.1f} sec, {rows / seconds:,.0f} rows/sec")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for suffix in (".parquet", ".csv"):
+            path = Path(workdir) / f"synthetic{suffix}"
+            start = time.perf_counter()
+            generator.write(str(path), n_rows, chunk_size=chunk_size)
+            seconds = time.perf_counter() - start
+            print(f"write {suffix:8s}: {seconds:.1f} sec, {n_rows / seconds:,.0f} rows/sec, "
+                  f"{path.stat().st_size / 2 ** 20:.0f} MB")
+
+    print(f"fidelity of {min(n_rows, chunk_size)} rows, max absolute difference to the raw data")
+    _fidelity(raw, next(generator.generate(n_rows, chunk_size=chunk_size)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
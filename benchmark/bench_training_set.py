@@ -0,0 +1,76 @@
+"""Benchmark TrainingSetBuilder against a single get_historical_features call.
+
+The local FileSource offline store reads the whole Parquet file for every
+retrieval and joins in dask on this machine, unlike the PostgreSQL offline store
+which filters and joins in the database, so small windows carry a fixed cost here.
+The source version check of a cached build also reads the timestamps of the
+source rows with this store; the PostgreSQL and duckdb offline stores return
+the row count and latest timestamp from one aggregate query instead.
+
+Usage:
+    python benchmark/bench_training_set.py [n_entities] [days] [window_days] [workers]
+"""
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from _feast_local import (
+    FEATURE_SERVICE_NAME,
+    create_local_feature_store,
+)
+from training_set import TrainingSetBuilder
+
+
+def main(n_entities: int = 100_000, days: int = 360, window_days: int = 90, workers: int = 4):
+    """Print the time of the monolithic retrieval, of cold single and windowed builds and of a cached build"""
+    history = timedelta(days=days)
+    with tempfile.TemporaryDirectory() as workdir:
+        store, _, feature_service = create_local_feature_store(
+            workdir, n_entities, materialize=False, history=history
+        )
+        # Labels observed 30 minutes after the features, within the 1 hour ttl.
+        entity_df = pd.read_parquet(
+            Path(workdir) / "customer_credit_risk_offline_features.parquet",
+            columns=["entity_id", "event_timestamp"],
+        )
+        entity_df["event_timestamp"] += pd.Timedelta(minutes=30)
+
+        start = time.perf_counter()
+        rows = len(store.get_historical_features(entity_df=entity_df, features=feature_service).to_df())
+        monolithic_seconds = time.perf_counter() - start
+
+        windowed = TrainingSetBuilder(
+            store=store, repo_path=workdir, feature_service_name=FEATURE_SERVICE_NAME,
+            cache_dir="windowed", window=timedelta(days=window_days), max_workers=workers,
+        )
+        start = time.perf_counter()
+        windowed.build(entity_df)
+        windowed_seconds = time.perf_counter() - start
+
+        builder = TrainingSetBuilder(
+            store=store, repo_path=workdir, feature_service_name=FEATURE_SERVICE_NAME,
+        )
+        start = time.perf_counter()
+        path = builder.build(entity_df)
+        cold_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        builder.build(entity_df)
+        cached_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        cached_rows = len(pd.read_parquet(path))
+        read_seconds = time.perf_counter() - start
+
+        print(f"training set, {n_entities} entities over {days} days, {rows} / {cached_rows} rows")
+        print(f"    get_historical_features     : {monolithic_seconds:8.2f} sec")
+        print(f"    builder                     : {cold_seconds:8.2f} sec")
+        print(f"    builder, {window_days:3d} day windows x{workers}: {windowed_seconds:8.2f} sec")
+        print(f"    builder, cached             : {cached_seconds:8.2f} sec "
+              f"(+ {read_seconds:.2f} sec read_parquet)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
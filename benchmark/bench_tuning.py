@@ -0,0 +1,42 @@
+"""Benchmark successive halving against the notebook's stage 1 GridSearchCV.
+
+Usage:
+    python benchmark/bench_tuning.py
+"""
+import logging
+
+from sklearn.model_selection import train_test_split
+
+from _common import load_processed_features
+from tuning import compare_with_grid_search
+
+
+def main():
+    """Run the benchmark and print the report"""
+    X, y = load_processed_features()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42)
+    scale = float((y_train == 0).sum() / (y_train == 1).sum())
+
+    # Same grid as stage 1 in 00-credit-risk-model-without-feast.ipynb
+    param_grid = {
+        'max_depth': [3, 4],
+        'min_child_weight': [8, 12],
+        'n_estimators': [100, 200, 300],
+        'gamma': [0.1, 0.2],
+        'learning_rate': [0.005, 0.01, 0.015],
+    }
+    base_params = {
+        'random_state': 2,
+        'scale_pos_weight': scale,
+        'eval_metric': 'auc',
+    }
+    report = compare_with_grid_search(
+        X_train, y_train, X_test, y_test,
+        param_grid=param_grid, base_params=base_params, scoring='f1', cv=5
+    )
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,297 @@
+"""Batch scoring job module.
+
+Scores every customer of the offline table
+credit.customer_credit_risk_offline_features with a scorer of scorer.py and
+writes (entity_id, score, model_version, scored_at) into the predictions table
+credit.customer_credit_risk_predictions, e.g. nightly.
+
+- The latest row per entity is read in chunks of chunk_rows entities, by
+  entity_id keyset: DISTINCT ON (entity_id) ... WHERE entity_id > <last entity_id>
+  ORDER BY entity_id, event_timestamp DESC LIMIT chunk_rows. The (entity_id,
+  event_timestamp) index serves it without sorting the table.
+- The chunks are scored with the vectorised predict_proba of the scorer in a
+  process pool; at most max_in_flight chunks are read ahead, and the scores come
+  back in chunk order.
+- Each chunk is written with COPY, in the same transaction as the checkpoint of
+  the run in credit.batch_scoring_checkpoints (the last entity_id and the row
+  count). A failed or killed run started again with the same run_id resumes
+  after the last completed chunk, without duplicating nor missing a prediction,
+  and keeps the scored_at of the first attempt.
+
+Run from the feature repository, with the variables of deploy.sh set:
+    python batch_scoring.py --model data/model/scorer.npz
+"""
+import argparse
+import io
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+)
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+from sqlalchemy import (
+    create_engine,
+    text,
+)
+from sqlalchemy.engine import Engine
+
+from offline_export import (
+    OFFLINE_TABLE,
+    default_url,
+)
+from scorer import load_scorer
+
+PREDICTIONS_TABLE = "credit.customer_credit_risk_predictions"
+CHECKPOINTS_TABLE = "credit.batch_scoring_checkpoints"
+
+class _Worker:
+    """Per scoring process state, set by _init_worker"""
+    scorer: Any = None
+
+
+def _init_worker(model_path: str):
+    _Worker.scorer = load_scorer(model_path)
+
+
+def _score(features: np.ndarray) -> np.ndarray:
+    return _Worker.scorer.predict_proba(features)[:, 1]
+
+
+def score_chunks(
+        chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+        model_path: str,
+        workers: int = 1,
+        max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Score (entity_ids, features) chunks in order.
+
+    Args:
+        chunks: entity ids and feature matrices in the scorer's training column order
+        model_path: scorer .npz of scorer.save_scorer()
+        workers: scoring processes, 1 to score in this process
+        max_in_flight: chunks submitted and not yet returned, 2 * workers by default
+
+    Returns: Iterator of (entity_ids, scores) in the order of chunks
+    """
+    if workers <= 1:
+        _init_worker(model_path)
+        for entity_ids, features in chunks:
+            yield entity_ids, _score(features)
+        return
+
+    max_in_flight = max_in_flight or 2 * workers
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(model_path,)
+    ) as executor:
+        in_flight: Deque[Tuple[np.ndarray, Future]] = deque()
+        for entity_ids, features in chunks:
+            in_flight.append((entity_ids, executor.submit(_score, features)))
+            if len(in_flight) >= max_in_flight:
+                entity_ids, future = in_flight.popleft()
+                yield entity_ids, future.result()
+        while in_flight:
+            entity_ids, future = in_flight.popleft()
+            yield entity_ids, future.result()
+
+
+def predictions_csv(
+        entity_ids: np.ndarray, scores: np.ndarray, model_version: str, scored_at: datetime
+) -> io.StringIO:
+    """COPY ... WITH CSV input of the predictions"""
+    buffer = io.StringIO()
+    suffix = "," + _csv_field(model_version) + "," + scored_at.isoformat() + "\n"
+    buffer.writelines(
+        f"{entity_id},{score!r}{suffix}" for entity_id, score in zip(entity_ids.tolist(), scores.tolist())
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def _csv_field(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+class BatchScoringJob:
+    """Restartable batch scoring of the offline table.
+
+    Args:
+        engine: SQLAlchemy engine of the offline database
+        model_path: scorer .npz of scorer.save_scorer()
+        model_version: model_version of the predictions
+        run_id: checkpoint key, a run with the run_id of an unfinished run resumes it
+        table: offline table
+        predictions_table: predictions table, created if missing
+        chunk_rows: entities per chunk
+        workers: scoring processes
+    """
+    def __init__(
+            self,
+            engine: Engine,
+            model_path: str,
+            model_version: str,
+            run_id: str,
+            table: str = OFFLINE_TABLE,
+            predictions_table: str = PREDICTIONS_TABLE,
+            chunk_rows: int = 100_000,
+            workers: int = 1,
+    ):
+        self.engine = engine
+        self.model_path = model_path
+        self.model_version = model_version
+        self.run_id = run_id
+        self.table = table
+        self.predictions_table = predictions_table
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        self.feature_names = load_scorer(model_path).feature_names
+
+    def _create_tables(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.predictions_table} ("
+                "entity_id BIGINT NOT NULL, score DOUBLE PRECISION NOT NULL, "
+                "model_version TEXT NOT NULL, scored_at TIMESTAMPTZ NOT NULL)"
+            ))
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINTS_TABLE} ("
+                "run_id TEXT PRIMARY KEY, last_entity_id BIGINT, rows BIGINT NOT NULL, "
+                "scored_at TIMESTAMPTZ NOT NULL, completed BOOLEAN NOT NULL, updated_at TIMESTAMPTZ NOT NULL)"
+            ))
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Checkpoint of the run, None before its first chunk"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT last_entity_id, rows, scored_at, completed FROM {CHECKPOINTS_TABLE} "
+                     "WHERE run_id = :run_id"),
+                {"run_id": self.run_id},
+            ).mappings().first()
+        return dict(row) if row is not None else None
+
+    def _read_chunks(self, after_entity_id: Optional[int]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        columns = ", ".join(f'"{name}"' for name in self.feature_names)
+        query = text(
+            f"SELECT DISTINCT ON (entity_id) entity_id, {columns} FROM {self.table} "
+            "WHERE entity_id > :after ORDER BY entity_id, event_timestamp DESC LIMIT :limit"
+        )
+        after = after_entity_id if after_entity_id is not None else np.iinfo(np.int64).min
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(query, {"after": after, "limit": self.chunk_rows}).fetchall()
+            if not rows:
+                return
+            entity_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            yield entity_ids, np.array([row[1:] for row in rows], dtype=np.float64)
+            after = int(entity_ids[-1])
+
+    def _write_chunk(self, entity_ids: np.ndarray, scores: np.ndarray, scored_at: datetime, rows: int,
+                     completed: bool = False):
+        """COPY the predictions and advance the checkpoint in one transaction"""
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                if len(entity_ids):
+                    cursor.copy_expert(
+                        f"COPY {self.predictions_table} (entity_id, score, model_version, scored_at) "
+                        "FROM STDIN WITH CSV",
+                        predictions_csv(entity_ids, scores, self.model_version, scored_at),
+                    )
+                cursor.execute(
+                    f"INSERT INTO {CHECKPOINTS_TABLE} "
+                    "(run_id, last_entity_id, rows, scored_at, completed, updated_at) "
+                    "VALUES (%s, %s, %s, %s, %s, now()) ON CONFLICT (run_id) DO UPDATE SET "
+                    "last_entity_id = COALESCE(EXCLUDED.last_entity_id, "
+                    f"{CHECKPOINTS_TABLE}.last_entity_id), rows = EXCLUDED.rows, "
+                    "completed = EXCLUDED.completed, updated_at = EXCLUDED.updated_at",
+                    (self.run_id, int(entity_ids[-1]) if len(entity_ids) else None, rows, scored_at, completed),
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def run(self) -> Dict[str, Any]:
+        """Score the entities after the checkpoint.
+
+        Returns: run report with the rows, seconds and rows/s of this attempt
+        """
+        self._create_tables()
+        checkpoint = self.load_checkpoint()
+        if checkpoint is not None and checkpoint["completed"]:
+            logging.info("Run [%s] is already completed with [%s] rows", self.run_id, checkpoint["rows"])
+            return {"run_id": self.run_id, "status": "completed", "rows": 0,
+                    "total_rows": checkpoint["rows"], "seconds": 0., "rows_per_second": 0.}
+        if checkpoint is None:
+            after, total_rows, scored_at = None, 0, datetime.now(timezone.utc)
+        else:
+            after, total_rows, scored_at = (
+                checkpoint["last_entity_id"], checkpoint["rows"], checkpoint["scored_at"]
+            )
+            logging.info("Resuming run [%s] after entity_id [%s], [%s] rows scored", self.run_id, after, total_rows)
+
+        start = time.perf_counter()
+        rows = 0
+        for entity_ids, scores in score_chunks(self._read_chunks(after), self.model_path, self.workers):
+            rows += len(entity_ids)
+            self._write_chunk(entity_ids, scores, scored_at, total_rows + rows)
+            logging.info("Scored [%s] rows up to entity_id [%s]", total_rows + rows, entity_ids[-1])
+        self._write_chunk(np.empty(0, dtype=np.int64), np.empty(0), scored_at, total_rows + rows, completed=True)
+        seconds = time.perf_counter() - start
+        report = {
+            "run_id": self.run_id,
+            "status": "completed",
+            "rows": rows,
+            "total_rows": total_rows + rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds > 0 else 0.,
+        }
+        logging.info("Run [%s] scored [%s] rows in [%.1f] sec ([%.0f] rows/s)",
+                     self.run_id, rows, seconds, report["rows_per_second"])
+        return report
+
+
+def main():
+    """Score the offline table"""
+    parser = argparse.ArgumentParser(description="Batch score the offline table")
+    parser.add_argument("--model", required=True, help="scorer .npz from scorer.save_scorer()")
+    parser.add_argument("--model-version", default=None, help="model_version of the predictions, --model by default")
+    parser.add_argument("--run-id", default=None, help="<model version>@<UTC date> by default")
+    parser.add_argument("--url", default=None, help="SQLAlchemy URL of the offline database")
+    parser.add_argument("--table", default=OFFLINE_TABLE)
+    parser.add_argument("--predictions-table", default=PREDICTIONS_TABLE)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    model_version = args.model_version or args.model
+    run_id = args.run_id or f"{model_version}@{datetime.now(timezone.utc).date().isoformat()}"
+    engine = create_engine(args.url or default_url())
+    try:
+        BatchScoringJob(
+            engine, args.model, model_version, run_id, args.table, args.predictions_table,
+            args.chunk_rows, args.workers,
+        ).run()
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
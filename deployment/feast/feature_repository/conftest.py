@@ -0,0 +1,37 @@
+# conftest.py
+from typing import (
+    Any,
+    Dict,
+)
+
+import pytest
+import yaml
+
+from feast import FeatureStore
+
+
+@pytest.fixture
+def feature_store_config(tmp_path) -> Dict[str, Any]:
+    """feature_store.yaml of a local repository in tmp_path, override in a module to change it"""
+    return {
+        "project": "test",
+        "provider": "local",
+        "registry": str(tmp_path / "registry.db"),
+        "online_store": {"type": "sqlite", "path": str(tmp_path / "online_store.db")},
+        "offline_store": {"type": "file"},
+        "entity_key_serialization_version": 3,
+    }
+
+
+@pytest.fixture
+def feature_repo(tmp_path, feature_store_config):
+    """tmp_path with feature_store_config written to its feature_store.yaml"""
+    with open(tmp_path / "feature_store.yaml", "w", encoding="utf-8") as file:
+        yaml.safe_dump(feature_store_config, file)
+    return tmp_path
+
+
+@pytest.fixture
+def feature_store(feature_repo) -> FeatureStore:
+    """FeatureStore of feature_repo with nothing applied"""
+    return FeatureStore(repo_path=str(feature_repo))
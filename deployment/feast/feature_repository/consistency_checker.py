@@ -0,0 +1,383 @@
+"""Online / offline consistency checker module.
+
+Verifies after materialisation that the SQLite online store holds, for every
+entity_id, the latest row of the PostgreSQL offline table, without comparing
+every feature value of every row.
+
+- Each row is reduced to a 62 bit fingerprint of the IEEE 754 bits of its
+  feature values as float32 (the Float32 values of the online store), in the
+  feature view schema order. The fingerprint is two polynomial hashes modulo
+  the prime 2^31 - 1 of the 32 bit patterns, with different bases. A NULL or
+  missing value counts as the NaN bit pattern.
+- PostgreSQL computes the fingerprints of the latest row per entity server side
+  (float4send, see fingerprint_sql()), so only (entity_id, fingerprint) pairs
+  cross the network. The entity_id range is split into partitions queried in
+  parallel threads.
+- The online store table is read once, grouped by entity by SQLite, and decoded
+  with NumPy: the serialised entity keys end with the int64 entity_id and a
+  Float32 ValueProto is a tag byte and 4 little-endian bytes. The fingerprints
+  are computed with NumPy.
+- Entities are matched by sorted entity_id; only mismatched entities are
+  fetched from the offline table again to report the differing features
+  (max_drilldown of them).
+
+Only the SQLite online store and a single int64 join key are supported.
+
+Run from the feature repository, with the variables of deploy.sh set:
+    python consistency_checker.py --as-of 2025-01-01T00:00:00+00:00
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+from feast import FeatureStore
+from feast.infra.key_encoding_utils import (
+    deserialize_entity_key,
+    serialize_entity_key,
+)
+from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+from sqlalchemy import (
+    bindparam,
+    create_engine,
+    text,
+)
+from sqlalchemy.engine import Engine
+
+from offline_export import (
+    OFFLINE_TABLE,
+    default_url,
+)
+
+FEATURE_VIEW = "customer_credit_risk_feature_view"
+MODULUS = 2 ** 31 - 1
+BASES = (1_000_003, 998_244_353)
+ENTITY_KEY_SERIALIZATION_VERSION = 3
+# Serialised Float32 ValueProto: the float_val field tag then the value.
+_FLOAT_VAL_TAG = 0x35
+_NAN_BITS = np.float32(np.nan).view(np.uint32)
+
+
+def _coefficients(n_features: int) -> np.ndarray:
+    """base^i mod MODULUS per base and feature position, (n_bases, n_features) int64"""
+    coefficients = np.ones((len(BASES), n_features), dtype=np.int64)
+    for i in range(1, n_features):
+        coefficients[:, i] = coefficients[:, i - 1] * np.array(BASES, dtype=np.int64) % MODULUS
+    return coefficients
+
+
+def fingerprint(values: np.ndarray) -> np.ndarray:
+    """Fingerprints of the rows of values.
+
+    Args:
+        values: (n_rows, n_features) values, NaN for missing
+
+    Returns: (n_rows,) int64 fingerprints
+    """
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    bits = values.view(np.uint32).astype(np.int64)
+    bits[np.isnan(values)] = _NAN_BITS
+    bits %= MODULUS
+    hashes = [
+        (bits * coefficients % MODULUS).sum(axis=1) % MODULUS
+        for coefficients in _coefficients(values.shape[1])
+    ]
+    return (hashes[0] << 31) | hashes[1]
+
+
+def fingerprint_sql(feature_names: Sequence[str]) -> str:
+    """PostgreSQL expression of fingerprint() over the feature columns"""
+    terms = [[], []]
+    for name, coefficients in zip(feature_names, _coefficients(len(feature_names)).T):
+        # The float4 bits as a non negative bigint.
+        bits = f"""('x' || encode(float4send(COALESCE("{name}"::real, 'NaN'::real)), 'hex'))::bit(32)::bigint"""
+        for hash_terms, coefficient in zip(terms, coefficients):
+            hash_terms.append(f"mod(mod({bits}, {MODULUS}) * {coefficient}, {MODULUS})")
+    hashes = [f"mod({' + '.join(hash_terms)}, {MODULUS})" for hash_terms in terms]
+    return f"({hashes[0]} << 31) | {hashes[1]}"
+
+
+def _entity_key_prefix() -> bytes:
+    key = EntityKeyProto(join_keys=["entity_id"], entity_values=[ValueProto(int64_val=0)])
+    return serialize_entity_key(key, ENTITY_KEY_SERIALIZATION_VERSION)[:-8]
+
+
+def decode_entity_ids(keys: Sequence[bytes]) -> np.ndarray:
+    """entity_ids of serialised entity_id keys"""
+    prefix = _entity_key_prefix()
+    width = len(prefix) + 8
+    if all(len(key) == width for key in keys):
+        buffer = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, width)
+        if (buffer[:, :len(prefix)] == np.frombuffer(prefix, dtype=np.uint8)).all():
+            return buffer[:, len(prefix):].copy().view("<i8").ravel()
+    return np.array([
+        deserialize_entity_key(key, ENTITY_KEY_SERIALIZATION_VERSION).entity_values[0].int64_val for key in keys
+    ], dtype=np.int64)
+
+
+def decode_float_values(values: Sequence[bytes]) -> np.ndarray:
+    """float32 of serialised ValueProtos, NaN for the empty (null) ones"""
+    decoded = np.full(len(values), np.nan, dtype=np.float32)
+    for i, value in enumerate(values):
+        if len(value) == 5 and value[0] == _FLOAT_VAL_TAG:
+            decoded[i] = np.frombuffer(value, dtype="<f4", offset=1)[0]
+        elif value:
+            proto = ValueProto.FromString(value)
+            field = proto.WhichOneof("val")
+            decoded[i] = np.nan if field is None else float(getattr(proto, field))
+    return decoded
+
+
+def read_online_rows(path: str, table: str, feature_names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of a SQLite online store table.
+
+    SQLite groups the (entity, feature) rows by entity into comma separated
+    feature names and hex values, aligned as both aggregates see the rows of an
+    entity in the same order. The entities with the same feature name order and
+    only Float32 values, i.e. usually all of them, are decoded at once by NumPy.
+
+    Args:
+        path: SQLite database of the online store
+        table: online table of the feature view, <project>_<feature view>
+        feature_names: features in fingerprint order
+
+    Returns: Tuple(sorted entity_ids, (n_entities, n_features) float32 values, NaN when missing)
+    """
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            f'SELECT entity_key, group_concat(feature_name), group_concat(hex(value)) FROM "{table}" '
+            "GROUP BY entity_key"
+        ).fetchall()
+    matrix = np.full((len(rows), len(feature_names)), np.nan, dtype=np.float32)
+    if not rows:
+        return np.empty(0, dtype=np.int64), matrix
+    keys, names, hex_values = zip(*rows)
+    positions = {name: i for i, name in enumerate(feature_names)}
+    entities_by_names: Dict[str, List[int]] = {}
+    for entity, entity_names in enumerate(names):
+        entities_by_names.setdefault(entity_names, []).append(entity)
+
+    for entity_names, entities in entities_by_names.items():
+        columns = np.array([positions.get(name, -1) for name in entity_names.split(",")])
+        known = columns >= 0
+        # A Float32 value is 5 bytes, 10 hex digits.
+        width = 11 * len(columns) - 1
+        fixed = np.array([entity for entity in entities if len(hex_values[entity]) == width], dtype=np.int64)
+        if len(fixed):
+            buffer = np.frombuffer(
+                bytes.fromhex("".join(hex_values[entity] for entity in fixed).replace(",", "")), dtype=np.uint8
+            ).reshape(len(fixed), len(columns), 5)
+            is_float = (buffer[:, :, 0] == _FLOAT_VAL_TAG).all(axis=1)
+            values = buffer[is_float, :, 1:].copy().view("<f4")[:, :, 0]
+            matrix[np.ix_(fixed[is_float], columns[known])] = values[:, known]
+            fixed = fixed[is_float]
+        for entity in sorted(set(entities) - set(fixed.tolist())):
+            values = decode_float_values([bytes.fromhex(value) for value in hex_values[entity].split(",")])
+            matrix[entity, columns[known]] = values[known]
+
+    entity_ids = decode_entity_ids(keys)
+    order = np.argsort(entity_ids)
+    return entity_ids[order], matrix[order]
+
+
+def diff_fingerprints(
+        offline_ids: np.ndarray, offline_fingerprints: np.ndarray,
+        online_ids: np.ndarray, online_fingerprints: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Compare the fingerprints of sorted entity_ids.
+
+    Returns: entity_ids of the matched, mismatched, missing_online and missing_offline entities
+    """
+    common, offline_index, online_index = np.intersect1d(
+        offline_ids, online_ids, assume_unique=True, return_indices=True
+    )
+    equal = offline_fingerprints[offline_index] == online_fingerprints[online_index]
+    return {
+        "matched": common[equal],
+        "mismatched": common[~equal],
+        "missing_online": np.setdiff1d(offline_ids, common, assume_unique=True),
+        "missing_offline": np.setdiff1d(online_ids, common, assume_unique=True),
+    }
+
+
+class ConsistencyChecker:
+    """Fingerprint comparison of the latest offline rows and the online store.
+
+    Args:
+        engine: SQLAlchemy engine of the offline database
+        online_path: SQLite database of the online store
+        online_table: online table of the feature view
+        feature_names: features of the feature view, in schema order
+        table: offline table
+        partitions: entity_id ranges of the offline queries
+        workers: offline queries in parallel
+        max_drilldown: mismatched entities whose features are reported
+    """
+    def __init__(
+            self,
+            engine: Engine,
+            online_path: str,
+            online_table: str,
+            feature_names: Sequence[str],
+            table: str = OFFLINE_TABLE,
+            partitions: int = 16,
+            workers: int = 4,
+            max_drilldown: int = 20,
+    ):
+        self.engine = engine
+        self.online_path = online_path
+        self.online_table = online_table
+        self.feature_names = list(feature_names)
+        self.table = table
+        self.partitions = partitions
+        self.workers = workers
+        self.max_drilldown = max_drilldown
+
+    def _latest_rows_sql(self, select: str, where: str) -> str:
+        return (
+            f"SELECT DISTINCT ON (entity_id) entity_id, {select} FROM {self.table} WHERE {where} "
+            "AND (CAST(:as_of AS TIMESTAMPTZ) IS NULL OR event_timestamp <= :as_of) "
+            "ORDER BY entity_id, event_timestamp DESC, created DESC"
+        )
+
+    def entity_ranges(self) -> List[Tuple[int, int]]:
+        """[low, high) entity_id ranges of the partitions"""
+        with self.engine.connect() as conn:
+            low, high = conn.execute(text(f"SELECT min(entity_id), max(entity_id) FROM {self.table}")).one()
+        if low is None:
+            return []
+        bounds = np.unique(np.linspace(low, high + 1, self.partitions + 1).astype(np.int64))
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def offline_fingerprints(
+            self, low: int, high: int, as_of: Optional[datetime] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted entity_ids and fingerprints of the latest rows with low <= entity_id < high"""
+        query = text(self._latest_rows_sql(
+            f"{fingerprint_sql(self.feature_names)} AS fingerprint", "entity_id >= :low AND entity_id < :high"
+        ))
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, {"low": low, "high": high, "as_of": as_of}).fetchall()
+        entity_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        return entity_ids, np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+
+    def offline_values(self, entity_ids: Sequence[int], as_of: Optional[datetime] = None) -> Dict[int, List[float]]:
+        """Latest feature values of entity_ids"""
+        columns = ", ".join(f'"{name}"' for name in self.feature_names)
+        query = text(self._latest_rows_sql(columns, "entity_id IN :entity_ids")).bindparams(
+            bindparam("entity_ids", expanding=True)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, {"entity_ids": [int(i) for i in entity_ids], "as_of": as_of}).fetchall()
+        return {row[0]: [np.nan if value is None else float(value) for value in row[1:]] for row in rows}
+
+    def drilldown(
+            self, entity_ids: np.ndarray, online_ids: np.ndarray, online_values: np.ndarray,
+            as_of: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Differing features of the mismatched entity_ids"""
+        offline = self.offline_values(entity_ids, as_of)
+        differences = []
+        for entity_id in entity_ids.tolist():
+            offline_row = np.array(offline[entity_id], dtype=np.float32)
+            online_row = online_values[np.searchsorted(online_ids, entity_id)]
+            differs = (offline_row.view(np.uint32) != online_row.view(np.uint32)) & ~(
+                np.isnan(offline_row) & np.isnan(online_row)
+            )
+            differences += [
+                {"entity_id": entity_id, "feature": self.feature_names[i],
+                 "offline": float(offline_row[i]), "online": float(online_row[i])}
+                for i in np.flatnonzero(differs)
+            ]
+        return differences
+
+    def run(self, as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """Compare the latest offline rows (before as_of) with the online store.
+
+        Returns: report with the counts, the differing features of up to
+            max_drilldown mismatched entities, the seconds and entities/s
+        """
+        start = time.perf_counter()
+        online_ids, online_values = read_online_rows(self.online_path, self.online_table, self.feature_names)
+        online_fingerprints = fingerprint(online_values)
+        online_seconds = time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            parts = list(executor.map(lambda bounds: self.offline_fingerprints(*bounds, as_of), self.entity_ranges()))
+        offline_ids = np.concatenate([ids for ids, _ in parts] or [np.empty(0, dtype=np.int64)])
+        offline_fingerprints = np.concatenate([fps for _, fps in parts] or [np.empty(0, dtype=np.int64)])
+        offline_seconds = time.perf_counter() - start - online_seconds
+
+        diff = diff_fingerprints(offline_ids, offline_fingerprints, online_ids, online_fingerprints)
+        mismatches = self.drilldown(diff["mismatched"][:self.max_drilldown], online_ids, online_values, as_of) \
+            if len(diff["mismatched"]) else []
+        seconds = time.perf_counter() - start
+        entities = len(np.union1d(offline_ids, online_ids))
+        report = {
+            "offline_entities": len(offline_ids),
+            "online_entities": len(online_ids),
+            **{name: len(entity_ids) for name, entity_ids in diff.items()},
+            "missing_online_sample": diff["missing_online"][:self.max_drilldown].tolist(),
+            "missing_offline_sample": diff["missing_offline"][:self.max_drilldown].tolist(),
+            "mismatches": mismatches,
+            "online_seconds": online_seconds,
+            "offline_seconds": offline_seconds,
+            "seconds": seconds,
+            "entities_per_second": entities / seconds if seconds > 0 else 0.,
+        }
+        logging.info("Checked [%s] entities in [%.1f] sec ([%.0f] entities/s): [%s] mismatched, "
+                     "[%s] missing online, [%s] missing offline", entities, seconds,
+                     report["entities_per_second"], report["mismatched"], report["missing_online"],
+                     report["missing_offline"])
+        return report
+
+
+def main():
+    """Check the online store of the feature repository against the offline table"""
+    parser = argparse.ArgumentParser(description="Online / offline consistency check")
+    parser.add_argument("--as-of", default=None, help="end date of the last materialisation, ISO 8601")
+    parser.add_argument("--url", default=None, help="SQLAlchemy URL of the offline database")
+    parser.add_argument("--table", default=OFFLINE_TABLE)
+    parser.add_argument("--feature-view", default=FEATURE_VIEW)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-drilldown", type=int, default=20)
+    args = parser.parse_args()
+
+    store = FeatureStore(repo_path=".")
+    online_store = store.config.online_store
+    if online_store.type != "sqlite":
+        parser.error(f"online store type [{online_store.type}] is not sqlite")
+    online_path = Path(online_store.path)
+    if not online_path.is_absolute():
+        online_path = Path(store.repo_path) / online_path
+    feature_view = store.get_feature_view(args.feature_view)
+    engine = create_engine(args.url or default_url())
+    try:
+        report = ConsistencyChecker(
+            engine, str(online_path), f"{store.project}_{feature_view.name}",
+            [feature.name for feature in feature_view.features], args.table,
+            args.partitions, args.workers, args.max_drilldown,
+        ).run(datetime.fromisoformat(args.as_of) if args.as_of else None)
+    finally:
+        engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,467 @@
+"""Dense array online store module.
+
+FEAST OnlineStore for feature views keyed by a single dense, non-negative integer
+entity key (entity_id is range(1, N+1)) with numeric features stored as Float32.
+
+Each feature view is a directory of generations. A generation holds NumPy .npy
+files memory-mapped by the readers, with the entity_id as the row index:
+    values.npy      float32 (capacity, n_features), NaN for a null value
+    event_ts.npy    int64 (capacity,), microseconds since epoch, 0 if absent
+    created_ts.npy  int64 (capacity,)
+    features.json   feature names in column order
+    changes.npy     int64 entity ids written by the write that created the generation
+    base.json       name of the generation it was written over, written last
+
+- A lookup is an array index into the memory map. There is no entity key
+  serialisation, SQL or value deserialisation.
+- A published generation is never modified while it is current. A write stages
+  the rows into an unpublished generation (newer event_ts wins) and then
+  atomically swaps the `current` symlink to it. Writers are serialised by an
+  flock on write.lock.
+- The staging generation is the retired previous generation, written in place:
+  it is brought up to date with the changes of the current generation and then
+  the rows are applied. A write costs O(rows of the last two writes), not
+  O(capacity). A full copy is made only for the first write, when the capacity
+  grows, or when the previous generation is not a complete base of the current one.
+- Readers never lock. They re-map when the `current` symlink changes and retry a
+  read when `current` was swapped during it, as the generation may be restaged.
+
+feature_store.yaml (the feature repository must be importable, `feast` CLI adds it to sys.path):
+    online_store:
+      type: dense_online_store.DenseArrayOnlineStore
+      path: data/dense_online_store
+"""
+import fcntl
+import json
+import math
+import os
+import shutil
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+from pydantic import StrictStr
+
+from feast import (
+    Entity,
+    FeatureView,
+)
+from feast.infra.online_stores.online_store import OnlineStore
+from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+from feast.repo_config import (
+    FeastConfigBaseModel,
+    RepoConfig,
+)
+
+CURRENT = "current"
+WRITE_LOCK = "write.lock"
+GENERATION_PREFIX = "gen-"
+CHANGES = "changes.npy"
+BASE = "base.json"
+ARRAYS = ("values.npy", "event_ts.npy", "created_ts.npy")
+_NULL_VALUE = ValueProto()
+
+
+class DenseArrayOnlineStoreConfig(FeastConfigBaseModel):
+    """Online store config for the dense array online store"""
+
+    type: Literal["dense_online_store.DenseArrayOnlineStore"] = \
+        "dense_online_store.DenseArrayOnlineStore"
+    """ Online store type selector"""
+
+    path: StrictStr = "data/dense_online_store"
+    """ Directory of the feature view arrays, relative to the repo path """
+
+
+def _entity_id(entity_key: EntityKeyProto) -> int:
+    """Integer entity id of a single join key entity key"""
+    if len(entity_key.entity_values) != 1:
+        raise ValueError("dense online store supports a single join key only.")
+    value = entity_key.entity_values[0]
+    kind = value.WhichOneof("val")
+    if kind not in ("int64_val", "int32_val"):
+        raise ValueError(f"dense online store needs an integer join key, got [{kind}].")
+    return getattr(value, kind)
+
+
+def _to_float(value: ValueProto) -> float:
+    kind = value.WhichOneof("val")
+    if kind is None:
+        return np.nan
+    if kind not in ("float_val", "double_val", "int64_val", "int32_val", "bool_val"):
+        raise ValueError(f"dense online store needs numeric features, got [{kind}].")
+    return getattr(value, kind)
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+
+class _Generation:
+    """Memory-mapped arrays of one generation"""
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.name = directory.name
+        with open(directory / "features.json", "r", encoding="utf-8") as file:
+            self.features: List[str] = json.load(file)
+        self.column = {name: i for i, name in enumerate(self.features)}
+        # Plain ndarray views of the maps, np.memmap indexing is slower.
+        self.values = np.load(directory / "values.npy", mmap_mode="r").view(np.ndarray)
+        self.event_ts = np.load(directory / "event_ts.npy", mmap_mode="r").view(np.ndarray)
+        self.created_ts = np.load(directory / "created_ts.npy", mmap_mode="r").view(np.ndarray)
+        self.capacity = self.event_ts.shape[0]
+
+
+class DenseArrayOnlineStore(OnlineStore):
+    """
+    Memory-mapped dense array implementation of the online store interface.
+
+    Attributes:
+        _generations: current generation per feature view directory.
+        _table_dirs: feature view directory per (repo, path, project, feature view).
+        _value_protos: shared ValueProto per float value. The one-hot features have
+            few distinct values and FEAST copies the protos into the response.
+    """
+    max_value_protos = 65_536
+
+    def __init__(self):
+        super().__init__()
+        self._generations: Dict[Path, _Generation] = {}
+        self._value_protos: Dict[float, ValueProto] = {}
+        self._table_dirs: Dict[Tuple, Path] = {}
+
+    @staticmethod
+    def _table_dir(config: RepoConfig, table: FeatureView) -> Path:
+        path = Path(config.online_store.path)
+        if config.repo_path and not path.is_absolute():
+            path = Path(config.repo_path) / path
+        return path / f"{config.project}_{table.name}"
+
+    def _cached_table_dir(self, config: RepoConfig, table: FeatureView) -> Path:
+        """_table_dir without the pathlib cost on the read path"""
+        key = (config.repo_path, config.online_store.path, config.project, table.name)
+        table_dir = self._table_dirs.get(key)
+        if table_dir is None:
+            table_dir = self._table_dirs[key] = self._table_dir(config, table)
+        return table_dir
+
+    def _value_proto(self, value: float) -> ValueProto:
+        if math.isnan(value):
+            # NaN is a null value.
+            return _NULL_VALUE
+        if len(self._value_protos) >= self.max_value_protos:
+            self._value_protos.clear()
+        proto = self._value_protos[value] = ValueProto(float_val=value)
+        return proto
+
+    def _generation(self, table_dir: Path) -> Optional[_Generation]:
+        """Current generation, re-mapped when the current symlink has been swapped"""
+        for _ in range(3):
+            try:
+                name = os.readlink(table_dir / CURRENT)
+            except FileNotFoundError:
+                return None
+            generation = self._generations.get(table_dir)
+            if generation is not None and generation.name == name:
+                return generation
+            try:
+                generation = _Generation(table_dir / name)
+            except FileNotFoundError:
+                # The generation was removed by two swaps since the readlink.
+                continue
+            self._generations[table_dir] = generation
+            return generation
+        raise RuntimeError(f"cannot open a stable generation in [{table_dir}].")
+
+    def _read_rows(
+            self,
+            table_dir: Path,
+            ids: np.ndarray,
+    ) -> Optional[Tuple[_Generation, np.ndarray, np.ndarray, np.ndarray]]:
+        """Rows of the ids in the current generation.
+
+        Returns: None when nothing has been written, else Tuple(generation, ids in range,
+            event_ts, values) of the ids, with row 0 for the ids out of range
+        """
+        for _ in range(3):
+            generation = self._generation(table_dir)
+            if generation is None:
+                return None
+            in_range = (ids >= 0) & (ids < generation.capacity)
+            rows = np.where(in_range, ids, 0)
+            event_ts = generation.event_ts.take(rows)
+            values = generation.values.take(rows, axis=0)
+            # A generation is restaged only after it has been swapped out, hence
+            # the rows are consistent when it is still current after the read.
+            try:
+                if os.readlink(table_dir / CURRENT) == generation.name:
+                    return generation, in_range, event_ts, values
+            except FileNotFoundError:
+                return None
+        raise RuntimeError(f"cannot read a stable generation in [{table_dir}].")
+
+    def read_arrays(
+            self,
+            config: RepoConfig,
+            table: FeatureView,
+            entity_ids: Sequence[int],
+            requested_features: Optional[List[str]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Features of the entities as an array, without protos.
+
+        Args:
+            config: repo config
+            table: feature view
+            entity_ids: integer entity ids
+            requested_features: feature names, all the features by default
+
+        Returns: Tuple(float32 array (n_entities, n_features) with NaN for absent
+            entities, boolean array (n_entities,) True where the entity is present)
+        """
+        ids = np.asarray(entity_ids, dtype=np.int64)
+        read = self._read_rows(self._cached_table_dir(config, table), ids)
+        if read is None:
+            n_features = len(requested_features or table.features)
+            return (
+                np.full((ids.shape[0], n_features), np.nan, dtype=np.float32),
+                np.zeros(ids.shape[0], dtype=bool),
+            )
+        generation, in_range, event_ts, values = read
+        present = in_range & (event_ts > 0)
+        if requested_features is not None and requested_features != generation.features:
+            values = values[:, [generation.column[name] for name in requested_features]]
+        values[~present] = np.nan
+        return values, present
+
+    def online_read(
+        self,
+        config: RepoConfig,
+        table: FeatureView,
+        entity_keys: List[EntityKeyProto],
+        requested_features: Optional[List[str]] = None,
+    ) -> List[Tuple[Optional[datetime], Optional[Dict[str, ValueProto]]]]:
+        ids = np.fromiter((_entity_id(key) for key in entity_keys), dtype=np.int64,
+                          count=len(entity_keys))
+        read = self._read_rows(self._cached_table_dir(config, table), ids)
+        if read is None:
+            return [(None, None)] * len(entity_keys)
+        generation, in_range, event_ts, values = read
+        requested_features = [
+            name for name in requested_features or generation.features if name in generation.column
+        ]
+        present = in_range & (event_ts > 0)
+        if requested_features != generation.features:
+            values = values[:, [generation.column[name] for name in requested_features]]
+
+        value_protos, value_proto = self._value_protos, self._value_proto
+        result: List[Tuple[Optional[datetime], Optional[Dict[str, ValueProto]]]] = []
+        for row, ts, is_present in zip(values.tolist(), event_ts.tolist(), present.tolist()):
+            if not is_present:
+                result.append((None, None))
+                continue
+            result.append((
+                datetime.fromtimestamp(ts / 1_000_000, tz=timezone.utc),
+                {
+                    name: value_protos[value] if value in value_protos else value_proto(value)
+                    for name, value in zip(requested_features, row)
+                },
+            ))
+        return result
+
+    def online_write_batch(
+        self,
+        config: RepoConfig,
+        table: FeatureView,
+        data: List[
+            Tuple[EntityKeyProto, Dict[str, ValueProto], datetime, Optional[datetime]]
+        ],
+        progress: Optional[Callable[[int], Any]],
+    ) -> None:
+        if not data:
+            return
+        table_dir = self._table_dir(config, table)
+        table_dir.mkdir(parents=True, exist_ok=True)
+        features = [f.name for f in table.features]
+
+        ids = np.fromiter((_entity_id(row[0]) for row in data), dtype=np.int64, count=len(data))
+        if ids.min() < 0:
+            raise ValueError("dense online store needs non-negative entity ids.")
+        event_ts = np.fromiter((_to_micros(row[2]) for row in data), dtype=np.int64,
+                               count=len(data))
+        created_ts = np.fromiter((_to_micros(row[3]) for row in data), dtype=np.int64,
+                                 count=len(data))
+        values = np.array(
+            [[_to_float(row[1][name]) if name in row[1] else np.nan for name in features]
+             for row in data],
+            dtype=np.float32,
+        )
+        # Latest event per entity within the batch.
+        order = np.lexsort((event_ts, ids))
+        last = np.r_[ids[order][1:] != ids[order][:-1], True]
+        keep = order[last]
+        ids, event_ts, created_ts, values = ids[keep], event_ts[keep], created_ts[keep], values[keep]
+
+        with open(table_dir / WRITE_LOCK, "w", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self._generation(table_dir)
+            self._write_generation(table_dir, current, features, ids, event_ts, created_ts, values)
+        if progress:
+            progress(len(data))
+
+    @staticmethod
+    def _staging(table_dir: Path, current: Optional[_Generation], features: List[str],
+                 max_id: int) -> Optional[Path]:
+        """Retired generation current was written over, None when it cannot be restaged"""
+        if current is None or max_id >= current.capacity or current.features != features:
+            return None
+        try:
+            with open(current.directory / BASE, "r", encoding="utf-8") as file:
+                base = json.load(file)
+            if base is None:
+                return None
+            directory = table_dir / base
+            # base.json is written last, it is absent from an incomplete generation.
+            with open(directory / BASE, "r", encoding="utf-8"):
+                pass
+            with open(directory / "features.json", "r", encoding="utf-8") as file:
+                if json.load(file) != features:
+                    return None
+            if np.load(directory / "event_ts.npy", mmap_mode="r").shape[0] != current.capacity:
+                return None
+        except FileNotFoundError:
+            return None
+        return directory
+
+    def _write_generation(
+            self,
+            table_dir: Path,
+            current: Optional[_Generation],
+            features: List[str],
+            ids: np.ndarray,
+            event_ts: np.ndarray,
+            created_ts: np.ndarray,
+            values: np.ndarray,
+    ):
+        """Stage current and the rows into a new generation and swap the current symlink"""
+        # Time based names are never reused, even after the table is recreated.
+        generations = [p.name for p in table_dir.glob(f"{GENERATION_PREFIX}*")]
+        name = f"{GENERATION_PREFIX}{time.time_ns():020d}"
+
+        staging = self._staging(table_dir, current, features, int(ids.max()))
+        if staging is not None:
+            (staging / BASE).unlink()
+            new_values, new_event_ts, new_created_ts = (
+                np.load(staging / array, mmap_mode="r+") for array in ARRAYS
+            )
+            changes = np.load(current.directory / CHANGES)
+            new_values[changes] = current.values[changes]
+            new_event_ts[changes] = current.event_ts[changes]
+            new_created_ts[changes] = current.created_ts[changes]
+            directory = staging
+        else:
+            directory = self._copy_generation(table_dir / name, current, features, int(ids.max()))
+            new_values, new_event_ts, new_created_ts = (
+                np.load(directory / array, mmap_mode="r+") for array in ARRAYS
+            )
+
+        newer = event_ts >= new_event_ts[ids]
+        new_values[ids[newer]] = values[newer]
+        new_event_ts[ids[newer]] = event_ts[newer]
+        new_created_ts[ids[newer]] = created_ts[newer]
+        for array in (new_values, new_event_ts, new_created_ts):
+            array.flush()
+        np.save(directory / CHANGES, ids[newer])
+        with open(directory / BASE, "w", encoding="utf-8") as file:
+            json.dump(current.name if current is not None else None, file)
+        if directory.name != name:
+            os.rename(directory, table_dir / name)
+
+        link = table_dir / f"{CURRENT}.tmp"
+        if link.is_symlink():
+            link.unlink()
+        link.symlink_to(name)
+        os.replace(link, table_dir / CURRENT)
+
+        # Keep the previous generation, the staging generation of the next write.
+        keep = {name, current.name if current is not None else None}
+        for old in generations:
+            if old not in keep:
+                shutil.rmtree(table_dir / old, ignore_errors=True)
+
+    @staticmethod
+    def _copy_generation(directory: Path, current: Optional[_Generation], features: List[str],
+                         max_id: int) -> Path:
+        """Copy current into a new generation directory, grown to hold max_id"""
+        capacity = current.capacity if current is not None else 0
+        if max_id >= capacity:
+            capacity = max(max_id + 1, 2 * capacity)
+        directory.mkdir()
+
+        new_values = np.lib.format.open_memmap(
+            directory / "values.npy", mode="w+", dtype=np.float32, shape=(capacity, len(features))
+        )
+        new_event_ts = np.lib.format.open_memmap(
+            directory / "event_ts.npy", mode="w+", dtype=np.int64, shape=(capacity,)
+        )
+        new_created_ts = np.lib.format.open_memmap(
+            directory / "created_ts.npy", mode="w+", dtype=np.int64, shape=(capacity,)
+        )
+        new_values[:] = np.nan
+        if current is not None:
+            size = current.capacity
+            new_event_ts[:size] = current.event_ts
+            new_created_ts[:size] = current.created_ts
+            for column, feature in enumerate(features):
+                if feature in current.column:
+                    new_values[:size, column] = current.values[:, current.column[feature]]
+        for array in (new_values, new_event_ts, new_created_ts):
+            array.flush()
+        with open(directory / "features.json", "w", encoding="utf-8") as file:
+            json.dump(features, file)
+        return directory
+
+    def update(
+        self,
+        config: RepoConfig,
+        tables_to_delete: Sequence[FeatureView],
+        tables_to_keep: Sequence[FeatureView],
+        entities_to_delete: Sequence[Entity],
+        entities_to_keep: Sequence[Entity],
+        partial: bool,
+    ):
+        for table in tables_to_keep:
+            self._table_dir(config, table).mkdir(parents=True, exist_ok=True)
+        for table in tables_to_delete:
+            self._delete(self._table_dir(config, table))
+
+    def teardown(
+        self,
+        config: RepoConfig,
+        tables: Sequence[FeatureView],
+        entities: Sequence[Entity],
+    ):
+        for table in tables:
+            self._delete(self._table_dir(config, table))
+
+    def _delete(self, table_dir: Path):
+        self._generations.pop(table_dir, None)
+        shutil.rmtree(table_dir, ignore_errors=True)
@@ -1,6 +1,11 @@
 #!/usr/bin/env bash
 #--------------------------------------------------------------------------------
 # Setup FEAST Configurations (but not run feast apply)
+#
+# OFFLINE_STORE selects the offline store template:
+#   postgres (default): feature_store.yaml.template
+#   duckdb            : feature_store.duckdb.yaml.template, over the Parquet export
+#                       of the offline table by offline_export.py
 #--------------------------------------------------------------------------------
 set -eo pipefail
 DIR="$(realpath "$(dirname "${0}")")"
@@ -17,8 +22,18 @@ check_file_exists() {
     fi
 }
 
+readonly OFFLINE_STORE="${OFFLINE_STORE:-postgres}"
+case "${OFFLINE_STORE}" in
+    postgres) readonly TEMPLATE="feature_store.yaml.template" ;;
+    duckdb)   readonly TEMPLATE="feature_store.duckdb.yaml.template" ;;
+    *)
+        echo "Error: OFFLINE_STORE must be postgres or duckdb, got ${OFFLINE_STORE}" >&2
+        exit 1
+        ;;
+esac
+
 echo
-echo "Generating feature_store.yaml from the variables..."
+echo "Generating feature_store.yaml from ${TEMPLATE}..."
 if [[ -z "${POSTGRES_PASSWORD:-}" ]]; then
     echo "Error: POSTGRES_PASSWORD not set" >&2
     exit 1
@@ -36,4 +51,8 @@ if [[ -f "feature_store.yaml" && ! -f "feature_store.yaml.bak" ]]; then
     mv feature_store.yaml feature_store.yaml.bak
     chmod go-rwx feature_store.yaml.bak
 fi
-envsubst < feature_store.yaml.template > feature_store.yaml
+envsubst < "${TEMPLATE}" > feature_store.yaml
+
+if [[ "${OFFLINE_STORE}" == "duckdb" ]]; then
+    echo "Run 'python offline_export.py' in ${DIR} once the offline table is populated."
+fi
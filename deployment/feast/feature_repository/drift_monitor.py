@@ -0,0 +1,318 @@
+"""Incremental drift monitor module.
+
+Folds the Parquet feature logs of customer_credit_risk_feature_service
+(feature_logger.py, FeatureStore.write_logged_features) into histograms of
+every logged feature and of the model score, and compares them with the
+histograms of the training baseline by PSI and KS.
+
+- create() bins the baseline: per feature, the cut points are the unique
+  n_bins-quantiles of the training values, or its distinct values for a
+  one-hot or low cardinality feature, plus one bin for missing values
+  (NaN, or a NOT_FOUND feature in the logs). The score of the training rows by
+  the scorer of scorer.py is binned the same way.
+- update() reads only the log files not in the manifest of processed files,
+  in record batches of the needed columns, so memory does not grow with the
+  file sizes. The values are binned with np.searchsorted and counted with
+  np.bincount per __log_date. The logs carry no score: the scorer scores the
+  logged features, as the scoring service did.
+- The state (bins, baseline counts, counts per log date and the manifest) is
+  one JSON file, rewritten atomically after every log file. A killed update
+  neither loses nor counts a file twice.
+- report() computes PSI and KS of all the features at once on the zero padded
+  (n_features, n_bins) count matrices. PSI includes the missing bin, KS compares
+  the distributions of the non missing values.
+
+Usage:
+    monitor = DriftMonitor.create("data/drift/state.json", training_df, feature_names, scorer)
+    monitor = DriftMonitor.load("data/drift/state.json", scorer)
+    monitor.update("data")
+    print(monitor.report())
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from feast.feature_logging import LOG_DATE_FIELD
+
+from packed_encoding import ONE_HOT_FEATURES
+from scorer import load_scorer
+
+SCORE = "score"
+LOG_FILE_PATTERN = "feature_log-*.parquet"
+STATE_VERSION = 1
+# Proportion of an empty bin in PSI, as ln(0) is undefined.
+PSI_EPSILON = 1e-4
+
+
+def compute_cuts(values: np.ndarray, n_bins: int) -> np.ndarray:
+    """Cut points of the non missing values.
+
+    A column with at most n_bins distinct values, e.g. a one-hot feature, gets
+    one bin per value: the quantiles of a rare category are all 0 and would put
+    0 and 1 in the same bin. Otherwise the unique n_bins-quantiles.
+    """
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= n_bins:
+        return distinct[1:]
+    return np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+
+
+def bin_counts(values: np.ndarray, cuts: np.ndarray) -> np.ndarray:
+    """Counts of values per bin: len(cuts) + 1 value bins then the missing bin"""
+    bins = np.searchsorted(cuts, values, side="right")
+    bins[np.isnan(values)] = len(cuts) + 1
+    return np.bincount(bins, minlength=len(cuts) + 2)
+
+
+def _padded(counts: Sequence[Sequence[int]]) -> np.ndarray:
+    matrix = np.zeros((len(counts), max(len(c) for c in counts)), dtype=np.float64)
+    for i, c in enumerate(counts):
+        matrix[i, :len(c)] = c
+    return matrix
+
+
+def _proportions(counts: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return counts / counts.sum(axis=1, keepdims=True)
+
+
+def psi_ks(expected: Sequence[Sequence[int]], actual: Sequence[Sequence[int]]) -> Dict[str, np.ndarray]:
+    """PSI and KS statistic of each pair of histograms with the same bins.
+
+    Args:
+        expected: baseline counts per histogram
+        actual: monitored counts per histogram
+
+    Returns: psi and ks arrays, NaN where actual has no values (no non missing
+        values for ks)
+    """
+    p, q = _proportions(_padded(expected)), _proportions(_padded(actual))
+    # Padding bins are empty on both sides and add 0.
+    p_smooth, q_smooth = np.maximum(p, PSI_EPSILON), np.maximum(q, PSI_EPSILON)
+    psi = ((q_smooth - p_smooth) * np.log(q_smooth / p_smooth)).sum(axis=1)
+    # The trailing missing bin has no place in the order of the values.
+    p_values = _proportions(_padded([c[:-1] for c in expected]))
+    q_values = _proportions(_padded([c[:-1] for c in actual]))
+    ks = np.abs(np.cumsum(q_values, axis=1) - np.cumsum(p_values, axis=1)).max(axis=1)
+    return {"psi": psi, "ks": ks}
+
+
+def _log_columns(schema: pa.Schema, feature_names: Sequence[str]) -> Dict[str, str]:
+    """Log column of each feature: <feature view>__<feature>"""
+    columns = {}
+    for name in schema.names:
+        if name.startswith("__") or name.endswith(("__timestamp", "__status")) or "__" not in name:
+            continue
+        feature = name.rsplit("__", 1)[1]
+        if feature in feature_names:
+            columns[feature] = name
+    return columns
+
+
+def _write_json(path: Path, content: Dict[str, Any]):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(content, file)
+    os.replace(tmp_path, path)
+
+
+class DriftMonitor:
+    """Drift of the logged features and scores against the training baseline.
+
+    Use create() or load().
+
+    Args:
+        path: state JSON file
+        state: state of create() or of the file
+        scorer: scorer of the score histogram, None to monitor the features only
+    """
+    def __init__(self, path: str, state: Dict[str, Any], scorer: Optional[Any] = None):
+        self.path = Path(path)
+        self.state = state
+        self.scorer = scorer
+        self.feature_names: List[str] = list(state["cuts"])
+        if SCORE in self.feature_names:
+            self.feature_names.remove(SCORE)
+            if scorer is None:
+                raise ValueError("The baseline has a score histogram, a scorer is needed.")
+        self._cuts = {name: np.array(cuts) for name, cuts in state["cuts"].items()}
+
+    @classmethod
+    def create(
+            cls,
+            path: str,
+            baseline: pd.DataFrame,
+            feature_names: Sequence[str],
+            scorer: Optional[Any] = None,
+            n_bins: int = 10,
+    ) -> "DriftMonitor":
+        """Bin the baseline and write a new state.
+
+        Args:
+            path: state JSON file, replaced if it exists
+            baseline: training rows with the feature columns
+            feature_names: monitored features
+            scorer: scorer of scorer.py scoring the feature view columns, None for no score
+            n_bins: quantile bins per feature
+        """
+        columns = {name: baseline[name].to_numpy(dtype=np.float64) for name in feature_names}
+        if scorer is not None:
+            columns[SCORE] = scorer.predict_proba(baseline[scorer.feature_names])[:, 1]
+        cuts = {name: compute_cuts(values, n_bins) for name, values in columns.items()}
+        state = {
+            "version": STATE_VERSION,
+            "cuts": {name: c.tolist() for name, c in cuts.items()},
+            "baseline": {name: bin_counts(values, cuts[name]).tolist() for name, values in columns.items()},
+            "baseline_rows": len(baseline),
+            "days": {},
+            "files": {},
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json(path, state)
+        return cls(str(path), state, scorer)
+
+    @classmethod
+    def load(cls, path: str, scorer: Optional[Any] = None) -> "DriftMonitor":
+        """Monitor of an existing state file"""
+        with open(path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"[{path}] is not a version {STATE_VERSION} drift monitor state.")
+        return cls(path, state, scorer)
+
+    def _fold_batch(self, batch: pa.RecordBatch, columns: Dict[str, str],
+                    file_counts: Dict[str, Dict[str, np.ndarray]]) -> int:
+        """Add the counts of the batch to file_counts[log date][histogram]"""
+        days = batch.column(LOG_DATE_FIELD).cast(pa.string()).to_numpy(zero_copy_only=False)
+        values = {
+            name: batch.column(column).to_numpy(zero_copy_only=False).astype(np.float64)
+            for name, column in columns.items()
+        }
+        if self.scorer is not None:
+            missing = [name for name in self.scorer.feature_names if name not in values]
+            if missing:
+                raise ValueError(f"The logs have no {missing} features to score.")
+            X = np.column_stack([values[name] for name in self.scorer.feature_names])
+            values[SCORE] = self.scorer.predict_proba(X)[:, 1]
+        unique_days = np.unique(days)
+        for day in unique_days:
+            rows = slice(None) if len(unique_days) == 1 else days == day
+            day_counts = file_counts.setdefault(str(day), {})
+            for name, column_values in values.items():
+                counts = bin_counts(column_values[rows], self._cuts[name])
+                day_counts[name] = day_counts[name] + counts if name in day_counts else counts
+        return batch.num_rows
+
+    def update(self, log_dir: str, batch_rows: int = 65_536) -> Dict[str, Any]:
+        """Fold the log files of log_dir not yet in the manifest.
+
+        Args:
+            log_dir: FileLoggingDestination directory
+            batch_rows: rows per record batch read
+
+        Returns: files and rows folded, seconds and rows/s
+        """
+        start = time.perf_counter()
+        files = rows = 0
+        for path in sorted(Path(log_dir).glob(LOG_FILE_PATTERN)):
+            if path.name in self.state["files"]:
+                continue
+            parquet_file = pq.ParquetFile(path)
+            columns = _log_columns(parquet_file.schema_arrow, self.feature_names)
+            file_counts: Dict[str, Dict[str, np.ndarray]] = {}
+            file_rows = 0
+            for batch in parquet_file.iter_batches(
+                    batch_size=batch_rows, columns=[LOG_DATE_FIELD] + list(columns.values())
+            ):
+                file_rows += self._fold_batch(batch, columns, file_counts)
+            # The counts of a file enter the state with its manifest entry only.
+            for day, day_counts in file_counts.items():
+                state_counts = self.state["days"].setdefault(day, {})
+                for name, counts in day_counts.items():
+                    state_counts[name] = (counts + np.asarray(state_counts.get(name, 0), dtype=np.int64)).tolist()
+            stat = path.stat()
+            self.state["files"][path.name] = {"rows": file_rows, "size": stat.st_size}
+            _write_json(self.path, self.state)
+            files += 1
+            rows += file_rows
+            logging.debug("Folded [%s] rows of [%s]", file_rows, path)
+        seconds = time.perf_counter() - start
+        logging.info("Folded [%s] log files, [%s] rows in [%.2f] sec", files, rows, seconds)
+        return {"files": files, "rows": rows, "seconds": seconds,
+                "rows_per_second": rows / seconds if seconds > 0 else 0.}
+
+    def counts(self, days: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Logged counts per histogram, summed over days (all by default)"""
+        days = self.state["days"] if days is None else days
+        names = list(self.state["cuts"])
+        totals = {name: np.zeros(len(self.state["baseline"][name]), dtype=np.int64) for name in names}
+        for day in days:
+            for name, counts in self.state["days"].get(day, {}).items():
+                totals[name] += np.asarray(counts, dtype=np.int64)
+        return totals
+
+    def report(self, days: Optional[Sequence[str]] = None, psi_threshold: float = 0.2) -> Dict[str, Any]:
+        """PSI and KS of every histogram over days (all by default).
+
+        Returns: rows, per feature (and score) psi, ks and rows, and the drifted
+            ones with a psi above psi_threshold
+        """
+        names = list(self.state["cuts"])
+        counts = self.counts(days)
+        statistics = psi_ks([self.state["baseline"][name] for name in names], [counts[name] for name in names])
+        features = {
+            name: {"psi": float(psi), "ks": float(ks), "rows": int(counts[name].sum())}
+            for name, psi, ks in zip(names, statistics["psi"], statistics["ks"])
+        }
+        return {
+            "days": sorted(self.state["days"] if days is None else days),
+            "rows": max((feature["rows"] for feature in features.values()), default=0),
+            "features": features,
+            "drifted": sorted(name for name, feature in features.items() if feature["psi"] > psi_threshold),
+        }
+
+
+def main():
+    """Fold the new logs and print the drift report"""
+    parser = argparse.ArgumentParser(description="Drift of the logged features and scores")
+    parser.add_argument("--logs", default="data", help="feature log directory")
+    parser.add_argument("--state", default="data/drift/state.json")
+    parser.add_argument("--model", default=None, help="scorer .npz from scorer.save_scorer()")
+    parser.add_argument("--baseline", default=None,
+                        help="training features CSV, creates the state (replacing an existing one) with the "
+                             "features of --model, or the one-hot features without it")
+    parser.add_argument("--n-bins", type=int, default=10)
+    parser.add_argument("--day", action="append", default=None, help="log date to report, all by default")
+    parser.add_argument("--psi-threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scorer = load_scorer(args.model) if args.model else None
+    if args.baseline:
+        baseline = pd.read_csv(args.baseline)
+        feature_names = scorer.feature_names if scorer is not None else ONE_HOT_FEATURES
+        monitor = DriftMonitor.create(args.state, baseline, feature_names, scorer, args.n_bins)
+    else:
+        monitor = DriftMonitor.load(args.state, scorer)
+    monitor.update(args.logs)
+    print(json.dumps(monitor.report(args.day, args.psi_threshold), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,185 @@
+"""Batch explanation module.
+
+Reason codes of the credit decisions, e.g. for adverse action notices: the
+categories of an applicant that raised the log odds of bad credit the most.
+
+- contributions(): the contribution of every one-hot feature to the log odds
+  of each row, in one matrix operation: coef * x for a linear model (a
+  LogisticRegression or a LinearScorer of scorer.py), and XGBoost
+  pred_contribs (TreeSHAP) of the distinct rows for an XGBClassifier. The last
+  column is the bias, and a row sums to its log odds.
+- group_contributions(): the feature contributions summed per category group of
+  packed_encoding.CATEGORY_GROUPS (purpose, housing, saving_accounts, ...), a
+  product with a (features, groups) indicator matrix.
+- top_reasons(): the k groups with the largest positive contribution per row,
+  with the category of the applicant in each group.
+
+TreeEnsembleScorer keeps no node statistics, so tree models are explained from
+the XGBClassifier.
+
+Usage:
+    reasons = explain(model, X, k=4)
+"""
+from typing import (
+    Any,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+from xgboost import DMatrix
+
+from packed_encoding import CATEGORY_GROUPS
+from scorer import (
+    LinearScorer,
+    TreeEnsembleScorer,
+    to_matrix,
+)
+
+BIAS = "bias"
+
+
+def _feature_names(model: Any) -> List[str]:
+    feature_names = getattr(model, "feature_names", None)
+    if feature_names is None:
+        feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        raise ValueError("the model has no feature names, fit it on a DataFrame.")
+    return [str(name) for name in feature_names]
+
+
+def contributions(model: Any, X) -> Tuple[np.ndarray, List[str]]:
+    """Contribution of each feature to the log odds of the positive (bad credit) class.
+
+    Args:
+        model: LinearScorer, fitted binary LogisticRegression (coef_ and
+            intercept_) or fitted XGBClassifier
+        X: DataFrame with the feature view columns, or array in the training
+            column order
+
+    Returns: (n_rows, n_features + 1) contributions, the last column is the
+        bias, and the column names
+    """
+    if isinstance(model, TreeEnsembleScorer):
+        raise ValueError("explain the XGBClassifier the TreeEnsembleScorer was exported from.")
+    feature_names = _feature_names(model)
+    X = to_matrix(X, feature_names)
+    if hasattr(model, "get_booster"):
+        # Same trees as predict_proba uses after early stopping.
+        best_iteration = getattr(model, "best_iteration", None)
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        # One-hot rows of the 8 category groups repeat, TreeSHAP runs once per distinct row.
+        unique, inverse = np.unique(X, axis=0, return_inverse=True)
+        contribs = model.get_booster().predict(
+            DMatrix(unique, feature_names=feature_names), pred_contribs=True, iteration_range=iteration_range,
+        ).astype(np.float64)[inverse.ravel()]
+    elif isinstance(model, LinearScorer) or hasattr(model, "coef_"):
+        if isinstance(model, LinearScorer):
+            coef, intercept = model.coef, model.intercept
+        else:
+            coef = np.asarray(model.coef_, dtype=np.float64)
+            if coef.ndim == 2 and coef.shape[0] != 1:
+                raise ValueError("only binary logistic regression is supported.")
+            coef, intercept = coef.ravel(), float(np.ravel(model.intercept_)[0])
+        contribs = np.empty((X.shape[0], X.shape[1] + 1), dtype=np.float64)
+        np.multiply(X, coef, out=contribs[:, :-1])
+        contribs[:, -1] = intercept
+    else:
+        raise ValueError(f"unsupported model type [{type(model).__name__}].")
+    return contribs, feature_names + [BIAS]
+
+
+def feature_groups(feature_names: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """Category group of each feature.
+
+    Features outside CATEGORY_GROUPS are groups of their own, and the bias
+    column belongs to no group.
+
+    Returns: group names, and the (n_features, n_groups) indicator matrix
+    """
+    group_of = {column: group for group, columns in CATEGORY_GROUPS.items() for column in columns}
+    groups: List[str] = []
+    for name in feature_names:
+        group = group_of.get(name, name)
+        if name != BIAS and group not in groups:
+            groups.append(group)
+    indicator = np.zeros((len(feature_names), len(groups)), dtype=np.float64)
+    for i, name in enumerate(feature_names):
+        if name != BIAS:
+            indicator[i, groups.index(group_of.get(name, name))] = 1.
+    return groups, indicator
+
+
+def group_contributions(contribs: np.ndarray, feature_names: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Contributions summed per category group.
+
+    Returns: (n_rows, n_groups) contributions and the group names
+    """
+    groups, indicator = feature_groups(feature_names)
+    return contribs @ indicator, groups
+
+
+def _categories(X: np.ndarray, feature_names: Sequence[str], groups: Sequence[str]) -> np.ndarray:
+    """(n_rows, n_groups) category of each row per group: its one-hot column set to 1"""
+    categories = np.full((X.shape[0], len(groups)), None, dtype=object)
+    index = {name: i for i, name in enumerate(feature_names)}
+    for g, group in enumerate(groups):
+        columns = [column for column in CATEGORY_GROUPS.get(group, []) if column in index]
+        if not columns:
+            # A feature of its own.
+            categories[:, g] = group
+            continue
+        values = X[:, [index[column] for column in columns]]
+        active = values.argmax(axis=1)
+        names = np.array(columns, dtype=object)[active]
+        categories[:, g] = np.where(values[np.arange(X.shape[0]), active] > 0, names, None)
+    return categories
+
+
+def top_reasons(
+        X,
+        contribs: np.ndarray,
+        feature_names: Sequence[str],
+        k: int = 4,
+        index: Optional[pd.Index] = None,
+) -> pd.DataFrame:
+    """The k category groups raising the log odds of bad credit the most per row.
+
+    Args:
+        X: features of the rows, as for contributions()
+        contribs: contributions() of the rows
+        feature_names: contributions() column names
+        k: reasons per row
+        index: index of the result, X.index for a DataFrame by default
+
+    Returns: reason_<i>, category_<i> and contribution_<i> columns for i in
+        1..k, None and NaN past the groups with a positive contribution
+    """
+    if index is None and hasattr(X, "index"):
+        index = X.index
+    model_features = [name for name in feature_names if name != BIAS]
+    X = to_matrix(X, model_features)
+    grouped, groups = group_contributions(contribs, feature_names)
+    k = min(k, len(groups))
+    top = np.argsort(-grouped, axis=1, kind="stable")[:, :k]
+    top_contribs = np.take_along_axis(grouped, top, axis=1)
+    positive = top_contribs > 0
+    reasons = np.where(positive, np.array(groups, dtype=object)[top], None)
+    categories = np.where(positive, np.take_along_axis(_categories(X, model_features, groups), top, axis=1), None)
+    top_contribs = np.where(positive, top_contribs, np.nan)
+
+    columns = {}
+    for i in range(k):
+        columns[f"reason_{i + 1}"] = reasons[:, i]
+        columns[f"category_{i + 1}"] = categories[:, i]
+        columns[f"contribution_{i + 1}"] = top_contribs[:, i]
+    return pd.DataFrame(columns, index=index)
+
+
+def explain(model: Any, X, k: int = 4) -> pd.DataFrame:
+    """Top k reasons of a batch of applicants, see top_reasons()"""
+    contribs, feature_names = contributions(model, X)
+    return top_reasons(X, contribs, feature_names, k)
@@ -0,0 +1,300 @@
+"""Feature logging writer module.
+
+Buffered sink for the served features of a feature service with a
+FileLoggingDestination logging config. FeatureStore.write_logged_features
+writes one Parquet file per call on the caller's thread; at scoring request
+rates that is a small file and a filesystem write per request.
+
+- log() appends the served rows (OnlineResponse.to_dict() layout) to a bounded
+  in-memory buffer and returns; nothing is converted or written on the request
+  path.
+- A background thread converts the buffered rows to Arrow in the schema of
+  FeatureServiceLoggingSource and appends them as one row group when
+  row_group_rows are buffered or every flush_seconds.
+- A file is rotated when it reaches max_file_rows or is max_file_seconds old.
+  It is written as a hidden .inprogress file and renamed to .parquet when
+  closed, so that readers of the destination only see complete files.
+- When the buffer is full, log() drops the rows (block=False) or waits for the
+  writer (block=True). Both are counted in stats().
+- close() flushes the buffer and closes the current file.
+
+to_dict() carries neither the feature timestamps nor the statuses. The
+__timestamp columns are null and the __status columns are PRESENT or NOT_FOUND
+from whether the value is None.
+
+Usage:
+    feature_logger = FeatureLogWriter(store)
+    feature_logger.log(store.get_online_features(...).to_dict())
+    feature_logger.close()
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from feast import FeatureStore
+from feast.feature_logging import (
+    LOG_DATE_FIELD,
+    LOG_TIMESTAMP_FIELD,
+    REQUEST_ID_FIELD,
+    FeatureServiceLoggingSource,
+)
+from feast.protos.feast.serving.ServingService_pb2 import FieldStatus
+
+DEFAULT_FEATURE_SERVICE_NAME = "customer_credit_risk_feature_service"
+
+# (rows, log time, request id, response columns)
+_Batch = Tuple[int, datetime, str, Dict[str, List[Any]]]
+
+
+class FeatureLogWriter:
+    """Asynchronous, buffered Parquet writer of served features.
+
+    Args:
+        store: FeatureStore serving the feature service.
+        feature_service_name: feature service with a FileLoggingDestination logging config.
+        max_buffer_rows: rows buffered in memory before log() drops or blocks.
+        row_group_rows: rows per Parquet row group, a flush is triggered at this size.
+        flush_seconds: maximum time rows stay in the buffer.
+        max_file_rows: rotate the file after this many rows.
+        max_file_seconds: rotate the file after this many seconds.
+        block: wait for buffer space instead of dropping rows when the buffer is full.
+    """
+    def __init__(
+            self,
+            store: FeatureStore,
+            feature_service_name: str = DEFAULT_FEATURE_SERVICE_NAME,
+            max_buffer_rows: int = 100_000,
+            row_group_rows: int = 10_000,
+            flush_seconds: float = 5.0,
+            max_file_rows: int = 1_000_000,
+            max_file_seconds: float = 300.0,
+            block: bool = False,
+    ):
+        feature_service = store.get_feature_service(feature_service_name)
+        if feature_service.logging_config is None:
+            raise ValueError(f"feature service [{feature_service_name}] has no logging config.")
+        destination = Path(feature_service.logging_config.destination.path)
+        if not destination.is_absolute() and store.config.repo_path is not None:
+            destination = Path(store.config.repo_path) / destination
+        self.path = destination
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.schema = FeatureServiceLoggingSource(feature_service, store.project).get_schema(
+            store.registry
+        )
+        # Log column of each to_dict() name, i.e. the join keys and the feature names.
+        self._columns: Dict[str, str] = {}
+        for projection in feature_service.feature_view_projections:
+            for feature in projection.features:
+                self._columns[feature.name] = f"{projection.name_to_use()}__{feature.name}"
+        system_fields = {LOG_TIMESTAMP_FIELD, LOG_DATE_FIELD, REQUEST_ID_FIELD}
+        for field in self.schema:
+            if field.name not in system_fields and "__" not in field.name:
+                self._columns[field.name] = field.name
+
+        self.max_buffer_rows = max_buffer_rows
+        self.row_group_rows = row_group_rows
+        self.flush_seconds = flush_seconds
+        self.max_file_rows = max_file_rows
+        self.max_file_seconds = max_file_seconds
+        self.block = block
+
+        self._buffer: Deque[_Batch] = deque()
+        self._buffered_rows = 0
+        self._condition = threading.Condition()
+        self._closing = False
+        self._waiting = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._file_path: Optional[Path] = None
+        self._file_rows = 0
+        self._file_opened = 0.0
+
+        self.logged_rows = 0
+        self.written_rows = 0
+        self.dropped_rows = 0
+        self.blocked_seconds = 0.0
+        self.max_buffered_rows = 0
+        self.flushes = 0
+        self.files = 0
+        self.write_seconds = 0.0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="feature-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, features: Dict[str, List[Any]], request_id: Optional[str] = None) -> bool:
+        """Buffer the served rows of one response.
+
+        Args:
+            features: served features in the OnlineResponse.to_dict() layout.
+            request_id: request id of the rows, a new one by default.
+
+        Returns: False when the rows were dropped because the buffer is full
+        """
+        rows = len(next(iter(features.values()), []))
+        if rows == 0:
+            return True
+        batch = (rows, datetime.now(timezone.utc), request_id or uuid.uuid4().hex, features)
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("FeatureLogWriter is closed.")
+            if self._buffered_rows + rows > self.max_buffer_rows:
+                if not self.block:
+                    self.dropped_rows += rows
+                    return False
+                start = time.perf_counter()
+                self._waiting += 1
+                while self._buffered_rows + rows > self.max_buffer_rows and self._buffered_rows:
+                    self._condition.notify_all()
+                    self._condition.wait()
+                self._waiting -= 1
+                self.blocked_seconds += time.perf_counter() - start
+            self._buffer.append(batch)
+            self._buffered_rows += rows
+            self.logged_rows += rows
+            self.max_buffered_rows = max(self.max_buffered_rows, self._buffered_rows)
+            if self._buffered_rows >= self.row_group_rows:
+                self._condition.notify_all()
+        return True
+
+    def _to_table(self, batches: List[_Batch]) -> pa.Table:
+        """Arrow table in the logging schema of the buffered responses"""
+        columns: Dict[str, List[Any]] = {name: [] for name in self._columns.values()}
+        log_timestamps: List[datetime] = []
+        request_ids: List[str] = []
+        for rows, log_timestamp, request_id, features in batches:
+            for name, column in self._columns.items():
+                columns[column].extend(features.get(name, [None] * rows))
+            log_timestamps.extend([log_timestamp] * rows)
+            request_ids.extend([request_id] * rows)
+
+        n_rows = len(log_timestamps)
+        arrays = []
+        for field in self.schema:
+            if field.name in columns:
+                arrays.append(pa.array(columns[field.name], type=field.type))
+            elif field.name.endswith("__status"):
+                values = columns[field.name[:-len("__status")]]
+                arrays.append(pa.array(
+                    [FieldStatus.NOT_FOUND if value is None else FieldStatus.PRESENT
+                     for value in values],
+                    type=field.type,
+                ))
+            elif field.name == LOG_TIMESTAMP_FIELD:
+                arrays.append(pa.array(log_timestamps, type=field.type))
+            elif field.name == LOG_DATE_FIELD:
+                arrays.append(pa.array([ts.date() for ts in log_timestamps], type=field.type))
+            elif field.name == REQUEST_ID_FIELD:
+                arrays.append(pa.array(request_ids, type=field.type))
+            else:
+                arrays.append(pa.nulls(n_rows, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _open_file(self):
+        name = f"feature_log-{time.time_ns()}-{os.getpid()}"
+        self._file_path = self.path / f"{name}.parquet"
+        self._writer = pq.ParquetWriter(self.path / f".{name}.inprogress", self.schema)
+        self._file_rows = 0
+        self._file_opened = time.monotonic()
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self.path / f".{self._file_path.stem}.inprogress", self._file_path)
+        self._writer = None
+        self.files += 1
+
+    def _flush(self, batches: List[_Batch]):
+        """Write the batches as one row group, rotating the file as needed"""
+        start = time.perf_counter()
+        if batches:
+            table = self._to_table(batches)
+            if self._writer is None:
+                self._open_file()
+            self._writer.write_table(table, row_group_size=table.num_rows)
+            self._file_rows += table.num_rows
+            self.written_rows += table.num_rows
+            self.flushes += 1
+        if self._writer is not None and (
+                self._file_rows >= self.max_file_rows
+                or time.monotonic() - self._file_opened >= self.max_file_seconds
+        ):
+            self._close_file()
+        self.write_seconds += time.perf_counter() - start
+
+    def _run(self):
+        """Background flush loop"""
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_seconds
+                while (not self._closing and not self._waiting
+                       and self._buffered_rows < self.row_group_rows):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batches: List[_Batch] = []
+                rows = 0
+                while self._buffer and rows < self.row_group_rows:
+                    batch = self._buffer.popleft()
+                    batches.append(batch)
+                    rows += batch[0]
+                self._buffered_rows -= rows
+                closing = self._closing and not self._buffer
+                self._condition.notify_all()
+            try:
+                self._flush(batches)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.errors += 1
+                logging.error("Feature log flush of %s rows failed: %s", rows, e)
+            if closing:
+                self._close_file()
+                return
+
+    def close(self):
+        """Flush the buffer, close the current file and stop the writer thread"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Logging and backpressure metrics"""
+        return {
+            "logged_rows": self.logged_rows,
+            "written_rows": self.written_rows,
+            "dropped_rows": self.dropped_rows,
+            "buffered_rows": self._buffered_rows,
+            "max_buffered_rows": self.max_buffered_rows,
+            "blocked_seconds": self.blocked_seconds,
+            "flushes": self.flushes,
+            "files": self.files,
+            "errors": self.errors,
+            "mean_flush_ms": 1000 * self.write_seconds / self.flushes if self.flushes else 0.0,
+        }
@@ -1,14 +1,23 @@
 """Feature definition
 """
 from datetime import timedelta
+from typing import (
+    Any,
+    Dict,
+)
 
 from feast import (
     Entity,
     FeatureService,
     FeatureView,
     Field,
+    FileSource,
     Project,
+    PushSource,
+    RequestSource,
 )
+from feast.data_format import ParquetFormat
+from feast.on_demand_feature_view import on_demand_feature_view
 from feast.infra.offline_stores.contrib.postgres_offline_store.postgres_source import (
     PostgreSQLSource,
 )
@@ -17,11 +26,20 @@ from feast.feature_logging import LoggingConfig
 from feast.infra.offline_stores.file_source import FileLoggingDestination
 from feast.types import (
     Float32,
-    #Int64
+    Int64,
+    String,
 )
 from utility import (
     get_yaml_value
 )
+from offline_export import PARQUET_GLOB
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    packed_source_query,
+    unpack_categories,
+)
+from request_encoding import encode_applicants
 
 #--------------------------------------------------------------------------------
 # A FEAST Project is a namespace in which related FEAST objects are managed
@@ -35,14 +53,38 @@ project = Project(
 #--------------------------------------------------------------------------------
 # Physical Data Source where actual Features for ML consumption are stored.
 # FEAST Offline Store is backed by Physical Data Source”
+#
+# The offline store type of feature_store.yaml selects the source:
+# - postgres (feature_store.yaml.template): the offline table in PostgreSQL.
+# - duckdb (feature_store.duckdb.yaml.template): the Parquet export of the same
+#   table by offline_export.py, joined in-process by DuckDB.
 #--------------------------------------------------------------------------------
-# https://docs.feast.dev/reference/data-sources/postgres
-credit_risk_feature_source = PostgreSQLSource(
-    name="customer_credit_risk_feature_source",
-    # The table name must match with the offline table insert SQL.
-    query="SELECT * FROM credit.customer_credit_risk_offline_features",
-    timestamp_field="event_timestamp",
-    created_timestamp_column="created",
+offline_store_type = get_yaml_value("feature_store.yaml", "offline_store", {}).get("type")
+
+if offline_store_type == "duckdb":
+    # https://docs.feast.dev/reference/data-sources/file
+    credit_risk_feature_source = FileSource(
+        name="customer_credit_risk_feature_source",
+        path=PARQUET_GLOB,
+        file_format=ParquetFormat(),
+        timestamp_field="event_timestamp",
+        created_timestamp_column="created",
+    )
+else:
+    # https://docs.feast.dev/reference/data-sources/postgres
+    credit_risk_feature_source = PostgreSQLSource(
+        name="customer_credit_risk_feature_source",
+        # The table name must match with the offline table insert SQL.
+        query="SELECT * FROM credit.customer_credit_risk_offline_features",
+        timestamp_field="event_timestamp",
+        created_timestamp_column="created",
+    )
+
+# Rows of new applications pushed by push_ingestion.py, written to the online store
+# as they arrive. The batch source is what is materialised and retrieved offline.
+credit_risk_push_source = PushSource(
+    name="customer_credit_risk_push_source",
+    batch_source=credit_risk_feature_source,
 )
 
 #--------------------------------------------------------------------------------
@@ -57,13 +99,15 @@ customer = Entity(name="customer", join_keys=["entity_id"])
 #--------------------------------------------------------------------------------
 credit_risk_feature_view = FeatureView(
     name="customer_credit_risk_feature_view",
-    source=credit_risk_feature_source,    # Link to the raw data storage technology
+    source=credit_risk_push_source,       # Push source over the raw data storage technology
     entities=[customer],
     ttl=timedelta(hours=1),
     # The list of features defined below act as a schema to both define features
     # for both materialization of features into a store, and are used as references
     # during retrieval for building a training dataset or serving features
     schema=[
+        # Entity column, declared so that it is not inferred from the source.
+        Field(name="entity_id", dtype=Int64),
         Field(name="risk", dtype=Float32),
         Field(name="purpose_business", dtype=Float32),
         Field(name="purpose_car", dtype=Float32),
@@ -122,3 +166,115 @@ customer_credit_risk_feature_service = FeatureService(
         destination=FileLoggingDestination(path="data")
     ),
 )
+
+#------------------------------------------------------------------------------------------
+# Packed online layout of the same features (packed_encoding.py).
+# The one-hot groups are bit-packed into one Int64 online value instead of 35 Float32
+# values. Clients either read packed_categories and expand it with unpack_one_hot, or
+# use the packed feature service whose on demand feature view expands it on read.
+#------------------------------------------------------------------------------------------
+if offline_store_type == "duckdb":
+    # offline_export.py adds packed_categories to the exported files.
+    credit_risk_packed_feature_source = FileSource(
+        name="customer_credit_risk_packed_feature_source",
+        path=PARQUET_GLOB,
+        file_format=ParquetFormat(),
+        timestamp_field="event_timestamp",
+        created_timestamp_column="created",
+    )
+else:
+    credit_risk_packed_feature_source = PostgreSQLSource(
+        name="customer_credit_risk_packed_feature_source",
+        query=packed_source_query("credit.customer_credit_risk_offline_features"),
+        timestamp_field="event_timestamp",
+        created_timestamp_column="created",
+    )
+
+# Packed rows of the new applications pushed by push_ingestion.py, so that the
+# packed feature service serves them as soon as the one-hot one.
+credit_risk_packed_push_source = PushSource(
+    name="customer_credit_risk_packed_push_source",
+    batch_source=credit_risk_packed_feature_source,
+)
+
+credit_risk_packed_feature_view = FeatureView(
+    name="customer_credit_risk_packed_feature_view",
+    source=credit_risk_packed_push_source,
+    entities=[customer],
+    ttl=timedelta(hours=1),
+    schema=[
+        Field(name="entity_id", dtype=Int64),
+        Field(name="risk", dtype=Float32),
+        Field(name=PACKED_FEATURE, dtype=Int64),
+    ],
+    online=True,
+)
+
+
+@on_demand_feature_view(
+    sources=[credit_risk_packed_feature_view],
+    schema=[Field(name=name, dtype=Float32) for name in ONE_HOT_FEATURES],
+    mode="python",
+)
+def customer_credit_risk_unpacked_feature_view(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand packed_categories to the one-hot features"""
+    return unpack_categories(inputs)
+
+
+customer_credit_risk_packed_feature_service = FeatureService(
+    name="customer_credit_risk_packed_feature_service",
+    description="Features for Customer Credit Risk Model from the packed online layout",
+    tags={
+        "version": "0.1"
+    },
+    # Only the one-hot features. Online, FEAST reads packed_categories for the on
+    # demand feature view without serving it. get_historical_features does not read
+    # the sources of an on demand feature view, hence train on
+    # customer_credit_risk_feature_service, or request
+    # customer_credit_risk_packed_feature_view:packed_categories with the features.
+    features=[
+        customer_credit_risk_unpacked_feature_view,
+    ],
+)
+
+#------------------------------------------------------------------------------------------
+# Features of new applicants, who have no materialised row, from their raw attributes
+# in the request (request_encoding.py). The lookup table encoding gives the one-hot
+# features of the notebook eda + feature_engineering pipelines. A missing saving_accounts
+# or checking_account is sent as "no_inf", and an unknown category fails the request.
+#------------------------------------------------------------------------------------------
+applicant_request_source = RequestSource(
+    name="customer_credit_risk_applicant",
+    schema=[
+        Field(name="age", dtype=Int64),
+        Field(name="sex", dtype=String),
+        Field(name="job", dtype=Int64),
+        Field(name="housing", dtype=String),
+        Field(name="saving_accounts", dtype=String),
+        Field(name="checking_account", dtype=String),
+        Field(name="credit_amount", dtype=Int64),
+        Field(name="purpose", dtype=String),
+    ],
+)
+
+
+@on_demand_feature_view(
+    sources=[applicant_request_source],
+    schema=[Field(name=name, dtype=Float32) for name in ONE_HOT_FEATURES],
+    mode="python",
+)
+def customer_credit_risk_applicant_feature_view(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode the raw applicant attributes to the one-hot features"""
+    return encode_applicants(inputs)
+
+
+customer_credit_risk_applicant_feature_service = FeatureService(
+    name="customer_credit_risk_applicant_feature_service",
+    description="Features for Customer Credit Risk Model from the applicant attributes of the request",
+    tags={
+        "version": "0.1"
+    },
+    features=[
+        customer_credit_risk_applicant_feature_view,
+    ],
+)
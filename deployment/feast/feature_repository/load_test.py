@@ -0,0 +1,439 @@
+"""Load test module.
+
+Asyncio HTTP load generator for the local services of the feature repository.
+It uses a minimal keep-alive HTTP/1.1 client on asyncio streams, so it needs no
+HTTP client package, and records per-request latency to report percentiles and
+throughput.
+
+Scoring service (scoring_service.py):
+    python load_test.py score --url http://127.0.0.1:6570/score --entities 1000
+
+FEAST feature server (`feast serve`, SQLite online store), sweeping the number of
+features, entities per request and concurrency, with a JSON report per run:
+    python load_test.py feast --entities 1000 --distribution zipf --output data/load_test.json
+    python load_test.py compare data/load_test_baseline.json data/load_test.json
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import platform
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+class HttpConnection:
+    """Keep-alive HTTP/1.1 connection for POSTing JSON.
+
+    Args:
+        url: target URL, http only.
+        timeout: seconds to wait for a response.
+    """
+    def __init__(self, url: str, timeout: float = 30.0):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError(f"only http URLs are supported, got [{url}].")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        """Close the connection"""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+    async def _request(self, body: bytes) -> Tuple[int, bytes]:
+        if self._writer is not None and (self._reader.at_eof() or self._writer.is_closing()):
+            # The server closed the idle keep-alive connection.
+            await self.close()
+        if self._writer is None:
+            await self._connect()
+        self._writer.write(
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n".encode("ascii") + body
+        )
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).strip(), 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            response_body = b"".join(chunks)
+        else:
+            response_body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, response_body
+
+    async def post_json(self, payload: Any) -> Tuple[int, bytes]:
+        """POST payload as JSON and return (status, body).
+
+        A keep-alive connection closed by the server is replaced before sending.
+        A request is never resent, since a POST that failed after sending may
+        have been processed and a retry would be counted twice.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        return await asyncio.wait_for(self._request(body), self.timeout)
+
+
+async def run_load(
+        url: str,
+        make_payload: Callable[[int], Any],
+        n_requests: int,
+        concurrency: int,
+        timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Send n_requests POSTs from `concurrency` connections in a closed loop.
+
+    Args:
+        url: target URL
+        make_payload: returns the JSON payload of the i-th request
+        n_requests: number of requests
+        concurrency: number of concurrent connections
+        timeout: seconds to wait for a response
+
+    Returns: summary from summarize()
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(n_requests))
+
+    async def worker():
+        connection = HttpConnection(url, timeout=timeout)
+        try:
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.post_json(make_payload(i))
+                    if status != 200:
+                        errors[f"http_{status}"] = errors.get(f"http_{status}", 0) + 1
+                        continue
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    await connection.close()
+                    continue
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def summarize(latencies: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles in milliseconds, throughput and error rate"""
+    n_errors = sum(errors.values())
+    n_total = len(latencies) + n_errors
+    latencies_ms = np.asarray(latencies) * 1000
+    percentiles = (
+        np.percentile(latencies_ms, [50, 95, 99]) if latencies else [float("nan")] * 3
+    )
+    return {
+        "requests": n_total,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "error_rate": n_errors / n_total if n_total else 0.0,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()) if latencies else float("nan"),
+            "p50": float(percentiles[0]),
+            "p95": float(percentiles[1]),
+            "p99": float(percentiles[2]),
+            "max": float(latencies_ms.max()) if latencies else float("nan"),
+        },
+    }
+
+
+ENTITY_DISTRIBUTIONS = ("uniform", "zipf", "sequential")
+
+
+def make_entity_sampler(
+        distribution: str,
+        n_entities: int,
+        seed: int = 0,
+        zipf_a: float = 1.2,
+) -> Callable[[int], List[int]]:
+    """Return a function drawing `size` entity ids from 1..n_entities.
+
+    Args:
+        distribution: 'uniform', 'zipf' (few hot applicants requested repeatedly,
+            as in retries and re-scoring) or 'sequential' (batch backfill order).
+        n_entities: number of entities
+        seed: random seed
+        zipf_a: Zipf exponent, larger is more skewed
+
+    Returns: sampler(size) -> list of entity ids
+    """
+    if distribution not in ENTITY_DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {ENTITY_DISTRIBUTIONS}, got [{distribution}].")
+    rng = np.random.default_rng(seed)
+
+    if distribution == "uniform":
+        return lambda size: rng.integers(1, n_entities + 1, size=size).tolist()
+
+    if distribution == "zipf":
+        # Hot ranks are mapped to random entity ids so that hot keys are not adjacent.
+        entity_by_rank = rng.permutation(n_entities) + 1
+
+        def _zipf(size):
+            ranks = np.minimum(rng.zipf(zipf_a, size=size), n_entities) - 1
+            return entity_by_rank[ranks].tolist()
+        return _zipf
+
+    position = itertools.count()
+
+    def _sequential(size):
+        start = next(position) * size
+        return ((np.arange(start, start + size) % n_entities) + 1).tolist()
+    return _sequential
+
+
+def _feature_server_payload(
+        features: List[str], batch_size: int, sampler: Callable[[int], List[int]], _: int
+) -> Dict[str, Any]:
+    """get-online-features request of batch_size sampled entities"""
+    return {"features": features, "entities": {"entity_id": sampler(batch_size)}}
+
+
+def run_feature_server_sweep(
+        url: str,
+        feature_refs: Sequence[str],
+        n_entities: int,
+        feature_counts: Iterable[int] = (1, 8, 35),
+        batch_sizes: Iterable[int] = (1, 10, 100),
+        concurrencies: Iterable[int] = (1, 8, 32),
+        distribution: str = "zipf",
+        n_requests: int = 500,
+        seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Load test /get-online-features of the FEAST feature server for every
+    (feature count, entities per request, concurrency) combination.
+
+    Args:
+        url: get-online-features URL e.g. http://127.0.0.1:6566/get-online-features
+        feature_refs: feature references "<feature view>:<feature>"
+        n_entities: entity ids are drawn from 1..n_entities
+        feature_counts: numbers of features requested, first N of feature_refs
+        batch_sizes: numbers of entities per request
+        concurrencies: numbers of concurrent connections
+        distribution: entity id distribution, see make_entity_sampler
+        n_requests: requests per combination
+        seed: random seed
+
+    Returns: list of summaries with the combination parameters
+    """
+    results = []
+    for n_features, batch_size, concurrency in itertools.product(
+            feature_counts, batch_sizes, concurrencies
+    ):
+        features = list(feature_refs[:n_features])
+        sampler = make_entity_sampler(distribution, n_entities, seed=seed)
+
+        make_payload = functools.partial(_feature_server_payload, features, batch_size, sampler)
+        summary = asyncio.run(run_load(url, make_payload, n_requests, concurrency))
+        summary.update({
+            "n_features": len(features),
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "distribution": distribution,
+            "entities_per_second": summary["throughput_rps"] * batch_size,
+        })
+        results.append(summary)
+        logging.info(
+            "features=%-3s batch=%-4s concurrency=%-3s p50=%8.2fms p99=%8.2fms rps=%8.1f errors=%.2f%%",
+            len(features), batch_size, concurrency, summary["latency_ms"]["p50"],
+            summary["latency_ms"]["p99"], summary["throughput_rps"], 100 * summary["error_rate"],
+        )
+    return results
+
+
+def write_report(path: str, results: List[Dict[str, Any]], parameters: Dict[str, Any]):
+    """Write the results with run metadata as a JSON report"""
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=4)
+
+
+def compare_reports(baseline_path: str, current_path: str) -> List[Dict[str, Any]]:
+    """Compare two reports combination by combination.
+
+    Returns: list of dicts with the p50/p99 latency and throughput ratio current/baseline
+    """
+    def _load(path):
+        with open(path, "r", encoding="utf-8") as file:
+            return {
+                (r["n_features"], r["batch_size"], r["concurrency"], r["distribution"]): r
+                for r in json.load(file)["results"]
+            }
+
+    def _ratio(after, before):
+        return after / before if before else float("nan")
+
+    baseline, current = _load(baseline_path), _load(current_path)
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        rows.append({
+            "n_features": key[0],
+            "batch_size": key[1],
+            "concurrency": key[2],
+            "distribution": key[3],
+            "p50_ratio": _ratio(after["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            "p99_ratio": _ratio(after["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            "throughput_ratio": _ratio(after["throughput_rps"], before["throughput_rps"]),
+            "error_rate": after["error_rate"],
+        })
+    return rows
+
+
+def _get_feature_refs(repo_path: str, feature_view_name: str) -> List[str]:
+    """Feature references of the feature view from the registry"""
+    from feast import FeatureStore  # pylint: disable=import-outside-toplevel
+    feature_view = FeatureStore(repo_path=repo_path).get_feature_view(feature_view_name)
+    return [f"{feature_view_name}:{feature.name}" for feature in feature_view.features]
+
+
+def _feast_command(args):
+    feature_refs = _get_feature_refs(args.repo_path, args.feature_view)
+    parameters = {
+        "url": args.url,
+        "entities": args.entities,
+        "feature_counts": args.feature_counts,
+        "batch_sizes": args.batch_sizes,
+        "concurrencies": args.concurrencies,
+        "distribution": args.distribution,
+        "requests": args.requests,
+        "seed": args.seed,
+    }
+    results = run_feature_server_sweep(
+        url=args.url,
+        feature_refs=feature_refs,
+        n_entities=args.entities,
+        feature_counts=args.feature_counts,
+        batch_sizes=args.batch_sizes,
+        concurrencies=args.concurrencies,
+        distribution=args.distribution,
+        n_requests=args.requests,
+        seed=args.seed,
+    )
+    write_report(args.output, results, parameters)
+    print(f"Report written to {args.output}")
+
+
+def _compare_command(args):
+    print(f"{'features':>8} {'batch':>6} {'conc':>5} {'dist':>10} "
+          f"{'p50 x':>7} {'p99 x':>7} {'rps x':>7} {'errors':>7}")
+    for row in compare_reports(args.baseline, args.current):
+        print(f"{row['n_features']:>8} {row['batch_size']:>6} {row['concurrency']:>5} "
+              f"{row['distribution']:>10} {row['p50_ratio']:>7.2f} {row['p99_ratio']:>7.2f} "
+              f"{row['throughput_ratio']:>7.2f} {row['error_rate']:>7.2%}")
+
+
+def _score_command(args):
+    rng = np.random.default_rng(args.seed)
+
+    def make_payload(_):
+        ids = rng.integers(1, args.entities + 1, size=args.batch_size)
+        return {"entity_ids": ids.tolist()}
+
+    summary = asyncio.run(run_load(args.url, make_payload, args.requests, args.concurrency))
+    print(json.dumps(summary, indent=4))
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load test for the local services")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="load test scoring_service.py")
+    score.add_argument("--url", default="http://127.0.0.1:6570/score")
+    score.add_argument("--entities", type=int, default=1000, help="entity ids are 1..entities")
+    score.add_argument("--batch-size", type=int, default=1, help="entity ids per request")
+    score.add_argument("--requests", type=int, default=2000)
+    score.add_argument("--concurrency", type=int, default=32)
+    score.add_argument("--seed", type=int, default=0)
+    score.set_defaults(func=_score_command)
+
+    feast = commands.add_parser("feast", help="load test `feast serve`")
+    feast.add_argument("--url", default="http://127.0.0.1:6566/get-online-features")
+    feast.add_argument("--repo-path", default=".", help="feature repository to read feature names from")
+    feast.add_argument("--feature-view", default="customer_credit_risk_feature_view")
+    feast.add_argument("--entities", type=int, default=1000, help="entity ids are 1..entities")
+    feast.add_argument("--distribution", choices=ENTITY_DISTRIBUTIONS, default="zipf")
+    feast.add_argument("--feature-counts", type=int, nargs="+", default=[1, 8, 35])
+    feast.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    feast.add_argument("--concurrencies", type=int, nargs="+", default=[1, 8, 32])
+    feast.add_argument("--requests", type=int, default=500, help="requests per combination")
+    feast.add_argument("--seed", type=int, default=0)
+    feast.add_argument("--output", default="load_test_report.json")
+    feast.set_defaults(func=_feast_command)
+
+    compare = commands.add_parser("compare", help="compare two `feast` reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.set_defaults(func=_compare_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
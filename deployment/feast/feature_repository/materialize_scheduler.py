@@ -0,0 +1,414 @@
+"""Materialisation scheduler module.
+
+Splits a materialisation time range into windows and materialises them with a
+bounded pool of worker processes, so that a failure only redoes its window
+instead of a whole `feast materialize` over the range.
+
+- Each worker pulls the latest row per entity of its window [start, end) from
+  the offline store and writes them with FeatureStore.write_to_online_store, the
+  same rows as `feast materialize` of the window. The pull includes its end date,
+  hence it ends a microsecond before the window, and rows on the end of a window
+  are left to the next window.
+- Windows finish in any order and failed windows are redone later, while the
+  online stores overwrite a row regardless of its event timestamp. Rows older
+  than the online row of their entity are therefore skipped, so that an earlier
+  window never overwrites a later one.
+- Materialisation is CPU bound Python (offline rows to protos, entity key
+  serialisation), hence the workers are processes, each with its own FeatureStore.
+- The online timestamp check and the write of a window are made under a lock
+  shared by the workers, so that no other window writes in between. The pulls of
+  the workers still overlap.
+- Completed windows are recorded in a JSON state file. The high-water mark is
+  the end of the contiguous run of completed windows from the start; a rerun
+  starts from the high-water mark and skips windows already completed after it,
+  so an outage only redoes the failed windows.
+- A failed window is retried on its own with exponential backoff.
+- Only the contiguous completed range is recorded in the registry, so that
+  `feast materialize-incremental` never skips a failed window.
+
+The scheduler is for restartability, not speed: every window is a separate
+offline query, and an entity updated in several windows is written once per
+window. A backfill is only faster than one `feast materialize` with enough CPUs
+for the workers; on one CPU it is slower (benchmark/bench_materialize_scheduler.py).
+
+Run from the feature repository:
+    python materialize_scheduler.py --start-date 2025-01-01 --window-hours 24 --workers 4
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed,
+)
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import pandas as pd
+
+from feast import (
+    FeatureStore,
+    FeatureView,
+)
+from feast.infra.offline_stores.offline_utils import get_offline_store_from_config
+
+DEFAULT_FEATURE_VIEW_NAME = "customer_credit_risk_feature_view"
+DEFAULT_STATE_PATH = "data/materialization_state.json"
+
+Window = Tuple[datetime, datetime]
+
+
+class _Worker:
+    """Per worker process state, set by _init_worker"""
+    store: Optional[FeatureStore] = None
+    feature_view_name: Optional[str] = None
+    write_lock: Any = None
+
+
+def _tz_aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def split_windows(start_date: datetime, end_date: datetime, window: timedelta) -> List[Window]:
+    """Split [start_date, end_date) into consecutive windows of at most `window`"""
+    if window <= timedelta(0):
+        raise ValueError(f"window must be positive, got [{window}].")
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + window, end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def advance_high_water_mark(
+        high_water_mark: datetime,
+        windows: Iterable[Window],
+        completed: Set[Window]
+) -> datetime:
+    """Move the high-water mark over the contiguous completed windows that start at it"""
+    for window_start, window_end in windows:
+        if window_start != high_water_mark or (window_start, window_end) not in completed:
+            break
+        high_water_mark = window_end
+    return high_water_mark
+
+
+def _init_worker(repo_path: str, feature_view_name: str, write_lock: Any):
+    """Create the worker's FeatureStore, the online writes are serialised by write_lock"""
+    _Worker.store = FeatureStore(repo_path=repo_path)
+    _Worker.feature_view_name = feature_view_name
+    _Worker.write_lock = write_lock
+
+
+def _online_event_timestamps(
+        store: FeatureStore,
+        feature_view: FeatureView,
+        entity_rows: List[Dict[str, Any]]
+) -> pd.DatetimeIndex:
+    """Event timestamp of the online row per entity row, the epoch for entities not in the online store"""
+    response = store.get_online_features(
+        features=[f"{feature_view.name}:{feature_view.features[0].name}"],
+        entity_rows=entity_rows,
+    )
+    position = list(response.proto.metadata.feature_names.val).index(feature_view.features[0].name)
+    return pd.to_datetime([
+        timestamp.ToNanoseconds() for timestamp in response.proto.results[position].event_timestamps
+    ], utc=True)
+
+
+def _write_newer(store: FeatureStore, feature_view: FeatureView, df: pd.DataFrame, join_keys: Dict[str, str]) -> int:
+    """Write the rows of df that are not older than the online rows of their entities"""
+    entity_rows = df[list(join_keys.values())].rename(
+        columns={column: join_key for join_key, column in join_keys.items()}
+    ).to_dict("records")
+    online = _online_event_timestamps(store, feature_view, entity_rows)
+    event_timestamps = pd.to_datetime(df[feature_view.batch_source.timestamp_field], utc=True)
+    df = df[event_timestamps.to_numpy(dtype="datetime64[ns]") >= online.to_numpy(dtype="datetime64[ns]")]
+    if not df.empty:
+        store.write_to_online_store(feature_view.name, df)
+    return len(df)
+
+
+def _materialize_window(window_start: datetime, window_end: datetime) -> int:
+    """Materialise one window in the worker process and return the number of rows written.
+
+    Rows older than the online row of their entity, i.e. already overwritten by a
+    later window, are not written and not counted.
+    """
+    store = _Worker.store
+    feature_view = store.get_feature_view(_Worker.feature_view_name)
+    source = feature_view.batch_source
+    # Source column names, write_to_online_store applies the field mapping.
+    columns = {feature: column for column, feature in (source.field_mapping or {}).items()}
+    join_keys = {entity.name: columns.get(entity.name, entity.name) for entity in feature_view.entity_columns}
+    # FeatureStore.materialize() records every window in the registry, which would
+    # move materialize_incremental past a failed window, hence the rows are pulled
+    # and written here and the scheduler records the contiguous range only.
+    df = get_offline_store_from_config(store.config.offline_store).pull_latest_from_table_or_query(
+        config=store.config,
+        data_source=source,
+        join_key_columns=list(join_keys.values()),
+        feature_name_columns=[columns.get(field.name, field.name) for field in feature_view.features],
+        timestamp_field=source.timestamp_field,
+        created_timestamp_column=source.created_timestamp_column or None,
+        start_date=window_start,
+        # The pull includes end_date, the offline timestamps are microseconds.
+        end_date=window_end - timedelta(microseconds=1),
+    ).to_df()
+    if df.empty:
+        return 0
+    if _Worker.write_lock is None:
+        return _write_newer(store, feature_view, df, join_keys)
+    with _Worker.write_lock:
+        return _write_newer(store, feature_view, df, join_keys)
+
+
+def _run_window(
+        window_start: datetime,
+        window_end: datetime,
+        max_retries: int,
+        retry_backoff_seconds: float
+) -> Dict[str, Any]:
+    """Materialise one window with retries and return its report"""
+    report = {
+        "start": window_start.isoformat(),
+        "end": window_end.isoformat(),
+        "rows": 0,
+        "seconds": 0.0,
+        "rows_per_second": 0.0,
+        "attempts": 0,
+        "status": "failed",
+        "error": None,
+    }
+    for attempt in range(1, max_retries + 2):
+        report["attempts"] = attempt
+        start = time.perf_counter()
+        try:
+            report["rows"] = _materialize_window(window_start, window_end)
+            report["seconds"] = time.perf_counter() - start
+            report["rows_per_second"] = (
+                report["rows"] / report["seconds"] if report["seconds"] > 0 else 0.0
+            )
+            report["status"] = "completed"
+            report["error"] = None
+            return report
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            report["error"] = f"{type(e).__name__}: {e}"
+            logging.error("Window [%s, %s) attempt [%s] failed: %s",
+                          window_start, window_end, attempt, e)
+            if attempt <= max_retries:
+                time.sleep(retry_backoff_seconds * 2 ** (attempt - 1))
+    return report
+
+
+class MaterializationScheduler:
+    """Windowed, parallel, restartable materialisation of one feature view.
+
+    Args:
+        repo_path: FEAST feature repository path.
+        feature_view_name: Feature view to materialise.
+        window: Window length.
+        max_workers: Maximum number of windows materialised concurrently.
+        max_retries: Retries per failed window.
+        retry_backoff_seconds: Backoff before the first retry, doubled per retry.
+        state_path: JSON file recording the high-water mark and completed windows.
+    """
+    def __init__(
+            self,
+            repo_path: str = ".",
+            feature_view_name: str = DEFAULT_FEATURE_VIEW_NAME,
+            window: timedelta = timedelta(days=1),
+            max_workers: int = 4,
+            max_retries: int = 3,
+            retry_backoff_seconds: float = 1.0,
+            state_path: str = DEFAULT_STATE_PATH,
+    ):
+        self.repo_path = repo_path
+        self.feature_view_name = feature_view_name
+        self.window = window
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.state_path = Path(state_path)
+        self._store: Optional[FeatureStore] = None
+
+    @property
+    def store(self) -> FeatureStore:
+        """FeatureStore of the scheduling process"""
+        if self._store is None:
+            self._store = FeatureStore(repo_path=self.repo_path)
+        return self._store
+
+    def load_state(self) -> Tuple[Optional[datetime], Set[Window]]:
+        """High-water mark and completed windows above it from the state file"""
+        if not self.state_path.exists():
+            return None, set()
+        with open(self.state_path, "r", encoding="utf-8") as file:
+            state = json.load(file).get(self.feature_view_name, {})
+        high_water_mark = state.get("high_water_mark")
+        return (
+            datetime.fromisoformat(high_water_mark) if high_water_mark else None,
+            {
+                (datetime.fromisoformat(start), datetime.fromisoformat(end))
+                for start, end in state.get("completed", [])
+            },
+        )
+
+    def save_state(self, high_water_mark: Optional[datetime], completed: Set[Window]):
+        """Write the state atomically, keeping the other feature views"""
+        states = {}
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                states = json.load(file)
+        states[self.feature_view_name] = {
+            "high_water_mark": high_water_mark.isoformat() if high_water_mark else None,
+            "completed": sorted(
+                [start.isoformat(), end.isoformat()] for start, end in completed
+                if high_water_mark is None or end > high_water_mark
+            ),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(states, file, indent=4)
+        tmp_path.replace(self.state_path)
+
+    def high_water_mark(self) -> Optional[datetime]:
+        """End of the contiguous materialised range, from the state file or the registry"""
+        high_water_mark, _ = self.load_state()
+        if high_water_mark is None:
+            high_water_mark = self.store.get_feature_view(self.feature_view_name).most_recent_end_time
+        return high_water_mark
+
+    def run(self, end_date: datetime, start_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Materialise [start, end_date) in windows.
+
+        Args:
+            end_date: end of the range
+            start_date: Start of the range. Defaults to the high-water mark, i.e.
+                materialize_incremental semantics. Required on the first run.
+
+        Returns: run report with the rows, seconds and rows/s of the run and of each window.
+        """
+        end_date = _tz_aware(end_date)
+        start_date = start_date or self.high_water_mark()
+        if start_date is None:
+            raise ValueError("start_date is required when nothing has been materialised yet.")
+        start_date = _tz_aware(start_date)
+
+        state_high_water_mark, completed = self.load_state()
+        windows = split_windows(start_date, end_date, self.window)
+        pending = [window for window in windows if window not in completed]
+        logging.info("Materializing [%s] of [%s] windows of [%s] with [%s] workers",
+                     len(pending), len(windows), self.window, self.max_workers)
+
+        start = time.perf_counter()
+        reports = []
+        if pending:
+            context = multiprocessing.get_context("spawn")
+            with context.Manager() as manager, ProcessPoolExecutor(
+                    max_workers=min(self.max_workers, len(pending)),
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.repo_path, self.feature_view_name, manager.Lock()),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _run_window, window_start, window_end,
+                        self.max_retries, self.retry_backoff_seconds
+                    )
+                    for window_start, window_end in pending
+                ]
+                for future in as_completed(futures):
+                    report = future.result()
+                    reports.append(report)
+                    if report["status"] == "completed":
+                        completed.add((
+                            datetime.fromisoformat(report["start"]),
+                            datetime.fromisoformat(report["end"]),
+                        ))
+                        self.save_state(state_high_water_mark, completed)
+                    logging.info("Window [%s, %s) %s: [%s] rows in [%.2f] sec ([%.0f] rows/s)",
+                                 report["start"], report["end"], report["status"],
+                                 report["rows"], report["seconds"], report["rows_per_second"])
+        elapsed = time.perf_counter() - start
+
+        high_water_mark = advance_high_water_mark(start_date, windows, completed)
+        self.save_state(high_water_mark, completed)
+        if high_water_mark > start_date:
+            self.store.registry.apply_materialization(
+                self.store.get_feature_view(self.feature_view_name),
+                self.store.project,
+                start_date,
+                high_water_mark,
+            )
+
+        reports.sort(key=lambda report: report["start"])
+        total_rows = sum(report["rows"] for report in reports)
+        return {
+            "feature_view": self.feature_view_name,
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "high_water_mark": high_water_mark.isoformat(),
+            "windows": len(windows),
+            "skipped": len(windows) - len(pending),
+            "failed": sum(report["status"] != "completed" for report in reports),
+            "rows": total_rows,
+            "seconds": elapsed,
+            "rows_per_second": total_rows / elapsed if elapsed > 0 else 0.0,
+            "window_reports": reports,
+        }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Windowed parallel materialisation")
+    parser.add_argument("--repo-path", default=".")
+    parser.add_argument("--feature-view", default=DEFAULT_FEATURE_VIEW_NAME)
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=None,
+                        help="ISO start, defaults to the high-water mark")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None,
+                        help="ISO end, defaults to now")
+    parser.add_argument("--window-hours", type=float, default=24)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--state-path", default=DEFAULT_STATE_PATH)
+    args = parser.parse_args()
+
+    scheduler = MaterializationScheduler(
+        repo_path=args.repo_path,
+        feature_view_name=args.feature_view,
+        window=timedelta(hours=args.window_hours),
+        max_workers=args.workers,
+        max_retries=args.max_retries,
+        state_path=args.state_path,
+    )
+    report = scheduler.run(
+        end_date=args.end_date or datetime.now(timezone.utc),
+        start_date=args.start_date,
+    )
+    print(json.dumps({k: v for k, v in report.items() if k != "window_reports"}, indent=4))
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,173 @@
+"""Offline table export module.
+
+Exports the PostgreSQL offline table credit.customer_credit_risk_offline_features
+to Parquet for the DuckDB offline store configuration
+(feature_store.duckdb.yaml.template), where features.py registers a FileSource
+over the exported files instead of the PostgreSQLSource.
+
+- The table is read ordered by event_timestamp in chunks, never as a whole.
+- One Parquet file per month of event_timestamp, <output_dir>/part-YYYY-MM.parquet.
+  The rows of each file are sorted by event_timestamp, so the row group
+  statistics let DuckDB skip the row groups outside the time range of a
+  point-in-time join.
+- packed_categories (packed_encoding.py) is added unless present, so the packed
+  feature view reads the same files.
+- The export is written to a temporary directory and swapped in when complete.
+- write_parquet_part() adds rows written to the table since, e.g. by
+  push_ingestion.py, as one more file of the export.
+
+Run from the feature repository, with the variables of deploy.sh set:
+    python offline_export.py
+"""
+import argparse
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+)
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import (
+    create_engine,
+    text,
+)
+
+from packed_encoding import (
+    PACKED_FEATURE,
+    pack_one_hot,
+)
+
+OFFLINE_TABLE = "credit.customer_credit_risk_offline_features"
+DEFAULT_OUTPUT_DIR = "data/offline/customer_credit_risk_offline_features"
+# FileSource path of the exported files, read by DuckDB.
+PARQUET_GLOB = f"{DEFAULT_OUTPUT_DIR}/*.parquet"
+
+
+def write_monthly_parquet(chunks: Iterable[pd.DataFrame], output_dir: str) -> Dict[str, int]:
+    """Write chunks ordered by event_timestamp to one Parquet file per month.
+
+    Args:
+        chunks: DataFrames of the offline table, ordered by event_timestamp.
+        output_dir: directory to replace with the exported files.
+
+    Returns: rows per month
+    """
+    output_dir = Path(output_dir)
+    tmp_dir = output_dir.with_name(f".{output_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    writers: Dict[str, pq.ParquetWriter] = {}
+    rows: Dict[str, int] = {}
+    schema = None
+    try:
+        for chunk in chunks:
+            if PACKED_FEATURE not in chunk:
+                chunk = chunk.assign(**{PACKED_FEATURE: pack_one_hot(chunk)})
+            timestamps = pd.to_datetime(chunk["event_timestamp"], utc=True)
+            months = timestamps.dt.strftime("%Y-%m")
+            for month, part in chunk.groupby(months.to_numpy(), sort=False):
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                if schema is None:
+                    schema = table.schema
+                if month not in writers:
+                    # DuckDB timestamps are microseconds.
+                    writers[month] = pq.ParquetWriter(
+                        tmp_dir / f"part-{month}.parquet", schema,
+                        coerce_timestamps="us", allow_truncated_timestamps=True,
+                    )
+                writers[month].write_table(table.cast(schema))
+                rows[month] = rows.get(month, 0) + len(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    old_dir = output_dir.with_name(f".{output_dir.name}.old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if output_dir.exists():
+        os.rename(output_dir, old_dir)
+    os.rename(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return rows
+
+
+def write_parquet_part(df: pd.DataFrame, output_dir: str, file_name: str) -> Path:
+    """Add rows of the offline table to the export as one more file.
+
+    The columns are cast to the schema of the exported files, and the file is
+    written to a temporary name and renamed, so DuckDB never reads a partial
+    file. The next export_offline_table() replaces it with the table content.
+
+    Returns: path of the file
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if PACKED_FEATURE not in df:
+        df = df.assign(**{PACKED_FEATURE: pack_one_hot(df)})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    exported = sorted(output_dir.glob("part-*.parquet"))
+    if exported:
+        schema = pq.read_schema(exported[0])
+        table = table.select(schema.names).cast(schema)
+    path = output_dir / file_name
+    tmp_path = output_dir / f".{file_name}.tmp"
+    pq.write_table(table, tmp_path, coerce_timestamps="us", allow_truncated_timestamps=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_offline_table(
+        url: str,
+        table: str = OFFLINE_TABLE,
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+        chunksize: int = 100_000,
+) -> Dict[str, int]:
+    """Export the offline table at the SQLAlchemy url to monthly Parquet files"""
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            chunks = pd.read_sql(
+                text(f"SELECT * FROM {table} ORDER BY event_timestamp"),
+                conn.execution_options(stream_results=True),
+                chunksize=chunksize,
+            )
+            return write_monthly_parquet(chunks, output_dir)
+    finally:
+        engine.dispose()
+
+
+def default_url() -> str:
+    """Offline database URL from the variables of deploy.sh"""
+    password = quote(os.environ.get("POSTGRES_PASSWORD", ""))
+    return (
+        f"postgresql+psycopg2://{os.environ.get('PG_OFFLINE_USER', 'dbadm')}:{password}"
+        f"@{os.environ.get('PG_OFFLINE_HOST', 'localhost')}:{os.environ.get('PG_OFFLINE_PORT', '5432')}"
+        f"/{os.environ.get('PG_OFFLINE_DB', 'offline_features')}"
+    )
+
+
+def main():
+    """Export the offline table"""
+    parser = argparse.ArgumentParser(description="Export the offline table to Parquet")
+    parser.add_argument("--url", default=None, help="SQLAlchemy URL of the offline database")
+    parser.add_argument("--table", default=OFFLINE_TABLE)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = export_offline_table(args.url or default_url(), args.table, args.output_dir, args.chunksize)
+    logging.info("Exported %s rows in %s files to [%s] in %.1f sec",
+                 sum(rows.values()), len(rows), args.output_dir, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
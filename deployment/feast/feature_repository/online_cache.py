@@ -0,0 +1,232 @@
+"""Online feature cache module.
+
+Read-through, size bounded LRU cache in front of FeatureStore.get_online_features
+keyed by entity_id.
+
+Every get_online_features call resolves the feature references against the
+registry, serialises the entity keys and reads the SQLite online store, which
+costs milliseconds per request. Scoring requests for the same applicant within
+the FeatureView ttl get the same values, hence they are served from memory.
+
+Usage:
+    cache = OnlineFeatureCache(
+        store=FeatureStore(repo_path="."),
+        features=store.get_feature_service("customer_credit_risk_feature_service"),
+    )
+    features = cache.get_online_features([1, 2, 3])   # same layout as OnlineResponse.to_dict()
+    cache.materialize_incremental(end_date=datetime.now())   # invalidates the cache
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from feast import (
+    FeatureService,
+    FeatureStore,
+)
+
+DEFAULT_FEATURE_VIEW_NAME = "customer_credit_risk_feature_view"
+DEFAULT_JOIN_KEY = "entity_id"
+
+
+class OnlineFeatureCache:
+    """Read-through LRU cache for online features keyed by entity id.
+
+    Args:
+        store: FeatureStore to read through to.
+        features: Feature references or FeatureService as for get_online_features.
+        max_entries: Maximum number of entities to keep, least recently used are evicted.
+        ttl: Cache entry time to live. Defaults to the ttl of feature_view_name.
+        feature_view_name: FeatureView whose ttl and materialisation state the cache follows.
+        join_key: Entity join key.
+        materialization_check_seconds: How often to check the registry for a
+            materialisation run by another process. 0 disables the check.
+    """
+    def __init__(
+            self,
+            store: FeatureStore,
+            features: Union[List[str], FeatureService],
+            max_entries: int = 100_000,
+            ttl: Optional[timedelta] = None,
+            feature_view_name: str = DEFAULT_FEATURE_VIEW_NAME,
+            join_key: str = DEFAULT_JOIN_KEY,
+            materialization_check_seconds: float = 60.0,
+    ):
+        self.store = store
+        self.features = features
+        self.max_entries = max_entries
+        self.feature_view_name = feature_view_name
+        self.join_key = join_key
+        self.materialization_check_seconds = materialization_check_seconds
+
+        if ttl is None:
+            ttl = store.get_feature_view(feature_view_name).ttl
+        # Feast treats a zero ttl as no expiry.
+        self.ttl_seconds = ttl.total_seconds() if ttl else float("inf")
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()    # entity_id -> (expires_at, values)
+        self._feature_names: Optional[List[str]] = None
+        # Bumped by every invalidation, a fetch started before one is not cached.
+        self._generation = 0
+        self._last_materialization = self._get_last_materialization()
+        self._last_materialization_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.fetches = 0
+        self.fetch_seconds = 0.0
+        self.lookup_seconds = 0.0
+        self.lookups = 0
+
+    def _get_last_materialization(self) -> Optional[Any]:
+        """End of the latest materialisation interval of the feature view in the registry"""
+        try:
+            intervals = self.store.get_feature_view(self.feature_view_name).materialization_intervals
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.error("Cannot read materialization intervals: %s", e)
+            return None
+        return intervals[-1][1] if intervals else None
+
+    def _check_materialization(self):
+        """Invalidate when another process has materialised since the last check"""
+        if self.materialization_check_seconds <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_materialization_check < self.materialization_check_seconds:
+            return
+        self._last_materialization_check = now
+        last = self._get_last_materialization()
+        if last != self._last_materialization:
+            logging.info("Feature view [%s] materialized at [%s], invalidating cache",
+                         self.feature_view_name, last)
+            self._last_materialization = last
+            self.invalidate()
+
+    def _fetch(self, entity_ids: Sequence[Any]) -> Dict[Any, Tuple]:
+        """Fetch the missing entities from the online store in one call"""
+        start = time.perf_counter()
+        response = self.store.get_online_features(
+            features=self.features,
+            entity_rows=[{self.join_key: entity_id} for entity_id in entity_ids],
+        ).to_dict()
+        self.fetches += 1
+        self.fetch_seconds += time.perf_counter() - start
+
+        if self._feature_names is None:
+            self._feature_names = [name for name in response if name != self.join_key]
+        columns = [response[name] for name in self._feature_names]
+        return {
+            entity_id: tuple(column[i] for column in columns)
+            for i, entity_id in enumerate(entity_ids)
+        }
+
+    def get_online_features(self, entity_ids: Iterable[Any]) -> Dict[str, List[Any]]:
+        """Return the features for the entity ids, reading through on misses.
+
+        Args:
+            entity_ids: entity ids, duplicates allowed.
+
+        Returns: Dict in the same layout as OnlineResponse.to_dict(), i.e. the join
+            key and every feature name mapped to a list in entity_ids order.
+        """
+        start = time.perf_counter()
+        entity_ids = list(entity_ids)
+        self._check_materialization()
+
+        rows: Dict[Any, Tuple] = {}
+        missing: List[Any] = []
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            for entity_id in entity_ids:
+                if entity_id in rows:
+                    continue
+                entry = self._entries.get(entity_id)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(entity_id)
+                    rows[entity_id] = entry[1]
+                    self.hits += 1
+                else:
+                    rows[entity_id] = None
+                    missing.append(entity_id)
+                    self.misses += 1
+
+        if missing:
+            fetched = self._fetch(missing)
+            rows.update(fetched)
+            expires_at = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                # Invalidated during the fetch, the fetched rows may predate it.
+                if generation != self._generation:
+                    fetched = {}
+                for entity_id, values in fetched.items():
+                    self._entries[entity_id] = (expires_at, values)
+                    self._entries.move_to_end(entity_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        result: Dict[str, List[Any]] = {self.join_key: entity_ids}
+        for position, name in enumerate(self._feature_names or []):
+            result[name] = [rows[entity_id][position] for entity_id in entity_ids]
+
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        return result
+
+    def invalidate(self, entity_ids: Optional[Iterable[Any]] = None):
+        """Drop the given entities, or every entity when entity_ids is None"""
+        with self._lock:
+            if entity_ids is None:
+                self._entries.clear()
+            else:
+                for entity_id in entity_ids:
+                    self._entries.pop(entity_id, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def materialize(self, *args, **kwargs):
+        """FeatureStore.materialize followed by cache invalidation"""
+        self.store.materialize(*args, **kwargs)
+        self._last_materialization = self._get_last_materialization()
+        self.invalidate()
+
+    def materialize_incremental(self, *args, **kwargs):
+        """FeatureStore.materialize_incremental followed by cache invalidation"""
+        self.store.materialize_incremental(*args, **kwargs)
+        self._last_materialization = self._get_last_materialization()
+        self.invalidate()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate and latency metrics"""
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "fetches": self.fetches,
+            "mean_fetch_ms": 1000 * self.fetch_seconds / self.fetches if self.fetches else 0.0,
+            "lookups": self.lookups,
+            "mean_lookup_us": 1e6 * self.lookup_seconds / self.lookups if self.lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,153 @@
+"""Packed categorical encoding module.
+
+The 35 one-hot features of customer_credit_risk_feature_view come from 8
+categorical columns and exactly one column per category group is 1. Storing the
+index of that column per group, bit-packed into one Int64, replaces 35 Float32
+online values with a single one.
+
+Layout, from the least significant bits: code 0 is "no category", and code k is
+the k-th one-hot column of the group.
+    purpose 4 bits | gender 2 | housing 2 | saving_accounts 3 | checking_account 3
+    | generation 3 | job 3 | amount 3
+
+- pack_one_hot() / unpack_one_hot(): vectorised, for DataFrames and arrays.
+- pack_codes(): packs per group codes, e.g. of request_encoding.py.
+- unpack_categories(): the python mode on-demand feature view transformation
+  that expands the packed value back to the one-hot features on read.
+- packed_source_query(): the offline source SELECT computing the packed value
+  in PostgreSQL from the one-hot offline table.
+"""
+from typing import (
+    Any,
+    Dict,
+    List,
+    Sequence,
+)
+
+import numpy as np
+import pandas as pd
+
+PACKED_FEATURE = "packed_categories"
+
+# Category groups in the customer_credit_risk_feature_view schema order.
+CATEGORY_GROUPS: Dict[str, List[str]] = {
+    "purpose": [
+        "purpose_business", "purpose_car", "purpose_domestic_appliances", "purpose_education",
+        "purpose_furniture_equipment", "purpose_radio_tv", "purpose_repairs",
+        "purpose_vacation_others",
+    ],
+    "gender": ["gender_female", "gender_male"],
+    "housing": ["housing_free", "housing_own", "housing_rent"],
+    "saving_accounts": [
+        "saving_accounts_little", "saving_accounts_moderate", "saving_accounts_no_inf",
+        "saving_accounts_quite_rich", "saving_accounts_rich",
+    ],
+    "checking_account": [
+        "checking_account_little", "checking_account_moderate", "checking_account_no_inf",
+        "checking_account_rich",
+    ],
+    "generation": [
+        "generation_student", "generation_young", "generation_adult", "generation_senior",
+    ],
+    "job": ["job_0", "job_1", "job_2", "job_3"],
+    "amount": ["amount_0", "amount_1", "amount_2", "amount_3", "amount_4"],
+}
+ONE_HOT_FEATURES: List[str] = [name for columns in CATEGORY_GROUPS.values() for name in columns]
+
+
+def _layout() -> List[tuple]:
+    """(group, columns, shift, mask) per group"""
+    layout = []
+    shift = 0
+    for group, columns in CATEGORY_GROUPS.items():
+        bits = len(columns).bit_length()
+        layout.append((group, columns, shift, (1 << bits) - 1))
+        shift += bits
+    return layout
+
+
+_LAYOUT = _layout()
+# One-hot values per code of each group, code 0 is all zeros. NumPy float32 so that
+# FEAST infers the Float32 schema of the on demand feature view.
+_ONE_HOT = [
+    [tuple(np.float32(code == i + 1) for i in range(len(columns))) for code in range(mask + 1)]
+    for _, columns, _, mask in _LAYOUT
+]
+
+
+def pack_one_hot(df: pd.DataFrame) -> np.ndarray:
+    """Pack the one-hot columns of df into one int64 per row.
+
+    Args:
+        df: DataFrame with the ONE_HOT_FEATURES columns
+
+    Returns: int64 array of the packed values
+
+    Raises:
+        ValueError: a row has more than one non-zero column in a group
+    """
+    codes = np.zeros((len(df), len(_LAYOUT)), dtype=np.int64)
+    for i, (group, columns, _, _) in enumerate(_LAYOUT):
+        one_hot = df[columns].to_numpy() != 0
+        if (one_hot.sum(axis=1) > 1).any():
+            raise ValueError(f"group [{group}] is not one-hot.")
+        codes[:, i] = np.where(one_hot.any(axis=1), one_hot.argmax(axis=1) + 1, 0)
+    return pack_codes(codes)
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """Pack per group codes into one int64 per row.
+
+    Args:
+        codes: (n_rows, n_groups) codes in CATEGORY_GROUPS order, 0 for no category
+            and k for the k-th one-hot column of the group
+
+    Returns: int64 array of the packed values
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    packed = np.zeros(len(codes), dtype=np.int64)
+    for i, (_, _, shift, _) in enumerate(_LAYOUT):
+        packed |= codes[:, i] << shift
+    return packed
+
+
+def unpack_one_hot(packed: Sequence[int]) -> pd.DataFrame:
+    """Inverse of pack_one_hot: float32 DataFrame with the ONE_HOT_FEATURES columns"""
+    packed = np.asarray(packed, dtype=np.int64)
+    blocks = []
+    for _, columns, shift, mask in _LAYOUT:
+        code = (packed >> shift) & mask
+        # Row 0 of the identity is code 0, i.e. no category.
+        blocks.append(np.eye(mask + 1, len(columns) + 1, dtype=np.float32)[code][:, 1:])
+    return pd.DataFrame(np.hstack(blocks), columns=ONE_HOT_FEATURES)
+
+
+def unpack_categories(inputs: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Python mode on-demand transformation: packed_categories to the one-hot features.
+    A missing packed value gives missing features.
+    """
+    rows = []
+    for packed in inputs[PACKED_FEATURE]:
+        if packed is None:
+            rows.append((None,) * len(ONE_HOT_FEATURES))
+            continue
+        row = ()
+        for (_, _, shift, mask), one_hot in zip(_LAYOUT, _ONE_HOT):
+            row += one_hot[(packed >> shift) & mask]
+        rows.append(row)
+    columns = zip(*rows) if rows else [()] * len(ONE_HOT_FEATURES)
+    return {name: list(values) for name, values in zip(ONE_HOT_FEATURES, columns)}
+
+
+def packed_source_query(table: str) -> str:
+    """SELECT on the one-hot table returning risk and packed_categories"""
+    terms = []
+    for _, columns, shift, _ in _LAYOUT:
+        codes = " + ".join(f"{i + 1} * {column}" for i, column in enumerate(columns))
+        terms.append(f"(CAST({codes} AS BIGINT) << {shift})")
+    packed = "\n        | ".join(terms)
+    return (
+        f"SELECT entity_id, event_timestamp, created, risk,\n"
+        f"        {packed} AS {PACKED_FEATURE}\n"
+        f"FROM {table}"
+    )
@@ -0,0 +1,393 @@
+"""Push ingestion module.
+
+Streams newly approved applications into both feature stores within seconds,
+instead of the rerun of the 01 notebook, truncate, reload and materialise.
+
+The applications are JSON lines appended to a file, one object per line with
+entity_id, event_timestamp (ISO 8601) and the raw attributes keyed by the raw
+column names or the request fields of request_encoding.py, e.g.
+
+    {"entity_id": 1001, "event_timestamp": "2025-01-02T10:00:00+00:00", "Age": 35,
+     "Sex": "male", "Job": 2, "Housing": "own", "Saving accounts": null,
+     "Checking account": "little", "Credit amount": 2500, "Purpose": "car"}
+
+and an optional Risk (good / bad, or 0. / 1.), null otherwise.
+
+- FileTailSource reads the complete lines after a byte offset, i.e. it follows
+  the file as it grows.
+- PushIngestion collects the records into micro batches of batch_size records,
+  or fewer once the first record of the batch waited max_latency_seconds.
+- A batch is encoded with request_encoding.encode_records() into the offline
+  table columns and written
+  1. to the online store with FeatureStore.push() to the PushSources of
+     customer_credit_risk_feature_view and, with packed_categories, of
+     customer_credit_risk_packed_feature_view (features.py), then
+  2. with the DuckDB offline store, to one more Parquet file of the export the
+     FileSources read (offline_export.write_parquet_part()), and
+  3. to the offline table with COPY, in the same transaction as the byte offset
+     after the batch in credit.push_ingestion_checkpoints.
+  After a failure or a kill, ingestion resumes from the checkpointed offset. The
+  offline rows of a batch are committed exactly once with its offset, and a
+  batch pushed online but not committed is pushed again with the same values,
+  which overwrites the same online rows. The Parquet file of a batch is named
+  after the byte offset of its first record, and the files from the
+  checkpointed offset on are deleted on resume. Hence every record lands
+  exactly once in each store.
+- A line which is not a JSON object, lacks entity_id / event_timestamp or has an
+  unknown categorical value is logged and skipped.
+
+The offline write does not go through PushMode.OFFLINE, as the offline store
+write cannot share the transaction of the checkpoint. The next offline_export.py
+run exports the pushed rows from the table and replaces their Parquet files;
+run it with the ingestion stopped, as a file written during the export is lost
+with the previous export directory.
+
+Run from the feature repository, with the variables of deploy.sh set:
+    python push_ingestion.py --path data/applications.jsonl
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+from feast import FeatureStore
+from feast.data_source import PushMode
+from sqlalchemy import (
+    create_engine,
+    text,
+)
+from sqlalchemy.engine import Engine
+
+from offline_export import (
+    DEFAULT_OUTPUT_DIR,
+    OFFLINE_TABLE,
+    default_url,
+    write_parquet_part,
+)
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    pack_one_hot,
+)
+from request_encoding import encode_records
+from utility import get_yaml_value
+
+PUSH_SOURCE = "customer_credit_risk_push_source"
+PACKED_PUSH_SOURCE = "customer_credit_risk_packed_push_source"
+CHECKPOINTS_TABLE = "credit.push_ingestion_checkpoints"
+OFFLINE_COLUMNS = ["entity_id", "event_timestamp", "created", "risk"] + ONE_HOT_FEATURES
+_RISK_VALUES = {"good": 0., "bad": 1., 0: 0., 1: 1.}
+
+
+class FileTailSource:
+    """Complete JSON lines of a growing file after a byte offset.
+
+    Args:
+        path: JSON lines file, which may not exist yet
+        offset: byte offset of the first line to read
+    """
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = offset
+
+    def read(self, max_records: int) -> List[Tuple[int, Optional[Dict[str, Any]]]]:
+        """Read up to max_records lines without waiting.
+
+        Returns: (byte offset after the line, record) per line, None for an invalid line
+        """
+        records = []
+        try:
+            file = open(self.path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            return records
+        with file:
+            file.seek(self.offset)
+            while len(records) < max_records:
+                line = file.readline()
+                # A line without its newline is still being written.
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                if line.strip():
+                    records.append((self.offset, _parse_line(line)))
+        return records
+
+
+def _parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        logging.warning("Skipping a line which is not JSON: %.200s", line)
+        return None
+    if not isinstance(record, dict) or record.get("entity_id") is None or not record.get("event_timestamp"):
+        logging.warning("Skipping a record without entity_id or event_timestamp: %.200s", line)
+        return None
+    return record
+
+
+def _risk(record: Dict[str, Any]) -> float:
+    risk = record.get("Risk", record.get("risk"))
+    return np.nan if risk is None else _RISK_VALUES[risk]
+
+
+def encode_batch(records: List[Dict[str, Any]], created: datetime) -> pd.DataFrame:
+    """Offline table rows (OFFLINE_COLUMNS) of the records.
+
+    Args:
+        records: valid records of FileTailSource
+        created: created timestamp of the rows
+
+    Raises:
+        ValueError: a record has an unknown categorical value or Risk
+    """
+    try:
+        risk = [_risk(record) for record in records]
+    except KeyError as error:
+        raise ValueError(f"Risk [{error.args[0]!r}] is not one of {list(_RISK_VALUES)}.") from error
+    df = pd.DataFrame(encode_records(records), columns=ONE_HOT_FEATURES)
+    df.insert(0, "entity_id", np.array([record["entity_id"] for record in records], dtype=np.int64))
+    df.insert(1, "event_timestamp", pd.to_datetime([record["event_timestamp"] for record in records], utc=True))
+    df.insert(2, "created", pd.Timestamp(created))
+    df.insert(3, "risk", np.array(risk, dtype=np.float32))
+    return df
+
+
+class PushIngestion:
+    """Micro batched ingestion of a FileTailSource into the online and offline stores.
+
+    Args:
+        store: FeatureStore of the feature repository
+        engine: SQLAlchemy engine of the offline database
+        source: the applications
+        name: checkpoint key, the path of the source by default
+        push_source_name: PushSource of the feature views to write online
+        packed_push_source_name: PushSource of the packed feature view, None not to write it
+        table: offline table
+        parquet_dir: export directory of the DuckDB offline store to add the rows to,
+            None with the PostgreSQL offline store
+        batch_size: records per batch
+        max_latency_seconds: longest wait of a record for its batch to fill up
+        poll_seconds: wait between reads of an idle source
+    """
+    def __init__(
+            self,
+            store: FeatureStore,
+            engine: Engine,
+            source: FileTailSource,
+            name: Optional[str] = None,
+            push_source_name: str = PUSH_SOURCE,
+            packed_push_source_name: Optional[str] = PACKED_PUSH_SOURCE,
+            table: str = OFFLINE_TABLE,
+            parquet_dir: Optional[str] = None,
+            batch_size: int = 500,
+            max_latency_seconds: float = 1.0,
+            poll_seconds: float = 0.1,
+    ):
+        self.store = store
+        self.engine = engine
+        self.source = source
+        self.name = name or os.path.abspath(source.path)
+        self.push_source_name = push_source_name
+        self.packed_push_source_name = packed_push_source_name
+        self.table = table
+        self.parquet_dir = parquet_dir
+        self.batch_size = batch_size
+        self.max_latency_seconds = max_latency_seconds
+        self.poll_seconds = poll_seconds
+        self.records = 0
+        self.skipped = 0
+        self.batches = 0
+
+    def _create_table(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINTS_TABLE} ("
+                "name TEXT PRIMARY KEY, byte_offset BIGINT NOT NULL, records BIGINT NOT NULL, "
+                "updated_at TIMESTAMPTZ NOT NULL)"
+            ))
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Byte offset and record count of the last committed batch, None before the first"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT byte_offset, records FROM {CHECKPOINTS_TABLE} WHERE name = :name"),
+                {"name": self.name},
+            ).mappings().first()
+        return dict(row) if row is not None else None
+
+    def _encode(self, records: List[Optional[Dict[str, Any]]], created: datetime) -> pd.DataFrame:
+        valid = [record for record in records if record is not None]
+        if not valid:
+            return pd.DataFrame(columns=OFFLINE_COLUMNS)
+        try:
+            return encode_batch(valid, created)
+        except ValueError:
+            # Find and skip the invalid records, one at a time.
+            dfs = []
+            for record in valid:
+                try:
+                    dfs.append(encode_batch([record], created))
+                except ValueError as error:
+                    logging.warning("Skipping entity_id [%s]: %s", record["entity_id"], error)
+            return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=OFFLINE_COLUMNS)
+
+    def _write_offline(self, df: pd.DataFrame, offset: int, records: int):
+        """COPY the rows and advance the checkpoint in one transaction"""
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                if len(df):
+                    buffer = io.StringIO()
+                    df[OFFLINE_COLUMNS].to_csv(buffer, index=False, header=False, date_format="%Y-%m-%dT%H:%M:%S.%f%z")
+                    buffer.seek(0)
+                    columns = ", ".join(f'"{name}"' for name in OFFLINE_COLUMNS)
+                    cursor.copy_expert(f"COPY {self.table} ({columns}) FROM STDIN WITH CSV", buffer)
+                cursor.execute(
+                    f"INSERT INTO {CHECKPOINTS_TABLE} (name, byte_offset, records, updated_at) "
+                    "VALUES (%s, %s, %s, now()) ON CONFLICT (name) DO UPDATE SET "
+                    "byte_offset = EXCLUDED.byte_offset, records = EXCLUDED.records, "
+                    "updated_at = EXCLUDED.updated_at",
+                    (self.name, offset, records),
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _part_name(self, offset: int) -> str:
+        """Parquet file of the batch starting at offset"""
+        return f"push-{hashlib.sha1(self.name.encode()).hexdigest()[:12]}-{offset:020d}.parquet"
+
+    def _remove_uncommitted_parts(self):
+        """Delete the Parquet files of the batches after the checkpoint"""
+        prefix = self._part_name(0)[:-len("00000000000000000000.parquet")]
+        for path in Path(self.parquet_dir).glob(f"{prefix}*.parquet"):
+            if int(path.stem[len(prefix):]) >= self.source.offset:
+                logging.info("Removing [%s] of an uncommitted batch", path)
+                path.unlink()
+
+    def flush(self, batch: List[Tuple[int, Optional[Dict[str, Any]]]], start_offset: int):
+        """Write a batch to the online store, then to the offline table with its checkpoint.
+
+        Args:
+            batch: records of FileTailSource.read()
+            start_offset: byte offset of the first record of the batch
+        """
+        start = time.perf_counter()
+        df = self._encode([record for _, record in batch], datetime.now(timezone.utc))
+        if len(df):
+            self.store.push(self.push_source_name, df, to=PushMode.ONLINE)
+            if self.packed_push_source_name is not None:
+                packed = df[["entity_id", "event_timestamp", "created", "risk"]].assign(
+                    **{PACKED_FEATURE: pack_one_hot(df)}
+                )
+                self.store.push(self.packed_push_source_name, packed, to=PushMode.ONLINE)
+            if self.parquet_dir is not None:
+                write_parquet_part(df[OFFLINE_COLUMNS], self.parquet_dir, self._part_name(start_offset))
+        self._write_offline(df, batch[-1][0], self.records + len(df))
+        self.records += len(df)
+        self.skipped += len(batch) - len(df)
+        self.batches += 1
+        logging.info("Ingested [%s] records up to offset [%s] in [%.3f] sec",
+                     len(df), batch[-1][0], time.perf_counter() - start)
+
+    def run(self, stop: Optional[threading.Event] = None, idle_exit: bool = False) -> Dict[str, Any]:
+        """Ingest until stop is set, or until the source has no more records with idle_exit.
+
+        Returns: report with the records, batches, seconds and records/s of this run
+        """
+        self._create_table()
+        checkpoint = self.load_checkpoint()
+        if checkpoint is not None:
+            self.source.offset, self.records = checkpoint["byte_offset"], checkpoint["records"]
+            logging.info("Resuming [%s] at offset [%s], [%s] records ingested",
+                         self.name, self.source.offset, self.records)
+        if self.parquet_dir is not None:
+            self._remove_uncommitted_parts()
+        stop = stop or threading.Event()
+        start, records_before = time.perf_counter(), self.records
+        batch: List[Tuple[int, Optional[Dict[str, Any]]]] = []
+        batch_offset = self.source.offset
+        batch_started = 0.
+        while not stop.is_set():
+            new_records = self.source.read(self.batch_size - len(batch))
+            if new_records and not batch:
+                batch_started = time.monotonic()
+            batch += new_records
+            waited = time.monotonic() - batch_started
+            if len(batch) >= self.batch_size or (batch and (waited >= self.max_latency_seconds or idle_exit)):
+                self.flush(batch, batch_offset)
+                batch, batch_offset = [], batch[-1][0]
+            elif not new_records:
+                if idle_exit:
+                    break
+                stop.wait(min(self.poll_seconds, self.max_latency_seconds - waited) if batch else self.poll_seconds)
+        if batch:
+            self.flush(batch, batch_offset)
+
+        seconds = time.perf_counter() - start
+        records = self.records - records_before
+        return {
+            "name": self.name,
+            "records": records,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "offset": self.source.offset,
+            "seconds": seconds,
+            "records_per_second": records / seconds if seconds > 0 else 0.,
+        }
+
+
+def main():
+    """Follow an applications file"""
+    parser = argparse.ArgumentParser(description="Push ingestion of new applications")
+    parser.add_argument("--path", required=True, help="JSON lines file of the applications")
+    parser.add_argument("--url", default=None, help="SQLAlchemy URL of the offline database")
+    parser.add_argument("--table", default=OFFLINE_TABLE)
+    parser.add_argument("--push-source", default=PUSH_SOURCE)
+    parser.add_argument("--packed-push-source", default=PACKED_PUSH_SOURCE)
+    parser.add_argument("--parquet-dir", default=None,
+                        help=f"DuckDB offline store export, {DEFAULT_OUTPUT_DIR} with the duckdb offline store")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-latency", type=float, default=1.0, help="seconds")
+    parser.add_argument("--idle-exit", action="store_true", help="stop at the end of the file")
+    args = parser.parse_args()
+
+    parquet_dir = args.parquet_dir
+    if parquet_dir is None and get_yaml_value("feature_store.yaml", "offline_store", {}).get("type") == "duckdb":
+        parquet_dir = DEFAULT_OUTPUT_DIR
+    engine = create_engine(args.url or default_url())
+    try:
+        report = PushIngestion(
+            FeatureStore(repo_path="."), engine, FileTailSource(args.path), push_source_name=args.push_source,
+            packed_push_source_name=args.packed_push_source, table=args.table, parquet_dir=parquet_dir,
+            batch_size=args.batch_size, max_latency_seconds=args.max_latency,
+        ).run(idle_exit=args.idle_exit)
+        logging.info("Ingested [%s] records in [%s] batches, [%s] skipped",
+                     report["records"], report["batches"], report["skipped"])
+    except KeyboardInterrupt:
+        logging.info("Stopped, the next run resumes from the checkpoint")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,211 @@
+"""Request-time encoding module.
+
+Encodes the raw attributes of new applicants, who have no materialised row, into
+the 35 one-hot features of customer_credit_risk_feature_view, without running
+the pandas eda + feature_engineering pipelines of the notebooks per request.
+
+The pipelines are replaced by lookup tables built once at import:
+- Purpose, Sex, Housing, Saving accounts, Checking account and Job: a dict from
+  the raw value to the code of its one-hot column. A missing Saving accounts or
+  Checking account (None or NaN) is no_inf, as get_impute_na() imputes it.
+- Age and Credit amount: the bin edges of add_generation_category() and
+  add_credit_amount_category(), right-closed as pd.cut. np.searchsorted gives the
+  bin; a value outside the edges has no category (all zeros), as pd.cut gives NaN.
+
+A batch is encoded column by column: one dict lookup per value and one
+searchsorted per numeric column, then one scatter into a float32 matrix.
+
+- encode_columns() / encode_records(): (n, 35) float32 arrays in ONE_HOT_FEATURES
+  order, from columns or records keyed by the request field names or the raw
+  column names (RAW_COLUMN_NAMES).
+- encode_packed(): packed_categories values of the packed feature view.
+- encode_applicants(): the python mode on-demand feature view transformation of
+  customer_credit_risk_applicant_feature_view in features.py. A request sends a
+  missing Saving accounts or Checking account as "no_inf": FEAST cannot infer
+  the type of a None request value of a single row request, nor convert NaN
+  among strings.
+
+Usage:
+    X = encode_records([{"Age": 35, "Sex": "male", "Job": 2, "Housing": "own",
+                         "Saving accounts": "no_inf", "Checking account": "little",
+                         "Credit amount": 2500, "Purpose": "car"}])
+"""
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Sequence,
+)
+
+import numpy as np
+
+from packed_encoding import (
+    CATEGORY_GROUPS,
+    ONE_HOT_FEATURES,
+    pack_codes,
+)
+
+# Request field per raw column of german_credit_data.csv.
+RAW_COLUMN_NAMES: Dict[str, str] = {
+    "Age": "age",
+    "Sex": "sex",
+    "Job": "job",
+    "Housing": "housing",
+    "Saving accounts": "saving_accounts",
+    "Checking account": "checking_account",
+    "Credit amount": "credit_amount",
+    "Purpose": "purpose",
+}
+
+_NA = "no_inf"
+# Value of every String request field when FEAST infers the on-demand feature view schema.
+SCHEMA_PLACEHOLDER = "hello world"
+# Request field: (category group, raw value per one-hot column of the group).
+_CATEGORICAL_FIELDS: Dict[str, tuple] = {
+    "purpose": ("purpose", [
+        "business", "car", "domestic appliances", "education", "furniture/equipment",
+        "radio/TV", "repairs", "vacation/others",
+    ]),
+    "sex": ("gender", ["female", "male"]),
+    "housing": ("housing", ["free", "own", "rent"]),
+    "saving_accounts": ("saving_accounts", ["little", "moderate", _NA, "quite rich", "rich"]),
+    "checking_account": ("checking_account", ["little", "moderate", _NA, "rich"]),
+    "job": ("job", [0, 1, 2, 3]),
+}
+# Request field: (category group, pd.cut bin edges).
+_BINNED_FIELDS: Dict[str, tuple] = {
+    "age": ("generation", np.array([18, 25, 35, 60, 100], dtype=np.float64)),
+    "credit_amount": ("amount", np.array([0, 5000, 10000, 15000, 20000, np.inf], dtype=np.float64)),
+}
+REQUEST_FIELDS: List[str] = list(RAW_COLUMN_NAMES.values())
+
+_GROUP_INDEX = {group: i for i, group in enumerate(CATEGORY_GROUPS)}
+_GROUP_OFFSET = np.cumsum([0] + [len(columns) for columns in CATEGORY_GROUPS.values()])[:-1]
+
+
+def _lookup_table(field: str, values: Sequence[Any]) -> Dict[Any, int]:
+    table = {value: code for code, value in enumerate(values, start=1)}
+    if field == "job":
+        # Strings of JSON requests, floats of pandas columns with missing values.
+        table.update({str(value): code for value, code in list(table.items())})
+        table.update({float(value): code for value, code in list(table.items()) if isinstance(value, int)})
+    if _NA in table:
+        table[None] = table[_NA]
+    return table
+
+
+_LOOKUP_TABLES = {field: _lookup_table(field, values) for field, (_, values) in _CATEGORICAL_FIELDS.items()}
+
+
+def _categorical_codes(field: str, values: Sequence[Any], errors: str = "raise") -> np.ndarray:
+    lookup = _LOOKUP_TABLES[field].get
+    codes = np.fromiter((lookup(value, -1) for value in values), dtype=np.int64, count=len(values))
+    unknown = np.flatnonzero(codes < 0)
+    if len(unknown):
+        na_code = _LOOKUP_TABLES[field].get(None)
+        for i in unknown:
+            value = values[i]
+            # NaN of a pandas or NumPy column, which is not None.
+            if na_code is not None and isinstance(value, float) and value != value:
+                codes[i] = na_code
+            elif errors == "ignore":
+                codes[i] = 0
+            else:
+                raise ValueError(f"[{field}] value [{value!r}] is not one of {_CATEGORICAL_FIELDS[field][1]}.")
+    return codes
+
+
+def _binned_codes(field: str, values: Sequence[Any]) -> np.ndarray:
+    edges = _BINNED_FIELDS[field][1]
+    numbers = np.fromiter(
+        (np.nan if value is None else value for value in values), dtype=np.float64, count=len(values)
+    )
+    # (edges[k - 1], edges[k]] is code k, as pd.cut with right=True.
+    position = np.searchsorted(edges, numbers, side="left")
+    return np.where((position >= 1) & (position < len(edges)), position, 0)
+
+
+def encode_codes(columns: Mapping[str, Sequence[Any]], errors: str = "raise") -> np.ndarray:
+    """Per group codes of the request columns.
+
+    Args:
+        columns: values per request field (REQUEST_FIELDS)
+        errors: "raise" for an unknown categorical value, "ignore" to give it no category
+
+    Returns: (n_rows, n_groups) int64 codes in CATEGORY_GROUPS order, 0 for no category
+
+    Raises:
+        KeyError: a request field is missing
+        ValueError: a categorical value is unknown and errors is "raise"
+    """
+    n_rows = len(columns[REQUEST_FIELDS[0]])
+    codes = np.zeros((n_rows, len(CATEGORY_GROUPS)), dtype=np.int64)
+    for field, (group, _) in _CATEGORICAL_FIELDS.items():
+        codes[:, _GROUP_INDEX[group]] = _categorical_codes(field, columns[field], errors)
+    for field, (group, _) in _BINNED_FIELDS.items():
+        codes[:, _GROUP_INDEX[group]] = _binned_codes(field, columns[field])
+    return codes
+
+
+def encode_columns(columns: Mapping[str, Sequence[Any]], errors: str = "raise") -> np.ndarray:
+    """One-hot features of the request columns.
+
+    Args:
+        columns: values per request field (REQUEST_FIELDS) or raw column name
+        errors: "raise" or "ignore" an unknown categorical value, as encode_codes()
+
+    Returns: (n_rows, 35) float32 array in ONE_HOT_FEATURES order
+    """
+    columns = {RAW_COLUMN_NAMES.get(name, name): values for name, values in columns.items()}
+    codes = encode_codes(columns, errors)
+    one_hot = np.zeros((len(codes), len(ONE_HOT_FEATURES)), dtype=np.float32)
+    rows, groups = np.nonzero(codes)
+    one_hot[rows, _GROUP_OFFSET[groups] + codes[rows, groups] - 1] = 1.
+    return one_hot
+
+
+def _records_to_columns(records: Sequence[Mapping[str, Any]]) -> Dict[str, List[Any]]:
+    raw = bool(records) and next(iter(RAW_COLUMN_NAMES)) in records[0]
+    return {
+        field: [record.get(name if raw else field) for record in records]
+        for name, field in RAW_COLUMN_NAMES.items()
+    }
+
+
+def encode_records(records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+    """One-hot features of records keyed by the request fields or the raw column names.
+
+    Returns: (n_rows, 35) float32 array in ONE_HOT_FEATURES order
+    """
+    return encode_columns(_records_to_columns(records))
+
+
+def encode_packed(columns: Mapping[str, Sequence[Any]]) -> np.ndarray:
+    """packed_categories (packed_encoding.py) of the request columns"""
+    columns = {RAW_COLUMN_NAMES.get(name, name): values for name, values in columns.items()}
+    return pack_codes(encode_codes(columns))
+
+
+def _is_schema_placeholder(inputs: Mapping[str, Sequence[Any]]) -> bool:
+    """Whether inputs are the placeholder values of the FEAST schema inference"""
+    return all(
+        all(value == SCHEMA_PLACEHOLDER for value in inputs[field])
+        for field in _CATEGORICAL_FIELDS if field != "job"
+    )
+
+
+def encode_applicants(inputs: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Python mode on-demand transformation: request fields to the one-hot features.
+
+    An unknown categorical value fails the request, a decision is not scored on
+    a mistyped attribute. Only the placeholder values ("hello world") FEAST runs
+    the transformation on to infer its schema at apply encode to no category.
+
+    Raises:
+        ValueError: a categorical value is unknown
+    """
+    columns = {field: inputs[field] for field in REQUEST_FIELDS}
+    one_hot = encode_columns(columns, errors="ignore" if _is_schema_placeholder(columns) else "raise")
+    # NumPy float32 values, as unpack_categories() returns.
+    return {name: list(one_hot[:, i]) for i, name in enumerate(ONE_HOT_FEATURES)}
@@ -0,0 +1,345 @@
+"""Low latency model scorer module.
+
+Serving-time scorers for the credit risk models that only need NumPy.
+sklearn LogisticRegression and XGBoost XGBClassifier spend most of a single-row
+predict_proba in input validation and Python dispatch, while the models
+themselves are a dot product over the 35 one-hot features, or a few hundred
+shallow trees.
+
+export_scorer() turns a trained model into one of the scorers below and
+save_scorer()/load_scorer() persist it as a .npz file. The export side uses duck
+typing (coef_, get_booster()) so that the serving process needs neither sklearn
+nor xgboost.
+
+The flattened trees beat XGBoost's native predictor below about 16 rows, the
+single applicant path, and take 2 to 2.5 times its time for larger batches on
+one CPU, the price of keeping xgboost out of the serving process.
+
+The scorers take the feature engineering output directly, either a DataFrame with
+the feature view column names or an array in the training column order.
+"""
+import json
+import math
+from typing import (
+    Any,
+    List,
+    Optional,
+    Sequence,
+)
+
+import numpy as np
+
+
+def to_matrix(X, feature_names: Sequence[str]) -> np.ndarray:
+    """Return X as a 2D float array in the training column order."""
+    if hasattr(X, "columns"):
+        X = X[list(feature_names)].to_numpy()
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.shape[1] != len(feature_names):
+        raise ValueError(
+            f"expected [{len(feature_names)}] features, got [{X.shape[1]}]."
+        )
+    return X
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-margin))
+
+
+class LinearScorer:
+    """Logistic regression scorer: sigmoid(X @ coef + intercept).
+
+    Args:
+        coef: coefficients, one per feature
+        intercept: intercept
+        feature_names: training column order
+    """
+    kind = "linear"
+
+    def __init__(self, coef: np.ndarray, intercept: float, feature_names: Sequence[str]):
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.feature_names = list(feature_names)
+        self._coef_list = self.coef.tolist()
+
+    def decision_function(self, X) -> np.ndarray:
+        """Log odds of the positive (bad credit) class"""
+        return to_matrix(X, self.feature_names) @ self.coef + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities with the same (n_samples, 2) layout as sklearn"""
+        positive = _sigmoid(self.decision_function(X))
+        return np.column_stack([1.0 - positive, positive])
+
+    def score_one(self, x: Sequence[float]) -> float:
+        """Probability of the positive class for one row in training column order.
+        Pure Python for the single applicant path, avoids NumPy call overhead.
+        """
+        margin = self.intercept + sum(w * v for w, v in zip(self._coef_list, x) if v)
+        return 1.0 / (1.0 + math.exp(-margin))
+
+    def to_arrays(self) -> dict:
+        """Arrays to persist with save_scorer"""
+        return {"coef": self.coef, "intercept": np.array([self.intercept])}
+
+    @classmethod
+    def from_arrays(cls, arrays, feature_names: Sequence[str]) -> "LinearScorer":
+        """Inverse of to_arrays"""
+        return cls(arrays["coef"], float(arrays["intercept"][0]), feature_names)
+
+
+class TreeEnsembleScorer:
+    """Binary logistic gradient boosted trees flattened into node arrays.
+
+    Every tree is padded to a complete binary tree of depth max_depth in heap
+    order, where node i has the children 2i+1 and 2i+2, and a leaf above the last
+    level sends every row left down to copies of itself. A batch is then evaluated
+    level by level for every (row, tree) pair at once with one gather and one
+    comparison per level and no per-node branching in Python.
+
+    The padded arrays hold 2**max_depth nodes per tree, fine for boosted trees of
+    depth 10 or less.
+
+    Args:
+        feature: split feature index per node
+        threshold: split threshold per node (go left if x < threshold)
+        left: left child global node index per node (self for leaves)
+        right: right child global node index per node (self for leaves)
+        default_left: whether a missing value goes left per node
+        value: leaf value per node (0 for inner nodes)
+        roots: global node index of each tree root
+        max_depth: maximum depth over the trees
+        bias: margin added to the sum of the leaf values (base score)
+        feature_names: training column order
+    """
+    kind = "tree"
+    # Rows evaluated together, keeps the (rows, trees) node index arrays in cache.
+    block_rows = 64
+
+    def __init__(
+            self,
+            feature: np.ndarray,
+            threshold: np.ndarray,
+            left: np.ndarray,
+            right: np.ndarray,
+            default_left: np.ndarray,
+            value: np.ndarray,
+            roots: np.ndarray,
+            max_depth: int,
+            bias: float,
+            feature_names: Sequence[str],
+    ):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.bias = float(bias)
+        self.feature_names = list(feature_names)
+        self._complete_layout()
+
+    def _complete_layout(self):
+        """Pad the trees to complete binary trees of depth max_depth in heap order"""
+        n_trees, n_inner = len(self.roots), 2 ** self.max_depth - 1
+        feature = np.zeros((n_trees, n_inner), dtype=np.intp)
+        # NaN thresholds with default left send every row left below an early leaf.
+        threshold = np.full((n_trees, n_inner), np.nan, dtype=np.float32)
+        default_left = np.ones((n_trees, n_inner), dtype=bool)
+        leaf_value = np.zeros((n_trees, n_inner + 1), dtype=np.float64)
+        for tree, root in enumerate(self.roots):
+            stack = [(int(root), 0)]
+            while stack:
+                node, position = stack.pop()
+                if position >= n_inner:
+                    leaf_value[tree, position - n_inner] = self.value[node]
+                    continue
+                if self.left[node] != node:
+                    feature[tree, position] = self.feature[node]
+                    threshold[tree, position] = self.threshold[node]
+                    default_left[tree, position] = self.default_left[node]
+                stack.append((int(self.left[node]), 2 * position + 1))
+                stack.append((int(self.right[node]), 2 * position + 2))
+        self._n_inner = n_inner
+        self._tree_offsets = np.arange(n_trees, dtype=np.intp) * n_inner
+        self._leaf_offsets = np.arange(n_trees, dtype=np.intp) * (n_inner + 1) - n_inner
+        self._padded_feature = feature.ravel()
+        self._padded_threshold = threshold.ravel()
+        self._padded_default_right = ~default_left.ravel()
+        self._leaf_value = leaf_value.ravel()
+
+    def decision_function(self, X) -> np.ndarray:
+        """Log odds of the positive (bad credit) class"""
+        X = to_matrix(X, self.feature_names).astype(np.float32)
+        has_missing = bool(np.isnan(X).any())
+        margin = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.block_rows):
+            block = X[start:start + self.block_rows]
+            margin[start:start + block.shape[0]] = self._block_margin(block, has_missing)
+        return margin + self.bias
+
+    def _block_margin(self, X: np.ndarray, has_missing: bool) -> np.ndarray:
+        """Sum of the leaf values for a block of rows"""
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        position = np.zeros((X.shape[0], len(self.roots)), dtype=np.intp)
+        for _ in range(self.max_depth):
+            node = self._tree_offsets + position
+            x = flat.take(row_offsets + self._padded_feature.take(node))
+            go_right = x >= self._padded_threshold.take(node)
+            if has_missing:
+                go_right = np.where(np.isnan(x), self._padded_default_right.take(node), go_right)
+            position = 2 * position + 1 + go_right
+        return self._leaf_value.take(self._leaf_offsets + position).sum(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities with the same (n_samples, 2) layout as sklearn"""
+        positive = _sigmoid(self.decision_function(X))
+        return np.column_stack([1.0 - positive, positive])
+
+    def score_one(self, x: Sequence[float]) -> float:
+        """Probability of the positive class for one row in training column order"""
+        return float(_sigmoid(self.decision_function(np.asarray(x).reshape(1, -1)))[0])
+
+    def to_arrays(self) -> dict:
+        """Arrays to persist with save_scorer"""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "default_left": self.default_left,
+            "value": self.value,
+            "roots": self.roots,
+            "max_depth": np.array([self.max_depth]),
+            "bias": np.array([self.bias]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, feature_names: Sequence[str]) -> "TreeEnsembleScorer":
+        """Inverse of to_arrays"""
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            default_left=arrays["default_left"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=int(arrays["max_depth"][0]),
+            bias=float(arrays["bias"][0]),
+            feature_names=feature_names,
+        )
+
+
+_SCORERS = {
+    LinearScorer.kind: LinearScorer,
+    TreeEnsembleScorer.kind: TreeEnsembleScorer,
+}
+
+
+def _tree_depth(left: List[int], right: List[int]) -> int:
+    """Depth of one XGBoost tree in the JSON node layout (leaf children are -1)"""
+    depth = 0
+    level = [0]
+    while level:
+        level = [
+            child for node in level for child in (left[node], right[node]) if child != -1
+        ]
+        depth += 1 if level else 0
+    return depth
+
+
+def _export_linear(model: Any, feature_names: Sequence[str]) -> LinearScorer:
+    coef = np.asarray(model.coef_)
+    if coef.ndim == 2 and coef.shape[0] != 1:
+        raise ValueError("only binary logistic regression is supported.")
+    return LinearScorer(coef.ravel(), float(np.ravel(model.intercept_)[0]), feature_names)
+
+
+def _export_trees(model: Any, feature_names: Sequence[str]) -> TreeEnsembleScorer:
+    booster = model.get_booster()
+    gbtree = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]
+    if "model" not in gbtree:
+        raise ValueError(f"unsupported booster [{gbtree.get('name')}].")
+    trees = gbtree["model"]["trees"]
+
+    # Same trees as predict_proba uses after early stopping.
+    best_iteration = getattr(model, "best_iteration", None)
+    if best_iteration is not None:
+        trees = trees[:gbtree["model"]["iteration_indptr"][best_iteration + 1]]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    for tree in trees:
+        if any(tree.get("split_type", [])):
+            raise ValueError("categorical splits are not supported.")
+        offset = len(feature)
+        roots.append(offset)
+        tree_left, tree_right = tree["left_children"], tree["right_children"]
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        for node, (lc, rc) in enumerate(zip(tree_left, tree_right)):
+            is_leaf = lc == -1
+            feature.append(0 if is_leaf else tree["split_indices"][node])
+            threshold.append(0.0 if is_leaf else tree["split_conditions"][node])
+            left.append(offset + node if is_leaf else offset + lc)
+            right.append(offset + node if is_leaf else offset + rc)
+            default_left.append(bool(tree["default_left"][node]))
+            value.append(tree["split_conditions"][node] if is_leaf else 0.0)
+
+    scorer = TreeEnsembleScorer(
+        feature, threshold, left, right, default_left, value, roots, max_depth, 0.0, feature_names
+    )
+    # The base score is stored in probability space and its transform depends on
+    # the objective, hence take the bias from the model's own margin output.
+    probe = np.zeros((1, len(feature_names)), dtype=np.float32)
+    margin = float(np.ravel(model.predict(probe, output_margin=True))[0])
+    scorer.bias = margin - float(scorer.decision_function(probe)[0])
+    return scorer
+
+
+def export_scorer(model: Any, feature_names: Optional[Sequence[str]] = None):
+    """Convert a trained model into a NumPy scorer.
+
+    Args:
+        model: fitted binary LogisticRegression (or any linear model with coef_
+            and intercept_), or fitted XGBClassifier with a gbtree booster.
+        feature_names: Training column order. Defaults to model.feature_names_in_,
+            which sklearn and XGBoost set when fitted on a DataFrame.
+
+    Returns: LinearScorer or TreeEnsembleScorer
+    """
+    if feature_names is None:
+        feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        raise ValueError("feature_names is required when the model was not fitted on a DataFrame.")
+    feature_names = [str(name) for name in feature_names]
+
+    if hasattr(model, "get_booster"):
+        return _export_trees(model, feature_names)
+    if hasattr(model, "coef_"):
+        return _export_linear(model, feature_names)
+    raise ValueError(f"unsupported model type [{type(model).__name__}].")
+
+
+def save_scorer(scorer, path: str):
+    """Save the scorer as an .npz file"""
+    np.savez(
+        path,
+        kind=np.array(scorer.kind),
+        feature_names=np.array(scorer.feature_names),
+        **scorer.to_arrays()
+    )
+
+
+def load_scorer(path: str):
+    """Load a scorer saved by save_scorer"""
+    with np.load(path, allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+    scorer_class = _SCORERS[str(arrays.pop("kind"))]
+    feature_names = [str(name) for name in arrays.pop("feature_names")]
+    return scorer_class.from_arrays(arrays, feature_names)
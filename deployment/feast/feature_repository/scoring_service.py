@@ -0,0 +1,297 @@
+"""Online scoring service module.
+
+Asyncio HTTP service that scores applicants by entity_id. Concurrent requests are
+micro-batched: requests arriving within max_wait_ms (or until max_batch_size
+entities) are merged, the customer_credit_risk_feature_service features of the
+whole batch are fetched with a single get_online_features call, and the batch is
+scored in one vectorised call of a scorer exported by scorer.export_scorer().
+
+Export the model from the notebook first, e.g.
+    save_scorer(export_scorer(best_logistic_model), "<feature_repository>/data/model.npz")
+
+Run from the feature repository (feature_store.yaml with the SQLite online store):
+    python scoring_service.py --model data/model.npz --model-version 1.0 --port 6570
+
+Request:
+    curl -X POST http://localhost:6570/score -d '{"entity_ids": [1, 2]}'
+"""
+import argparse
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from feast import FeatureStore
+from feature_logger import FeatureLogWriter
+from online_cache import OnlineFeatureCache
+from store_provider import get_feature_store
+from scorer import load_scorer
+
+DEFAULT_FEATURE_SERVICE_NAME = "customer_credit_risk_feature_service"
+DEFAULT_JOIN_KEY = "entity_id"
+
+
+class BatchScorer:
+    """Micro-batches concurrent scoring requests.
+
+    Args:
+        store: FeatureStore to read the online features from.
+        feature_service_name: FeatureService with the model features.
+        scorer: scorer from scorer.load_scorer()
+        max_batch_size: Maximum number of entities per feature fetch.
+        max_wait_ms: Maximum time the first request of a batch waits for others.
+        max_in_flight: Maximum number of batches fetched and scored concurrently.
+        cache: Optional OnlineFeatureCache to read through instead of the store.
+        feature_logger: Optional FeatureLogWriter the served features are logged to.
+    """
+    def __init__(
+            self,
+            store: FeatureStore,
+            scorer: Any,
+            feature_service_name: str = DEFAULT_FEATURE_SERVICE_NAME,
+            max_batch_size: int = 256,
+            max_wait_ms: float = 2.0,
+            max_in_flight: int = 4,
+            cache: Optional[OnlineFeatureCache] = None,
+            feature_logger: Optional[FeatureLogWriter] = None,
+    ):
+        self.store = store
+        self.scorer = scorer
+        self.feature_service = store.get_feature_service(feature_service_name)
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.feature_logger = feature_logger
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks.
+        self._dispatches: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_requests = 0
+        self.batched_entities = 0
+
+    def _score_batch(self, entity_ids: List[Any]) -> np.ndarray:
+        """Fetch features and score one batch. Runs in the executor thread."""
+        if self.cache is not None:
+            features = self.cache.get_online_features(entity_ids)
+        else:
+            features = self.store.get_online_features(
+                features=self.feature_service,
+                entity_rows=[{DEFAULT_JOIN_KEY: entity_id} for entity_id in entity_ids],
+            ).to_dict()
+        if self.feature_logger is not None:
+            self.feature_logger.log(features)
+        # None (unknown entity) becomes NaN.
+        X = np.column_stack([
+            np.array(features[name], dtype=np.float64) for name in self.scorer.feature_names
+        ])
+        scores = self.scorer.predict_proba(X)[:, 1]
+        scores[np.isnan(X).all(axis=1)] = np.nan
+        return scores
+
+    async def _dispatch(self, batch: List[Tuple[List[Any], asyncio.Future]]):
+        """Score one batch and resolve the futures of its requests"""
+        try:
+            entity_ids = list(dict.fromkeys(
+                entity_id for request_ids, _ in batch for entity_id in request_ids
+            ))
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(self._executor, self._score_batch, entity_ids)
+            score_by_id = dict(zip(entity_ids, scores.tolist()))
+            for request_ids, future in batch:
+                if not future.done():
+                    future.set_result([score_by_id[entity_id] for entity_id in request_ids])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.error("Scoring batch failed: %s", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    async def _run(self):
+        """Collect requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[List[Any], asyncio.Future]] = []
+        try:
+            while True:
+                batch = []
+                await self._collect(loop, batch)
+                self.batches += 1
+                self.batched_requests += len(batch)
+                self.batched_entities += sum(len(request_ids) for request_ids, _ in batch)
+                await self._slots.acquire()
+                task = asyncio.create_task(self._dispatch(batch))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+        except asyncio.CancelledError:
+            # Requests collected or queued but not dispatched.
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("the scoring service is stopping."))
+            raise
+
+    async def _collect(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[List[Any], asyncio.Future]]):
+        """Add a request to batch, then more until max_batch_size entities or max_wait_ms"""
+        batch.append(await self._queue.get())
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait_seconds
+        while size < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop, after the dispatched batches are scored"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.gather(*self._dispatches, return_exceptions=True)
+        self._executor.shutdown()
+        if self.feature_logger is not None:
+            self.feature_logger.close()
+
+    async def score(self, entity_ids: Sequence[Any]) -> List[Optional[float]]:
+        """Probability of bad credit per entity, None for unknown entities"""
+        if not entity_ids:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((list(entity_ids), future))
+        scores = await future
+        return [None if math.isnan(score) else score for score in scores]
+
+    def stats(self) -> Dict[str, float]:
+        """Batching metrics"""
+        return {
+            "batches": self.batches,
+            "requests": self.batched_requests,
+            "entities": self.batched_entities,
+            "mean_requests_per_batch":
+                self.batched_requests / self.batches if self.batches else 0.0,
+            "mean_entities_per_batch":
+                self.batched_entities / self.batches if self.batches else 0.0,
+        }
+
+
+class ScoreRequest(BaseModel):
+    """Scoring request body"""
+    entity_ids: List[int]
+
+
+def create_app(batch_scorer: BatchScorer, model_version: str = "") -> FastAPI:
+    """Create the FastAPI application serving batch_scorer"""
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        batch_scorer.start()
+        yield
+        await batch_scorer.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/score")
+    async def score(request: ScoreRequest):
+        start = time.perf_counter()
+        scores = await batch_scorer.score(request.entity_ids)
+        return {
+            "entity_ids": request.entity_ids,
+            "scores": scores,
+            "model_version": model_version,
+            "latency_ms": 1000 * (time.perf_counter() - start),
+        }
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        result = {"batching": batch_scorer.stats()}
+        if batch_scorer.cache is not None:
+            result["cache"] = batch_scorer.cache.stats()
+        if batch_scorer.feature_logger is not None:
+            result["feature_logging"] = batch_scorer.feature_logger.stats()
+        return result
+
+    return app
+
+
+def main():
+    """Run the scoring service"""
+    parser = argparse.ArgumentParser(description="Credit risk online scoring service")
+    parser.add_argument("--model", required=True, help="scorer .npz from scorer.save_scorer()")
+    parser.add_argument("--model-version", required=True, help="model_version of the responses")
+    parser.add_argument("--repo-path", default=".", help="FEAST feature repository path")
+    parser.add_argument("--feature-service", default=DEFAULT_FEATURE_SERVICE_NAME)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6570)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="entities in the online feature cache, 0 disables the cache")
+    parser.add_argument("--log-features", action="store_true",
+                        help="log the served features to the feature service logging destination")
+    args = parser.parse_args()
+
+    store = get_feature_store(args.repo_path)
+    cache = None
+    if args.cache_size > 0:
+        cache = OnlineFeatureCache(
+            store=store,
+            features=store.get_feature_service(args.feature_service),
+            max_entries=args.cache_size,
+        )
+    batch_scorer = BatchScorer(
+        store=store,
+        scorer=load_scorer(args.model),
+        feature_service_name=args.feature_service,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_in_flight=args.max_in_flight,
+        cache=cache,
+        feature_logger=FeatureLogWriter(store, args.feature_service) if args.log_features else None,
+    )
+    uvicorn.run(create_app(batch_scorer, model_version=args.model_version), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,185 @@
+"""Shared FeatureStore accessor module.
+
+FeatureStore(repo_path=".") loads the whole registry when it is constructed. With
+the SQL registry of feature_store.yaml.template, that is a round-trip to PostgreSQL
+and a protobuf parse per object, so a cold worker pays it before its first request.
+
+get_feature_store() returns one FeatureStore per repository per process. Its
+registry is a local file snapshot of the configured registry
+(data/registry_snapshot.pb), so a worker starts from the snapshot left by the
+previous worker. A background thread loads the configured registry, rewrites the
+snapshot atomically and reloads the store's registry cache every refresh_seconds.
+
+The snapshot store is for the read path (get_online_features, get_feature_view,
+...). Use FeatureStore(repo_path) for apply and materialize, as they would write
+to the snapshot instead of the configured registry.
+
+Usage:
+    store = get_feature_store()     # the same store on every call
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Dict,
+    Optional,
+)
+
+import yaml
+
+from feast import FeatureStore
+from feast.repo_config import RepoConfig
+
+DEFAULT_SNAPSHOT_PATH = "data/registry_snapshot.pb"
+DEFAULT_REFRESH_SECONDS = 60.0
+
+_lock = threading.Lock()
+_stores: Dict[str, FeatureStore] = {}
+_refreshers: Dict[str, "RegistrySnapshotRefresher"] = {}
+
+
+def write_registry_snapshot(store: FeatureStore, snapshot_path: str):
+    """Write the cached registry of store to snapshot_path atomically"""
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer, every worker process rewrites the shared snapshot.
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(store.registry.cached_registry_proto.SerializeToString())
+        os.replace(tmp_path, snapshot_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _snapshot_config(repo_path: Path, snapshot_path: Path) -> RepoConfig:
+    """feature_store.yaml of repo_path with the registry replaced by the snapshot file"""
+    with open(repo_path / "feature_store.yaml", "r", encoding="utf-8") as file:
+        raw_config = yaml.safe_load(os.path.expandvars(file.read()))
+    # A 0 ttl never expires the cache, the refresher reloads it.
+    raw_config["registry"] = {
+        "registry_type": "file", "path": str(snapshot_path), "cache_ttl_seconds": 0
+    }
+    config = RepoConfig(**raw_config)
+    config.repo_path = repo_path
+    return config
+
+
+class RegistrySnapshotRefresher:
+    """Background thread keeping the snapshot and the snapshot store's registry fresh.
+
+    Args:
+        repo_path: FEAST feature repository path.
+        snapshot_path: registry snapshot file.
+        store: FeatureStore reading the snapshot.
+        refresh_seconds: refresh interval.
+        source: FeatureStore on the configured registry, created in the thread by default.
+            A given source was just loaded, hence the first refresh waits refresh_seconds.
+    """
+    def __init__(
+            self,
+            repo_path: str,
+            snapshot_path: str,
+            store: FeatureStore,
+            refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+            source: Optional[FeatureStore] = None,
+    ):
+        self.repo_path = repo_path
+        self.snapshot_path = snapshot_path
+        self.store = store
+        self.refresh_seconds = refresh_seconds
+        self.source = source
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_seconds = 0.0
+        self._wait_first = source is not None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="registry-snapshot-refresher", daemon=True
+        )
+
+    def refresh(self):
+        """Load the configured registry, rewrite the snapshot and reload the store"""
+        start = time.perf_counter()
+        if self.source is None:
+            self.source = FeatureStore(repo_path=self.repo_path)
+        else:
+            self.source.refresh_registry()
+        write_registry_snapshot(self.source, self.snapshot_path)
+        self.store.refresh_registry()
+        self.refreshes += 1
+        self.last_refresh_seconds = time.perf_counter() - start
+
+    def _run(self):
+        if self._wait_first:
+            self._stop.wait(self.refresh_seconds)
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Keep serving from the current snapshot.
+                self.failures += 1
+                logging.error("Registry snapshot refresh failed: %s", e)
+            self._stop.wait(self.refresh_seconds)
+
+    def start(self):
+        """Start refreshing in the background"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def get_feature_store(
+        repo_path: str = ".",
+        snapshot_path: Optional[str] = None,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+) -> FeatureStore:
+    """Process-wide FeatureStore of repo_path backed by a registry snapshot.
+
+    Args:
+        repo_path: FEAST feature repository path.
+        snapshot_path: Registry snapshot file, data/registry_snapshot.pb in the repository
+            by default.
+        refresh_seconds: Background refresh interval of the snapshot.
+
+    Returns: the same FeatureStore for every call with the same repo_path
+    """
+    repo_path = Path(repo_path).resolve()
+    key = str(repo_path)
+    with _lock:
+        store = _stores.get(key)
+        if store is not None:
+            return store
+
+        snapshot_path = Path(snapshot_path) if snapshot_path else repo_path / DEFAULT_SNAPSHOT_PATH
+        source = None
+        if not snapshot_path.exists():
+            # Cold start: the first worker creates the snapshot.
+            logging.info("No registry snapshot [%s], loading the registry", snapshot_path)
+            source = FeatureStore(repo_path=key)
+            write_registry_snapshot(source, str(snapshot_path))
+
+        store = FeatureStore(repo_path=key, config=_snapshot_config(repo_path, snapshot_path))
+        refresher = RegistrySnapshotRefresher(
+            key, str(snapshot_path), store, refresh_seconds, source=source
+        )
+        refresher.start()
+        _stores[key] = store
+        _refreshers[key] = refresher
+        return store
+
+
+def close_feature_stores():
+    """Stop the background refreshes and forget the shared stores"""
+    with _lock:
+        for refresher in _refreshers.values():
+            refresher.stop()
+        _refreshers.clear()
+        _stores.clear()
@@ -0,0 +1,217 @@
+# test_batch_scoring.py
+import csv
+import os
+import uuid
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+import numpy as np
+import pytest
+from sqlalchemy import (
+    create_engine,
+    text,
+)
+
+from batch_scoring import (
+    CHECKPOINTS_TABLE,
+    BatchScoringJob,
+    predictions_csv,
+    score_chunks,
+)
+from offline_export import default_url
+from scorer import (
+    LinearScorer,
+    save_scorer,
+)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    rng = np.random.default_rng(0)
+    scorer = LinearScorer(rng.normal(size=5), 0.3, [f"feature_{i}" for i in range(5)])
+    path = tmp_path / "scorer.npz"
+    save_scorer(scorer, str(path))
+    return str(path), scorer
+
+
+@pytest.fixture
+def chunks():
+    rng = np.random.default_rng(1)
+    return [
+        (np.arange(start, start + size), rng.integers(0, 2, size=(size, 5)).astype(np.float64))
+        for start, size in ((1, 7), (8, 3), (11, 10), (21, 1))
+    ]
+
+
+class InMemoryJob(BatchScoringJob):
+    """BatchScoringJob with the offline table, the predictions and the checkpoint in a dict"""
+    def __init__(self, database, model_path, *args, fail_at_chunk=None, **kwargs):
+        super().__init__(None, model_path, "v1", "run", *args, **kwargs)
+        self.database = database
+        self.fail_at_chunk = fail_at_chunk
+        self.chunks = 0
+
+    def _create_tables(self):
+        self.database.setdefault("predictions", [])
+
+    def load_checkpoint(self):
+        return self.database.get("checkpoint")
+
+    def _read_chunks(self, after_entity_id):
+        entity_ids, features = self.database["offline"]
+        if after_entity_id is not None:
+            keep = entity_ids > after_entity_id
+            entity_ids, features = entity_ids[keep], features[keep]
+        for start in range(0, len(entity_ids), self.chunk_rows):
+            yield entity_ids[start:start + self.chunk_rows], features[start:start + self.chunk_rows]
+
+    def _write_chunk(self, entity_ids, scores, scored_at, rows, completed=False):
+        if self.chunks == self.fail_at_chunk:
+            raise ConnectionError("killed")
+        self.chunks += 1
+        checkpoint = self.database.get("checkpoint") or {"last_entity_id": None}
+        self.database["predictions"].extend(
+            (entity_id, score, scored_at) for entity_id, score in zip(entity_ids.tolist(), scores.tolist())
+        )
+        self.database["checkpoint"] = {
+            "last_entity_id": int(entity_ids[-1]) if len(entity_ids) else checkpoint["last_entity_id"],
+            "rows": rows,
+            "scored_at": scored_at,
+            "completed": completed,
+        }
+
+
+class TestBatchScoringJob:
+
+    def test_resume_after_failure(self, model_path):
+        """A run killed mid-way resumes after the last chunk, without duplicates"""
+        path, scorer = model_path
+        rng = np.random.default_rng(2)
+        entity_ids = np.arange(1, 24)
+        features = rng.integers(0, 2, size=(len(entity_ids), 5)).astype(np.float64)
+        database = {"offline": (entity_ids, features)}
+
+        with pytest.raises(ConnectionError):
+            InMemoryJob(database, path, chunk_rows=5, fail_at_chunk=2).run()
+        assert database["checkpoint"]["last_entity_id"] == 10
+        assert not database["checkpoint"]["completed"]
+        scored_at = database["checkpoint"]["scored_at"]
+
+        report = InMemoryJob(database, path, chunk_rows=5).run()
+        assert report["rows"] == 13
+        assert report["total_rows"] == 23
+        assert database["checkpoint"]["completed"]
+        predictions = database["predictions"]
+        assert [entity_id for entity_id, _, _ in predictions] == entity_ids.tolist()
+        assert {at for _, _, at in predictions} == {scored_at}
+        np.testing.assert_allclose(
+            [score for _, score, _ in predictions], scorer.predict_proba(features)[:, 1]
+        )
+
+    def test_completed_run_is_not_rescored(self, model_path):
+        path, _ = model_path
+        database = {"offline": (np.arange(1, 4), np.zeros((3, 5)))}
+        InMemoryJob(database, path, chunk_rows=5).run()
+        report = InMemoryJob(database, path, chunk_rows=5).run()
+        assert report["rows"] == 0
+        assert report["total_rows"] == 3
+        assert len(database["predictions"]) == 3
+
+
+class KilledJob(BatchScoringJob):
+    """BatchScoringJob whose connection is lost before writing chunk fail_at_chunk"""
+    def __init__(self, *args, fail_at_chunk, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_at_chunk = fail_at_chunk
+        self.chunks = 0
+
+    def _write_chunk(self, *args, **kwargs):
+        if self.chunks == self.fail_at_chunk:
+            raise ConnectionError("killed")
+        self.chunks += 1
+        super()._write_chunk(*args, **kwargs)
+
+
+@pytest.mark.skipif(not os.environ.get("POSTGRES_PASSWORD"),
+                    reason="needs POSTGRES_PASSWORD and the PG_OFFLINE_* variables of deploy.sh")
+def test_resume_after_failure_on_postgres(model_path):
+    """The keyset reads, COPY and checkpoint upsert resume a killed run without duplicates nor gaps"""
+    path, scorer = model_path
+    suffix = uuid.uuid4().hex[:8]
+    table, predictions_table = f"credit.test_offline_{suffix}", f"credit.test_predictions_{suffix}"
+    run_id = f"test@{suffix}"
+    feature_names = scorer.feature_names
+    rng = np.random.default_rng(3)
+    # Every entity has an older row, which DISTINCT ON must skip, and the ids have gaps.
+    entity_ids = np.arange(1, 48, 2)
+    latest = rng.integers(0, 2, size=(len(entity_ids), len(feature_names))).astype(np.float64)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"entity_id": int(entity_id), "event_timestamp": timestamp, **dict(zip(feature_names, values))}
+        for entity_id, latest_values in zip(entity_ids, latest)
+        for timestamp, values in ((now - timedelta(days=1), 1 - latest_values), (now, latest_values))
+    ]
+    columns = ", ".join(f'"{name}" DOUBLE PRECISION' for name in feature_names)
+    engine = create_engine(default_url())
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE SCHEMA IF NOT EXISTS credit"))
+            conn.execute(text(
+                f"CREATE TABLE {table} (entity_id BIGINT NOT NULL, event_timestamp TIMESTAMPTZ NOT NULL, {columns})"
+            ))
+            conn.execute(
+                text(f"INSERT INTO {table} VALUES (:entity_id, :event_timestamp, "
+                     + ", ".join(f":{name}" for name in feature_names) + ")"),
+                rows,
+            )
+
+        with pytest.raises(ConnectionError):
+            KilledJob(engine, path, "v1", run_id, table, predictions_table, chunk_rows=5,
+                      fail_at_chunk=1).run()
+        checkpoint = BatchScoringJob(engine, path, "v1", run_id, table, predictions_table).load_checkpoint()
+        assert (checkpoint["last_entity_id"], checkpoint["rows"], checkpoint["completed"]) == (9, 5, False)
+
+        report = BatchScoringJob(engine, path, "v1", run_id, table, predictions_table, chunk_rows=5).run()
+        assert (report["rows"], report["total_rows"]) == (len(entity_ids) - 5, len(entity_ids))
+        with engine.connect() as conn:
+            predictions = conn.execute(text(
+                f"SELECT entity_id, score, scored_at FROM {predictions_table} ORDER BY entity_id"
+            )).fetchall()
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {predictions_table}"))
+            conn.execute(text(f"DELETE FROM {CHECKPOINTS_TABLE} WHERE run_id = :run_id"), {"run_id": run_id})
+        engine.dispose()
+
+    assert [row[0] for row in predictions] == entity_ids.tolist()
+    assert {row[2] for row in predictions} == {checkpoint["scored_at"]}
+    np.testing.assert_allclose([row[1] for row in predictions], scorer.predict_proba(latest)[:, 1])
+
+
+class TestScoreChunks:
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_scores_in_chunk_order(self, model_path, chunks, workers):
+        path, scorer = model_path
+        results = list(score_chunks(iter(chunks), path, workers=workers, max_in_flight=2))
+
+        assert [entity_ids.tolist() for entity_ids, _ in results] == [ids.tolist() for ids, _ in chunks]
+        for (_, scores), (_, features) in zip(results, chunks):
+            np.testing.assert_allclose(scores, scorer.predict_proba(features)[:, 1])
+
+
+class TestPredictionsCsv:
+
+    def test_rows(self):
+        scored_at = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        buffer = predictions_csv(np.array([1, 2]), np.array([0.25, 1 / 3]), 'model "a", v1', scored_at)
+        rows = list(csv.reader(buffer))
+
+        assert rows == [
+            ["1", "0.25", 'model "a", v1', "2025-01-02T03:04:05+00:00"],
+            ["2", repr(1 / 3), 'model "a", v1', "2025-01-02T03:04:05+00:00"],
+        ]
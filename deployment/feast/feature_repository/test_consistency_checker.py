@@ -0,0 +1,175 @@
+# test_consistency_checker.py
+import os
+import struct
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from feast import (
+    Entity,
+    FeatureView,
+    Field,
+    FileSource,
+)
+from feast.types import Float32
+
+from sqlalchemy import (
+    create_engine,
+    text,
+)
+
+from consistency_checker import (
+    BASES,
+    MODULUS,
+    ConsistencyChecker,
+    diff_fingerprints,
+    fingerprint,
+    fingerprint_sql,
+    read_online_rows,
+)
+from offline_export import default_url
+
+FEATURES = ["risk", "age", "amount"]
+
+
+def latest_rows(offline_df):
+    return offline_df.sort_values("event_timestamp").drop_duplicates("entity_id", keep="last") \
+        .set_index("entity_id").sort_index()
+
+
+def reference_fingerprint(row):
+    """fingerprint_sql() arithmetic in Python integers"""
+    hashes = []
+    for base in BASES:
+        total = 0
+        for i, value in enumerate(row):
+            bits = int.from_bytes(struct.pack(">f", float("nan") if value is None else value), "big")
+            total += bits % MODULUS * pow(base, i, MODULUS) % MODULUS
+        hashes.append(total % MODULUS)
+    return (hashes[0] << 31) | hashes[1]
+
+
+@pytest.fixture
+def offline_df():
+    """Two rows per entity, the latest is the second"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 2, size=(20, 3)).astype(np.float32), columns=FEATURES)
+    df["entity_id"] = np.repeat(np.arange(1, 11), 2)
+    df["event_timestamp"] = pd.Timestamp("2025-01-01", tz="UTC") + pd.to_timedelta(np.tile([0, 1], 10), unit="h")
+    df.loc[19, "age"] = np.nan
+    return df
+
+
+@pytest.fixture
+def store(tmp_path, offline_df, feature_store):
+    offline_df.to_parquet(tmp_path / "source.parquet")
+
+    customer = Entity(name="customer", join_keys=["entity_id"])
+    feature_view = FeatureView(
+        name="feature_view",
+        source=FileSource(path=str(tmp_path / "source.parquet"), timestamp_field="event_timestamp"),
+        entities=[customer],
+        ttl=timedelta(days=1),
+        schema=[Field(name=name, dtype=Float32) for name in FEATURES],
+    )
+    feature_store.apply([customer, feature_view])
+    feature_store.materialize(pd.Timestamp("2024-12-31", tz="UTC"), pd.Timestamp("2025-01-02", tz="UTC"))
+    return feature_store
+
+
+class InMemoryChecker(ConsistencyChecker):
+    """ConsistencyChecker with the offline table in a DataFrame"""
+    def __init__(self, offline_df, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.latest = latest_rows(offline_df)
+
+    def entity_ranges(self):
+        return [(1, 6), (6, 12)]
+
+    def offline_fingerprints(self, low, high, as_of=None):
+        latest = self.latest.loc[low:high - 1]
+        return latest.index.to_numpy(), fingerprint(latest[self.feature_names].to_numpy())
+
+    def offline_values(self, entity_ids, as_of=None):
+        return {i: self.latest.loc[i, self.feature_names].tolist() for i in entity_ids}
+
+
+class TestFingerprint:
+
+    def test_matches_reference(self):
+        rows = [[0., 1., 0.5], [1., 0., None], [-0., 3.25, 1e-7]]
+        values = np.array([[np.nan if v is None else v for v in row] for row in rows])
+        assert fingerprint(values).tolist() == [reference_fingerprint(row) for row in rows]
+
+    def test_sensitivity(self):
+        fingerprints = fingerprint(np.array([[0., 1.], [1., 0.], [0., np.nan], [0., 1.]]))
+        assert len(set(fingerprints[:3].tolist())) == 3
+        assert fingerprints[0] == fingerprints[3]
+
+
+@pytest.mark.skipif(not os.environ.get("POSTGRES_PASSWORD"),
+                    reason="needs POSTGRES_PASSWORD and the PG_OFFLINE_* variables of deploy.sh")
+def test_fingerprint_sql_on_postgres():
+    """PostgreSQL computes the same fingerprints as fingerprint()"""
+    rows = [
+        [0., 1., 0.5], [1., 0., None], [-0., 3.25, 1e-7], [float("nan"), -1., -0.1],
+        [-2.5, None, float("nan")], [0.1, -123456.789, float("inf")], [None, None, None],
+    ]
+    engine = create_engine(default_url())
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TEMPORARY TABLE fingerprints "
+                "(id INT, risk DOUBLE PRECISION, age DOUBLE PRECISION, amount DOUBLE PRECISION)"
+            ))
+            conn.execute(
+                text("INSERT INTO fingerprints VALUES (:id, :risk, :age, :amount)"),
+                [dict(zip(["id"] + FEATURES, [i] + row)) for i, row in enumerate(rows)],
+            )
+            result = conn.execute(text(
+                f"SELECT {fingerprint_sql(FEATURES)} FROM fingerprints ORDER BY id"
+            )).scalars().all()
+    finally:
+        engine.dispose()
+    values = np.array([[np.nan if v is None else v for v in row] for row in rows])
+    assert result == fingerprint(values).tolist()
+
+
+class TestReadOnlineRows:
+
+    def test_materialised_rows(self, store, tmp_path, offline_df):
+        entity_ids, values = read_online_rows(str(tmp_path / "online_store.db"), "test_feature_view", FEATURES)
+
+        latest = latest_rows(offline_df)
+        np.testing.assert_array_equal(entity_ids, np.arange(1, 11))
+        np.testing.assert_array_equal(values, latest[FEATURES].to_numpy(dtype=np.float32))
+
+
+def test_diff_fingerprints():
+    diff = diff_fingerprints(np.array([1, 2, 3, 4]), np.array([10, 20, 30, 40]),
+                             np.array([2, 3, 4, 5]), np.array([20, 31, 40, 50]))
+    assert {name: ids.tolist() for name, ids in diff.items()} == {
+        "matched": [2, 4], "mismatched": [3], "missing_online": [1], "missing_offline": [5],
+    }
+
+
+class TestConsistencyChecker:
+
+    def test_consistent(self, store, tmp_path, offline_df):
+        report = InMemoryChecker(offline_df, str(tmp_path / "online_store.db"), "test_feature_view", FEATURES).run()
+        assert (report["matched"], report["mismatched"], report["missing_online"]) == (10, 0, 0)
+
+    def test_drilldown(self, store, tmp_path, offline_df):
+        online_amount = float(offline_df.loc[5, "amount"])
+        offline_df.loc[5, "amount"] = 7.
+        offline_df.loc[19, "age"] = 2.
+        offline_df = pd.concat([offline_df, offline_df.tail(1).assign(entity_id=11)])
+        report = InMemoryChecker(offline_df, str(tmp_path / "online_store.db"), "test_feature_view", FEATURES).run()
+
+        assert (report["matched"], report["mismatched"], report["missing_online"]) == (8, 2, 1)
+        assert report["missing_online_sample"] == [11]
+        first, second = report["mismatches"]
+        assert first == {"entity_id": 3, "feature": "amount", "offline": 7., "online": online_amount}
+        assert (second["entity_id"], second["feature"], second["offline"]) == (10, "age", 2.)
+        assert np.isnan(second["online"])
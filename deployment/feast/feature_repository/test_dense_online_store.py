@@ -0,0 +1,169 @@
+# test_dense_online_store.py
+import os
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from dense_online_store import (
+    BASE,
+    CURRENT,
+    DenseArrayOnlineStore,
+)
+from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+
+EVENT_TS = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def entity_key(entity_id):
+    return EntityKeyProto(join_keys=["entity_id"], entity_values=[ValueProto(int64_val=entity_id)])
+
+
+def row(entity_id, age, amount, event_ts=EVENT_TS):
+    return (
+        entity_key(entity_id),
+        {"age": ValueProto(float_val=age), "amount": ValueProto(float_val=amount)},
+        event_ts,
+        None,
+    )
+
+
+@pytest.fixture
+def config(tmp_path):
+    return SimpleNamespace(
+        online_store=SimpleNamespace(path="online"), repo_path=tmp_path, project="test"
+    )
+
+
+@pytest.fixture
+def table():
+    return SimpleNamespace(
+        name="feature_view", features=[SimpleNamespace(name="age"), SimpleNamespace(name="amount")]
+    )
+
+
+@pytest.fixture
+def store(config, table):
+    store = DenseArrayOnlineStore()
+    store.online_write_batch(config, table, [row(1, 25.0, 1000.0), row(3, 40.0, 5000.0)], None)
+    return store
+
+
+class TestDenseArrayOnlineStore:
+
+    def test_online_read(self, store, config, table):
+        """Present entities return their values, others (None, None)"""
+        result = store.online_read(config, table, [entity_key(3), entity_key(2), entity_key(1)])
+        assert result[0] == (EVENT_TS, {
+            "age": ValueProto(float_val=40.0), "amount": ValueProto(float_val=5000.0)
+        })
+        assert result[1] == (None, None)
+        assert result[2][1]["age"].float_val == 25.0
+
+    def test_out_of_range_entity(self, store, config, table):
+        assert store.online_read(config, table, [entity_key(10_000)]) == [(None, None)]
+
+    def test_requested_features(self, store, config, table):
+        _, values = store.online_read(config, table, [entity_key(1)], ["amount"])[0]
+        assert list(values) == ["amount"]
+
+    def test_read_arrays(self, store, config, table):
+        values, present = store.read_arrays(config, table, [1, 2, 3])
+        assert present.tolist() == [True, False, True]
+        assert values[0].tolist() == [25.0, 1000.0]
+        assert np.isnan(values[1]).all()
+
+    def test_newer_event_wins(self, store, config, table):
+        """An older event does not overwrite a newer one"""
+        store.online_write_batch(config, table, [
+            row(1, 30.0, 2000.0, EVENT_TS + timedelta(hours=1)),
+            row(3, 99.0, 9999.0, EVENT_TS - timedelta(hours=1)),
+        ], None)
+        values, _ = store.read_arrays(config, table, [1, 3])
+        assert values.tolist() == [[30.0, 2000.0], [40.0, 5000.0]]
+
+    def test_write_grows_capacity(self, store, config, table):
+        store.online_write_batch(config, table, [row(100, 50.0, 100.0)], None)
+        values, present = store.read_arrays(config, table, [1, 100])
+        assert present.all()
+        assert values[1].tolist() == [50.0, 100.0]
+
+    def test_other_reader_sees_swap(self, store, config, table):
+        """A reader in another instance (process) re-maps after a swap"""
+        reader = DenseArrayOnlineStore()
+        assert reader.read_arrays(config, table, [1])[0][0, 0] == 25.0
+        store.online_write_batch(
+            config, table, [row(1, 26.0, 1000.0, EVENT_TS + timedelta(days=1))], None
+        )
+        assert reader.read_arrays(config, table, [1])[0][0, 0] == 26.0
+
+    def test_old_generations_are_removed(self, store, config, table):
+        """Only the current and the previous generation are kept"""
+        for day in range(1, 4):
+            store.online_write_batch(
+                config, table, [row(1, 20.0 + day, 1.0, EVENT_TS + timedelta(days=day))], None
+            )
+        table_dir = DenseArrayOnlineStore._table_dir(config, table)
+        generations = [p for p in os.listdir(table_dir) if p.startswith("gen-")]
+        assert len(generations) == 2
+        assert os.readlink(table_dir / CURRENT) == max(generations)
+
+    def test_write_restages_previous_generation(self, store, config, table):
+        """A write reuses the generation swapped out by the previous one in place"""
+        table_dir = DenseArrayOnlineStore._table_dir(config, table)
+        first = os.readlink(table_dir / CURRENT)
+        inode = os.stat(table_dir / first / "values.npy").st_ino
+        store.online_write_batch(
+            config, table, [row(2, 30.0, 3000.0, EVENT_TS + timedelta(days=1))], None
+        )
+        store.online_write_batch(
+            config, table, [row(3, 41.0, 5001.0, EVENT_TS + timedelta(days=2))], None
+        )
+        third = os.readlink(table_dir / CURRENT)
+        assert os.stat(table_dir / third / "values.npy").st_ino == inode
+        # The restaged generation has the rows of both writes since it was current.
+        values, present = DenseArrayOnlineStore().read_arrays(config, table, [1, 2, 3])
+        assert present.all()
+        assert values.tolist() == [[25.0, 1000.0], [30.0, 3000.0], [41.0, 5001.0]]
+
+    def test_incomplete_previous_generation_is_not_restaged(self, store, config, table):
+        """A generation without base.json, e.g. after a crash, is replaced by a copy"""
+        table_dir = DenseArrayOnlineStore._table_dir(config, table)
+        first = os.readlink(table_dir / CURRENT)
+        store.online_write_batch(
+            config, table, [row(2, 30.0, 3000.0, EVENT_TS + timedelta(days=1))], None
+        )
+        os.remove(table_dir / first / BASE)
+        store.online_write_batch(
+            config, table, [row(3, 41.0, 5001.0, EVENT_TS + timedelta(days=2))], None
+        )
+        assert not (table_dir / first).exists()
+        values, _ = store.read_arrays(config, table, [1, 2, 3])
+        assert values.tolist() == [[25.0, 1000.0], [30.0, 3000.0], [41.0, 5001.0]]
+
+    def test_reader_of_restaged_generation(self, store, config, table):
+        """A reader holding a generation that was restaged re-maps the current one"""
+        reader = DenseArrayOnlineStore()
+        assert reader.read_arrays(config, table, [1])[0][0, 0] == 25.0
+        for day in range(1, 3):
+            store.online_write_batch(
+                config, table, [row(1, 25.0 + day, 1000.0, EVENT_TS + timedelta(days=day))], None
+            )
+        assert reader.read_arrays(config, table, [1])[0][0, 0] == 27.0
+
+    def test_teardown(self, store, config, table):
+        store.teardown(config, [table], [])
+        assert store.online_read(config, table, [entity_key(1)]) == [(None, None)]
+
+    def test_string_key_rejected(self, config, table):
+        key = EntityKeyProto(join_keys=["entity_id"], entity_values=[ValueProto(string_val="a")])
+        with pytest.raises(ValueError):
+            DenseArrayOnlineStore().online_write_batch(
+                config, table, [(key, {}, EVENT_TS, None)], None
+            )
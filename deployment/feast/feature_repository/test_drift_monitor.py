@@ -0,0 +1,126 @@
+# test_drift_monitor.py
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from drift_monitor import (
+    SCORE,
+    DriftMonitor,
+    bin_counts,
+    compute_cuts,
+    psi_ks,
+)
+from scorer import LinearScorer
+
+FEATURES = ["age", "job_1"]
+
+
+@pytest.fixture
+def baseline():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"age": rng.normal(40, 10, 5000), "job_1": rng.integers(0, 2, 5000).astype(float)})
+
+
+@pytest.fixture
+def scorer():
+    return LinearScorer(np.array([0.05, -1.]), -2., FEATURES)
+
+
+def write_log(path, df, day):
+    """Feature log file in the layout of feature_logger.py"""
+    columns = {"entity_id": pa.array(np.arange(len(df)))}
+    for name in FEATURES:
+        values = df[name].to_numpy()
+        columns[f"feature_view__{name}"] = pa.array(values, type=pa.float32(), mask=np.isnan(values))
+        columns[f"feature_view__{name}__timestamp"] = pa.nulls(len(df), pa.timestamp("us", tz="UTC"))
+        columns[f"feature_view__{name}__status"] = pa.array(np.ones(len(df), dtype=np.int32))
+    columns["__log_timestamp"] = pa.array([datetime.datetime(2025, 1, 1)] * len(df), pa.timestamp("us", tz="UTC"))
+    columns["__log_date"] = pa.array(day if isinstance(day, list) else [day] * len(df), pa.date32())
+    columns["__request_id"] = pa.array(["request"] * len(df))
+    pq.write_table(pa.table(columns), path, row_group_size=1000)
+
+
+class TestHistograms:
+
+    def test_bin_counts(self):
+        cuts = compute_cuts(np.arange(8.), 4)
+        assert cuts.tolist() == [1.75, 3.5, 5.25]
+        assert bin_counts(np.array([-1., 1.75, 2., 6., 9., np.nan]), cuts).tolist() == [1, 2, 0, 2, 1]
+
+    def test_distinct_value_cuts(self):
+        """One bin per value, even for a rare value under every quantile"""
+        cuts = compute_cuts(np.array([0.] * 95 + [1.] * 5 + [np.nan]), 10)
+        assert cuts.tolist() == [1.]
+        assert bin_counts(np.array([-1., 0., 0.5, 1., 2., np.nan]), cuts).tolist() == [3, 2, 1]
+
+    def test_psi_ks(self):
+        statistics = psi_ks([[50, 50], [50, 50, 0], [50, 50, 0]], [[50, 50], [10, 90, 0], [25, 25, 50]])
+        assert statistics["psi"][0] == pytest.approx(0.)
+        assert statistics["psi"][1] == pytest.approx(0.4 * np.log(5) + 0.4 * np.log(1.8))
+        assert statistics["psi"][2] > 2.
+        # Missing values change PSI but not the distribution of the values.
+        assert statistics["ks"].tolist() == pytest.approx([0., 0.4, 0.])
+
+
+class TestDriftMonitor:
+
+    def test_incremental_update(self, tmp_path, baseline, scorer):
+        state_path = tmp_path / "drift" / "state.json"
+        monitor = DriftMonitor.create(str(state_path), baseline, FEATURES, scorer)
+        write_log(tmp_path / "feature_log-1.parquet", baseline.iloc[:3000], datetime.date(2025, 1, 1))
+        assert monitor.update(str(tmp_path), batch_rows=700)["rows"] == 3000
+
+        write_log(tmp_path / "feature_log-2.parquet", baseline.iloc[3000:], datetime.date(2025, 1, 2))
+        monitor = DriftMonitor.load(str(state_path), scorer)
+        assert monitor.update(str(tmp_path))["files"] == 1
+        assert monitor.update(str(tmp_path))["files"] == 0
+
+        report = monitor.report()
+        assert report["days"] == ["2025-01-01", "2025-01-02"]
+        assert report["rows"] == 5000
+        assert set(report["features"]) == {*FEATURES, SCORE}
+        for feature in report["features"].values():
+            assert feature["psi"] == pytest.approx(0., abs=1e-12)
+            assert feature["ks"] == pytest.approx(0.)
+        assert monitor.report(["2025-01-02"])["rows"] == 2000
+
+    def test_drift(self, tmp_path, baseline, scorer):
+        monitor = DriftMonitor.create(str(tmp_path / "state.json"), baseline, FEATURES, scorer)
+        shifted = baseline.assign(age=baseline["age"] + 10)
+        shifted.loc[:99, "job_1"] = np.nan
+        days = [datetime.date(2025, 1, 1)] * 2500 + [datetime.date(2025, 1, 2)] * 2500
+        write_log(tmp_path / "feature_log-1.parquet", shifted, days)
+        monitor.update(str(tmp_path))
+
+        report = monitor.report()
+        assert report["drifted"] == ["age", SCORE]
+        assert report["features"]["age"]["ks"] > 0.3
+        assert monitor.counts()["job_1"][-1] == 100
+        assert monitor.counts(["2025-01-01"])["age"].sum() == 2500
+
+    def test_rare_category_drift(self, tmp_path, baseline, scorer):
+        """All the logs in a category of 5% of the baseline"""
+        baseline["job_1"] = (np.arange(len(baseline)) % 20 == 0).astype(float)
+        monitor = DriftMonitor.create(str(tmp_path / "state.json"), baseline, FEATURES, scorer)
+        write_log(tmp_path / "feature_log-1.parquet", baseline.assign(job_1=1.), datetime.date(2025, 1, 1))
+        monitor.update(str(tmp_path))
+
+        job = monitor.report()["features"]["job_1"]
+        assert job["psi"] > 2.
+        assert job["ks"] == pytest.approx(0.95)
+
+    def test_failed_file_is_not_counted(self, tmp_path, baseline, scorer):
+        monitor = DriftMonitor.create(str(tmp_path / "state.json"), baseline, FEATURES, scorer)
+        write_log(tmp_path / "feature_log-1.parquet", baseline, datetime.date(2025, 1, 1))
+        pq.write_table(pa.table({"__log_date": pa.array([datetime.date(2025, 1, 1)]),
+                                 "feature_view__age": pa.array([1.])}), tmp_path / "feature_log-2.parquet")
+        with pytest.raises(ValueError, match="job_1"):
+            monitor.update(str(tmp_path))
+
+        monitor = DriftMonitor.load(str(tmp_path / "state.json"), scorer)
+        assert list(monitor.state["files"]) == ["feature_log-1.parquet"]
+        assert monitor.report()["rows"] == 5000
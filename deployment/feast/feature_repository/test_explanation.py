@@ -0,0 +1,97 @@
+# test_explanation.py
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from explanation import (
+    BIAS,
+    contributions,
+    explain,
+    feature_groups,
+    top_reasons,
+)
+from packed_encoding import CATEGORY_GROUPS
+from scorer import (
+    LinearScorer,
+    export_scorer,
+)
+
+GROUPS = {group: CATEGORY_GROUPS[group] for group in ["purpose", "housing", "job"]}
+FEATURES = [column for columns in GROUPS.values() for column in columns]
+
+
+@pytest.fixture
+def one_hot_data():
+    """One category per group, bad credit depending on purpose and housing"""
+    rng = np.random.default_rng(0)
+    values = np.zeros((500, len(FEATURES)))
+    for columns in GROUPS.values():
+        active = [FEATURES.index(column) for column in columns]
+        values[np.arange(500), np.take(active, rng.integers(0, len(columns), 500))] = 1.
+    X = pd.DataFrame(values, index=np.arange(100, 600), columns=FEATURES)
+    logits = 2 * X["purpose_car"] + 1.5 * X["housing_rent"] - X["job_2"] - 0.5
+    y = (rng.random(len(X)) < 1 / (1 + np.exp(-logits))).astype(int)
+    return X, y
+
+
+class TestContributions:
+
+    def test_linear(self, one_hot_data):
+        X, y = one_hot_data
+        model = LogisticRegression().fit(X, y)
+        contribs, names = contributions(model, X)
+
+        assert names == FEATURES + [BIAS]
+        np.testing.assert_allclose(contribs[:, :-1], X.to_numpy() * model.coef_)
+        np.testing.assert_allclose(contribs.sum(axis=1), model.decision_function(X))
+        np.testing.assert_allclose(contributions(export_scorer(model), X)[0], contribs)
+
+    def test_xgboost(self, one_hot_data):
+        X, y = one_hot_data
+        model = XGBClassifier(n_estimators=20, max_depth=3).fit(X, y)
+        contribs, names = contributions(model, X)
+
+        assert names == FEATURES + [BIAS]
+        np.testing.assert_allclose(contribs.sum(axis=1), model.predict(X, output_margin=True), atol=1e-5)
+
+    def test_tree_scorer_is_rejected(self, one_hot_data):
+        X, y = one_hot_data
+        scorer = export_scorer(XGBClassifier(n_estimators=2).fit(X, y))
+        with pytest.raises(ValueError, match="XGBClassifier"):
+            contributions(scorer, X)
+
+
+def test_feature_groups():
+    groups, indicator = feature_groups(["housing_own", "age", "housing_rent", "purpose_car", BIAS])
+    assert groups == ["housing", "age", "purpose"]
+    np.testing.assert_array_equal(indicator, [[1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 0, 1], [0, 0, 0]])
+
+
+class TestTopReasons:
+
+    def test_reasons(self):
+        X = pd.DataFrame([[1., 0., 0., 1.], [0., 1., 0., 0.]], index=[7, 8],
+                         columns=["purpose_car", "purpose_repairs", "housing_own", "housing_rent"])
+        scorer = LinearScorer(np.array([2., -1., 0.5, 1.]), -1., X.columns)
+        reasons = top_reasons(X, *contributions(scorer, X), k=2)
+
+        assert reasons.index.tolist() == [7, 8]
+        assert reasons.loc[7].tolist() == ["purpose", "purpose_car", 2., "housing", "housing_rent", 1.]
+        assert reasons.loc[8, ["reason_1", "category_1", "reason_2", "category_2"]].tolist() == [None] * 4
+        assert reasons.loc[8, ["contribution_1", "contribution_2"]].isna().all()
+
+    def test_explain_batch(self, one_hot_data):
+        X, y = one_hot_data
+        model = LogisticRegression().fit(X, y)
+        reasons = explain(model, X, k=3)
+
+        car = X["purpose_car"] == 1
+        assert (reasons.loc[car, "reason_1"] == "purpose").all()
+        assert (reasons.loc[car, "category_1"] == "purpose_car").all()
+        contribution = reasons[["contribution_1", "contribution_2", "contribution_3"]].to_numpy()
+        assert (np.diff(contribution, axis=1)[~np.isnan(contribution[:, 1:])] <= 0).all()
+        for group, columns in GROUPS.items():
+            mask = reasons["reason_2"] == group
+            assert reasons.loc[mask, "category_2"].isin(columns).all()
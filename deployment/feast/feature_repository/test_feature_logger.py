@@ -0,0 +1,97 @@
+# test_feature_logger.py
+from datetime import timedelta
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from feast import (
+    Entity,
+    FeatureService,
+    FeatureView,
+    Field,
+    FileSource,
+)
+from feast.feature_logging import (
+    LoggingConfig,
+    REQUEST_ID_FIELD,
+)
+from feast.infra.offline_stores.file_source import FileLoggingDestination
+from feast.types import Float32
+from feature_logger import FeatureLogWriter
+
+
+@pytest.fixture
+def store(tmp_path, feature_store):
+    pd.DataFrame({
+        "entity_id": [1], "age": [30.0], "amount": [1000.0],
+        "event_timestamp": [pd.Timestamp("2025-01-01", tz="UTC")],
+    }).to_parquet(tmp_path / "source.parquet")
+
+    customer = Entity(name="customer", join_keys=["entity_id"])
+    feature_view = FeatureView(
+        name="feature_view",
+        source=FileSource(path=str(tmp_path / "source.parquet"), timestamp_field="event_timestamp"),
+        entities=[customer],
+        ttl=timedelta(days=1),
+        schema=[Field(name="age", dtype=Float32), Field(name="amount", dtype=Float32)],
+    )
+    service = FeatureService(
+        name="service", features=[feature_view],
+        logging_config=LoggingConfig(destination=FileLoggingDestination(path="logs")),
+    )
+    feature_store.apply([customer, feature_view, service])
+    return feature_store
+
+
+def response(entity_ids):
+    """OnlineResponse.to_dict() layout, odd entities are unknown"""
+    return {
+        "entity_id": list(entity_ids),
+        "age": [None if i % 2 else float(i) for i in entity_ids],
+        "amount": [None if i % 2 else 100.0 * i for i in entity_ids],
+    }
+
+
+def writer(store, **kwargs):
+    return FeatureLogWriter(store, feature_service_name="service", **kwargs)
+
+
+class TestFeatureLogWriter:
+
+    def test_close_flushes(self, store, tmp_path):
+        with writer(store, flush_seconds=60) as feature_logger:
+            feature_logger.log(response([1, 2]), request_id="a")
+            feature_logger.log(response([4]), request_id="b")
+
+        table = pq.read_table(tmp_path / "logs")
+        assert table.schema.names == feature_logger.schema.names
+        assert table.column("entity_id").to_pylist() == [1, 2, 4]
+        assert table.column("feature_view__age").to_pylist() == [None, 2.0, 4.0]
+        assert table.column("feature_view__age__status").to_pylist() == [3, 1, 1]
+        assert table.column(REQUEST_ID_FIELD).to_pylist() == ["a", "a", "b"]
+        assert not list((tmp_path / "logs").glob(".*"))
+
+    def test_rotation(self, store, tmp_path):
+        with writer(store, row_group_rows=2, max_file_rows=4) as feature_logger:
+            for i in range(5):
+                feature_logger.log(response([2 * i, 2 * i + 1]))
+
+        files = list((tmp_path / "logs").glob("*.parquet"))
+        assert feature_logger.stats()["files"] == len(files) == 3
+        assert pq.read_table(tmp_path / "logs").num_rows == 10
+
+    def test_drop_when_full(self, store):
+        with writer(store, max_buffer_rows=3, row_group_rows=100, flush_seconds=60) as feature_logger:
+            assert feature_logger.log(response([1, 2]))
+            assert not feature_logger.log(response([3, 4]))
+        stats = feature_logger.stats()
+        assert (stats["written_rows"], stats["dropped_rows"]) == (2, 2)
+
+    def test_block_when_full(self, store, tmp_path):
+        with writer(store, max_buffer_rows=3, row_group_rows=100, flush_seconds=60,
+                    block=True) as feature_logger:
+            for i in range(4):
+                assert feature_logger.log(response([2 * i, 2 * i + 1]))
+        assert feature_logger.stats()["dropped_rows"] == 0
+        assert pq.read_table(tmp_path / "logs").num_rows == 8
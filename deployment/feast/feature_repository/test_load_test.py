@@ -0,0 +1,147 @@
+# test_load_test.py
+import asyncio
+import math
+from collections import Counter
+
+import pytest
+
+from load_test import (
+    HttpConnection,
+    compare_reports,
+    make_entity_sampler,
+    summarize,
+    write_report,
+)
+
+
+def result(n_features, batch_size, p50, p99, rps, error_rate=0.):
+    return {
+        "n_features": n_features, "batch_size": batch_size, "concurrency": 8, "distribution": "zipf",
+        "latency_ms": {"p50": p50, "p99": p99}, "throughput_rps": rps, "error_rate": error_rate,
+    }
+
+
+async def serve_and_post(actions):
+    """POST len(actions) times to a local server and return (requests received, post_json results).
+
+    The server answers the i-th request and keeps the connection open for
+    actions[i] "keep", answers and then closes it for "close", or closes it
+    without an answer for "drop".
+    """
+    received = []
+
+    async def handle(reader, writer):
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            action = actions[len(received)]
+            received.append(action)
+            if action != "drop":
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+                await writer.drain()
+            if action != "keep":
+                break
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    connection = HttpConnection(f"http://127.0.0.1:{port}/score", timeout=5)
+    results = []
+    try:
+        for _ in actions:
+            try:
+                results.append(await connection.post_json({}))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                results.append(e)
+            # Lets the client see the close of an idle connection.
+            await asyncio.sleep(0.05)
+    finally:
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+    return received, results
+
+
+class TestHttpConnection:
+
+    def test_reconnects_after_idle_close(self):
+        """A keep-alive connection closed by the server is replaced before the next POST"""
+        received, results = asyncio.run(serve_and_post(["keep", "close", "keep", "close"]))
+        assert received == ["keep", "close", "keep", "close"]
+        assert results == [(200, b"{}")] * 4
+
+    def test_request_is_not_resent(self):
+        """A POST that reached the server before the connection failed is an error, not a retry"""
+        received, results = asyncio.run(serve_and_post(["keep", "drop", "keep"]))
+        assert received == ["keep", "drop", "keep"]
+        assert results[0] == results[2] == (200, b"{}")
+        assert isinstance(results[1], ConnectionError)
+
+
+class TestMakeEntitySampler:
+
+    @pytest.mark.parametrize("distribution", ["uniform", "zipf", "sequential"])
+    def test_ids_in_range(self, distribution):
+        sampler = make_entity_sampler(distribution, 50, seed=1)
+        ids = [entity_id for _ in range(20) for entity_id in sampler(10)]
+        assert len(ids) == 200
+        assert min(ids) >= 1 and max(ids) <= 50
+
+    def test_seed_is_reproducible(self):
+        assert make_entity_sampler("zipf", 100, seed=3)(20) == make_entity_sampler("zipf", 100, seed=3)(20)
+
+    def test_zipf_is_skewed(self):
+        """The hottest entity of zipf is requested far more often than under uniform"""
+        zipf = Counter(make_entity_sampler("zipf", 1000, seed=0)(5000))
+        uniform = Counter(make_entity_sampler("uniform", 1000, seed=0)(5000))
+        assert zipf.most_common(1)[0][1] > 10 * uniform.most_common(1)[0][1]
+
+    def test_sequential_wraps_around(self):
+        sampler = make_entity_sampler("sequential", 5)
+        assert [sampler(3) for _ in range(3)] == [[1, 2, 3], [4, 5, 1], [2, 3, 4]]
+
+    def test_unknown_distribution(self):
+        with pytest.raises(ValueError):
+            make_entity_sampler("normal", 10)
+
+
+class TestSummarize:
+
+    def test_percentiles_and_rates(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        summary = summarize(latencies, {"http_500": 5, "TimeoutError": 5}, elapsed=2.0)
+        assert summary["requests"] == 110
+        assert summary["succeeded"] == 100
+        assert summary["error_rate"] == pytest.approx(10 / 110)
+        assert summary["throughput_rps"] == 50.0
+        assert summary["latency_ms"]["p50"] == pytest.approx(50.5)
+        assert summary["latency_ms"]["max"] == pytest.approx(100.0)
+
+    def test_no_successful_request(self):
+        summary = summarize([], {"ConnectionRefusedError": 3}, elapsed=1.0)
+        assert summary["error_rate"] == 1.0
+        assert summary["throughput_rps"] == 0.0
+        assert math.isnan(summary["latency_ms"]["p99"])
+
+
+class TestCompareReports:
+
+    def test_ratios_of_common_combinations(self, tmp_path):
+        baseline, current = str(tmp_path / "baseline.json"), str(tmp_path / "current.json")
+        write_report(baseline, [result(1, 10, 2.0, 8.0, 100.), result(8, 10, 4.0, 10.0, 50.)], {})
+        write_report(current, [result(1, 10, 1.0, 4.0, 200., 0.01), result(35, 10, 5.0, 9.0, 40.)], {})
+
+        rows = compare_reports(baseline, current)
+        assert len(rows) == 1
+        assert rows[0]["n_features"] == 1
+        assert rows[0]["p50_ratio"] == 0.5
+        assert rows[0]["p99_ratio"] == 0.5
+        assert rows[0]["throughput_ratio"] == 2.0
+        assert rows[0]["error_rate"] == 0.01
+
+    def test_zero_baseline(self, tmp_path):
+        baseline, current = str(tmp_path / "baseline.json"), str(tmp_path / "current.json")
+        write_report(baseline, [result(1, 10, 0.0, 8.0, 100.)], {})
+        write_report(current, [result(1, 10, 1.0, 4.0, 200.)], {})
+        assert math.isnan(compare_reports(baseline, current)[0]["p50_ratio"])
@@ -0,0 +1,152 @@
+# test_materialize_scheduler.py
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feast import (
+    Entity,
+    FeatureView,
+    Field,
+    FileSource,
+)
+from feast.types import Float32
+from materialize_scheduler import (
+    MaterializationScheduler,
+    _init_worker,
+    _materialize_window,
+    advance_high_water_mark,
+    split_windows,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DAY = timedelta(days=1)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return MaterializationScheduler(repo_path=str(tmp_path), state_path=str(tmp_path / "state.json"))
+
+
+@pytest.fixture
+def store(tmp_path, feature_store):
+    """Feature rows of entities 1..3, age changes every day"""
+    rows = [
+        {"entity_id": entity_id, "age": float(entity_id * 100 + day),
+         "event_timestamp": START + day * DAY, "created": START + day * DAY}
+        for entity_id in range(1, 4) for day in range(3)
+    ]
+    pd.DataFrame(rows).astype({"age": np.float32}).to_parquet(tmp_path / "source.parquet")
+    customer = Entity(name="customer", join_keys=["entity_id"])
+    feature_view = FeatureView(
+        name="feature_view",
+        source=FileSource(path=str(tmp_path / "source.parquet"), timestamp_field="event_timestamp",
+                          created_timestamp_column="created"),
+        entities=[customer],
+        ttl=timedelta(days=30),
+        schema=[Field(name="age", dtype=Float32)],
+    )
+    feature_store.apply([customer, feature_view])
+    return feature_store
+
+
+class TestSplitWindows:
+
+    def test_exact_division(self):
+        """Windows are consecutive and cover the range"""
+        windows = split_windows(START, START + 3 * DAY, DAY)
+        assert windows == [
+            (START, START + DAY),
+            (START + DAY, START + 2 * DAY),
+            (START + 2 * DAY, START + 3 * DAY),
+        ]
+
+    def test_last_window_is_truncated(self):
+        """The last window ends at end_date"""
+        windows = split_windows(START, START + DAY + timedelta(hours=6), DAY)
+        assert windows[-1] == (START + DAY, START + DAY + timedelta(hours=6))
+
+    def test_empty_range(self):
+        assert split_windows(START, START, DAY) == []
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            split_windows(START, START + DAY, timedelta(0))
+
+
+class TestAdvanceHighWaterMark:
+
+    def test_stops_at_first_gap(self):
+        """A failed window holds the high-water mark even if later windows completed"""
+        windows = split_windows(START, START + 4 * DAY, DAY)
+        completed = {windows[0], windows[1], windows[3]}
+        assert advance_high_water_mark(START, windows, completed) == START + 2 * DAY
+
+    def test_nothing_completed(self):
+        windows = split_windows(START, START + 2 * DAY, DAY)
+        assert advance_high_water_mark(START, windows, set()) == START
+
+
+class TestState:
+
+    def test_no_state_file(self, scheduler):
+        assert scheduler.load_state() == (None, set())
+
+    def test_round_trip_drops_windows_below_high_water_mark(self, scheduler):
+        """Only the completed windows above the high-water mark are kept"""
+        windows = split_windows(START, START + 4 * DAY, DAY)
+        scheduler.save_state(START + 2 * DAY, {windows[0], windows[1], windows[3]})
+        assert scheduler.load_state() == (START + 2 * DAY, {windows[3]})
+
+    def test_other_feature_views_are_kept(self, scheduler, tmp_path):
+        """Feature views share the state file"""
+        other = MaterializationScheduler(
+            repo_path=str(tmp_path), feature_view_name="other", state_path=scheduler.state_path
+        )
+        other.save_state(START, set())
+        scheduler.save_state(START + DAY, set())
+        assert other.load_state() == (START, set())
+        assert scheduler.high_water_mark() == START + DAY
+
+
+class TestMaterializeWindow:
+
+    def test_latest_row_of_the_window(self, store, tmp_path):
+        """The latest row per entity of the window is written, and counted"""
+        _init_worker(str(tmp_path), "feature_view", None)
+        assert _materialize_window(START, START + DAY + timedelta(hours=12)) == 3
+        online = store.get_online_features(
+            features=["feature_view:age"], entity_rows=[{"entity_id": i} for i in range(1, 4)]
+        ).to_dict()
+        assert online["age"] == [101.0, 201.0, 301.0]
+        assert store.get_feature_view("feature_view").materialization_intervals == []
+
+    def test_windows_out_of_order(self, store, tmp_path):
+        """A window finishing after a later one does not overwrite its rows"""
+        _init_worker(str(tmp_path), "feature_view", None)
+        assert _materialize_window(START + 2 * DAY, START + 3 * DAY) == 3
+        assert _materialize_window(START, START + DAY) == 0
+        assert _materialize_window(START + DAY, START + 2 * DAY) == 0
+        online = store.get_online_features(
+            features=["feature_view:age"], entity_rows=[{"entity_id": i} for i in range(1, 4)]
+        ).to_dict()
+        assert online["age"] == [102.0, 202.0, 302.0]
+
+    def test_window_end_is_exclusive(self, store, tmp_path):
+        """A row on the end of a window is written by the next window only"""
+        _init_worker(str(tmp_path), "feature_view", None)
+        assert _materialize_window(START, START + DAY) == 3
+        online = store.get_online_features(
+            features=["feature_view:age"], entity_rows=[{"entity_id": i} for i in range(1, 4)]
+        ).to_dict()
+        assert online["age"] == [100.0, 200.0, 300.0]
+        assert _materialize_window(START + DAY, START + 2 * DAY) == 3
+
+    def test_empty_window(self, store, tmp_path):
+        _init_worker(str(tmp_path), "feature_view", None)
+        assert _materialize_window(START + 10 * DAY, START + 11 * DAY) == 0
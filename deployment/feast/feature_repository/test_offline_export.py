@@ -0,0 +1,48 @@
+# test_offline_export.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from offline_export import write_monthly_parquet
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    pack_one_hot,
+)
+
+
+@pytest.fixture
+def offline_df():
+    """Hourly rows from 2025-01-20 to 2025-02-10, ordered by event_timestamp"""
+    n = 21 * 24
+    df = pd.DataFrame(np.zeros((n, len(ONE_HOT_FEATURES)), dtype=np.float32), columns=ONE_HOT_FEATURES)
+    df["job_1"] = np.float32(1)
+    df["risk"] = np.float32(0)
+    df["entity_id"] = np.arange(n)
+    df["event_timestamp"] = pd.date_range("2025-01-20", periods=n, freq="h", tz="UTC")
+    df["created"] = df["event_timestamp"]
+    return df
+
+
+class TestWriteMonthlyParquet:
+
+    def test_monthly_files(self, offline_df, tmp_path):
+        """Chunks spanning months are split into one file per month"""
+        output_dir = tmp_path / "offline"
+        chunks = [offline_df.iloc[i:i + 100] for i in range(0, len(offline_df), 100)]
+        rows = write_monthly_parquet(chunks, str(output_dir))
+
+        assert rows == {"2025-01": 12 * 24, "2025-02": 9 * 24}
+        assert sorted(path.name for path in output_dir.iterdir()) == [
+            "part-2025-01.parquet", "part-2025-02.parquet"
+        ]
+        result = pd.read_parquet(output_dir / "part-2025-02.parquet")
+        assert result["event_timestamp"].is_monotonic_increasing
+        assert result[PACKED_FEATURE].tolist() == pack_one_hot(offline_df.iloc[:1]).tolist() * 9 * 24
+
+    def test_replaces_previous_export(self, offline_df, tmp_path):
+        output_dir = tmp_path / "offline"
+        write_monthly_parquet([offline_df], str(output_dir))
+        write_monthly_parquet([offline_df.iloc[:24]], str(output_dir))
+        assert [path.name for path in output_dir.iterdir()] == ["part-2025-01.parquet"]
+        assert len(pd.read_parquet(output_dir)) == 24
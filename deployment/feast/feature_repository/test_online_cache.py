@@ -0,0 +1,141 @@
+# test_online_cache.py
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from online_cache import OnlineFeatureCache
+
+
+class FakeResponse:
+    """Stand-in for feast OnlineResponse"""
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+@pytest.fixture
+def store():
+    """FeatureStore mock whose feature value is entity_id * 10"""
+    store = Mock()
+    store.get_feature_view.return_value = Mock(
+        ttl=timedelta(hours=1), materialization_intervals=[]
+    )
+
+    def get_online_features(features, entity_rows):
+        ids = [row["entity_id"] for row in entity_rows]
+        return FakeResponse({
+            "entity_id": ids,
+            "purpose_car": [i * 10.0 for i in ids],
+            "risk": [0.0 for _ in ids],
+        })
+
+    store.get_online_features.side_effect = get_online_features
+    return store
+
+
+@pytest.fixture
+def cache(store):
+    return OnlineFeatureCache(
+        store=store, features=["customer_credit_risk_feature_view:purpose_car"], max_entries=3
+    )
+
+
+class TestOnlineFeatureCache:
+
+    def test_read_through(self, cache, store):
+        """Misses are fetched in one batch and the result keeps the request order"""
+        result = cache.get_online_features([3, 1, 2])
+        assert result == {
+            "entity_id": [3, 1, 2],
+            "purpose_car": [30.0, 10.0, 20.0],
+            "risk": [0.0, 0.0, 0.0],
+        }
+        assert store.get_online_features.call_count == 1
+
+    def test_hits_do_not_call_store(self, cache, store):
+        """Repeated lookups are served from the cache"""
+        cache.get_online_features([1, 2])
+        result = cache.get_online_features([2, 1, 2])
+        assert result["purpose_car"] == [20.0, 10.0, 20.0]
+        assert store.get_online_features.call_count == 1
+        assert cache.hits == 2
+        assert cache.misses == 2
+
+    def test_only_misses_are_fetched(self, cache, store):
+        """A partial hit fetches only the missing entities"""
+        cache.get_online_features([1])
+        cache.get_online_features([1, 2])
+        entity_rows = store.get_online_features.call_args.kwargs["entity_rows"]
+        assert entity_rows == [{"entity_id": 2}]
+
+    def test_lru_eviction(self, cache, store):
+        """Least recently used entity is evicted beyond max_entries"""
+        cache.get_online_features([1, 2, 3])
+        cache.get_online_features([1])
+        cache.get_online_features([4])
+        assert len(cache) == 3
+        assert cache.evictions == 1
+
+        cache.get_online_features([2])
+        entity_rows = store.get_online_features.call_args.kwargs["entity_rows"]
+        assert entity_rows == [{"entity_id": 2}]
+
+    def test_ttl_expiry(self, store):
+        """Entries older than the ttl are fetched again"""
+        cache = OnlineFeatureCache(store=store, features=[], ttl=timedelta(seconds=-1))
+        cache.get_online_features([1])
+        cache.get_online_features([1])
+        assert store.get_online_features.call_count == 2
+
+    def test_ttl_from_feature_view(self, cache):
+        """Default ttl is the FeatureView ttl"""
+        assert cache.ttl_seconds == 3600
+
+    def test_materialize_invalidates(self, cache, store):
+        """Materialisation through the cache clears it"""
+        cache.get_online_features([1])
+        cache.materialize_incremental(end_date=None)
+        store.materialize_incremental.assert_called_once_with(end_date=None)
+        assert len(cache) == 0
+
+    def test_materialization_by_other_process_invalidates(self, store):
+        """A new materialisation interval in the registry clears the cache"""
+        cache = OnlineFeatureCache(store=store, features=[], materialization_check_seconds=1e-9)
+        cache.get_online_features([1])
+        store.get_feature_view.return_value = Mock(
+            ttl=timedelta(hours=1), materialization_intervals=[(0, 1)]
+        )
+        cache.get_online_features([1])
+        assert store.get_online_features.call_count == 2
+        assert cache.invalidations == 1
+
+    def test_stats(self, cache):
+        """Hit rate is reported"""
+        cache.get_online_features([1, 1])
+        cache.get_online_features([1])
+        cache.get_online_features([1])
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_invalidation_during_fetch_is_not_undone(self, cache, store):
+        """Rows fetched before an invalidation are returned but not cached"""
+        get_online_features = store.get_online_features.side_effect
+
+        def invalidating_fetch(features, entity_rows):
+            response = get_online_features(features, entity_rows)
+            cache.invalidate()
+            return response
+
+        store.get_online_features.side_effect = invalidating_fetch
+        assert cache.get_online_features([1])["purpose_car"] == [10.0]
+        assert len(cache) == 0
+
+        store.get_online_features.side_effect = get_online_features
+        cache.get_online_features([1])
+        cache.get_online_features([1])
+        assert store.get_online_features.call_count == 2
@@ -0,0 +1,61 @@
+# test_packed_encoding.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from packed_encoding import (
+    CATEGORY_GROUPS,
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    pack_one_hot,
+    packed_source_query,
+    unpack_categories,
+    unpack_one_hot,
+)
+
+
+@pytest.fixture
+def one_hot():
+    """Every category of every group at least once, plus a row with no category"""
+    rows = []
+    for i in range(8):
+        row = dict.fromkeys(ONE_HOT_FEATURES, 0.0)
+        for columns in CATEGORY_GROUPS.values():
+            row[columns[i % len(columns)]] = 1.0
+        rows.append(row)
+    rows.append(dict.fromkeys(ONE_HOT_FEATURES, 0.0))
+    return pd.DataFrame(rows, dtype=np.float32)
+
+
+class TestPackedEncoding:
+
+    def test_round_trip(self, one_hot):
+        assert unpack_one_hot(pack_one_hot(one_hot)).equals(one_hot)
+
+    def test_fits_in_int32(self, one_hot):
+        assert pack_one_hot(one_hot).max() < 2 ** 31
+
+    def test_not_one_hot(self, one_hot):
+        one_hot.loc[0, ["job_0", "job_1"]] = 1.0
+        with pytest.raises(ValueError):
+            pack_one_hot(one_hot)
+
+    def test_unpack_categories(self, one_hot):
+        """The on demand transformation matches unpack_one_hot, None stays missing"""
+        packed = pack_one_hot(one_hot).tolist()
+        result = unpack_categories({PACKED_FEATURE: packed + [None]})
+        assert list(result) == ONE_HOT_FEATURES
+        assert pd.DataFrame(result).iloc[:-1].astype(np.float32).equals(one_hot)
+        assert result["job_0"][-1] is None
+
+    def test_source_query(self, one_hot):
+        """The offline SELECT computes the same packed values"""
+        df = one_hot.assign(
+            entity_id=range(len(one_hot)), event_timestamp=0, created=0, risk=0.0
+        )
+        with sqlite3.connect(":memory:") as conn:
+            df.to_sql("offline_features", conn)
+            packed = pd.read_sql(packed_source_query("offline_features"), conn)[PACKED_FEATURE]
+        assert packed.tolist() == pack_one_hot(one_hot).tolist()
@@ -0,0 +1,196 @@
+# test_push_ingestion.py
+import json
+import threading
+from datetime import (
+    datetime,
+    timezone,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    PACKED_FEATURE,
+    pack_one_hot,
+)
+from push_ingestion import (
+    OFFLINE_COLUMNS,
+    PACKED_PUSH_SOURCE,
+    PUSH_SOURCE,
+    FileTailSource,
+    PushIngestion,
+    encode_batch,
+)
+
+
+def _record(entity_id, **kwargs):
+    record = {
+        "entity_id": entity_id, "event_timestamp": "2025-01-02T10:00:00+00:00", "Age": 35, "Sex": "male",
+        "Job": 2, "Housing": "own", "Saving accounts": None, "Checking account": "little",
+        "Credit amount": 2500, "Purpose": "car",
+    }
+    record.update(kwargs)
+    return record
+
+
+def _append(path, *lines):
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+
+class FakeStore:
+    """FeatureStore mock recording the pushed rows per push source"""
+    def __init__(self):
+        self.pushed = []
+        self.packed = []
+
+    def push(self, push_source_name, df, to=None):
+        {PUSH_SOURCE: self.pushed, PACKED_PUSH_SOURCE: self.packed}[push_source_name].append(df.copy())
+
+
+class InMemoryIngestion(PushIngestion):
+    """PushIngestion with the offline table and the checkpoint in a dict"""
+    def __init__(self, database, *args, fail_at_batch=None, **kwargs):
+        super().__init__(FakeStore(), None, *args, name="test", **kwargs)
+        self.database = database
+        self.fail_at_batch = fail_at_batch
+
+    def _create_table(self):
+        self.database.setdefault("rows", [])
+
+    def load_checkpoint(self):
+        return self.database.get("checkpoint")
+
+    def _write_offline(self, df, offset, records):
+        if self.batches == self.fail_at_batch:
+            raise ConnectionError("killed")
+        self.database["rows"].append(df)
+        self.database["checkpoint"] = {"byte_offset": offset, "records": records}
+
+
+class TestFileTailSource:
+
+    def test_complete_lines_only(self, tmp_path):
+        path = tmp_path / "applications.jsonl"
+        source = FileTailSource(str(path))
+        assert source.read(10) == []
+
+        first = json.dumps(_record(1)) + "\n"
+        _append(path, first, '{"entity_id": 2, "event_')
+        records = source.read(10)
+        assert [(offset, record["entity_id"]) for offset, record in records] == [(len(first), 1)]
+
+        _append(path, 'timestamp": "2025-01-02T10:00:00+00:00"}\n', "not json\n", "\n", '{"Age": 35}\n')
+        records = source.read(10)
+        assert [record for _, record in records] == [
+            {"entity_id": 2, "event_timestamp": "2025-01-02T10:00:00+00:00"}, None, None,
+        ]
+        assert source.offset == path.stat().st_size
+
+    def test_max_records(self, tmp_path):
+        path = tmp_path / "applications.jsonl"
+        _append(path, *[json.dumps(_record(i)) + "\n" for i in range(5)])
+        source = FileTailSource(str(path))
+        assert [record["entity_id"] for _, record in source.read(3)] == [0, 1, 2]
+        assert [record["entity_id"] for _, record in source.read(3)] == [3, 4]
+
+
+class TestEncodeBatch:
+
+    def test_rows(self):
+        created = datetime(2025, 1, 3, tzinfo=timezone.utc)
+        df = encode_batch([_record(1, Risk="bad"), _record(2, risk=0.)], created)
+
+        assert list(df.columns) == OFFLINE_COLUMNS
+        assert df["entity_id"].tolist() == [1, 2]
+        assert df["risk"].tolist() == [1., 0.]
+        assert (df["created"] == pd.Timestamp(created)).all()
+        assert df.loc[0, ["purpose_car", "saving_accounts_no_inf", "amount_0"]].tolist() == [1., 1., 1.]
+        assert df[ONE_HOT_FEATURES].sum(axis=1).tolist() == [8., 8.]
+
+    def test_no_risk(self):
+        df = encode_batch([_record(1)], datetime.now(timezone.utc))
+        assert np.isnan(df.loc[0, "risk"])
+
+    def test_unknown_risk(self):
+        with pytest.raises(ValueError, match="Risk"):
+            encode_batch([_record(1, Risk="unknown")], datetime.now(timezone.utc))
+
+
+class TestPushIngestion:
+
+    def test_micro_batches(self, tmp_path):
+        path = tmp_path / "applications.jsonl"
+        _append(path, *[json.dumps(_record(i)) + "\n" for i in range(7)])
+        _append(path, json.dumps(_record(7, Housing="castle")) + "\n", "not json\n")
+        database = {}
+        ingestion = InMemoryIngestion(database, FileTailSource(str(path)), batch_size=3)
+        report = ingestion.run(idle_exit=True)
+
+        assert [len(df) for df in ingestion.store.pushed] == [3, 3, 1]
+        packed = pd.concat(ingestion.store.packed, ignore_index=True)
+        assert list(packed.columns) == ["entity_id", "event_timestamp", "created", "risk", PACKED_FEATURE]
+        np.testing.assert_array_equal(packed[PACKED_FEATURE], pack_one_hot(pd.concat(database["rows"])))
+        assert [len(df) for df in database["rows"]] == [3, 3, 1]
+        assert report["records"] == 7
+        assert report["skipped"] == 2
+        assert database["checkpoint"] == {"byte_offset": path.stat().st_size, "records": 7}
+
+    def test_resume_exactly_once(self, tmp_path):
+        path = tmp_path / "applications.jsonl"
+        _append(path, *[json.dumps(_record(i)) + "\n" for i in range(10)])
+        database = {}
+
+        ingestion = InMemoryIngestion(database, FileTailSource(str(path)), batch_size=4, fail_at_batch=1)
+        with pytest.raises(ConnectionError):
+            ingestion.run(idle_exit=True)
+        # The second batch is online but neither offline nor checkpointed.
+        assert [len(df) for df in ingestion.store.pushed] == [4, 4]
+        assert database["checkpoint"]["records"] == 4
+
+        resumed = InMemoryIngestion(database, FileTailSource(str(path)), batch_size=4)
+        resumed.run(idle_exit=True)
+        assert [df["entity_id"].tolist() for df in resumed.store.pushed] == [[4, 5, 6, 7], [8, 9]]
+        offline = pd.concat(database["rows"], ignore_index=True)
+        assert offline["entity_id"].tolist() == list(range(10))
+        assert database["checkpoint"]["records"] == 10
+
+    def test_max_latency(self, tmp_path):
+        path = tmp_path / "applications.jsonl"
+        _append(path, json.dumps(_record(1)) + "\n")
+        database = {}
+        ingestion = InMemoryIngestion(
+            database, FileTailSource(str(path)), batch_size=100, max_latency_seconds=0.05, poll_seconds=0.01
+        )
+
+        stop = threading.Event()
+
+        def write_offline(df, offset, records):
+            InMemoryIngestion._write_offline(ingestion, df, offset, records)
+            stop.set()
+
+        ingestion._write_offline = write_offline
+        ingestion.run(stop)
+        assert [len(df) for df in database["rows"]] == [1]
+
+    def test_parquet_export_exactly_once(self, tmp_path):
+        """With the DuckDB offline store, the rows of the committed batches are in the export"""
+        path = tmp_path / "applications.jsonl"
+        export_dir = tmp_path / "export"
+        _append(path, *[json.dumps(_record(i)) + "\n" for i in range(10)])
+        database = {}
+
+        ingestion = InMemoryIngestion(database, FileTailSource(str(path)), batch_size=4, fail_at_batch=1,
+                                      parquet_dir=str(export_dir))
+        with pytest.raises(ConnectionError):
+            ingestion.run(idle_exit=True)
+        # The file of the uncommitted second batch is written.
+        assert len(list(export_dir.glob("push-*.parquet"))) == 2
+
+        resumed = InMemoryIngestion(database, FileTailSource(str(path)), batch_size=3, parquet_dir=str(export_dir))
+        resumed.run(idle_exit=True)
+        export = pd.read_parquet(export_dir)
+        assert sorted(export["entity_id"].tolist()) == list(range(10))
+        assert PACKED_FEATURE in export
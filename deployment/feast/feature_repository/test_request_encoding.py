@@ -0,0 +1,156 @@
+# test_request_encoding.py
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+from feast import (
+    Field,
+    RequestSource,
+)
+from feast.on_demand_feature_view import on_demand_feature_view
+from feast.types import (
+    Float32,
+    Int64,
+    String,
+)
+
+from packed_encoding import (
+    ONE_HOT_FEATURES,
+    pack_one_hot,
+)
+from request_encoding import (
+    SCHEMA_PLACEHOLDER,
+    encode_applicants,
+    encode_columns,
+    encode_packed,
+    encode_records,
+)
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+
+
+@pytest.fixture
+def raw_df():
+    return pd.read_csv(DATA_DIR / "raw" / "german_credit_data.csv", index_col=0)
+
+
+@pytest.fixture
+def processed_df():
+    """Output of the notebook pipelines for raw_df, row by row"""
+    return pd.read_csv(DATA_DIR / "processed" / "customer_credit_risk_features.csv")
+
+
+@pytest.fixture
+def applicant():
+    return {"age": 30, "sex": "female", "job": 1, "housing": "rent", "saving_accounts": "rich",
+            "checking_account": "no_inf", "credit_amount": 12000, "purpose": "education"}
+
+
+@pytest.fixture
+def store(feature_store):
+    """Local store with the applicant on-demand feature view of features.py"""
+    request_source = RequestSource(name="applicant", schema=[
+        Field(name="age", dtype=Int64), Field(name="sex", dtype=String), Field(name="job", dtype=Int64),
+        Field(name="housing", dtype=String), Field(name="saving_accounts", dtype=String),
+        Field(name="checking_account", dtype=String), Field(name="credit_amount", dtype=Int64),
+        Field(name="purpose", dtype=String),
+    ])
+
+    @on_demand_feature_view(
+        sources=[request_source], schema=[Field(name=name, dtype=Float32) for name in ONE_HOT_FEATURES], mode="python",
+    )
+    def applicant_feature_view(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return encode_applicants(inputs)
+
+    feature_store.apply([request_source, applicant_feature_view])
+    return feature_store
+
+
+class TestEncode:
+
+    def test_matches_notebook_pipeline(self, raw_df, processed_df):
+        """Records encode to the feature engineering output of the notebooks"""
+        records = raw_df.astype(object).where(raw_df.notna(), None).to_dict("records")
+        np.testing.assert_array_equal(encode_records(records), processed_df[ONE_HOT_FEATURES].to_numpy())
+
+    def test_pandas_columns(self, raw_df, processed_df):
+        """Columns with NaN missing values, as the raw CSV loads"""
+        one_hot = encode_columns({name: raw_df[name].tolist() for name in raw_df.columns})
+        np.testing.assert_array_equal(one_hot, processed_df[ONE_HOT_FEATURES].to_numpy())
+        np.testing.assert_array_equal(
+            encode_packed({name: raw_df[name].tolist() for name in raw_df.columns}),
+            pack_one_hot(processed_df),
+        )
+
+    def test_out_of_range_bins(self):
+        """Age and Credit amount outside the bins have no category, as pd.cut"""
+        one_hot = encode_records([
+            {"age": age, "sex": "male", "job": "2", "housing": "own", "saving_accounts": None,
+             "checking_account": "rich", "credit_amount": amount, "purpose": "car"}
+            for age, amount in ((18, 0), (25, 5000), (101, 25000))
+        ])
+        generation = one_hot[:, [ONE_HOT_FEATURES.index(f"generation_{name}")
+                                 for name in ("student", "young", "adult", "senior")]]
+        amount = one_hot[:, [ONE_HOT_FEATURES.index(f"amount_{i}") for i in range(5)]]
+        assert generation.tolist() == [[0, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 0]]
+        assert amount.tolist() == [[0, 0, 0, 0, 0], [1, 0, 0, 0, 0], [0, 0, 0, 0, 1]]
+
+    def test_unknown_category(self):
+        with pytest.raises(ValueError, match="housing"):
+            encode_columns({"age": [30], "sex": ["male"], "job": [1], "housing": ["castle"],
+                            "saving_accounts": [None], "checking_account": [None],
+                            "credit_amount": [1000], "purpose": ["car"]})
+
+    def test_ignore_unknown_category(self):
+        columns = {"age": [30], "sex": ["male"], "job": [1], "housing": ["castle"], "saving_accounts": [None],
+                   "checking_account": [None], "credit_amount": [1000], "purpose": ["car"]}
+        housing = [ONE_HOT_FEATURES.index(f"housing_{name}") for name in ("free", "own", "rent")]
+        one_hot = encode_columns(columns, errors="ignore")
+        assert one_hot[0, housing].tolist() == [0, 0, 0]
+        assert one_hot.sum() == 7
+
+    def test_on_demand_transformation(self, applicant):
+        features = encode_applicants({name: [value] for name, value in applicant.items()})
+        assert list(features) == ONE_HOT_FEATURES
+        assert [name for name, values in features.items() if values == [1.]] == [
+            "purpose_education", "gender_female", "housing_rent", "saving_accounts_rich",
+            "checking_account_no_inf", "generation_young", "job_1", "amount_2",
+        ]
+
+    @pytest.mark.parametrize("field, value", [("purpose", "CAR"), ("saving_accounts", "lots")])
+    def test_on_demand_unknown_category(self, applicant, field, value):
+        """A mistyped attribute fails the request instead of encoding to no category"""
+        with pytest.raises(ValueError, match=field):
+            encode_applicants({name: [value if name == field else v] for name, v in applicant.items()})
+
+    def test_on_demand_schema_placeholder(self):
+        """FEAST schema inference values encode to no category"""
+        features = encode_applicants({
+            name: [1 if name in ("age", "job", "credit_amount") else SCHEMA_PLACEHOLDER]
+            for name in ("age", "sex", "job", "housing", "saving_accounts", "checking_account",
+                         "credit_amount", "purpose")
+        })
+        assert sum(values[0] for values in features.values()) == 2
+
+
+class TestApplicantFeatureView:
+
+    def features(self, store, rows):
+        return store.get_online_features(
+            features=[f"applicant_feature_view:{name}" for name in ONE_HOT_FEATURES], entity_rows=rows,
+        ).to_dict()
+
+    def test_single_row_missing_value(self, store, applicant):
+        """no_inf is the missing value a single row request can send"""
+        features = self.features(store, [dict(applicant, saving_accounts="no_inf")])
+        assert features["saving_accounts_no_inf"] == [1.]
+        assert features["checking_account_no_inf"] == [1.]
+
+    def test_unknown_category_fails(self, store, applicant):
+        with pytest.raises(ValueError, match="purpose"):
+            self.features(store, [applicant, dict(applicant, purpose="CAR")])
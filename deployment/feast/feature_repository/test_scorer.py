@@ -0,0 +1,129 @@
+# test_scorer.py
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from scorer import (
+    LinearScorer,
+    TreeEnsembleScorer,
+    export_scorer,
+    load_scorer,
+    save_scorer,
+)
+
+
+@pytest.fixture
+def one_hot_data():
+    """One-hot encoded features with a label depending on a few of them"""
+    rng = np.random.default_rng(42)
+    columns = [f"feature_{i}" for i in range(12)]
+    X = pd.DataFrame(
+        rng.integers(0, 2, size=(400, len(columns))).astype(np.float32), columns=columns
+    )
+    logits = 2 * X["feature_0"] - 1.5 * X["feature_3"] + X["feature_7"] - 0.5
+    y = (rng.random(len(X)) < 1 / (1 + np.exp(-logits))).astype(int)
+    return X, y
+
+
+class TestLinearScorer:
+
+    def test_matches_sklearn(self, one_hot_data):
+        """Scorer probabilities match LogisticRegression.predict_proba"""
+        X, y = one_hot_data
+        model = LogisticRegression(class_weight='balanced', solver='liblinear').fit(X, y)
+        scorer = export_scorer(model)
+
+        assert isinstance(scorer, LinearScorer)
+        np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), rtol=1e-9)
+
+    def test_score_one(self, one_hot_data):
+        """Single row path returns the same probability as the batch path"""
+        X, y = one_hot_data
+        scorer = export_scorer(LogisticRegression().fit(X, y))
+        row = X.iloc[5].tolist()
+        assert scorer.score_one(row) == pytest.approx(scorer.predict_proba(X.iloc[[5]])[0, 1])
+
+    def test_column_order_from_dataframe(self, one_hot_data):
+        """DataFrame input is reordered to the training column order"""
+        X, y = one_hot_data
+        scorer = export_scorer(LogisticRegression().fit(X, y))
+        shuffled = X[X.columns[::-1]]
+        np.testing.assert_allclose(scorer.predict_proba(shuffled), scorer.predict_proba(X))
+
+    def test_wrong_feature_count(self, one_hot_data):
+        """Array with a wrong number of columns is rejected"""
+        X, y = one_hot_data
+        scorer = export_scorer(LogisticRegression().fit(X, y))
+        with pytest.raises(ValueError):
+            scorer.predict_proba(np.zeros((1, 3)))
+
+    def test_feature_names_required_for_arrays(self, one_hot_data):
+        """Model fitted on an ndarray needs explicit feature names"""
+        X, y = one_hot_data
+        model = LogisticRegression().fit(X.to_numpy(), y)
+        with pytest.raises(ValueError):
+            export_scorer(model)
+        assert export_scorer(model, feature_names=X.columns).feature_names == list(X.columns)
+
+
+class TestTreeEnsembleScorer:
+
+    def test_matches_xgboost(self, one_hot_data):
+        """Scorer probabilities match XGBClassifier.predict_proba"""
+        X, y = one_hot_data
+        model = XGBClassifier(n_estimators=50, max_depth=4, scale_pos_weight=2.0).fit(X, y)
+        scorer = export_scorer(model)
+
+        assert isinstance(scorer, TreeEnsembleScorer)
+        np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), atol=1e-6)
+
+    def test_early_stopping_uses_best_iteration(self, one_hot_data):
+        """Only the trees up to best_iteration are exported"""
+        X, y = one_hot_data
+        model = XGBClassifier(n_estimators=300, early_stopping_rounds=5, learning_rate=0.3)
+        model.fit(X, y, eval_set=[(X, y)], verbose=False)
+        scorer = export_scorer(model)
+
+        assert scorer.roots.size == model.best_iteration + 1
+        np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), atol=1e-6)
+
+    def test_uneven_tree_depths(self, one_hot_data):
+        """Leaves above max_depth score as in XGBoost after the padding to complete trees"""
+        X, y = one_hot_data
+        model = XGBClassifier(n_estimators=30, max_depth=6, min_child_weight=20).fit(X, y)
+        scorer = export_scorer(model)
+
+        n_leaves = (scorer.left == np.arange(scorer.left.size)).sum()
+        assert n_leaves < scorer.roots.size * 2 ** scorer.max_depth
+        np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), atol=1e-6)
+        np.testing.assert_allclose(scorer.score_one(X.iloc[0].to_numpy()), model.predict_proba(X.iloc[[0]])[0, 1], atol=1e-6)
+
+    def test_missing_values_follow_default_direction(self, one_hot_data):
+        """NaN features take the default branch as in XGBoost"""
+        X, y = one_hot_data
+        model = XGBClassifier(n_estimators=20, max_depth=3).fit(X, y)
+        scorer = export_scorer(model)
+        X_missing = X.copy()
+        X_missing.iloc[::3, 0] = np.nan
+        np.testing.assert_allclose(
+            scorer.predict_proba(X_missing), model.predict_proba(X_missing), atol=1e-6
+        )
+
+
+@pytest.mark.parametrize("model", [
+    LogisticRegression(),
+    XGBClassifier(n_estimators=10, max_depth=3),
+])
+def test_save_and_load(model, one_hot_data, tmp_path):
+    """Saved scorer loads back with identical predictions"""
+    X, y = one_hot_data
+    scorer = export_scorer(model.fit(X, y))
+    path = tmp_path / "scorer.npz"
+    save_scorer(scorer, str(path))
+    loaded = load_scorer(str(path))
+
+    assert type(loaded) is type(scorer)
+    assert loaded.feature_names == scorer.feature_names
+    np.testing.assert_allclose(loaded.predict_proba(X), scorer.predict_proba(X))
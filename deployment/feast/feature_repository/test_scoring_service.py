@@ -0,0 +1,130 @@
+# test_scoring_service.py
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from scorer import LinearScorer
+from scoring_service import BatchScorer
+
+FEATURES = ["feature_0", "feature_1"]
+
+
+class FakeResponse:
+    def __init__(self, features):
+        self.features = features
+
+    def to_dict(self):
+        return self.features
+
+
+class FakeStore:
+    """FeatureStore mock: feature_i of entity e is e * (i + 1), unknown entities < 0"""
+    def __init__(self, delay=0., release=None):
+        self.delay = delay
+        self.release = release
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_feature_service(self, name):
+        return name
+
+    def get_online_features(self, features, entity_rows):
+        entity_ids = [row["entity_id"] for row in entity_rows]
+        with self._lock:
+            self.calls.append(entity_ids)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.release is not None:
+            self.release.wait(5)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return FakeResponse({
+            name: [None if entity_id < 0 else float(entity_id * (i + 1)) for entity_id in entity_ids]
+            for i, name in enumerate(FEATURES)
+        })
+
+
+@pytest.fixture
+def scorer():
+    return LinearScorer(np.array([0.1, -0.05]), 0., FEATURES)
+
+
+def expected_score(scorer, entity_id):
+    return float(scorer.predict_proba(np.array([[entity_id, 2. * entity_id]]))[0, 1])
+
+
+async def _score_all(batch_scorer, requests, delay=0.):
+    batch_scorer.start()
+    try:
+        tasks = []
+        for entity_ids in requests:
+            tasks.append(asyncio.create_task(batch_scorer.score(entity_ids)))
+            await asyncio.sleep(delay)
+        return await asyncio.gather(*tasks)
+    finally:
+        await batch_scorer.stop()
+
+
+class TestBatchScorer:
+
+    def test_concurrent_requests_share_a_fetch(self, scorer):
+        store = FakeStore()
+        batch_scorer = BatchScorer(store, scorer, max_batch_size=100, max_wait_ms=50)
+        results = asyncio.run(_score_all(batch_scorer, [[1, 2], [2, 3], [-1]]))
+
+        assert store.calls == [[1, 2, 3, -1]]
+        assert results[0] == pytest.approx([expected_score(scorer, 1), expected_score(scorer, 2)])
+        assert results[1][1] == pytest.approx(expected_score(scorer, 3))
+        assert results[2] == [None]
+        assert batch_scorer.stats()["mean_requests_per_batch"] == 3
+
+    def test_max_batch_size(self, scorer):
+        store = FakeStore()
+        batch_scorer = BatchScorer(store, scorer, max_batch_size=4, max_wait_ms=50)
+        asyncio.run(_score_all(batch_scorer, [[1, 2], [3, 4], [5, 6]]))
+        assert store.calls == [[1, 2, 3, 4], [5, 6]]
+
+    def test_max_wait_deadline(self, scorer):
+        """A request after the deadline of the first batch goes to the next"""
+        store = FakeStore()
+        batch_scorer = BatchScorer(store, scorer, max_batch_size=100, max_wait_ms=20)
+        asyncio.run(_score_all(batch_scorer, [[1], [2], [3]], delay=0.05))
+        assert store.calls == [[1], [2], [3]]
+
+    def test_max_in_flight(self, scorer):
+        store = FakeStore(delay=0.05)
+        batch_scorer = BatchScorer(store, scorer, max_batch_size=1, max_wait_ms=0, max_in_flight=2)
+        results = asyncio.run(_score_all(batch_scorer, [[i] for i in range(1, 7)]))
+        assert len(store.calls) == 6
+        assert store.max_in_flight == 2
+        assert [result[0] for result in results] == pytest.approx([expected_score(scorer, i) for i in range(1, 7)])
+
+    def test_stop_waits_for_dispatched_batches(self, scorer):
+        release = threading.Event()
+        store = FakeStore(release=release)
+        batch_scorer = BatchScorer(store, scorer, max_batch_size=1, max_wait_ms=0, max_in_flight=1)
+
+        async def run():
+            batch_scorer.start()
+            dispatched = asyncio.create_task(batch_scorer.score([1]))
+            while not store.calls:
+                await asyncio.sleep(0.01)
+            # The only slot is taken, the second request waits to be dispatched.
+            queued = asyncio.create_task(batch_scorer.score([2]))
+            await asyncio.sleep(0.02)
+            stopping = asyncio.create_task(batch_scorer.stop())
+            await asyncio.sleep(0.02)
+            assert not stopping.done()
+            release.set()
+            await stopping
+            return await dispatched, await asyncio.gather(queued, return_exceptions=True)
+
+        dispatched, (queued,) = asyncio.run(run())
+        assert dispatched == pytest.approx([expected_score(scorer, 1)])
+        assert isinstance(queued, RuntimeError)
@@ -0,0 +1,86 @@
+# test_store_provider.py
+import threading
+
+import pytest
+
+from feast import (
+    Entity,
+    FeatureStore,
+)
+from store_provider import (
+    _refreshers,
+    close_feature_stores,
+    get_feature_store,
+    write_registry_snapshot,
+)
+
+
+@pytest.fixture
+def feature_store_config(feature_store_config, tmp_path):
+    return {
+        **feature_store_config,
+        "registry": {"path": str(tmp_path / "registry.db"), "cache_ttl_seconds": 60},
+    }
+
+
+@pytest.fixture
+def repo_path(feature_repo, feature_store):
+    feature_store.apply([Entity(name="customer", join_keys=["entity_id"])])
+    yield feature_repo
+    close_feature_stores()
+
+
+def entity_names(store):
+    return sorted(entity.name for entity in store.list_entities())
+
+
+class TestGetFeatureStore:
+
+    def test_shared_store(self, repo_path):
+        """One store per repository, the cold start writes the snapshot"""
+        store = get_feature_store(str(repo_path))
+        assert get_feature_store(str(repo_path)) is store
+        assert (repo_path / "data" / "registry_snapshot.pb").exists()
+        assert entity_names(store) == ["customer"]
+
+    def test_warm_start_from_snapshot(self, repo_path):
+        """A snapshot left by a previous process is read instead of the registry"""
+        get_feature_store(str(repo_path), refresh_seconds=3600)
+        close_feature_stores()
+        (repo_path / "registry.db").unlink()
+
+        store = get_feature_store(str(repo_path), refresh_seconds=3600)
+        assert entity_names(store) == ["customer"]
+
+    def test_refresh(self, repo_path):
+        """Objects applied to the registry are served after a refresh"""
+        store = get_feature_store(str(repo_path), refresh_seconds=3600)
+        FeatureStore(repo_path=str(repo_path)).apply([Entity(name="loan", join_keys=["loan_id"])])
+        assert entity_names(store) == ["customer"]
+
+        _refreshers[str(repo_path.resolve())].refresh()
+        assert entity_names(store) == ["customer", "loan"]
+
+    def test_concurrent_snapshot_writers(self, repo_path):
+        """Writers of the same snapshot use their own temp files and leave none behind"""
+        store = FeatureStore(repo_path=str(repo_path))
+        store.refresh_registry()
+        snapshot_path = repo_path / "data" / "registry_snapshot.pb"
+
+        errors = []
+
+        def write():
+            try:
+                for _ in range(50):
+                    write_registry_snapshot(store, str(snapshot_path))
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert snapshot_path.read_bytes() == store.registry.cached_registry_proto.SerializeToString()
+        assert [path.name for path in snapshot_path.parent.iterdir()] == ["registry_snapshot.pb"]
@@ -0,0 +1,162 @@
+# test_training_set.py
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from feast import (
+    Entity,
+    FeatureService,
+    FeatureStore,
+    FeatureView,
+    Field,
+    FileSource,
+)
+from feast.types import Float32
+from training_set import (
+    MANIFEST,
+    TrainingSetBuilder,
+    split_entity_df,
+    training_set_key,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DAY = timedelta(days=1)
+
+
+@pytest.fixture
+def entity_df():
+    return pd.DataFrame({
+        "entity_id": np.arange(1, 11, dtype=np.int64),
+        "event_timestamp": [START + i * DAY + timedelta(hours=12) for i in range(10)],
+    })
+
+
+@pytest.fixture
+def store(tmp_path, feature_store):
+    """Feature rows of entities 1..10, age changes every day"""
+    rows = [
+        {"entity_id": entity_id, "age": float(entity_id * 100 + day),
+         "event_timestamp": START + day * DAY, "created": START + day * DAY}
+        for entity_id in range(1, 11) for day in range(10)
+    ]
+    pd.DataFrame(rows).astype({"age": np.float32}).to_parquet(tmp_path / "source.parquet")
+    customer = Entity(name="customer", join_keys=["entity_id"])
+    feature_view = FeatureView(
+        name="feature_view",
+        source=FileSource(path=str(tmp_path / "source.parquet"), timestamp_field="event_timestamp",
+                          created_timestamp_column="created"),
+        entities=[customer],
+        ttl=timedelta(days=2),
+        schema=[Field(name="age", dtype=Float32)],
+    )
+    feature_store.apply([customer, feature_view, FeatureService(name="service", features=[feature_view])])
+    return feature_store
+
+
+@pytest.fixture
+def builder(store, tmp_path):
+    return TrainingSetBuilder(
+        store=store, repo_path=str(tmp_path), feature_service_name="service", window=3 * DAY
+    )
+
+
+class TestSplitEntityDf:
+
+    def test_windows(self, entity_df):
+        chunks = split_entity_df(entity_df, 3 * DAY)
+        assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+        assert pd.concat(chunks).equals(entity_df)
+
+    def test_invalid_window(self, entity_df):
+        with pytest.raises(ValueError):
+            split_entity_df(entity_df, timedelta(0))
+
+
+class TestTrainingSetKey:
+
+    def test_row_order_does_not_matter(self, store, entity_df):
+        service = store.get_feature_service("service")
+        shuffled = entity_df.sample(frac=1, random_state=0)
+        assert training_set_key(shuffled, service) == training_set_key(entity_df, service)
+
+    def test_entities_change_the_key(self, store, entity_df):
+        service = store.get_feature_service("service")
+        assert training_set_key(entity_df.iloc[1:], service) != training_set_key(entity_df, service)
+
+
+class TestTrainingSetBuilder:
+
+    def test_same_as_get_historical_features(self, store, builder, entity_df):
+        """Values are point-in-time correct: the row of the day of the event"""
+        expected = store.get_historical_features(
+            entity_df=entity_df, features=store.get_feature_service("service")
+        ).to_df()
+        result = builder.get_training_df(entity_df)
+        assert len(list(builder.build(entity_df).glob("part-*.parquet"))) == 4
+        assert sorted(result["age"]) == sorted(expected["age"])
+        assert sorted(result["age"]) == [float(i * 100 + i - 1) for i in range(1, 11)]
+
+    def test_served_from_cache(self, store, builder, entity_df, monkeypatch):
+        path = builder.build(entity_df)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("not cached")
+        monkeypatch.setattr(store, "get_historical_features", fail)
+        assert builder.build(entity_df) == path
+
+    def test_single_retrieval_by_default(self, store, tmp_path, entity_df):
+        builder = TrainingSetBuilder(store=store, repo_path=str(tmp_path), feature_service_name="service")
+        path = builder.build(entity_df)
+        assert len(list(path.glob("part-*.parquet"))) == 1
+        assert len(pd.read_parquet(path)) == len(entity_df)
+
+    def test_incomplete_dataset_is_rebuilt(self, builder, entity_df):
+        """A dataset directory without a manifest is not a cache hit"""
+        path = builder.build(entity_df)
+        (path / MANIFEST).unlink()
+        (path / "part-00099.parquet").write_bytes(b"left by a killed build")
+        assert builder.build(entity_df) == path
+        assert (path / MANIFEST).exists()
+        assert len(pd.read_parquet(path)) == len(entity_df)
+
+    def test_source_change_changes_the_key(self, builder, entity_df, tmp_path):
+        """A corrected source row is retrieved, not served from the cache"""
+        path = builder.build(entity_df)
+        source = pd.read_parquet(tmp_path / "source.parquet")
+        correction = source[(source["entity_id"] == 1) & (source["event_timestamp"] == START)].copy()
+        correction["age"] = np.float32(-1.0)
+        correction["created"] = START + timedelta(hours=1)
+        pd.concat([source, correction]).to_parquet(tmp_path / "source.parquet")
+
+        corrected_path = builder.build(entity_df)
+        assert corrected_path != path
+        result = pd.read_parquet(corrected_path)
+        assert result.loc[result["entity_id"] == 1, "age"].tolist() == [-1.0]
+
+    def test_duckdb_source_stats_match_the_pull(self, store, builder, entity_df, feature_store_config, tmp_path):
+        """The duckdb offline store aggregates the Parquet source, with the same count and latest timestamp"""
+        duckdb_repo = tmp_path / "duckdb"
+        duckdb_repo.mkdir()
+        with open(duckdb_repo / "feature_store.yaml", "w", encoding="utf-8") as file:
+            yaml.safe_dump({
+                **feature_store_config,
+                "registry": str(duckdb_repo / "registry.db"),
+                "offline_store": {"type": "duckdb"},
+            }, file)
+        duckdb_store = FeatureStore(repo_path=str(duckdb_repo))
+        duckdb_store.apply([*store.list_entities(), *store.list_feature_views()])
+        duckdb_builder = TrainingSetBuilder(store=duckdb_store, repo_path=str(duckdb_repo))
+
+        feature_view = store.get_feature_view("feature_view")
+        for start_date, end_date in [(None, START + 20 * DAY), (START + 2 * DAY, START + 5 * DAY)]:
+            count, latest = duckdb_builder._source_stats(feature_view, start_date, end_date)
+            expected_count, expected_latest = builder._source_stats(feature_view, start_date, end_date)
+            assert count == expected_count
+            assert pd.Timestamp(latest) == pd.Timestamp(expected_latest)
@@ -0,0 +1,281 @@
+"""Training set builder module.
+
+Builds the point-in-time correct training set of a feature service and caches
+it on disk.
+
+- Datasets are cached by key, a hash of the entity DataFrame, the feature
+  service specification and the version of the source rows in the time range of
+  the entities (row count and latest created timestamp per feature view). An
+  identical request over unchanged sources is served from disk. Changing the
+  entities, the features of the feature service or the source rows, e.g. a push,
+  gives a new key. The row count and latest timestamp are aggregated by the
+  database for PostgreSQL sources and by DuckDB over the Parquet export for the
+  duckdb offline store, so a cache hit costs one aggregate query per feature view.
+  Only the file offline store pulls the timestamps of the rows to count them.
+- The dataset directory <cache_dir>/<key>/part-<window>.parquet can be read with
+  pd.read_parquet. It is complete when it has a manifest, a directory without
+  one is rebuilt.
+- By default the training set is retrieved with a single get_historical_features
+  call, which is the fastest. With a window, the entity DataFrame is split by
+  event_timestamp into windows retrieved concurrently in a thread pool and each
+  window is written to its own Parquet file as soon as it completes, so a
+  retrieval holds one window of the training set in memory rather than the whole.
+  Every window is a separate join, hence a window is slower overall and is for
+  training sets that do not fit in memory.
+
+Usage:
+    builder = TrainingSetBuilder(repo_path=".")
+    path = builder.build(entity_df)   # entity_id, event_timestamp
+    builder = TrainingSetBuilder(repo_path=".", window=timedelta(days=30))   # bounded memory
+    training_df = pd.read_parquet(path)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed,
+)
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import duckdb
+import pandas as pd
+import pyarrow.compute as pc
+
+from feast import (
+    FeatureService,
+    FeatureStore,
+    FeatureView,
+    FileSource,
+)
+from feast.infra.offline_stores.contrib.postgres_offline_store.postgres import PostgreSQLRetrievalJob
+from feast.infra.offline_stores.contrib.postgres_offline_store.postgres_source import PostgreSQLSource
+from feast.infra.offline_stores.offline_utils import (
+    get_offline_store_from_config,
+    get_timestamp_filter_sql,
+)
+
+DEFAULT_FEATURE_SERVICE_NAME = "customer_credit_risk_feature_service"
+DEFAULT_CACHE_DIR = "data/training_sets"
+MANIFEST = "_manifest.json"
+
+
+def split_entity_df(
+        entity_df: pd.DataFrame,
+        window: timedelta,
+        timestamp_column: str = "event_timestamp",
+) -> List[pd.DataFrame]:
+    """Split entity_df into the non-empty chunks of consecutive windows of event time"""
+    if window <= timedelta(0):
+        raise ValueError(f"window must be positive, got [{window}].")
+    if entity_df.empty:
+        return []
+    timestamps = pd.to_datetime(entity_df[timestamp_column])
+    window_index = (timestamps - timestamps.min()) // pd.Timedelta(window)
+    return [chunk for _, chunk in entity_df.groupby(window_index.to_numpy(), sort=True)]
+
+
+def training_set_key(
+        entity_df: pd.DataFrame,
+        feature_service: FeatureService,
+        source_version: str = "",
+) -> str:
+    """Hash of the entity rows (in any order), of the feature service specification
+    and of the source version from TrainingSetBuilder.source_version()"""
+    digest = hashlib.sha256()
+    digest.update(",".join(sorted(entity_df.columns)).encode())
+    rows = pd.util.hash_pandas_object(entity_df[sorted(entity_df.columns)], index=False)
+    digest.update(rows.sort_values().to_numpy().tobytes())
+    digest.update(feature_service.to_proto().spec.SerializeToString(deterministic=True))
+    digest.update(source_version.encode())
+    return digest.hexdigest()[:32]
+
+
+class TrainingSetBuilder:
+    """Chunked, parallel and cached get_historical_features of a feature service.
+
+    Args:
+        store: FeatureStore, FeatureStore(repo_path) by default.
+        repo_path: FEAST feature repository path.
+        feature_service_name: feature service to retrieve.
+        cache_dir: directory of the cached datasets, relative to repo_path.
+        window: event time covered by one retrieval, None for a single retrieval.
+        max_workers: number of concurrent retrievals.
+    """
+    def __init__(
+            self,
+            store: Optional[FeatureStore] = None,
+            repo_path: str = ".",
+            feature_service_name: str = DEFAULT_FEATURE_SERVICE_NAME,
+            cache_dir: str = DEFAULT_CACHE_DIR,
+            window: Optional[timedelta] = None,
+            max_workers: int = 4,
+    ):
+        self.store = store or FeatureStore(repo_path=repo_path)
+        self.feature_service_name = feature_service_name
+        self.cache_dir = Path(repo_path) / cache_dir
+        self.window = window
+        self.max_workers = max_workers
+
+    def _source_stats(
+            self,
+            feature_view: FeatureView,
+            start_date: Optional[datetime],
+            end_date: datetime,
+    ) -> Tuple[int, Any]:
+        """Row count and latest created (or event) timestamp of the batch source rows
+        with an event timestamp in [start_date, end_date]"""
+        config = self.store.config
+        source = feature_view.batch_source
+        column = source.created_timestamp_column or source.timestamp_field
+        if isinstance(source, PostgreSQLSource):
+            timestamp_filter = get_timestamp_filter_sql(
+                start_date, end_date, source.timestamp_field,
+                tz=timezone.utc, cast_style="timestamptz", date_time_separator=" ",
+            )
+            rows = PostgreSQLRetrievalJob(
+                query=f"""
+                    SELECT count(*) AS row_count, max({column}) AS latest
+                    FROM {source.get_table_query_string()} AS source
+                    WHERE {timestamp_filter}
+                """,
+                config=config,
+                full_feature_names=False,
+                on_demand_feature_views=None,
+            ).to_arrow().to_pylist()[0]
+            return rows["row_count"], rows["latest"]
+        if isinstance(source, FileSource) and config.offline_store.type == "duckdb":
+            path = FileSource.get_uri_for_file_path(config.repo_path, source.path)
+            where = f"{source.timestamp_field} <= $end_date"
+            parameters: Dict[str, Any] = {"path": path, "end_date": end_date}
+            if start_date is not None:
+                where += f" AND {source.timestamp_field} >= $start_date"
+                parameters["start_date"] = start_date
+            with duckdb.connect() as conn:
+                return conn.execute(
+                    f"SELECT count(*), max({column}) FROM read_parquet($path) WHERE {where}", parameters
+                ).fetchone()
+
+        # The file offline store has no aggregation, count the pulled timestamps.
+        rows = get_offline_store_from_config(config.offline_store).pull_all_from_table_or_query(
+            config=config,
+            data_source=source,
+            join_key_columns=[],
+            feature_name_columns=[],
+            timestamp_field=source.timestamp_field,
+            created_timestamp_column=source.created_timestamp_column or None,
+            start_date=start_date,
+            end_date=end_date,
+        ).to_arrow()
+        return rows.num_rows, pc.max(rows.column(column)).as_py() if rows.num_rows else None
+
+    def source_version(
+            self,
+            feature_service: FeatureService,
+            entity_df: pd.DataFrame,
+            timestamp_column: str = "event_timestamp",
+    ) -> str:
+        """Row count and latest created (or event) timestamp of the source rows of each
+        feature view of feature_service that a retrieval of entity_df can join"""
+        names = {projection.name for projection in feature_service.feature_view_projections}
+        timestamps = pd.to_datetime(entity_df[timestamp_column], utc=True)
+        versions = []
+        for feature_view in sorted(self.store.list_feature_views(), key=lambda view: view.name):
+            if feature_view.name not in names:
+                continue
+            start_date = None
+            if feature_view.ttl:
+                start_date = (timestamps.min() - feature_view.ttl).floor("us").to_pydatetime()
+            row_count, latest = self._source_stats(
+                feature_view, start_date, timestamps.max().ceil("us").to_pydatetime()
+            )
+            versions.append(f"{feature_view.name}:{row_count}:{latest}")
+        return ";".join(versions)
+
+    def _retrieve(self, feature_service: FeatureService, chunk: pd.DataFrame, path: Path) -> int:
+        """Point-in-time retrieval of one chunk, written to path. Returns the row count"""
+        df = self.store.get_historical_features(entity_df=chunk, features=feature_service).to_df()
+        df.to_parquet(path, index=False)
+        return len(df)
+
+    def build(self, entity_df: pd.DataFrame) -> Path:
+        """Build, or get from the cache, the training set of entity_df.
+
+        Args:
+            entity_df: entity rows with the join keys and an event_timestamp column
+
+        Returns: dataset directory of Parquet files
+        """
+        feature_service = self.store.get_feature_service(self.feature_service_name)
+        key = training_set_key(
+            entity_df, feature_service, self.source_version(feature_service, entity_df)
+        )
+        path = self.cache_dir / key
+        if (path / MANIFEST).exists():
+            logging.info("Training set [%s] served from the cache", key)
+            return path
+
+        start = time.perf_counter()
+        if self.window is None:
+            chunks = [entity_df] if not entity_df.empty else []
+        else:
+            chunks = split_entity_df(entity_df, self.window)
+        tmp_path = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        try:
+            rows = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._retrieve, feature_service, chunk, tmp_path / f"part-{i:05d}.parquet"
+                    )
+                    for i, chunk in enumerate(chunks)
+                ]
+                for future in as_completed(futures):
+                    rows += future.result()
+
+            manifest: Dict[str, Any] = {
+                "feature_service": self.feature_service_name,
+                "entity_rows": len(entity_df),
+                "rows": rows,
+                "windows": len(chunks),
+                "seconds": time.perf_counter() - start,
+            }
+            with open(tmp_path / MANIFEST, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, indent=2)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                if (path / MANIFEST).exists():
+                    # Built concurrently by another process, keep theirs.
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                else:
+                    # Incomplete, e.g. left by a build that was killed.
+                    shutil.rmtree(path, ignore_errors=True)
+                    os.rename(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        logging.info("Training set [%s]: %s", key, manifest)
+        return path
+
+    def get_training_df(self, entity_df: pd.DataFrame) -> pd.DataFrame:
+        """Training set of entity_df as a DataFrame"""
+        return pd.read_parquet(self.build(entity_df))
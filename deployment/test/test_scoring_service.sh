@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+# Run from the feature repository after exporting the model to data/model.npz:
+#   python scoring_service.py --model data/model.npz --model-version 1.0 --port 6570
+curl -X POST "http://localhost:6570/score" -d '{
+    "entity_ids": [1, 2]
+}'
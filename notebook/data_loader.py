@@ -0,0 +1,175 @@
+"""Raw Data Loader Module.
+
+Typed loader of data/raw/german_credit_data.csv (and of the synthetic files of
+synthetic_data.py with the same columns), replacing
+
+    pd.read_csv(path, index_col=0, converters={'Risk': lambda x: {'good': 0., 'bad': 1.}[x]})
+
+- The CSV is parsed by the multithreaded pyarrow CSV reader with the explicit
+  RAW_SCHEMA, instead of type inference and a Python call per Risk cell.
+- Risk is mapped to 0. / 1. with RISK_MAPPING in one vectorised lookup.
+- The categorical columns are read as Arrow dictionaries and become pandas
+  categoricals (with categorical=False, object strings as before).
+- The loaded table is cached in a Parquet sidecar next to the CSV,
+  .<csv name>.cache.parquet. The sidecar is used while the size and mtime of the
+  CSV are those it was written for, or, when they changed, while the CSV has the
+  same sha256. Otherwise the CSV is parsed again and the sidecar rewritten.
+
+Usage:
+    df = load_raw_data("../data/raw/german_credit_data.csv")
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+RAW_SCHEMA: Dict[str, pa.DataType] = {
+    "Age": pa.int64(),
+    "Sex": CATEGORY_TYPE,
+    "Job": pa.int64(),
+    "Housing": CATEGORY_TYPE,
+    "Saving accounts": CATEGORY_TYPE,
+    "Checking account": CATEGORY_TYPE,
+    "Credit amount": pa.int64(),
+    "Duration": pa.int64(),
+    "Purpose": CATEGORY_TYPE,
+    "Risk": pa.string(),
+}
+RISK_MAPPING = {"good": 0., "bad": 1.}
+_CACHE_METADATA_KEY = b"raw_data_loader"
+# Bumped when the cached table layout changes.
+_CACHE_VERSION = 1
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sidecar_path(path: str) -> Path:
+    """Parquet sidecar of the CSV at path"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.cache.parquet")
+
+
+def _map_risk(risk: pa.ChunkedArray) -> pa.ChunkedArray:
+    keys = pa.array(list(RISK_MAPPING), pa.string())
+    indices = pc.index_in(risk, value_set=keys)
+    unknown = pc.sum(pc.and_(pc.is_null(indices), pc.is_valid(risk))).as_py()
+    if unknown:
+        raise ValueError(f"{unknown} Risk values are not one of {list(RISK_MAPPING)}.")
+    return pc.take(pa.array(list(RISK_MAPPING.values()), pa.float64()), indices)
+
+
+def read_raw_table(path: str) -> pa.Table:
+    """Parse the CSV with RAW_SCHEMA and map Risk.
+
+    Columns not in RAW_SCHEMA, e.g. the unnamed index or the entity_id and
+    event_timestamp of synthetic files, are inferred by pyarrow.
+    """
+    table = pv.read_csv(
+        path,
+        read_options=pv.ReadOptions(use_threads=True, block_size=1 << 24),
+        convert_options=pv.ConvertOptions(
+            column_types=RAW_SCHEMA,
+            null_values=["NA", ""],
+            strings_can_be_null=True,
+        ),
+    )
+    if "Risk" in table.column_names:
+        table = table.set_column(table.column_names.index("Risk"), "Risk", _map_risk(table["Risk"]))
+    return table
+
+
+def _cache_key(path: Path) -> Dict[str, Any]:
+    stat = path.stat()
+    return {
+        "version": _CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_sha256(path),
+    }
+
+
+def _read_sidecar(path: Path, sidecar: Path) -> Optional[pa.Table]:
+    """The sidecar table when it is valid for the CSV, None otherwise"""
+    try:
+        metadata = pq.read_schema(sidecar).metadata or {}
+        cached = json.loads(metadata[_CACHE_METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+    stat = path.stat()
+    if cached.get("version") != _CACHE_VERSION:
+        return None
+    if (cached.get("size"), cached.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+        # Touched or copied: still valid with the same content.
+        if cached.get("size") != stat.st_size or cached.get("sha256") != _file_sha256(path):
+            return None
+    return pq.read_table(sidecar)
+
+
+def _write_sidecar(table: pa.Table, path: Path, sidecar: Path):
+    metadata = dict(table.schema.metadata or {})
+    metadata[_CACHE_METADATA_KEY] = json.dumps(_cache_key(path)).encode()
+    tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    try:
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, sidecar)
+    except OSError as error:
+        # e.g. a read only data directory, the cache is an optimisation only.
+        logging.warning("Could not write the cache [%s]: %s", sidecar, error)
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_raw_data(
+        path: str,
+        index_col: Optional[int] = 0,
+        categorical: bool = True,
+        use_cache: bool = True,
+) -> pd.DataFrame:
+    """Load the raw CSV.
+
+    Args:
+        path: german_credit_data.csv like CSV
+        index_col: position of the index column as in pd.read_csv, None for a RangeIndex
+        categorical: categorical columns as pandas categoricals, object strings otherwise
+        use_cache: read and write the Parquet sidecar
+
+    Returns: DataFrame with Risk 0. (good) / 1. (bad)
+    """
+    path = Path(path)
+    sidecar = sidecar_path(str(path))
+    table = _read_sidecar(path, sidecar) if use_cache and sidecar.exists() else None
+    if table is None:
+        table = read_raw_table(str(path))
+        if use_cache:
+            _write_sidecar(table, path, sidecar)
+    else:
+        logging.debug("Loaded [%s] from the cache [%s]", path, sidecar)
+
+    df = table.to_pandas()
+    if not categorical:
+        for column, dtype in RAW_SCHEMA.items():
+            if dtype == CATEGORY_TYPE and column in df:
+                df[column] = df[column].astype(object)
+    if index_col is not None:
+        df = df.set_index(df.columns[index_col])
+        if df.index.name.startswith("Unnamed") or df.index.name == "":
+            df.index.name = None
+    return df
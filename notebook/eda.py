@@ -1,7 +1,9 @@
 """Exploratory Data Analysis
 DO NOT mutate the data to explore. Transformation and exploration are separate concerns.
 """
+from functools import partial
 from typing import (
+    Dict,
     List,
     Sequence,
     Tuple,
@@ -15,6 +17,20 @@ import plotly.graph_objs as go
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from feature_engineering import (
+    CATEGORY_ORDER,
+    NA_CATEGORY,
+    to_categorical,
+)
+from instrumentation import instrument_pipeline
+
+# The EDA runs before the NA imputation, hence without the NA_CATEGORY placeholder,
+# which would show up as an empty category in the groupbys and value counts.
+EDA_CATEGORY_ORDER: Dict[str, List[str]] = {
+    col: [category for category in categories if category != NA_CATEGORY]
+    for col, categories in CATEGORY_ORDER.items()
+}
+
 
 def add_generation_category(
         df: pd.DataFrame,
@@ -59,17 +75,22 @@ def add_credit_amount_category(
 def run_eda_enrich_pipeline(
         df: pd.DataFrame,
         categorical_cols: List[str],
-        numeric_cols: List[str]
+        numeric_cols: List[str],
+        categorical: bool = True,
 ) -> Tuple[pd.DataFrame, List[str], List[str]]:
     """Apply feature engineering transformations on the input DataFrame.
     Steps:
-        1. Bin 'Age' into categorical 'Generation' groups.
-        2. Bin 'Credit amount' into categorical intervals.
+        1. Convert the string columns to Categoricals of EDA_CATEGORY_ORDER
+           (feature_engineering.to_categorical), unless categorical is False.
+           Missing values stay NA.
+        2. Bin 'Age' into categorical 'Generation' groups.
+        3. Bin 'Credit amount' into categorical intervals.
 
     Args:
         df (pd.DataFrame): Input DataFrame with columns 'Age' and 'Credit amount'.
         categorical_cols: categorical column names in df
         numeric_cols: numeric column names in df
+        categorical: convert the string columns to Categoricals
 
     Returns: Tuple(
         A copy of the DataFrame with an additional 'Amount' and 'Generation' categorical columns,
@@ -80,7 +101,13 @@ def run_eda_enrich_pipeline(
     age_transformer = FunctionTransformer(add_generation_category, validate=False)
     credit_amount_transformer = FunctionTransformer(add_credit_amount_category, validate=False)
 
-    transformation_pipeline = Pipeline([
+    steps = []
+    if categorical:
+        steps.append((
+            "categorical_dtypes",
+            FunctionTransformer(partial(to_categorical, category_order=EDA_CATEGORY_ORDER), validate=False),
+        ))
+    transformation_pipeline = Pipeline(steps + [
         ("age_binning", age_transformer),
         ("credit_binning", credit_amount_transformer),
     ])
@@ -88,7 +115,11 @@ def run_eda_enrich_pipeline(
     numeric_cols.remove('Age')
     numeric_cols.remove('Credit amount')
 
-    return transformation_pipeline.fit_transform(df), categorical_cols, numeric_cols
+    return (
+        instrument_pipeline(transformation_pipeline, "eda_enrich").fit_transform(df),
+        categorical_cols,
+        numeric_cols,
+    )
 
 
 def analyse_target_distribution(df: pd.DataFrame):
@@ -235,7 +266,7 @@ def risk_per_credit_amount_bin(df: pd.DataFrame):
 
         # Compute counts and mean risk per bin for this generation
         counts = gen_data['Amount'].value_counts().sort_index()
-        risk_means = gen_data.groupby('Amount')['Risk'].mean()
+        risk_means = gen_data.groupby('Amount', observed=False)['Risk'].mean()
 
         # Plot with dual axes
         ax1 = axes[i]
@@ -467,7 +498,7 @@ def risk_correlation(df: pd.DataFrame, categorical_cols: List[str]):
         ax = axes[i]
         # Categorical: proportions of Risk within each category
         prop_df = (
-            df.groupby(col)['Risk']
+            df.groupby(col, observed=False)['Risk']
             .value_counts(normalize=True)  # proportions
             .rename("proportion")
             .reset_index()
@@ -498,7 +529,7 @@ def risk_heatmap(df: pd.DataFrame, categorical_cols):
 
     heatmap_data = pd.DataFrame()
     for col in categorical_cols:
-        prop = df.groupby(col)['Risk'].mean().fillna(0)  # works if target is 0/1
+        prop = df.groupby(col, observed=False)['Risk'].mean().fillna(0)  # works if target is 0/1
         prop.name = col
         heatmap_data = pd.concat([heatmap_data, prop], axis=1)
 
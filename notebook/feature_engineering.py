@@ -2,6 +2,14 @@
 
 Provides utilities for handling missing values and encoding categorical features
 for tabular datasets, with a reusable pipeline.
+
+The string columns of CATEGORY_ORDER are converted to pandas Categoricals with
+that fixed category order (to_categorical). On Categoricals the NA imputation is
+an assignment of the NA_CATEGORY code and the one-hot encoding indexes by the
+codes, so no string is hashed after the conversion, and the encoded columns are
+the same whichever categories a sample contains. The orders are the sorted
+values, as pd.get_dummies orders object columns, hence both paths produce the
+same columns.
 """
 from typing import (
     List,
@@ -15,6 +23,56 @@ import pandas as pd
 from sklearn.preprocessing import FunctionTransformer
 from sklearn.pipeline import Pipeline
 
+from instrumentation import instrument_pipeline
+
+NA_CATEGORY = 'no_inf'
+CATEGORY_ORDER: Dict[str, List[str]] = {
+    'Sex': ['female', 'male'],
+    'Housing': ['free', 'own', 'rent'],
+    'Saving accounts': ['little', 'moderate', NA_CATEGORY, 'quite rich', 'rich'],
+    'Checking account': ['little', 'moderate', NA_CATEGORY, 'rich'],
+    'Purpose': [
+        'business', 'car', 'domestic appliances', 'education',
+        'furniture/equipment', 'radio/TV', 'repairs', 'vacation/others'
+    ],
+}
+
+
+def to_categorical(
+        df: pd.DataFrame,
+        category_order: Dict[str, List[str]] = None
+) -> pd.DataFrame:
+    """Convert the columns of category_order present in df to Categoricals with that order.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame with object or Categorical columns.
+        category_order: categories per column. Defaults to CATEGORY_ORDER.
+
+    Returns:
+        pd.DataFrame: A copy of df with the converted columns.
+
+    Raises:
+        ValueError: when a column holds a value outside its categories.
+    """
+    if category_order is None:
+        category_order = CATEGORY_ORDER
+    df = df.copy()
+    for col, categories in category_order.items():
+        if col not in df:
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if list(series.cat.categories) == categories:
+                continue
+            converted = series.cat.set_categories(categories)
+        else:
+            converted = series.astype(pd.CategoricalDtype(categories))
+        unknown = int(converted.isna().sum() - series.isna().sum())
+        if unknown:
+            raise ValueError(f"{unknown} values of [{col}] are not one of {categories}.")
+        df[col] = converted
+    return df
+
 
 def drop_unwanted_columns(
         df: pd.DataFrame, keep_cols: List[str]
@@ -40,12 +98,30 @@ def get_impute_na(
     def _impute(df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
         for col in columns:
-            df[col] = df[col].fillna('no_inf')
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                if NA_CATEGORY not in series.cat.categories:
+                    series = series.cat.add_categories([NA_CATEGORY])
+                codes = series.cat.codes.to_numpy(copy=True)
+                codes[codes == -1] = series.cat.categories.get_loc(NA_CATEGORY)
+                df[col] = pd.Categorical.from_codes(codes, dtype=series.dtype)
+            else:
+                df[col] = series.fillna(NA_CATEGORY)
         return df
 
     return _impute
 
 
+def _one_hot_codes(series: pd.Series, prefix: str) -> pd.DataFrame:
+    """pd.get_dummies(series, prefix, dtype=np.float32) of a Categorical, from its codes"""
+    codes = series.cat.codes.to_numpy()
+    categories = series.cat.categories
+    one_hot = np.zeros((len(codes), len(categories)), dtype=np.float32)
+    present = codes >= 0
+    one_hot[np.flatnonzero(present), codes[present]] = 1.
+    return pd.DataFrame(one_hot, index=series.index, columns=[f"{prefix}_{category}" for category in categories])
+
+
 def get_encode_categoricals(
         columns: List[str] = None
 ) -> Callable[[pd.DataFrame], pd.DataFrame]:
@@ -68,7 +144,9 @@ def get_encode_categoricals(
     def _encode(df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
         dummies = pd.concat([
-            pd.get_dummies(
+            _one_hot_codes(df[col], prefix=col.lower().replace(" ", "_"))
+            if isinstance(df[col].dtype, pd.CategoricalDtype)
+            else pd.get_dummies(
                 df[col],
                 prefix=col.lower().replace(" ", "_"),
                 drop_first=False,
@@ -91,6 +169,7 @@ def run_feature_engineering_pipeline(
         numeric_cols: List[str],
         label_column: str,
         column_rename_map: Dict[str, str],
+        categorical: bool = True,
 ) -> pd.DataFrame:
     """Apply feature engineering pipeline: NA imputation + categorical encoding.
 
@@ -100,6 +179,8 @@ def run_feature_engineering_pipeline(
         numeric_cols: List of numerical columns
         label_column: Label column name
         column_rename_map: Column renaming map
+        categorical: Run on Categoricals of CATEGORY_ORDER (to_categorical), or on
+            the columns as they are.
 
     Returns:
         pd.DataFrame: Transformed DataFrame with imputed and one-hot encoded features.
@@ -122,11 +203,13 @@ def run_feature_engineering_pipeline(
         validate=False
     )
 
-    pipeline: Pipeline = Pipeline([
-        ('select_columns', selector_transformer),
+    steps = [('select_columns', selector_transformer)]
+    if categorical:
+        steps.append(('categorical_dtypes', FunctionTransformer(to_categorical, validate=False)))
+    pipeline: Pipeline = Pipeline(steps + [
         ('impute_na', imputer_transformer),
         ('encode_categoricals', encoder_transformer),
         ('normalize_columns', normalize_transformer)
     ])
-    df_transformed: pd.DataFrame = pipeline.fit_transform(df)
+    df_transformed: pd.DataFrame = instrument_pipeline(pipeline, "feature_engineering").fit_transform(df)
     return df_transformed.drop(columns=numeric_cols)
@@ -0,0 +1,286 @@
+"""Pipeline Instrumentation Module.
+
+Per step measurements of the sklearn Pipelines of eda.py and
+feature_engineering.py. Their steps are FunctionTransformers of closures, e.g.
+get_impute_na()._impute, so a profiler only shows FunctionTransformer.transform
+frames. instrument_pipeline() wraps every step of a Pipeline in an
+InstrumentedStep which records per fit, transform and fit_transform call:
+
+    pipeline, step, method   names of the pipeline, the step and the call
+    wall_seconds             time.perf_counter() duration
+    cpu_seconds              time.process_time() duration (all threads of the process)
+    rows_in, rows_out        len() of the input and output, None for non sized values
+    memory_peak_bytes        peak of the traced allocations above those at the start
+                             of the call, None unless tracemalloc is tracing
+
+Records go to the sinks passed to enable(): LoggingSink, JsonLinesSink and
+PrometheusTextfileSink, or any object with emit(record) and close() methods.
+
+Disabled (the default), instrument_pipeline() returns the pipeline unchanged and
+the pipelines run exactly as without instrumentation.
+
+Usage:
+    with instrumented(LoggingSink(), JsonLinesSink("../data/metrics/steps.jsonl")):
+        df, categorical_cols, numeric_cols = run_eda_enrich_pipeline(...)
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from sklearn.base import (
+    BaseEstimator,
+    TransformerMixin,
+)
+from sklearn.pipeline import Pipeline
+
+_lock = threading.Lock()
+_sinks: List[Any] = []
+_started_tracemalloc = False
+
+
+class LoggingSink:
+    """Log one line per record.
+
+    Args:
+        level: logging level of the lines
+    """
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def emit(self, record: Dict[str, Any]):
+        """Log the record"""
+        memory = record["memory_peak_bytes"]
+        logging.log(
+            self.level, "%s.%s %s: %.4f sec wall, %.4f sec cpu, rows %s -> %s%s",
+            record["pipeline"], record["step"], record["method"], record["wall_seconds"],
+            record["cpu_seconds"], record["rows_in"], record["rows_out"],
+            "" if memory is None else f", peak {memory / 2 ** 20:.1f} MB",
+        )
+
+    def close(self):
+        """Nothing to release"""
+
+
+class JsonLinesSink:
+    """Append one JSON object per record to a file.
+
+    Args:
+        path: JSON lines file, created with its directory if missing
+    """
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def emit(self, record: Dict[str, Any]):
+        """Append the record"""
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Close the file"""
+        self._file.close()
+
+
+class PrometheusTextfileSink:
+    """Prometheus text format file of the totals per pipeline step, for the
+    node_exporter textfile collector. The file is rewritten (atomically) on every
+    record.
+
+    Args:
+        path: .prom file
+        prefix: metric name prefix
+    """
+    def __init__(self, path: str, prefix: str = "credit_pipeline_step"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def emit(self, record: Dict[str, Any]):
+        """Add the record to the totals and rewrite the file"""
+        totals = self._totals.setdefault(
+            (record["pipeline"], record["step"]),
+            {"calls": 0, "wall_seconds": 0., "cpu_seconds": 0., "rows_in": 0, "rows_out": 0,
+             "memory_peak_bytes": 0},
+        )
+        totals["calls"] += 1
+        totals["wall_seconds"] += record["wall_seconds"]
+        totals["cpu_seconds"] += record["cpu_seconds"]
+        totals["rows_in"] += record["rows_in"] or 0
+        totals["rows_out"] += record["rows_out"] or 0
+        totals["memory_peak_bytes"] = max(totals["memory_peak_bytes"], record["memory_peak_bytes"] or 0)
+        self._write()
+
+    def _write(self):
+        metrics = [
+            ("calls_total", "counter", "Calls of the step"),
+            ("wall_seconds_total", "counter", "Wall time of the step"),
+            ("cpu_seconds_total", "counter", "Process CPU time of the step"),
+            ("rows_in_total", "counter", "Rows into the step"),
+            ("rows_out_total", "counter", "Rows out of the step"),
+            ("memory_peak_bytes", "gauge", "Largest traced allocation peak of a call of the step"),
+        ]
+        lines = []
+        for metric, metric_type, description in metrics:
+            name = f"{self.prefix}_{metric}"
+            key = metric.replace("_total", "") if metric_type == "counter" else metric
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+            for (pipeline, step), totals in sorted(self._totals.items()):
+                lines.append(f'{name}{{pipeline="{pipeline}",step="{step}"}} {totals[key]}')
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Nothing to release, the file is complete after every record"""
+
+
+def enable(*sinks: Any, trace_memory: bool = False):
+    """Instrument the pipelines built from now on.
+
+    Args:
+        sinks: receivers of the records
+        trace_memory: start tracemalloc for memory_peak_bytes. Tracing slows
+            down allocations, hence it is off by default.
+    """
+    global _started_tracemalloc  # pylint: disable=global-statement
+    with _lock:
+        _sinks[:] = sinks
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+
+
+def disable():
+    """Stop instrumenting and close the sinks"""
+    global _started_tracemalloc  # pylint: disable=global-statement
+    with _lock:
+        sinks = list(_sinks)
+        _sinks.clear()
+        if _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+    for sink in sinks:
+        sink.close()
+
+
+def is_enabled() -> bool:
+    """True when enable() was called without disable()"""
+    return bool(_sinks)
+
+
+@contextmanager
+def instrumented(*sinks: Any, trace_memory: bool = False) -> Iterator[None]:
+    """enable() for the with-block"""
+    enable(*sinks, trace_memory=trace_memory)
+    try:
+        yield
+    finally:
+        disable()
+
+
+def _rows(value: Any) -> Optional[int]:
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _emit(record: Dict[str, Any]):
+    for sink in list(_sinks):
+        try:
+            sink.emit(record)
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Instrumentation sink [%s] failed", type(sink).__name__)
+
+
+class InstrumentedStep(TransformerMixin, BaseEstimator):
+    """Transformer delegating to transformer and recording every call.
+
+    Args:
+        transformer: the wrapped step
+        pipeline: pipeline name of the records
+        step: step name of the records
+    """
+    def __init__(self, transformer: Any = None, pipeline: str = "pipeline", step: str = "step"):
+        self.transformer = transformer
+        self.pipeline = pipeline
+        self.step = step
+
+    def _call(self, method: str, func: Callable[[], Any], X: Any) -> Any:
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = func()
+        wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _emit({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "pipeline": self.pipeline,
+            "step": self.step,
+            "method": method,
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "rows_in": _rows(X),
+            "rows_out": None if method == "fit" else _rows(result),
+            "memory_peak_bytes": tracemalloc.get_traced_memory()[1] - memory_start if tracing else None,
+        })
+        return result
+
+    def fit(self, X, y=None, **params):
+        """Fit the wrapped transformer"""
+        self._call("fit", lambda: self.transformer.fit(X, y, **params), X)
+        return self
+
+    def transform(self, X):
+        """Transform with the wrapped transformer"""
+        return self._call("transform", lambda: self.transformer.transform(X), X)
+
+    def fit_transform(self, X, y=None, **params):
+        """Fit and transform with the wrapped transformer"""
+        if hasattr(self.transformer, "fit_transform"):
+            return self._call("fit_transform", lambda: self.transformer.fit_transform(X, y, **params), X)
+        return self._call("fit_transform", lambda: self.transformer.fit(X, y, **params).transform(X), X)
+
+
+def instrument_pipeline(pipeline: Pipeline, name: str) -> Pipeline:
+    """Wrap the transformer steps of pipeline in InstrumentedSteps when enabled.
+
+    Args:
+        pipeline: unfitted Pipeline
+        name: pipeline name of the records
+
+    Returns: pipeline itself when disabled, a Pipeline of the wrapped steps otherwise
+    """
+    if not _sinks:
+        return pipeline
+    return Pipeline(
+        [
+            (step, InstrumentedStep(transformer, name, step)
+                if hasattr(transformer, "transform") and not isinstance(transformer, InstrumentedStep)
+                else transformer)
+            for step, transformer in pipeline.steps
+        ],
+        memory=pipeline.memory,
+        verbose=pipeline.verbose,
+    )
@@ -11,6 +11,11 @@ from urllib.parse import quote
 from tqdm import tqdm
 import numpy as np
 
+from sql_instrumentation import (
+    SQL_METRICS,
+    TimedQueuePool,
+)
+
 
 @contextmanager
 def get_engine(parameters):
@@ -25,7 +30,7 @@ def get_engine(parameters):
         password = quote(get_password_from_pgpass(parameters))
         conn_string = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
 
-        engine = create_engine(conn_string)
+        engine = SQL_METRICS.attach(create_engine(conn_string, poolclass=TimedQueuePool))
         yield engine
 
     finally:
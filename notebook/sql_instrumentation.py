@@ -0,0 +1,260 @@
+"""SQL Instrumentation Module.
+
+Latency and volume metrics of the SQLAlchemy engines of psql.py, to tell
+connection setup, catalog introspection and INSERTs apart in a slow run.
+psql.get_engine() attaches every engine it creates to SQL_METRICS.
+
+Recorded from the SQLAlchemy events of an attached engine:
+- per statement: latency, rows affected (cursor.rowcount) and bytes sent (the
+  query psycopg2 sent, or the statement and parameters otherwise, per parameter
+  set for an executemany), by kind:
+  the first keyword of the statement (SELECT, INSERT, TRUNCATE, ...) or CATALOG
+  for queries of pg_catalog / information_schema (Inspector).
+- connections: count and latency of new DBAPI connections.
+- pool checkouts: time until Pool.connect() returns, including a new connection
+  when the pool has none, with TimedQueuePool as the poolclass.
+- errors per statement kind.
+
+Latencies are aggregated into fixed bucket histograms. A statement slower than
+slow_query_seconds is logged as a warning and kept (the last max_slow_queries).
+
+Usage:
+    SQL_METRICS.reset()
+    ... pipeline run using psql.py ...
+    SQL_METRICS.log_summary()
+    SQL_METRICS.write_summary("../data/metrics/sql_summary.json")
+"""
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    List,
+    Optional,
+)
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds in seconds, the last bucket is unbounded.
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.]
+_CATALOG_PATTERN = re.compile(r"\b(pg_catalog|information_schema)\.", re.IGNORECASE)
+
+
+class Histogram:
+    """Fixed bucket histogram of latencies.
+
+    Args:
+        buckets: ascending bucket upper bounds
+    """
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = buckets or LATENCY_BUCKETS
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def observe(self, value: float):
+        """Add a value"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket of the q quantile, the maximum for the last bucket"""
+        if self.count == 0:
+            return None
+        rank, cumulative = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """count, sum, mean, max, p50, p95, p99 and the non empty buckets"""
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {bound: count for bound, count in zip(bounds, self.counts) if count},
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool reporting the time of every checkout to its metrics"""
+    metrics: Optional["SQLMetrics"] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        if self.metrics is not None:
+            self.metrics.observe_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def statement_kind(statement: str) -> str:
+    """CATALOG for catalog queries, the first keyword of the statement otherwise"""
+    if _CATALOG_PATTERN.search(statement):
+        return "CATALOG"
+    words = statement.lstrip(" (\n\t").split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _bytes_sent(cursor, statement: str, parameters, executemany: bool) -> int:
+    """Size of the query sent to the server, estimated where the cursor does not keep it"""
+    if executemany:
+        # cursor.query holds only the last parameter set of executemany.
+        return sum(len(statement) + len(str(row)) for row in parameters)
+    # psycopg2 keeps the query with the parameters bound as sent to the server.
+    query = getattr(cursor, "query", None)
+    if isinstance(query, (bytes, str)):
+        return len(query)
+    return len(statement) + len(str(parameters or ""))
+
+
+class SQLMetrics:
+    """Thread safe collector of the SQL metrics of the attached engines.
+
+    Args:
+        slow_query_seconds: statements at least this slow are logged and kept
+        max_slow_queries: number of slow statements kept
+    """
+    def __init__(self, slow_query_seconds: float = 1.0, max_slow_queries: int = 100):
+        self.slow_query_seconds = slow_query_seconds
+        self.max_slow_queries = max_slow_queries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Clear the metrics, e.g. at the start of a pipeline run"""
+        with self._lock:
+            self.statements: Dict[str, Histogram] = {}
+            self.rows: Dict[str, int] = {}
+            self.bytes_sent: Dict[str, int] = {}
+            self.errors: Dict[str, int] = {}
+            self.connect = Histogram()
+            self.checkout = Histogram()
+            self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=self.max_slow_queries)
+
+    def attach(self, engine: Engine) -> Engine:
+        """Register the event listeners on engine.
+
+        Returns: engine
+        """
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+        event.listen(engine, "do_connect", self._do_connect)
+        event.listen(engine, "connect", self._connect)
+        return engine
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        kind = statement_kind(statement)
+        sent = _bytes_sent(cursor, statement, parameters, executemany)
+        rowcount = cursor.rowcount if isinstance(cursor.rowcount, int) and cursor.rowcount >= 0 else 0
+        with self._lock:
+            self.statements.setdefault(kind, Histogram()).observe(seconds)
+            self.rows[kind] = self.rows.get(kind, 0) + rowcount
+            self.bytes_sent[kind] = self.bytes_sent.get(kind, 0) + sent
+            if seconds >= self.slow_query_seconds:
+                self.slow_queries.append({"seconds": seconds, "kind": kind, "rows": rowcount,
+                                          "statement": statement[:1000]})
+        if seconds >= self.slow_query_seconds:
+            logging.warning("Slow %s statement %.3f sec, %s rows: %.200s",
+                            kind, seconds, rowcount, " ".join(statement.split()))
+
+    def _handle_error(self, context):
+        statement = context.statement or ""
+        kind = statement_kind(statement) if statement else "CONNECT"
+        if statement and context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def _do_connect(self, dialect, conn_rec, cargs, cparams):
+        self._local.connect_start = time.perf_counter()
+
+    def _connect(self, dbapi_connection, connection_record):
+        start = getattr(self._local, "connect_start", None)
+        if start is not None:
+            self._local.connect_start = None
+            with self._lock:
+                self.connect.observe(time.perf_counter() - start)
+
+    def observe_checkout(self, seconds: float):
+        """Record a pool checkout"""
+        with self._lock:
+            self.checkout.observe(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """Metrics since the last reset()"""
+        with self._lock:
+            return {
+                "statements": {
+                    kind: dict(histogram.summary(), rows=self.rows[kind], bytes_sent=self.bytes_sent[kind])
+                    for kind, histogram in sorted(self.statements.items())
+                },
+                "errors": dict(self.errors),
+                "connections": self.connect.summary(),
+                "pool_checkouts": self.checkout.summary(),
+                "slow_query_seconds": self.slow_query_seconds,
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def log_summary(self, level: int = logging.INFO):
+        """Log one line per statement kind, connections and checkouts"""
+        summary = self.summary()
+        for kind, metrics in summary["statements"].items():
+            logging.log(level, "SQL %-8s %6d statements, %.3f sec total, p50 %.4f p95 %.4f max %.3f sec, "
+                               "%d rows, %d bytes sent", kind, metrics["count"], metrics["sum"],
+                        metrics["p50"], metrics["p95"], metrics["max"], metrics["rows"], metrics["bytes_sent"])
+        for name in ("connections", "pool_checkouts"):
+            metrics = summary[name]
+            logging.log(level, "SQL %s: %d, %.3f sec total, max %.3f sec",
+                        name, metrics["count"], metrics["sum"], metrics["max"])
+        if summary["errors"]:
+            logging.log(level, "SQL errors: %s", summary["errors"])
+        if summary["slow_queries"]:
+            logging.log(level, "SQL slow statements (>= %s sec): %d",
+                        self.slow_query_seconds, len(summary["slow_queries"]))
+
+    def write_summary(self, path: str):
+        """Write summary() as JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+# Collector of the engines of psql.get_engine().
+SQL_METRICS = SQLMetrics(slow_query_seconds=float(os.environ.get("PSQL_SLOW_QUERY_SECONDS", "1.0")))
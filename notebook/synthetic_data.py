@@ -0,0 +1,230 @@
+"""Synthetic Data Module.
+
+Scales data/raw/german_credit_data.csv (1,000 rows) out to any number of rows
+with the same columns, for tuning and benchmarking at production scale.
+
+The generator learns from the raw data:
+- Risk: its marginal frequency.
+- Categorical columns (Sex, Job, Housing, Saving accounts, Checking account,
+  Purpose) given Risk: the empirical joint distribution, i.e. a generated row
+  takes the categories of a raw row of the same Risk. Category frequencies,
+  their co-occurrence and the Risk conditionals are those of the raw data.
+- Age, Credit amount and Duration given Risk and Purpose: a multivariate normal
+  of their logarithms, which keeps e.g. the Credit amount / Duration correlation.
+  Groups with fewer than min_group_rows rows use the Risk group instead.
+  Duration is snapped to the durations seen in the raw data.
+
+Generation is vectorised per chunk. The rows are reproducible for a given seed
+and chunk_size; each chunk has its own random stream spawned from the seed.
+Each row gets an entity_id and an event_timestamp uniform over [start, end).
+
+Usage:
+    generator = SyntheticCreditDataGenerator.from_csv("../data/raw/german_credit_data.csv")
+    generator.write("../data/synthetic/german_credit_data_10m.parquet", n_rows=10_000_000)
+
+    python synthetic_data.py --rows 10000000 --output ../data/synthetic/german_credit_data_10m.parquet
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CATEGORICAL_COLUMNS = ["Sex", "Job", "Housing", "Saving accounts", "Checking account", "Purpose"]
+NUMERICAL_COLUMNS = ["Age", "Credit amount", "Duration"]
+TARGET_COLUMN = "Risk"
+RAW_COLUMNS = ["Age", "Sex", "Job", "Housing", "Saving accounts", "Checking account",
+               "Credit amount", "Duration", "Purpose", "Risk"]
+
+
+class SyntheticCreditDataGenerator:
+    """Vectorised generator of german_credit_data.csv like rows.
+
+    Args:
+        min_group_rows: minimum rows of a (Risk, Purpose) group to fit its own
+            numerical distribution.
+    """
+    def __init__(self, min_group_rows: int = 20):
+        self.min_group_rows = min_group_rows
+        self.risks: Optional[np.ndarray] = None
+        self.risk_probabilities: Optional[np.ndarray] = None
+        # Per Risk: categorical columns of the raw rows with that Risk.
+        self.categories: Dict[str, pd.DataFrame] = {}
+        # (Risk, Purpose) or (Risk, None): mean and covariance of the log numericals.
+        self.log_normals: Dict[Tuple[str, Optional[str]], Tuple[np.ndarray, np.ndarray]] = {}
+        self.bounds: Dict[str, Tuple[float, float]] = {}
+        self.durations: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "SyntheticCreditDataGenerator":
+        """Generator fitted to the raw CSV"""
+        return cls(**kwargs).fit(pd.read_csv(path, index_col=0))
+
+    def _log_normal(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        logs = np.log(df[NUMERICAL_COLUMNS].to_numpy(dtype=np.float64))
+        return logs.mean(axis=0), np.cov(logs, rowvar=False)
+
+    def fit(self, df: pd.DataFrame) -> "SyntheticCreditDataGenerator":
+        """Learn the distributions of the raw data.
+
+        Args:
+            df: raw data with the RAW_COLUMNS columns
+
+        Returns: self
+        """
+        frequencies = df[TARGET_COLUMN].value_counts(normalize=True).sort_index()
+        self.risks = frequencies.index.to_numpy()
+        self.risk_probabilities = frequencies.to_numpy()
+        self.categories = {}
+        self.log_normals = {}
+        for risk, group in df.groupby(TARGET_COLUMN):
+            self.categories[risk] = group[CATEGORICAL_COLUMNS].reset_index(drop=True)
+            self.log_normals[(risk, None)] = self._log_normal(group)
+            for purpose, purpose_group in group.groupby("Purpose"):
+                if len(purpose_group) >= self.min_group_rows:
+                    self.log_normals[(risk, purpose)] = self._log_normal(purpose_group)
+        self.bounds = {column: (df[column].min(), df[column].max()) for column in NUMERICAL_COLUMNS}
+        self.durations = np.sort(df["Duration"].unique())
+        return self
+
+    def sample(self, n_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+        """n_rows generated rows with the RAW_COLUMNS columns"""
+        if self.risks is None:
+            raise RuntimeError("fit() the generator first.")
+        risk_index = rng.choice(len(self.risks), size=n_rows, p=self.risk_probabilities)
+        parts: List[pd.DataFrame] = []
+        for i, risk in enumerate(self.risks):
+            n_risk = int((risk_index == i).sum())
+            if n_risk == 0:
+                continue
+            categories = self.categories[risk]
+            part = categories.iloc[rng.integers(0, len(categories), size=n_risk)].reset_index(drop=True)
+            part[TARGET_COLUMN] = risk
+
+            logs = np.empty((n_risk, len(NUMERICAL_COLUMNS)))
+            purposes = part["Purpose"].to_numpy()
+            fitted = np.zeros(n_risk, dtype=bool)
+            for purpose in np.unique(purposes):
+                key = (risk, purpose)
+                if key in self.log_normals:
+                    mask = purposes == purpose
+                    logs[mask] = rng.multivariate_normal(*self.log_normals[key], size=int(mask.sum()))
+                    fitted |= mask
+            logs[~fitted] = rng.multivariate_normal(
+                *self.log_normals[(risk, None)], size=int((~fitted).sum())
+            )
+            values = np.exp(logs)
+            for j, column in enumerate(NUMERICAL_COLUMNS):
+                low, high = self.bounds[column]
+                part[column] = np.clip(np.rint(values[:, j]), low, high).astype(np.int64)
+            # Snap to the nearest duration of the raw data, e.g. 6, 12, 18 or 24 months.
+            position = np.clip(np.searchsorted(self.durations, part["Duration"]), 1, len(self.durations) - 1)
+            lower, upper = self.durations[position - 1], self.durations[position]
+            part["Duration"] = np.where(part["Duration"] - lower <= upper - part["Duration"], lower, upper)
+            parts.append(part)
+
+        df = pd.concat(parts, ignore_index=True)
+        # Risk groups were generated one after the other.
+        return df.iloc[rng.permutation(n_rows)][RAW_COLUMNS].reset_index(drop=True)
+
+    def generate(
+            self,
+            n_rows: int,
+            chunk_size: int = 1_000_000,
+            seed: int = 0,
+            start: pd.Timestamp = pd.Timestamp("2024-01-01", tz="UTC"),
+            end: pd.Timestamp = pd.Timestamp("2025-01-01", tz="UTC"),
+            entity_id_start: int = 1,
+    ) -> Iterator[pd.DataFrame]:
+        """Generate n_rows rows in chunks.
+
+        Args:
+            n_rows: number of rows.
+            chunk_size: rows per chunk.
+            seed: seed of the random streams.
+            start: earliest event_timestamp.
+            end: event_timestamps are before end.
+            entity_id_start: entity_id of the first row, ids are consecutive.
+
+        Returns: Iterator of DataFrames with entity_id, event_timestamp and the RAW_COLUMNS
+        """
+        n_chunks = -(-n_rows // chunk_size)
+        span_us = int((end - start) / pd.Timedelta(microseconds=1))
+        for i, sequence in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+            rng = np.random.default_rng(sequence)
+            n_chunk = min(chunk_size, n_rows - i * chunk_size)
+            df = self.sample(n_chunk, rng)
+            first_id = entity_id_start + i * chunk_size
+            df.insert(0, "entity_id", np.arange(first_id, first_id + n_chunk, dtype=np.int64))
+            df.insert(1, "event_timestamp",
+                      start + pd.to_timedelta(rng.integers(0, span_us, size=n_chunk), unit="us"))
+            yield df
+
+    def write(self, path: str, n_rows: int, **kwargs) -> int:
+        """Generate n_rows rows to a .csv or .parquet file, chunk by chunk.
+
+        Args:
+            path: output file, the suffix selects the format.
+            n_rows: number of rows.
+            kwargs: arguments of generate().
+
+        Returns: number of rows written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix not in (".csv", ".parquet"):
+            raise ValueError(f"unsupported output format [{path.suffix}], use .csv or .parquet.")
+
+        rows = 0
+        writer: Optional[pq.ParquetWriter] = None
+        try:
+            for df in self.generate(n_rows, **kwargs):
+                if path.suffix == ".csv":
+                    df.to_csv(path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+                else:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                rows += len(df)
+                logging.info("Generated %s / %s rows", rows, n_rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+
+def main():
+    """Generate a synthetic data file"""
+    parser = argparse.ArgumentParser(description="Generate synthetic german credit data")
+    parser.add_argument("--input", default="../data/raw/german_credit_data.csv")
+    parser.add_argument("--output", required=True, help=".csv or .parquet file")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2024-01-01", help="earliest event_timestamp (UTC)")
+    parser.add_argument("--end", default="2025-01-01", help="event_timestamps are before end (UTC)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = SyntheticCreditDataGenerator.from_csv(args.input).write(
+        args.output, args.rows, chunk_size=args.chunk_size, seed=args.seed,
+        start=pd.Timestamp(args.start, tz="UTC"), end=pd.Timestamp(args.end, tz="UTC"),
+    )
+    logging.info("Wrote %s rows to [%s] in %.1f sec", rows, args.output, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,348 @@
+"""Hyperparameter Tuning Module.
+
+Successive halving search for the XGBoost credit risk model. Boosting rounds
+(n_estimators) are used as the resource: every candidate starts with a small
+number of rounds, only the best 1/factor of the candidates are promoted to the
+next rung with factor times more rounds, and every fit stops early on a
+validation split carved out of the training fold.
+"""
+import logging
+import math
+import time
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+from joblib import (
+    Parallel,
+    delayed,
+)
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import (
+    GridSearchCV,
+    ParameterGrid,
+    StratifiedKFold,
+    train_test_split,
+)
+from xgboost import XGBClassifier
+
+
+def _take(data, indices):
+    """Row selection that works for both DataFrame and ndarray."""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.iloc[indices]
+    return data[indices]
+
+
+def _fit_and_score_fold(
+        params: Dict[str, Any],
+        n_estimators: int,
+        X,
+        y,
+        train_index: np.ndarray,
+        test_index: np.ndarray,
+        scoring: str,
+        early_stopping_rounds: int,
+        validation_fraction: float,
+        random_state: int,
+) -> Tuple[float, int]:
+    """Fit one candidate on one CV fold with early stopping.
+
+    The early stopping validation set is split off the training fold so that
+    the test fold used for scoring is never seen during training.
+
+    Returns: Tuple(score on the test fold, number of boosting rounds actually used)
+    """
+    y_train_fold = _take(y, train_index)
+    fit_index, val_index = train_test_split(
+        train_index,
+        test_size=validation_fraction,
+        stratify=y_train_fold,
+        random_state=random_state
+    )
+    model = XGBClassifier(
+        **params,
+        n_estimators=n_estimators,
+        early_stopping_rounds=early_stopping_rounds,
+        n_jobs=1,
+    )
+    model.fit(
+        _take(X, fit_index), _take(y, fit_index),
+        eval_set=[(_take(X, val_index), _take(y, val_index))],
+        verbose=False
+    )
+    score = get_scorer(scoring)(model, _take(X, test_index), _take(y, test_index))
+    best_iteration = getattr(model, "best_iteration", None)
+    n_rounds = n_estimators if best_iteration is None else best_iteration + 1
+    return float(score), int(n_rounds)
+
+
+class XGBSuccessiveHalvingSearch:
+    """Successive halving search over XGBClassifier hyperparameters.
+
+    Mirrors the GridSearchCV attributes used in the notebooks
+    (best_params_, best_score_, best_estimator_, cv_results_).
+
+    Args:
+        param_grid: Parameter grid as for GridSearchCV. If it contains
+            'n_estimators', the largest value is used as max_resource and the
+            key is removed from the grid, as the rounds are the resource.
+        base_params: Parameters applied to every candidate, e.g. random_state,
+            scale_pos_weight, eval_metric.
+        scoring: sklearn scorer name to select candidates with.
+        cv: Number of stratified folds.
+        factor: Proportion of candidates kept per rung is 1/factor and the
+            boosting rounds are multiplied by factor on every rung.
+        min_resource: Boosting rounds given to every candidate on the first rung.
+        max_resource: Boosting rounds on the last rung.
+        early_stopping_rounds: Stop a fit if the validation metric has not
+            improved for this number of rounds.
+        validation_fraction: Fraction of each training fold held out for early stopping.
+        n_jobs: Number of parallel (candidate, fold) fits. -1 uses all cores.
+        random_state: Seed for the fold and validation splits.
+    """
+    def __init__(
+            self,
+            param_grid: Dict[str, List[Any]],
+            base_params: Optional[Dict[str, Any]] = None,
+            scoring: str = "f1",
+            cv: int = 5,
+            factor: int = 3,
+            min_resource: int = 20,
+            max_resource: Optional[int] = None,
+            early_stopping_rounds: int = 50,
+            validation_fraction: float = 0.2,
+            n_jobs: int = -1,
+            random_state: int = 2,
+    ):
+        self.param_grid = dict(param_grid)
+        self.base_params = dict(base_params or {})
+        self.scoring = scoring
+        self.cv = cv
+        self.factor = factor
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+        self.best_params_: Dict[str, Any] = {}
+        self.best_score_: float = float("nan")
+        self.best_n_estimators_: int = 0
+        self.best_estimator_: Optional[XGBClassifier] = None
+        self.cv_results_: List[Dict[str, Any]] = []
+        self.elapsed_seconds_: float = 0.0
+
+    def _resources(self, n_candidates: int, max_resource: int) -> List[int]:
+        """Boosting rounds per rung, ending with max_resource on the last rung."""
+        n_rungs_by_candidates = math.ceil(math.log(max(n_candidates, 1), self.factor)) + 1
+        n_rungs_by_resource = int(
+            math.floor(math.log(max_resource / self.min_resource, self.factor))
+        ) + 1
+        n_rungs = max(1, min(n_rungs_by_candidates, n_rungs_by_resource))
+        return [
+            max(1, int(max_resource / self.factor ** (n_rungs - 1 - rung)))
+            for rung in range(n_rungs)
+        ]
+
+    def fit(
+            self,
+            X,
+            y,
+            initial_candidates: Optional[List[Dict[str, Any]]] = None
+    ) -> "XGBSuccessiveHalvingSearch":
+        """Run the search.
+
+        Args:
+            X: training features
+            y: training labels
+            initial_candidates: Extra candidates (e.g. the best of a previous
+                stage) evaluated on the first rung together with the grid.
+
+        Returns: self
+        """
+        start = time.perf_counter()
+        grid = dict(self.param_grid)
+        max_resource = self.max_resource
+        if "n_estimators" in grid:
+            max_resource = max_resource or max(grid.pop("n_estimators"))
+        max_resource = max_resource or 300
+
+        candidates = [
+            {**self.base_params, **params} for params in ParameterGrid(grid)
+        ]
+        for params in initial_candidates or []:
+            params = {**self.base_params, **params}
+            params.pop("n_estimators", None)
+            if params not in candidates:
+                candidates.append(params)
+
+        folds = list(
+            StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+            .split(X, y)
+        )
+        resources = self._resources(len(candidates), max_resource)
+        logging.info(
+            "Successive halving: [%s] candidates, [%s] folds, rounds per rung %s",
+            len(candidates), len(folds), resources
+        )
+
+        self.cv_results_ = []
+        survivors = list(range(len(candidates)))
+        rung_results: List[Tuple[int, float, int]] = []
+        for rung, n_estimators in enumerate(resources):
+            outputs = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_and_score_fold)(
+                    candidates[index], n_estimators, X, y, train_index, test_index,
+                    self.scoring, self.early_stopping_rounds,
+                    self.validation_fraction, self.random_state
+                )
+                for index in survivors
+                for train_index, test_index in folds
+            )
+            rung_results = []
+            for position, index in enumerate(survivors):
+                fold_outputs = outputs[position * len(folds):(position + 1) * len(folds)]
+                scores = np.array([score for score, _ in fold_outputs])
+                rounds = int(np.ceil(np.mean([n_rounds for _, n_rounds in fold_outputs])))
+                rung_results.append((index, float(scores.mean()), rounds))
+                self.cv_results_.append({
+                    "rung": rung,
+                    "n_estimators": n_estimators,
+                    "params": candidates[index],
+                    "mean_test_score": float(scores.mean()),
+                    "std_test_score": float(scores.std()),
+                    "mean_rounds_used": rounds,
+                })
+
+            rung_results.sort(key=lambda result: result[1], reverse=True)
+            n_keep = max(1, math.ceil(len(rung_results) / self.factor))
+            survivors = [index for index, _, _ in rung_results[:n_keep]]
+            logging.info(
+                "Rung [%s] n_estimators=[%s]: best score [%.4f], promoting [%s]",
+                rung, n_estimators, rung_results[0][1], len(survivors)
+            )
+
+        best_index, self.best_score_, self.best_n_estimators_ = rung_results[0]
+        self.best_params_ = {**candidates[best_index], "n_estimators": self.best_n_estimators_}
+
+        self.best_estimator_ = XGBClassifier(**self.best_params_)
+        self.best_estimator_.fit(X, y, verbose=False)
+        self.elapsed_seconds_ = time.perf_counter() - start
+        return self
+
+
+def two_stage_search(
+        X,
+        y,
+        stage1_grid: Dict[str, List[Any]],
+        stage2_grid: Dict[str, List[Any]],
+        base_params: Optional[Dict[str, Any]] = None,
+        **kwargs
+) -> Tuple[XGBSuccessiveHalvingSearch, XGBSuccessiveHalvingSearch]:
+    """Two stage search as in the notebook, stage 2 warm-started from stage 1.
+
+    Stage 2 fixes every stage 1 parameter not present in stage2_grid to its
+    best value, caps the rounds at what stage 1 actually used (plus early stopping
+    head room), and seeds the stage 1 winner as a candidate so that stage 2 can
+    never end up worse than stage 1.
+
+    Args:
+        X: training features
+        y: training labels
+        stage1_grid: parameter grid for the first stage
+        stage2_grid: parameter grid for the second stage
+        base_params: parameters applied to every candidate
+        kwargs: passed to XGBSuccessiveHalvingSearch
+
+    Returns: Tuple(stage 1 search, stage 2 search)
+    """
+    stage1 = XGBSuccessiveHalvingSearch(
+        param_grid=stage1_grid, base_params=base_params, **kwargs
+    ).fit(X, y)
+
+    stage1_best = dict(stage1.best_params_)
+    stage1_best.pop("n_estimators")
+    stage2_base = {**(base_params or {}), **stage1_best}
+    for key in stage2_grid:
+        stage2_base.pop(key, None)
+
+    stage2_kwargs = dict(kwargs)
+    stage2_kwargs.setdefault(
+        "max_resource",
+        stage1.best_n_estimators_ + stage2_kwargs.get("early_stopping_rounds", 50)
+    )
+    stage2 = XGBSuccessiveHalvingSearch(
+        param_grid={k: v for k, v in stage2_grid.items() if k != "n_estimators"},
+        base_params=stage2_base,
+        **stage2_kwargs
+    ).fit(X, y, initial_candidates=[stage1_best])
+    return stage1, stage2
+
+
+def compare_with_grid_search(
+        X_train,
+        y_train,
+        X_test,
+        y_test,
+        param_grid: Dict[str, List[Any]],
+        base_params: Optional[Dict[str, Any]] = None,
+        scoring: str = "f1",
+        cv: int = 5,
+        **kwargs
+) -> pd.DataFrame:
+    """Run exhaustive GridSearchCV and successive halving on the same grid and
+    report wall-clock time and scores side by side.
+
+    Args:
+        X_train: training features
+        y_train: training labels
+        X_test: test features
+        y_test: test labels
+        param_grid: parameter grid including 'n_estimators'
+        base_params: parameters applied to every candidate
+        scoring: sklearn scorer name
+        cv: number of folds
+        kwargs: passed to XGBSuccessiveHalvingSearch
+
+    Returns: DataFrame with one row per method.
+    """
+    base_params = dict(base_params or {})
+    scorer = get_scorer(scoring)
+
+    start = time.perf_counter()
+    grid = GridSearchCV(
+        XGBClassifier(**base_params), param_grid=param_grid, cv=cv, scoring=scoring, n_jobs=-1
+    )
+    grid.fit(X_train, y_train)
+    grid_seconds = time.perf_counter() - start
+
+    halving = XGBSuccessiveHalvingSearch(
+        param_grid=param_grid, base_params=base_params, scoring=scoring, cv=cv, **kwargs
+    ).fit(X_train, y_train)
+
+    report = pd.DataFrame([
+        {
+            "method": "GridSearchCV",
+            "seconds": grid_seconds,
+            "cv_score": grid.best_score_,
+            "test_score": scorer(grid.best_estimator_, X_test, y_test),
+            "n_estimators": grid.best_params_.get("n_estimators"),
+        },
+        {
+            "method": "SuccessiveHalving",
+            "seconds": halving.elapsed_seconds_,
+            "cv_score": halving.best_score_,
+            "test_score": scorer(halving.best_estimator_, X_test, y_test),
+            "n_estimators": halving.best_n_estimators_,
+        },
+    ])
+    report["speedup"] = grid_seconds / report["seconds"]
+    return report